@@ -0,0 +1,56 @@
+"""
+Throughput of relational_database.batch_rewrite over worker process counts.
+
+Needs an in-memory entitlement snapshot (no Neo4j during the run); the queries are a few
+shapes with varying literals spread over --users users, like a day of query logs.
+
+    python -m graph_database.in_memory_repository --save /tmp/entitlements.json
+    python -m benchmark.bench_batch_rewrite --snapshot /tmp/entitlements.json --queries 200000
+    python -m benchmark.bench_batch_rewrite --snapshot /tmp/entitlements.json --workers 1 2 4 8
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import time
+
+from relational_database.batch_rewrite import DEFAULT_CHUNK_SIZE, rewrite_batch
+
+SHAPES = [
+    "SELECT e.emp_id, e.first_name, e.salary FROM bank.employee e WHERE e.emp_id > {n} ORDER BY e.emp_id",
+    "SELECT e.emp_id, e.salary, d.dept_name FROM bank.employee e "
+    "JOIN bank.department d ON e.dept_id = d.dept_id WHERE e.salary > {n}",
+    "SELECT d.dept_name, COUNT(*) AS staff FROM bank.department d "
+    "JOIN bank.employee e ON e.dept_id = d.dept_id GROUP BY d.dept_name HAVING COUNT(*) > {n}",
+]
+
+USERS = ["user-alice", "user-bob", "user-carol", "user-sam", "user-tom"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--snapshot", required=True, help="entitlement snapshot the workers load")
+    parser.add_argument("--queries", type=int, default=50000)
+    parser.add_argument("--users", type=int, default=len(USERS), help="distinct users (sample users first)")
+    parser.add_argument("--workers", type=int, nargs="+", default=None, help="worker counts to measure")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    users = (USERS + [f"user-{i}" for i in range(args.users)])[:args.users]
+    pairs = [(users[i % len(users)], SHAPES[i % len(SHAPES)].format(n=i)) for i in range(args.queries)]
+    counts = args.workers or sorted({1, 2, 4, os.cpu_count() or 1})
+
+    baseline = None
+    for workers in counts:
+        started = time.perf_counter()
+        errors = sum(
+            result.error is not None
+            for result in rewrite_batch(pairs, workers, args.chunk_size, "mysql", args.snapshot)
+        )
+        rate = len(pairs) / (time.perf_counter() - started)
+        baseline = baseline or rate
+        print(f"workers={workers:<3} {rate:12,.0f} queries/s  scaling={rate / baseline:5.2f}x  errors={errors}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Fetch throughput of jaydebeapi's row-wise fetchmany() versus the column-wise typed getters
+in relational_database.columnar_fetch, on a generated result of --rows rows (default 1M).
+
+The rows come from a recursive CTE (MySQL) or CONNECT BY (Oracle), so no table is needed;
+pass --sql to measure a real table instead. Needs the [mysql] / [oracle] JDBC settings.
+
+    python -m benchmark.bench_columnar_fetch
+    python -m benchmark.bench_columnar_fetch --section oracle --rows 200000
+    python -m benchmark.bench_columnar_fetch --sql "SELECT * FROM bank.big_table"
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Callable
+
+from relational_database.columnar_fetch import fetch_columnar
+from relational_database.jdbc_pool import jdbc_pool
+
+_GENERATED_SQL = {
+    "mysql": """
+        WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < {rows})
+        SELECT n AS id, CONCAT('name-', n) AS name, n * 1.25 AS amount,
+               DATE_ADD('2020-01-01', INTERVAL n MOD 3650 DAY) AS day,
+               CASE WHEN n MOD 10 = 0 THEN NULL ELSE n MOD 97 END AS bucket
+        FROM seq
+    """,
+    "oracle": """
+        SELECT LEVEL AS id, 'name-' || LEVEL AS name, LEVEL * 1.25 AS amount,
+               DATE '2020-01-01' + MOD(LEVEL, 3650) AS day,
+               CASE WHEN MOD(LEVEL, 10) = 0 THEN NULL ELSE MOD(LEVEL, 97) END AS bucket
+        FROM dual CONNECT BY LEVEL <= {rows}
+    """,
+}
+
+
+def _row_dicts(cursor, batch_size: int) -> int:
+    # what oracle_query did: jaydebeapi per-cell conversion, then a dict per row
+    columns = [d[0] for d in cursor.description]
+    count = 0
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return count
+        count += len([dict(zip(columns, row)) for row in rows])
+
+
+def _columnar(cursor, batch_size: int) -> int:
+    return sum(batch.num_rows for batch in fetch_columnar(cursor, batch_size))
+
+
+def _execute(conn, sql: str) -> None:
+    cursor = conn.cursor()
+    try:
+        cursor.execute(sql)
+    finally:
+        cursor.close()
+
+
+def _run(conn, sql: str, fetch: Callable[[object, int], int], batch_size: int) -> tuple:
+    cursor = conn.cursor()
+    try:
+        cursor.execute(sql)
+        started = time.perf_counter()
+        count = fetch(cursor, batch_size)
+        return count, time.perf_counter() - started
+    finally:
+        cursor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--section", choices=sorted(_GENERATED_SQL), default="mysql")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--sql", help="query to fetch instead of the generated rows")
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    sql = args.sql or _GENERATED_SQL[args.section].format(rows=args.rows)
+    # MySQL stops recursive CTEs at 1000 levels by default; the pooled connection gets the
+    # session default back before it is returned
+    raise_depth = not args.sql and args.section == "mysql"
+    pool = jdbc_pool(args.section)
+    with pool.connection() as conn:
+        if raise_depth:
+            _execute(conn, f"SET SESSION cte_max_recursion_depth = {args.rows + 1}")
+        try:
+            for label, fetch in (("row-wise fetchmany + dicts", _row_dicts), ("columnar typed getters", _columnar)):
+                best = None
+                for _ in range(args.repeat):
+                    count, seconds = _run(conn, sql, fetch, args.batch_size)
+                    best = seconds if best is None else min(best, seconds)
+                print(f"{label:<28} rows={count:>9}  best={best:8.2f}s  {count / best:12,.0f} rows/s")
+        finally:
+            if raise_depth:
+                _execute(conn, "SET SESSION cte_max_recursion_depth = DEFAULT")
+
+
+if __name__ == "__main__":
+    main()
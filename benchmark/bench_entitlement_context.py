@@ -0,0 +1,86 @@
+"""
+Latency of the entitlement lookup done by entitlements_node.
+
+Compares the previous path (one repository for the per-table entitlements, a second one for the
+group names and the row-governed tables, N+2 sessions in total) against the unified
+EntitlementRepository.fetch_entitlement_context read transaction.
+
+Requires the seeded Neo4j graph (python -m demo.neo4j_data_loader).
+
+    python -m benchmark.bench_entitlement_context --user user-alice --iterations 200
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+from typing import Callable, List
+
+from graph_database.entitlement_util import EntitlementRepository
+from relational_database.mysql.mysql_entitlement_util import fetch_all_entitlements_for_tables, parse_tables
+
+DEFAULT_SQL = """
+SELECT e.emp_id, e.first_name, e.last_name, e.salary, d.dept_name
+FROM bank.employee e
+JOIN bank.department d ON e.dept_id = d.dept_id
+"""
+
+
+def _separate_lookups(user_id: str, parsed_tables):
+    repo = EntitlementRepository()
+    try:
+        fetch_all_entitlements_for_tables(user_id, parsed_tables)
+        repo.fetch_user_group_names(user_id)
+        repo.fetch_row_governed_tables(parsed_tables)
+    finally:
+        repo.close()
+
+
+def _unified_context(user_id: str, parsed_tables):
+    repo = EntitlementRepository()
+    try:
+        repo.fetch_entitlement_context(user_id, parsed_tables)
+    finally:
+        repo.close()
+
+
+def _measure(fn: Callable[[], None], iterations: int, warmup: int) -> List[float]:
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000.0)
+    return timings
+
+
+def _report(label: str, timings: List[float]) -> None:
+    ordered = sorted(timings)
+    p95 = ordered[max(0, int(len(ordered) * 0.95) - 1)]
+    print(
+        f"{label:<20} mean={statistics.mean(timings):8.2f} ms  "
+        f"p50={statistics.median(timings):8.2f} ms  p95={p95:8.2f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user", default="user-alice")
+    parser.add_argument("--sql", default=DEFAULT_SQL)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    args = parser.parse_args()
+
+    parsed_tables = parse_tables(args.sql)
+    print(f"tables: {[t['table'] for t in parsed_tables]}  iterations: {args.iterations}")
+
+    separate = _measure(lambda: _separate_lookups(args.user, parsed_tables), args.iterations, args.warmup)
+    unified = _measure(lambda: _unified_context(args.user, parsed_tables), args.iterations, args.warmup)
+    _report("separate lookups", separate)
+    _report("entitlement context", unified)
+    print(f"speedup (mean): {statistics.mean(separate) / statistics.mean(unified):.2f}x")
+
+
+if __name__ == "__main__":
+    main()
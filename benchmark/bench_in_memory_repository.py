@@ -0,0 +1,74 @@
+"""
+Per-call latency of the entitlement reads on the Neo4j repository and the in-memory engine.
+
+With --snapshot only the in-memory engine is measured, so no Neo4j is needed:
+
+    python -m graph_database.in_memory_repository --save /tmp/entitlements.json
+    python -m benchmark.bench_in_memory_repository --snapshot /tmp/entitlements.json
+    python -m benchmark.bench_in_memory_repository --user user-alice --iterations 2000
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+from typing import Callable, List
+
+from graph_database.in_memory_repository import InMemoryEntitlementRepository
+
+DEFAULT_TABLES = [{"schema": "bank", "table": "employee"}, {"schema": "bank", "table": "department"}]
+
+
+def _measure(fn: Callable[[], object], iterations: int, warmup: int) -> List[float]:
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1e6)
+    return timings
+
+
+def _report(label: str, timings: List[float]) -> None:
+    ordered = sorted(timings)
+    p99 = ordered[max(0, int(len(ordered) * 0.99) - 1)]
+    print(f"{label:<44} mean={statistics.mean(timings):10.1f} us  p99={p99:10.1f} us")
+
+
+def _bench(name: str, repo, user_id: str, tables, iterations: int, warmup: int) -> None:
+    _report(f"{name} fetch_entitlements", _measure(
+        lambda: repo.fetch_entitlements(user_id, tables[0]["schema"], tables[0]["table"]), iterations, warmup))
+    _report(f"{name} fetch_user_group_names", _measure(
+        lambda: repo.fetch_user_group_names(user_id), iterations, warmup))
+    _report(f"{name} fetch_row_governed_tables", _measure(
+        lambda: repo.fetch_row_governed_tables(tables), iterations, warmup))
+    _report(f"{name} fetch_entitlement_context", _measure(
+        lambda: repo.fetch_entitlement_context(user_id, tables), iterations, warmup))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user", default="user-alice")
+    parser.add_argument("--snapshot", help="load the in-memory engine from this snapshot and skip Neo4j")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=100)
+    args = parser.parse_args()
+
+    if args.snapshot:
+        memory = InMemoryEntitlementRepository.from_snapshot(args.snapshot)
+    else:
+        from graph_database.entitlement_util import EntitlementRepository
+
+        memory = InMemoryEntitlementRepository.from_neo4j()
+        neo4j_repo = EntitlementRepository()
+        try:
+            _bench("neo4j", neo4j_repo, args.user, DEFAULT_TABLES, args.iterations, args.warmup)
+        finally:
+            neo4j_repo.close()
+    print(f"graph: {memory.stats()['nodes']}")
+    _bench("memory", memory, args.user, DEFAULT_TABLES, args.iterations, args.warmup)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+CPU per request of the parse + rewrite steps: parsing the SQL in parse_tables and again in
+the rewriter, versus parsing once in parse_node and rewriting the shared AST in place.
+
+Runs over a generated corpus of wide analytical queries (many projected columns, joins,
+CASE expressions, GROUP BY/ORDER BY). No database is needed; the rewrite plan cache is off.
+
+    python -m benchmark.bench_parse_once --queries 200 --columns 60
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+from typing import List
+
+from relational_database.mysql import mysql_entitlement_util as util
+from relational_database.parsed_query import parse_query
+
+ENTITLEMENTS = {
+    "bank.employee": [
+        {
+            "columnName": "dept_name",
+            "policyDefinition": "Allow access only to rows where dept_name = 'Finance'",
+            "ruleType": "ROW",
+        },
+        {
+            "columnName": "salary",
+            "policyDefinition": "Mask salary EXCEPT members of Client Support Team",
+            "ruleType": "MASK",
+        },
+    ],
+    "bank.department": [],
+}
+GOVERNED = ["bank.employee"]
+
+
+def wide_query(n: int, columns: int) -> str:
+    projections = ["e.salary"]
+    for i in range(columns):
+        if i % 3 == 0:
+            projections.append(f"SUM(CASE WHEN e.grade_{i} > {i} THEN e.amount_{i} ELSE 0 END) AS s_{i}")
+        elif i % 3 == 1:
+            projections.append(f"AVG(d.metric_{i}) AS a_{i}")
+        else:
+            projections.append(f"COALESCE(e.attr_{i}, d.attr_{i}, 'n/a') AS c_{i}")
+    return (
+        f"SELECT e.emp_id, d.dept_name, {', '.join(projections)} "
+        "FROM bank.employee e "
+        "JOIN bank.department d ON e.dept_id = d.dept_id "
+        f"WHERE e.hire_date >= '2020-01-{1 + n % 28:02d}' AND d.budget > {1000 * n} "
+        "GROUP BY e.emp_id, d.dept_name, e.salary "
+        f"ORDER BY e.emp_id LIMIT {10 + n}"
+    )
+
+
+def _parse_twice(sql: str) -> str:
+    parsed_tables = util.parse_tables(sql)
+    return util.rule_based_rewrite_all(sql, parsed_tables, ENTITLEMENTS, [], GOVERNED)
+
+
+def _parse_once(sql: str) -> str:
+    parsed_query = parse_query(sql, "mysql")
+    return util.rule_based_rewrite_all(
+        sql, parsed_query.parsed_tables(), ENTITLEMENTS, [], GOVERNED, parsed_query
+    )
+
+
+def _measure(fn, corpus: List[str]) -> List[float]:
+    timings = []
+    for sql in corpus:
+        start = time.process_time()
+        fn(sql)
+        timings.append((time.process_time() - start) * 1000.0)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--columns", type=int, default=60)
+    args = parser.parse_args()
+
+    util.rewrite_cache = None
+    corpus = [wide_query(n, args.columns) for n in range(args.queries)]
+    for sql in corpus[:3]:
+        assert _parse_twice(sql) == _parse_once(sql)
+
+    twice = _measure(_parse_twice, corpus)
+    once = _measure(_parse_once, corpus)
+    saved = statistics.mean(twice) - statistics.mean(once)
+    print(f"corpus: {len(corpus)} queries, ~{len(corpus[0])} chars each")
+    print(f"parse twice  mean CPU={statistics.mean(twice):8.2f} ms")
+    print(f"parse once   mean CPU={statistics.mean(once):8.2f} ms")
+    print(f"saved per request: {saved:.2f} ms ({saved / statistics.mean(twice) * 100:.0f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Per-query latency of the entitlement pipeline in each runner mode:
+
+    graph-rebuild  a StateGraph built and compiled for every query (what run_query used to do)
+    graph          the StateGraph compiled once and reused (entitlement_pipeline.compiled_app)
+    fast           the node functions called directly (entitlement_pipeline.run_query_fast)
+
+The nodes do the same work in every mode, so the differences are framework overhead. To keep
+Neo4j and database round trips out of the numbers, run with an in-memory entitlement graph
+and the embedded executor:
+
+    [entitlement] BACKEND = memory, SNAPSHOT = /tmp/entitlements.json
+    [executor]    BACKEND = sqlite
+
+    python -m benchmark.bench_pipeline_overhead
+    python -m benchmark.bench_pipeline_overhead --iterations 2000 --modes graph fast
+
+The graph modes need langgraph; they are skipped when it is not installed.
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+from typing import Callable, List
+
+from relational_database.mysql import entitlement_pipeline as pipeline
+
+DEFAULT_SQL = (
+    "SELECT e.emp_id, e.first_name, e.salary, d.dept_name FROM bank.employee e "
+    "JOIN bank.department d ON e.dept_id = d.dept_id ORDER BY e.emp_id LIMIT 10"
+)
+
+
+def _graph_rebuild(user_id: str, sql: str):
+    return pipeline.build_app().invoke({"user_id": user_id, "input_sql": sql})
+
+
+MODES = {
+    "graph-rebuild": _graph_rebuild,
+    "graph": pipeline.run_query_graph,
+    "fast": pipeline.run_query_fast,
+}
+
+
+def _measure(fn: Callable[[], object], iterations: int, warmup: int) -> List[float]:
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1e6)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user", default="user-alice")
+    parser.add_argument("--sql", default=DEFAULT_SQL)
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    args = parser.parse_args()
+
+    baseline = None
+    for mode in args.modes:
+        run = MODES[mode]
+        try:
+            timings = _measure(lambda: run(args.user, args.sql), args.iterations, args.warmup)
+        except ImportError as exc:
+            print(f"{mode:<14} skipped: {exc}")
+            continue
+        ordered = sorted(timings)
+        mean = statistics.mean(timings)
+        p99 = ordered[max(0, int(len(ordered) * 0.99) - 1)]
+        baseline = baseline or mean
+        print(f"{mode:<14} mean={mean:10.1f} us  p99={p99:10.1f} us  relative={mean / baseline:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
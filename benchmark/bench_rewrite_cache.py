@@ -0,0 +1,79 @@
+"""
+Rule-based rewrite latency with and without the rewrite plan cache.
+
+Replays a few query shapes with varying literals, the pattern BI tools produce. No database
+is needed; entitlements are fixed in-process.
+
+    python -m benchmark.bench_rewrite_cache --iterations 2000
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+from typing import List
+
+from relational_database.mysql import mysql_entitlement_util as util
+from relational_database.rewrite_cache import RewriteCache
+
+SHAPES = [
+    "SELECT e.emp_id, e.first_name, e.salary FROM bank.employee e ORDER BY e.emp_id LIMIT {n}",
+    "SELECT e.emp_id, e.salary, d.dept_name FROM bank.employee e "
+    "JOIN bank.department d ON e.dept_id = d.dept_id ORDER BY 'k{n}' LIMIT {n}",
+    "SELECT d.dept_name, {n} AS bucket FROM bank.department d LIMIT {n}",
+]
+
+ENTITLEMENTS = {
+    "bank.employee": [
+        {
+            "columnName": "dept_name",
+            "policyDefinition": "Allow access only to rows where dept_name = 'Finance'",
+            "ruleType": "ROW",
+        },
+        {
+            "columnName": "salary",
+            "policyDefinition": "Mask salary EXCEPT members of Client Support Team",
+            "ruleType": "MASK",
+        },
+    ],
+    "bank.department": [],
+}
+
+
+def _run(queries: List[str]) -> List[float]:
+    timings = []
+    for sql in queries:
+        parsed = util.parse_tables(sql)
+        start = time.perf_counter()
+        util.rule_based_rewrite_all(sql, parsed, ENTITLEMENTS, ["Finance"], ["bank.employee"])
+        timings.append((time.perf_counter() - start) * 1e6)
+    return timings
+
+
+def _report(label: str, timings: List[float]) -> None:
+    ordered = sorted(timings)
+    p99 = ordered[max(0, int(len(ordered) * 0.99) - 1)]
+    print(f"{label:<12} mean={statistics.mean(timings):9.1f} us  p50={statistics.median(timings):9.1f} us  p99={p99:9.1f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    queries = [SHAPES[i % len(SHAPES)].format(n=i + 1) for i in range(args.iterations)]
+
+    util.rewrite_cache = None
+    uncached = _run(queries)
+    cache = RewriteCache()
+    util.rewrite_cache = cache
+    cached = _run(queries)
+
+    _report("no cache", uncached)
+    _report("plan cache", cached)
+    print(f"speedup (mean): {statistics.mean(uncached) / statistics.mean(cached):.1f}x")
+    print(cache.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+HTTP load benchmark for the Entitlement Manager API.
+
+Runs a fixed number of concurrent clients against one or more running instances and reports
+requests/sec and latency percentiles per instance, e.g. the previous sync build on :8001 and
+the async build on :8000:
+
+    uvicorn webapp.main:app --port 8000 --workers 1
+    python -m benchmark.bench_webapp_load --base-url http://localhost:8000 \\
+        --base-url http://localhost:8001 --concurrency 200 --duration 30
+
+Requires httpx (pip install httpx).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Dict, List
+
+DEFAULT_PATHS = [
+    "/api/users",
+    "/api/groups",
+    "/api/dashboard",
+    "/api/users/user-alice/group-options",
+    "/api/search?q=finance",
+]
+
+
+def _percentile(ordered: List[float], pct: float) -> float:
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+async def _client(client, paths: List[str], stop_at: float, latencies: List[float], errors: List[int], offset: int):
+    i = offset
+    while time.perf_counter() < stop_at:
+        path = paths[i % len(paths)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            response = await client.get(path)
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+                continue
+        except Exception:
+            errors.append(0)
+            continue
+        latencies.append((time.perf_counter() - start) * 1000.0)
+
+
+async def run_load(base_url: str, paths: List[str], concurrency: int, duration: float) -> Dict[str, float]:
+    import httpx
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    latencies: List[float] = []
+    errors: List[int] = []
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+        started = time.perf_counter()
+        stop_at = started + duration
+        await asyncio.gather(
+            *(_client(client, paths, stop_at, latencies, errors, n) for n in range(concurrency))
+        )
+        elapsed = time.perf_counter() - started
+
+    ordered = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": statistics.median(ordered) if ordered else 0.0,
+        "p99_ms": _percentile(ordered, 99),
+        "max_ms": ordered[-1] if ordered else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", action="append", dest="base_urls")
+    parser.add_argument("--path", action="append", dest="paths")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=30.0)
+    args = parser.parse_args()
+
+    base_urls = args.base_urls or ["http://localhost:8000"]
+    paths = args.paths or DEFAULT_PATHS
+    for base_url in base_urls:
+        result = asyncio.run(run_load(base_url, paths, args.concurrency, args.duration))
+        print(
+            f"{base_url:<28} requests={result['requests']:>7} errors={result['errors']:>5} "
+            f"rps={result['rps']:9.1f} p50={result['p50_ms']:8.2f} ms "
+            f"p99={result['p99_ms']:8.2f} ms max={result['max_ms']:8.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
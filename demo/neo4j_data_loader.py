@@ -1,6 +1,8 @@
 from neo4j import GraphDatabase
 import os
 from secret.secret_util import get_config
+from graph_database.entitlement_schema import ensure_schema
+from graph_database.policy_compiler import backfill
 import asyncio
 import websockets
 import json
@@ -55,4 +57,6 @@ if __name__ == "__main__":
         database=database,
         filepath=cypher_file
     )
+    print("✔ Neo4j constraints/indexes:", ensure_schema())
+    print("✔ Compiled policies:", backfill())
     asyncio.run(notify_schema_change_via_ws())
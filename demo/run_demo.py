@@ -1,31 +1,11 @@
-from langgraph.graph import StateGraph, START, END
 from relational_database.mysql.mysql_entitlement_util import *
+# compiled StateGraph reused across queries, or the fast path ([entitlement] PIPELINE)
+from relational_database.mysql.entitlement_pipeline import run_query
 from relational_database.mysql.mysql_entitlement_util import _effective_entitlements_for_user
+from relational_database.jdbc_pool import jdbc_pool
 from secret.secret_util import *
 config = get_config()
 
-# ---- Graph wiring ----------------------------------------------------
-def build_app():
-    g = StateGraph(AppState)
-    g.add_node("parse", parse_node)
-    g.add_node("entitlements", entitlements_node)
-    g.add_node("rewrite", rewrite_node)
-    g.add_node("execute", execute_node)
-
-    g.add_edge(START, "parse")
-    g.add_edge("parse", "entitlements")
-    g.add_edge("entitlements", "rewrite")
-    g.add_edge("rewrite", "execute")
-    g.add_edge("execute", END)
-    return g.compile()
-
-# ---- Runner ----------------------------------------------------------
-def run_query(user_id: str, sql: str) -> AppState:
-    app = build_app()
-    initial: AppState = {"user_id": user_id, "input_sql": sql}
-    return app.invoke(initial)
-
-
 def summarize_effective_entitlements(res: AppState) -> list[str]:
     summaries = []
     entitlements_by_table = res.get("entitlements_by_table", {}) or {}
@@ -71,6 +51,9 @@ def show(user_id: str, sql: str):
         print(row)
 
 if __name__ == "__main__":
+    # start the JVM and open the MySQL connections once, before the first query
+    jdbc_pool("mysql").warm()
+
     q = """
     SELECT e.emp_id, e.first_name, e.last_name, e.salary, d.dept_name
     FROM bank.employee e
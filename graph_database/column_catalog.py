@@ -0,0 +1,419 @@
+"""
+Column catalog: (:Column)-[:belongsToTable]->(:Table)-[:belongsToSchema]->(:Schema) as an
+in-memory index, so the rewriter can expand SELECT * and resolve unqualified columns without
+a graph query per statement.
+
+The index is loaded with one read query (or from the in-memory entitlement graph when
+[entitlement] BACKEND = memory) and revalidated against the entitlement graph version at most
+every [column_catalog] CHECK_INTERVAL seconds; any mutation bumps that version, so a reload
+follows every graph change. A check or reload runs on a worker thread and is waited for at most
+[column_catalog] CHECK_TIMEOUT seconds: when the graph is slow or unreachable the rewriter keeps
+the index it has (and logs why) instead of blocking in driver retries.
+
+A table's column list is complete only once it was synced from the database catalog (columns
+then carry ordinalPosition): the seed graph holds just the columns policies point at.
+sync_from_information_schema() reads MySQL information_schema.columns and upserts only the
+columns that are new or whose position/type changed, one write transaction per chunk.
+
+    python -m graph_database.column_catalog --sync bank
+    python -m graph_database.column_catalog --sync bank --prune
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Sequence, Set, Tuple
+
+from graph_database.entitlement_util import (
+    CURRENT_VERSION_QUERY,
+    ENTITLEMENT_VERSION_ID,
+    entitlement_change,
+    record_changes,
+)
+from graph_database.in_memory_repository import shared_in_memory_repository
+from graph_database.neo4j_driver_registry import neo4j_driver_registry
+from secret.secret_util import get_config
+
+logger = logging.getLogger(__name__)
+
+# version checks and reloads, off the rewrite path; one at a time is enough
+_refresh_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="column-catalog-refresh")
+
+FETCH_COLUMN_CATALOG_QUERY = """
+    MATCH (c:Column)-[:belongsToTable]->(t:Table)-[:belongsToSchema]->(s:Schema)
+    RETURN
+      s.schemaName       AS schemaName,
+      t.tableName        AS tableName,
+      c.columnName       AS columnName,
+      c.ordinalPosition  AS ordinalPosition,
+      c.dataType         AS dataType
+"""
+
+SYNC_COLUMNS_QUERY = """
+    UNWIND $rows AS row
+    MERGE (s:Schema {schemaId: row.schemaId})
+      ON CREATE SET s.schemaName = row.schemaName
+    MERGE (t:Table {tableId: row.tableId})
+      ON CREATE SET t.tableName = row.tableName
+    MERGE (t)-[:belongsToSchema]->(s)
+    MERGE (c:Column {columnId: row.columnId})
+      ON CREATE SET c.columnName = row.columnName
+    SET c.ordinalPosition = row.ordinalPosition,
+        c.dataType = row.dataType
+    MERGE (c)-[:belongsToTable]->(t)
+"""
+
+# columns gone from the database; those a policy still points at are kept (and reported)
+PRUNE_COLUMNS_QUERY = """
+    UNWIND $columnIds AS columnId
+    MATCH (c:Column {columnId: columnId})
+    WHERE NOT EXISTS { MATCH (:Policy)-[:hasRowRule|hasColumnRule]->(c) }
+    DETACH DELETE c
+    RETURN columnId
+"""
+
+INFORMATION_SCHEMA_COLUMNS_SQL = """
+    SELECT table_schema, table_name, column_name, ordinal_position, data_type
+    FROM information_schema.columns
+    WHERE table_schema IN ({schemas})
+    ORDER BY table_schema, table_name, ordinal_position
+"""
+
+
+def _table_key(schema_name: str, table_name: str) -> str:
+    return f"{schema_name}.{table_name}".lower()
+
+
+@dataclass
+class _Index:
+    version: int
+    columns: Dict[str, List[str]]  # "schema.table" (lower) -> column names, ordinal order
+    complete: Set[str]  # tables whose every column has an ordinalPosition (synced)
+
+
+def _build_index(rows: Sequence[Dict[str, Any]], version: int) -> _Index:
+    by_table: Dict[str, List[Tuple[int | None, str]]] = {}
+    for row in rows:
+        if row.get("schemaName") is None or row.get("tableName") is None or not row.get("columnName"):
+            continue
+        by_table.setdefault(_table_key(row["schemaName"], row["tableName"]), []).append(
+            (row.get("ordinalPosition"), row["columnName"])
+        )
+    columns: Dict[str, List[str]] = {}
+    complete: Set[str] = set()
+    for key, entries in by_table.items():
+        ordered = sorted(entries, key=lambda e: (e[0] is None, e[0] or 0, e[1]))
+        columns[key] = [name for _, name in ordered]
+        if all(position is not None for position, _ in entries):
+            complete.add(key)
+    return _Index(version=version, columns=columns, complete=complete)
+
+
+def _memory_backend() -> bool:
+    return get_config().get("entitlement", "BACKEND", fallback="neo4j").strip().lower() == "memory"
+
+
+class ColumnCatalog:
+    """
+    Version-checked, in-memory column index of the entitlement graph. Thread safe.
+    """
+
+    def __init__(self, check_interval: float = 5.0, driver=None, database: str | None = None,
+                 check_timeout: float = 2.0):
+        self.check_interval = check_interval
+        self.check_timeout = check_timeout
+        self._driver = driver
+        self._database = database
+        self._index: _Index | None = None
+        self._checked_at = 0.0
+        self._pending: Future | None = None
+        self._lock = threading.Lock()
+        self._stats = {"loads": 0, "version_checks": 0, "check_failures": 0, "lookups": 0, "misses": 0}
+
+    # ---------------------------
+    # Loading and revalidation
+    # ---------------------------
+    def _run_read(self, work):
+        driver = self._driver or neo4j_driver_registry.acquire()
+        try:
+            with driver.session(database=self._database or neo4j_driver_registry.database) as session:
+                return session.execute_read(work)
+        finally:
+            if self._driver is None:
+                neo4j_driver_registry.release()
+
+    def _fetch(self) -> Tuple[List[Dict[str, Any]], int]:
+        if self._driver is None and _memory_backend():
+            return shared_in_memory_repository().column_catalog_rows()
+
+        def _read(tx):
+            rows = [dict(r) for r in tx.run(FETCH_COLUMN_CATALOG_QUERY)]
+            return rows, tx.run(CURRENT_VERSION_QUERY, versionId=ENTITLEMENT_VERSION_ID).single()["version"]
+
+        return self._run_read(_read)
+
+    def _current_version(self) -> int:
+        if self._driver is None and _memory_backend():
+            return shared_in_memory_repository().current_version()
+        return self._run_read(
+            lambda tx: tx.run(CURRENT_VERSION_QUERY, versionId=ENTITLEMENT_VERSION_ID).single()["version"]
+        )
+
+    def reload(self) -> None:
+        rows, version = self._fetch()
+        index = _build_index(rows, version)
+        with self._lock:
+            self._index = index
+            self._checked_at = time.monotonic()
+            self._stats["loads"] += 1
+
+    def _refresh(self, index: _Index | None) -> None:
+        if index is None or self._current_version() != index.version:
+            self.reload()
+
+    def _fresh_index(self) -> _Index | None:
+        """
+        The index, revalidated when the check interval has passed; None while none could be loaded.
+        """
+        with self._lock:
+            index, due = self._index, time.monotonic() - self._checked_at >= self.check_interval
+            if due:
+                self._checked_at = time.monotonic()  # one checker per interval
+                if index is not None:
+                    self._stats["version_checks"] += 1
+                pending = self._pending
+                if pending is None or pending.done():
+                    pending = self._pending = _refresh_pool.submit(self._refresh, index)
+        if due:
+            try:
+                # a check that outlives the timeout finishes in the background
+                pending.result(timeout=self.check_timeout)
+            except Exception as exc:
+                with self._lock:
+                    self._stats["check_failures"] += 1
+                logger.warning(
+                    "column catalog: %s failed (%s: %s); serving %s",
+                    "version check" if index is not None else "load", type(exc).__name__, exc,
+                    f"the index of version {index.version}" if index is not None else "no index",
+                )
+        with self._lock:
+            return self._index
+
+    # ---------------------------
+    # Lookups
+    # ---------------------------
+    def version(self) -> int | None:
+        """
+        Entitlement graph version the index was loaded at (revalidated like every lookup);
+        None while no index could be loaded.
+        """
+        index = self._fresh_index()
+        return index.version if index is not None else None
+
+    def columns(self, table_key: str, complete_only: bool = True) -> List[str] | None:
+        """
+        Column names of "schema.table" in ordinal order; None when unknown (or, with
+        complete_only, when the table was never synced and the graph may hold only some columns).
+        """
+        index = self._fresh_index()
+        key = table_key.lower()
+        with self._lock:
+            self._stats["lookups"] += 1
+            if index is None or key not in index.columns or (complete_only and key not in index.complete):
+                self._stats["misses"] += 1
+                return None
+        return list(index.columns[key])
+
+    def has_column(self, table_key: str, column_name: str) -> bool | None:
+        """
+        Whether the table has the column; None when the table is not fully known.
+        """
+        columns = self.columns(table_key)
+        if columns is None:
+            return None
+        return column_name.lower() in {c.lower() for c in columns}
+
+    def resolve(self, column_name: str, table_keys: Sequence[str]) -> List[str]:
+        """
+        Which of the given tables have an (unqualified) column of that name, by the catalog.
+        """
+        return [key for key in table_keys if self.has_column(key, column_name)]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            index = self._index
+            return {
+                **self._stats,
+                "version": index.version if index else None,
+                "tables": len(index.columns) if index else 0,
+                "complete_tables": len(index.complete) if index else 0,
+                "check_interval": self.check_interval,
+                "check_timeout": self.check_timeout,
+            }
+
+
+_catalog: ColumnCatalog | None = None
+_catalog_lock = threading.Lock()
+
+
+def shared_column_catalog() -> ColumnCatalog | None:
+    """
+    Process-wide catalog, created on first use; None when [column_catalog] ENABLED = false.
+    """
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            config = get_config()
+            if not config.getboolean("column_catalog", "ENABLED", fallback=True):
+                return None
+            _catalog = ColumnCatalog(
+                check_interval=config.getfloat("column_catalog", "CHECK_INTERVAL", fallback=5.0),
+                check_timeout=config.getfloat("column_catalog", "CHECK_TIMEOUT", fallback=2.0),
+            )
+        return _catalog
+
+
+# ---------------------------
+# Sync from information_schema
+# ---------------------------
+@dataclass
+class CatalogSyncReport:
+    added: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    removed: int = 0
+    kept: List[str] = field(default_factory=list)  # gone from the database but still under a policy
+    version: int | None = None
+
+
+def information_schema_rows(schemas: Sequence[str], section: str = "mysql") -> List[Dict[str, Any]]:
+    """
+    Column rows of the given schemas from MySQL information_schema.columns.
+    """
+    from relational_database.jdbc_pool import jdbc_pool
+
+    placeholders = ", ".join("?" for _ in schemas)
+    with jdbc_pool(section).connection() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute(INFORMATION_SCHEMA_COLUMNS_SQL.format(schemas=placeholders), list(schemas))
+            return [
+                {
+                    "schemaName": schema_name,
+                    "tableName": table_name,
+                    "columnName": column_name,
+                    "ordinalPosition": int(position),
+                    "dataType": data_type,
+                }
+                for schema_name, table_name, column_name, position, data_type in cur.fetchall()
+            ]
+        finally:
+            cur.close()
+
+
+def _column_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    # ids follow the sample graph: bank / bank.employee / bank.employee.salary
+    table_id = f"{row['schemaName']}.{row['tableName']}"
+    return {
+        "schemaId": row["schemaName"],
+        "schemaName": row["schemaName"],
+        "tableId": table_id,
+        "tableName": row["tableName"],
+        "columnId": f"{table_id}.{row['columnName']}",
+        "columnName": row["columnName"],
+        "ordinalPosition": row["ordinalPosition"],
+        "dataType": row.get("dataType"),
+    }
+
+
+def sync_from_information_schema(
+    schemas: Sequence[str],
+    prune: bool = False,
+    chunk_size: int = 1000,
+    section: str = "mysql",
+    source_rows: Sequence[Dict[str, Any]] | None = None,
+    driver=None,
+    database: str | None = None,
+) -> CatalogSyncReport:
+    """
+    Diff the database catalog of `schemas` against the graph and upsert new or changed
+    columns (position/type) in chunks, bumping the graph version per chunk. With prune,
+    columns no longer in the database are deleted unless a policy references them.
+    source_rows replaces the information_schema read (other databases, tests).
+    """
+    owns_driver = driver is None
+    if owns_driver:
+        driver = neo4j_driver_registry.acquire()
+    database = database or neo4j_driver_registry.database
+    wanted = {s.lower() for s in schemas}
+    report = CatalogSyncReport()
+
+    def _upsert(tx, rows):
+        tx.run(SYNC_COLUMNS_QUERY, rows=rows).consume()
+        return record_changes(tx, [entitlement_change("upsert", "Column", row["columnId"]) for row in rows])
+
+    def _prune(tx, column_ids):
+        deleted = [r["columnId"] for r in tx.run(PRUNE_COLUMNS_QUERY, columnIds=column_ids)]
+        version = record_changes(tx, [entitlement_change("delete", "Column", column_id) for column_id in deleted])
+        return deleted, version
+
+    try:
+        rows = [_column_row(r) for r in (source_rows if source_rows is not None else information_schema_rows(schemas, section))]
+        with driver.session(database=database) as session:
+            existing = {
+                f"{r['schemaName']}.{r['tableName']}.{r['columnName']}": r
+                for r in session.run(FETCH_COLUMN_CATALOG_QUERY)
+                if r["schemaName"] and r["schemaName"].lower() in wanted
+            }
+            changed = []
+            for row in rows:
+                current = existing.pop(row["columnId"], None)
+                if current is None:
+                    report.added += 1
+                elif (current["ordinalPosition"], current["dataType"]) != (row["ordinalPosition"], row["dataType"]):
+                    report.updated += 1
+                else:
+                    report.unchanged += 1
+                    continue
+                changed.append(row)
+            for start in range(0, len(changed), chunk_size):
+                report.version = session.execute_write(_upsert, changed[start:start + chunk_size])
+
+            gone = sorted(existing)
+            if prune and gone:
+                for start in range(0, len(gone), chunk_size):
+                    chunk = gone[start:start + chunk_size]
+                    deleted, report.version = session.execute_write(_prune, chunk)
+                    report.removed += len(deleted)
+                    report.kept.extend(sorted(set(chunk) - set(deleted)))
+            else:
+                report.kept = gone
+    finally:
+        if owns_driver:
+            neo4j_driver_registry.release()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sync", nargs="+", required=True, metavar="SCHEMA", help="MySQL schemas to sync")
+    parser.add_argument("--prune", action="store_true", help="delete columns gone from the database")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--section", default="mysql", help="system_config.ini JDBC section")
+    args = parser.parse_args()
+
+    report = sync_from_information_schema(args.sync, prune=args.prune, chunk_size=args.chunk_size, section=args.section)
+    print(
+        f"added={report.added} updated={report.updated} unchanged={report.unchanged} "
+        f"removed={report.removed} kept={len(report.kept)} version={report.version}"
+    )
+    for column_id in report.kept:
+        print(f"  not in the database: {column_id}")
+
+
+if __name__ == "__main__":
+    main()
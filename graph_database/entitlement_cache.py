@@ -0,0 +1,269 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, FrozenSet, Hashable, Iterable, List, Tuple
+
+from secret.secret_util import get_config
+
+logger = logging.getLogger(__name__)
+
+# graph version checks, off the lookup path; one at a time is enough
+_check_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="entitlement-cache-check")
+
+
+def group_set_fingerprint(group_ids: Iterable[str]) -> str:
+    """
+    Stable fingerprint of a set of policy group ids; users with identical memberships share it.
+    """
+    joined = "\x1f".join(sorted({g for g in group_ids if g}))
+    return hashlib.sha1(joined.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class _Entry:
+    value: Any
+    expires_at: float
+    user_id: str | None = None
+    group_ids: FrozenSet[str] = frozenset()
+    table_key: str | None = None
+
+
+class EntitlementCache:
+    """
+    Bounded LRU cache with per-entry TTL for entitlement lookups.
+
+    Entries are tagged with the user, the policy group set and the "schema.table" they were
+    derived from, so mutations can evict exactly the entries they affect:
+
+    - ("groups", user_id)                        -> the user's memberships
+    - ("entitlements", fingerprint, table_key)   -> ROW/MASK entitlements of a group set on a table
+    - ("governed", table_key)                    -> whether the table has any row rule
+
+    Every invalidation bumps `generation`. A reader takes the generation before it queries
+    Neo4j and passes it to put(); the store is skipped if an invalidation ran in between, so
+    grants read before a mutation cannot be cached after it.
+
+    Mutations made by other processes evict nothing here; revalidate() compares the entitlement
+    graph version at most every check_interval seconds and clears the cache when it moved.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 60.0,
+                 check_interval: float = 5.0, check_timeout: float = 2.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.check_interval = check_interval
+        self.check_timeout = check_timeout
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.stale_puts = 0
+        self.version_checks = 0
+        self.check_failures = 0
+        self.version_clears = 0
+        self._generation = 0
+        self._version: int | None = None
+        self._checked_at = 0.0
+        self._pending: Future | None = None
+
+    @property
+    def generation(self) -> int:
+        with self._lock:
+            return self._generation
+
+    # ---------------------------
+    # Lookup / store
+    # ---------------------------
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            if entry.expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry.value
+
+    def put(
+        self,
+        key: Hashable,
+        value: Any,
+        user_id: str | None = None,
+        group_ids: Iterable[str] = (),
+        table_key: str | None = None,
+        generation: int | None = None,
+    ) -> None:
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                self.stale_puts += 1
+                return
+            self._entries[key] = _Entry(
+                value=value,
+                expires_at=time.monotonic() + self.ttl_seconds,
+                user_id=user_id,
+                group_ids=frozenset(group_ids),
+                table_key=table_key,
+            )
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    # ---------------------------
+    # Graph version check
+    # ---------------------------
+    def revalidate(self, current_version: Callable[[], int]) -> None:
+        """
+        Clear the cache if the graph version changed since the last check. Runs at most every
+        check_interval seconds (negative: never) and waits at most check_timeout seconds; a
+        check that fails or times out keeps the entries, which still expire after their TTL.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self.check_interval < 0 or now - self._checked_at < self.check_interval:
+                return
+            self._checked_at = now  # one checker per interval
+            self.version_checks += 1
+            pending = self._pending
+            if pending is None or pending.done():
+                pending = self._pending = _check_pool.submit(self._check_version, current_version)
+        try:
+            # a check that outlives the timeout finishes in the background
+            pending.result(timeout=self.check_timeout)
+        except Exception as exc:
+            with self._lock:
+                self.check_failures += 1
+            logger.warning(
+                "entitlement cache: version check failed (%s: %s); serving entries read at version %s",
+                type(exc).__name__, exc, self._version,
+            )
+
+    def _check_version(self, current_version: Callable[[], int]) -> None:
+        version = current_version()
+        with self._lock:
+            if version == self._version:
+                return
+            known, self._version = self._version, version
+            if known is not None or self._entries:
+                self.version_clears += 1
+                self.clear()
+
+    # ---------------------------
+    # Invalidation
+    # ---------------------------
+    def _evict_where(self, predicate) -> int:
+        with self._lock:
+            self._generation += 1
+            doomed = [key for key, entry in self._entries.items() if predicate(entry)]
+            for key in doomed:
+                del self._entries[key]
+            self.invalidations += len(doomed)
+            return len(doomed)
+
+    def invalidate_user(self, user_id: str) -> int:
+        """Membership of this user changed."""
+        return self._evict_where(lambda e: e.user_id == user_id)
+
+    def invalidate_groups(self, group_ids: Iterable[str]) -> int:
+        """Policies or properties of these groups changed (also drops memberships naming them)."""
+        targets = {g for g in group_ids if g}
+        if not targets:
+            return 0
+        return self._evict_where(lambda e: not targets.isdisjoint(e.group_ids))
+
+    def invalidate_tables(self, table_keys: Iterable[str]) -> int:
+        """Columns or rules of these "schema.table" keys changed."""
+        targets = {t for t in table_keys if t}
+        if not targets:
+            return 0
+        return self._evict_where(lambda e: e.table_key in targets)
+
+    def invalidate_scope(
+        self,
+        user_ids: Iterable[str] = (),
+        group_ids: Iterable[str] = (),
+        table_keys: Iterable[str] = (),
+    ) -> int:
+        users = {u for u in user_ids if u}
+        groups = {g for g in group_ids if g}
+        tables = {t for t in table_keys if t}
+        if not (users or groups or tables):
+            return 0
+        return self._evict_where(
+            lambda e: e.user_id in users or not groups.isdisjoint(e.group_ids) or e.table_key in tables
+        )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "stale_puts": self.stale_puts,
+                "generation": self._generation,
+                "version": self._version,
+                "version_checks": self.version_checks,
+                "check_failures": self.check_failures,
+                "version_clears": self.version_clears,
+                "check_interval": self.check_interval,
+                "check_timeout": self.check_timeout,
+            }
+
+
+def memberships_key(user_id: str) -> Tuple[str, str]:
+    return ("groups", user_id)
+
+
+def entitlements_key(fingerprint: str, table_key: str) -> Tuple[str, str, str]:
+    return ("entitlements", fingerprint, table_key)
+
+
+def governed_key(table_key: str) -> Tuple[str, str]:
+    return ("governed", table_key)
+
+
+def group_ids_of(memberships: List[Dict[str, Any]]) -> List[str]:
+    return [m["policyGroupId"] for m in memberships if m.get("policyGroupId")]
+
+
+def _cache_from_config() -> EntitlementCache | None:
+    config = get_config()
+    if not config.getboolean("entitlement_cache", "ENABLED", fallback=True):
+        return None
+    return EntitlementCache(
+        max_entries=config.getint("entitlement_cache", "MAX_ENTRIES", fallback=10000),
+        ttl_seconds=config.getfloat("entitlement_cache", "TTL_SECONDS", fallback=60.0),
+        check_interval=config.getfloat("entitlement_cache", "CHECK_INTERVAL", fallback=5.0),
+        check_timeout=config.getfloat("entitlement_cache", "CHECK_TIMEOUT", fallback=2.0),
+    )
+
+
+# Process-wide cache shared by every EntitlementRepository and the webapp (None when disabled)
+entitlement_cache = _cache_from_config()
@@ -0,0 +1,206 @@
+"""
+Constraint and index bootstrap for the entitlement graph.
+
+Every MERGE in EntitlementRepository and every MATCH on userId/policyGroupId/... in the webapp
+is a full label scan unless these exist. ensure_schema() is idempotent and runs at webapp
+startup and from the loaders; explain_index_usage() reports which indexes each repository
+query plans to use.
+
+    python -m graph_database.entitlement_schema            # ensure constraints/indexes
+    python -m graph_database.entitlement_schema --explain  # plus per-query index report
+"""
+from __future__ import annotations
+
+import argparse
+from typing import Any, Dict, List
+
+from graph_database import entitlement_util as eu
+from graph_database.neo4j_driver_registry import neo4j_driver_registry
+from graph_database.policy_compiler import policy_properties
+
+# Uniqueness constraints on the ontology identifiers (names match demo/scripts/seed_neo4j.cypher)
+CONSTRAINT_STATEMENTS = [
+    "CREATE CONSTRAINT unique_userId IF NOT EXISTS FOR (n:User) REQUIRE n.userId IS UNIQUE",
+    "CREATE CONSTRAINT unique_policyGroupId IF NOT EXISTS FOR (n:PolicyGroup) REQUIRE n.policyGroupId IS UNIQUE",
+    "CREATE CONSTRAINT unique_policyId IF NOT EXISTS FOR (n:Policy) REQUIRE n.policyId IS UNIQUE",
+    "CREATE CONSTRAINT unique_schemaId IF NOT EXISTS FOR (n:Schema) REQUIRE n.schemaId IS UNIQUE",
+    "CREATE CONSTRAINT unique_tableId IF NOT EXISTS FOR (n:Table) REQUIRE n.tableId IS UNIQUE",
+    "CREATE CONSTRAINT unique_columnId IF NOT EXISTS FOR (n:Column) REQUIRE n.columnId IS UNIQUE",
+    "CREATE CONSTRAINT unique_entitlementVersionId IF NOT EXISTS "
+    "FOR (n:EntitlementVersion) REQUIRE n.versionId IS UNIQUE",
+]
+
+# Lookup indexes on the name properties the repository matches on
+INDEX_STATEMENTS = [
+    "CREATE INDEX policy_group_name IF NOT EXISTS FOR (n:PolicyGroup) ON (n.policyGroupName)",
+    "CREATE INDEX policy_name IF NOT EXISTS FOR (n:Policy) ON (n.policyName)",
+    "CREATE INDEX schema_name IF NOT EXISTS FOR (n:Schema) ON (n.schemaName)",
+    "CREATE INDEX table_name IF NOT EXISTS FOR (n:Table) ON (n.tableName)",
+    "CREATE INDEX column_name IF NOT EXISTS FOR (n:Column) ON (n.columnName)",
+    "CREATE INDEX entitlement_change_version IF NOT EXISTS FOR (n:EntitlementChange) ON (n.version)",
+]
+
+SCHEMA_STATEMENTS = CONSTRAINT_STATEMENTS + INDEX_STATEMENTS
+
+_SAMPLE_PAIRS = [{"schemaName": "bank", "tableName": "employee"}]
+_SAMPLE_POLICY_ROW = {
+    "ruleType": "MASK",
+    "schemaId": "bank", "schemaName": "bank",
+    "tableId": "bank.employee", "tableName": "employee",
+    "columnId": "bank.employee.salary", "columnName": "salary",
+    "policyId": "mask_salary", "policyName": "Mask salary", "definition": "",
+    "compiled": policy_properties(""),
+    "policyGroupId": "pg", "policyGroupName": "pg",
+}
+_SAMPLE_POLICY_PARAMS = {
+    "schemaId": "bank", "schemaName": "bank",
+    "tableId": "bank.employee", "tableName": "employee",
+    "columnId": "bank.employee.salary", "columnName": "salary",
+    "policyId": "mask_salary", "policyName": "Mask salary", "definition": "",
+    "compiled": policy_properties(""),
+}
+
+# name -> (query, sample parameters) for every query EntitlementRepository runs
+REPOSITORY_QUERIES: Dict[str, tuple] = {
+    "fetch_entitlements": (
+        eu.FETCH_ENTITLEMENTS_QUERY,
+        {"userId": "user-alice", "schemaName": "bank", "tableName": "employee"},
+    ),
+    "fetch_entitlements_for_tables": (
+        eu.FETCH_ENTITLEMENTS_FOR_TABLES_QUERY,
+        {"userId": "user-alice", "pairs": _SAMPLE_PAIRS},
+    ),
+    "fetch_user_memberships": (eu.FETCH_USER_MEMBERSHIPS_QUERY, {"userId": "user-alice"}),
+    "fetch_row_governed_tables": (eu.FETCH_ROW_GOVERNED_TABLES_QUERY, {"pairs": _SAMPLE_PAIRS}),
+    "fetch_entitlement_context": (
+        eu.FETCH_ENTITLEMENT_CONTEXT_QUERY,
+        {"userId": "user-alice", "pairs": _SAMPLE_PAIRS},
+    ),
+    "fetch_group_entitlement_context": (
+        eu.FETCH_GROUP_ENTITLEMENT_CONTEXT_QUERY,
+        {"groupIds": ["finance_pg"], "pairs": _SAMPLE_PAIRS},
+    ),
+    "add_mask_policy": (eu.ADD_MASK_POLICY_QUERY, _SAMPLE_POLICY_PARAMS),
+    "add_row_policy": (eu.ADD_ROW_POLICY_QUERY, _SAMPLE_POLICY_PARAMS),
+    "attach_policy_group": (
+        eu.ATTACH_POLICY_GROUP_QUERY,
+        {"policyGroupId": "pg", "policyGroupName": "pg", "policyId": "mask_salary"},
+    ),
+    "add_user_to_policy_group": (
+        eu.ADD_USER_TO_POLICY_GROUP_QUERY,
+        {"userId": "user-alice", "policyGroupId": "pg", "policyGroupName": "pg"},
+    ),
+    "merge_policy_into_group": (
+        eu.MERGE_POLICY_INTO_GROUP_QUERY,
+        {
+            "policyGroupId": "pg", "policyGroupName": "pg",
+            "policyId": "mask_salary", "policyName": "Mask salary", "definition": "",
+            "compiled": policy_properties(""),
+        },
+    ),
+    "attach_policy_to_group": (
+        eu.ATTACH_POLICY_TO_GROUP_QUERY,
+        {"policyGroupId": "pg", "policyGroupName": "pg", "policyId": "mask_salary"},
+    ),
+    "bulk_upsert_policies": (eu.BULK_UPSERT_POLICIES_QUERY, {"rows": [_SAMPLE_POLICY_ROW]}),
+    "record_changes": (
+        eu.RECORD_CHANGES_QUERY,
+        {
+            "versionId": eu.ENTITLEMENT_VERSION_ID,
+            "changes": [eu.entitlement_change("link", "User", "user-alice", "memberOf", "PolicyGroup", "pg")],
+        },
+    ),
+    "current_version": (eu.CURRENT_VERSION_QUERY, {"versionId": eu.ENTITLEMENT_VERSION_ID}),
+    "changes_since": (eu.CHANGES_SINCE_QUERY, {"since": 0, "limit": 1000}),
+}
+
+_SCAN_OPERATORS = ("AllNodesScan", "NodeByLabelScan")
+
+
+def _existing_schema_names(session) -> set:
+    names = {record["name"] for record in session.run("SHOW CONSTRAINTS YIELD name RETURN name")}
+    names.update(record["name"] for record in session.run("SHOW INDEXES YIELD name RETURN name"))
+    return names
+
+
+def ensure_schema(driver=None, database: str | None = None) -> Dict[str, List[str]]:
+    """
+    Create the entitlement constraints and name indexes if missing (idempotent).
+    Returns {"created": [...], "existing": [...]} by constraint/index name; "existing" also
+    covers equivalents already present under another name.
+    """
+    owns_driver = driver is None
+    if owns_driver:
+        driver = neo4j_driver_registry.acquire()
+    database = database or neo4j_driver_registry.database
+    try:
+        with driver.session(database=database) as session:
+            before = _existing_schema_names(session)
+            for statement in SCHEMA_STATEMENTS:
+                session.run(statement).consume()
+            after = _existing_schema_names(session)
+    finally:
+        if owns_driver:
+            neo4j_driver_registry.release()
+    wanted = [statement.split()[2] for statement in SCHEMA_STATEMENTS]
+    created = sorted(name for name in after - before if name in wanted)
+    # IF NOT EXISTS is also a no-op when an equivalent constraint/index exists under another name
+    return {"created": created, "existing": sorted(name for name in wanted if name not in created)}
+
+
+def _walk_plan(plan: Dict[str, Any], out: Dict[str, List[str]]) -> None:
+    operator = plan.get("operatorType", "").split("@")[0]
+    details = (plan.get("args") or plan.get("arguments") or {}).get("Details", "")
+    if "Index" in operator:
+        out["indexes"].append(f"{operator}: {details}".strip(": "))
+    elif operator in _SCAN_OPERATORS:
+        out["scans"].append(f"{operator}: {details}".strip(": "))
+    for child in plan.get("children") or []:
+        _walk_plan(child, out)
+
+
+def explain_index_usage(driver=None, database: str | None = None) -> Dict[str, Dict[str, List[str]]]:
+    """
+    EXPLAIN every repository query and list the index seeks/scans and label scans in its plan.
+    EXPLAIN does not execute the query, so write queries are safe to inspect.
+    """
+    owns_driver = driver is None
+    if owns_driver:
+        driver = neo4j_driver_registry.acquire()
+    database = database or neo4j_driver_registry.database
+    report: Dict[str, Dict[str, List[str]]] = {}
+    try:
+        with driver.session(database=database) as session:
+            for name, (query, params) in REPOSITORY_QUERIES.items():
+                summary = session.run("EXPLAIN " + query, **params).consume()
+                usage: Dict[str, List[str]] = {"indexes": [], "scans": []}
+                if summary.plan:
+                    _walk_plan(summary.plan, usage)
+                report[name] = usage
+    finally:
+        if owns_driver:
+            neo4j_driver_registry.release()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--explain", action="store_true", help="report index usage of every repository query")
+    args = parser.parse_args()
+
+    result = ensure_schema()
+    print(f"created: {result['created'] or 'none'}")
+    print(f"already present: {result['existing'] or 'none'}")
+    if args.explain:
+        for name, usage in explain_index_usage().items():
+            print(f"\n{name}")
+            for line in usage["indexes"]:
+                print("  index:", line)
+            for line in usage["scans"]:
+                print("  SCAN: ", line)
+            if not usage["indexes"] and not usage["scans"]:
+                print("  (no node lookups)")
+
+
+if __name__ == "__main__":
+    main()
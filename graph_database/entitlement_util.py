@@ -1,95 +1,713 @@
 from __future__ import annotations
 
 import os
+import time
+from dataclasses import dataclass, field
+from itertools import islice
 
-from neo4j import GraphDatabase
-from typing import List, Dict, Any
+from neo4j.exceptions import ServiceUnavailable, SessionExpired, TransientError
+from typing import List, Dict, Any, Iterable
+from graph_database.entitlement_cache import (
+    entitlement_cache,
+    entitlements_key,
+    governed_key,
+    group_ids_of,
+    group_set_fingerprint,
+    memberships_key,
+)
+from graph_database.neo4j_driver_registry import Neo4jDriverRegistry, neo4j_driver_registry
+from graph_database.policy_compiler import COMPILED_POLICY_PROJECTION, policy_properties
 from secret.secret_util import get_config
 # Load all config once
 config = get_config()
 
+
+# ---------------------------
+# Repository queries (module level so schema tooling can EXPLAIN them)
+# ---------------------------
+FETCH_ENTITLEMENTS_QUERY = f"""
+    MATCH (u:User {{userId: $userId}})-[:memberOf]->(pg:PolicyGroup)-[:includesPolicy]->(p:Policy)
+    MATCH (t:Table {{tableName: $tableName}})-[:belongsToSchema]->(s:Schema {{schemaName: $schemaName}})
+    MATCH (c:Column)-[:belongsToTable]->(t)
+    MATCH (p)-[r:hasRowRule|hasColumnRule]->(c)
+    RETURN DISTINCT
+        c.columnName AS columnName,
+        p.definition  AS policyDefinition,
+        CASE type(r)
+            WHEN 'hasRowRule'    THEN 'ROW'
+            WHEN 'hasColumnRule' THEN 'MASK'
+        END AS ruleType,{COMPILED_POLICY_PROJECTION} AS compiled
+    ORDER BY columnName, ruleType
+"""
+
+FETCH_ENTITLEMENTS_FOR_TABLES_QUERY = f"""
+    UNWIND $pairs AS pair
+    MATCH (t:Table {{tableName: pair.tableName}})-[:belongsToSchema]->(s:Schema {{schemaName: pair.schemaName}})
+    MATCH (c:Column)-[:belongsToTable]->(t)
+    MATCH (u:User {{userId: $userId}})-[:memberOf]->(pg:PolicyGroup)-[:includesPolicy]->(p:Policy)
+    MATCH (p)-[r:hasRowRule|hasColumnRule]->(c)
+    WITH DISTINCT
+        pair.schemaName + '.' + pair.tableName AS tableKey,
+        c.columnName AS columnName,
+        p.definition  AS policyDefinition,
+        CASE type(r)
+            WHEN 'hasRowRule'    THEN 'ROW'
+            WHEN 'hasColumnRule' THEN 'MASK'
+        END AS ruleType,{COMPILED_POLICY_PROJECTION} AS compiled
+    RETURN tableKey, columnName, policyDefinition, ruleType, compiled
+    ORDER BY tableKey, columnName, ruleType
+"""
+
+FETCH_USER_MEMBERSHIPS_QUERY = """
+    MATCH (:User {userId: $userId})-[:memberOf]->(pg:PolicyGroup)
+    RETURN pg.policyGroupName AS policyGroupName, pg.policyGroupId AS policyGroupId
+    ORDER BY policyGroupName, policyGroupId
+"""
+
+FETCH_ROW_GOVERNED_TABLES_QUERY = """
+    UNWIND $pairs AS pair
+    MATCH (t:Table {tableName: pair.tableName})-[:belongsToSchema]->(s:Schema {schemaName: pair.schemaName})
+    MATCH (c:Column)-[:belongsToTable]->(t)
+    MATCH (:Policy)-[:hasRowRule]->(c)
+    RETURN DISTINCT s.schemaName AS schemaName, t.tableName AS tableName
+"""
+
+FETCH_ENTITLEMENT_CONTEXT_QUERY = f"""
+    RETURN
+      COLLECT {{
+        MATCH (:User {{userId: $userId}})-[:memberOf]->(pg:PolicyGroup)
+        RETURN DISTINCT {{policyGroupName: pg.policyGroupName, policyGroupId: pg.policyGroupId}} AS grp
+      }} AS userGroups,
+      COLLECT {{
+        UNWIND $pairs AS pair
+        MATCH (t:Table {{tableName: pair.tableName}})-[:belongsToSchema]->(:Schema {{schemaName: pair.schemaName}})
+        MATCH (c:Column)-[:belongsToTable]->(t)
+        MATCH (:User {{userId: $userId}})-[:memberOf]->(:PolicyGroup)-[:includesPolicy]->(p:Policy)
+        MATCH (p)-[r:hasRowRule|hasColumnRule]->(c)
+        RETURN DISTINCT {{
+          tableKey: pair.schemaName + '.' + pair.tableName,
+          columnName: c.columnName,
+          policyDefinition: p.definition,
+          ruleType: CASE type(r) WHEN 'hasRowRule' THEN 'ROW' WHEN 'hasColumnRule' THEN 'MASK' END,
+          compiled:{COMPILED_POLICY_PROJECTION}
+        }} AS entitlement
+      }} AS entitlements,
+      COLLECT {{
+        UNWIND $pairs AS pair
+        MATCH (t:Table {{tableName: pair.tableName}})-[:belongsToSchema]->(:Schema {{schemaName: pair.schemaName}})
+        WHERE EXISTS {{ MATCH (:Policy)-[:hasRowRule]->(:Column)-[:belongsToTable]->(t) }}
+        RETURN DISTINCT pair.schemaName + '.' + pair.tableName AS tableKey
+      }} AS rowGovernedTables
+"""
+
+# FETCH_ENTITLEMENT_CONTEXT_QUERY for group ids already read (the pipeline prefetches them)
+FETCH_GROUP_ENTITLEMENT_CONTEXT_QUERY = f"""
+    RETURN
+      COLLECT {{
+        UNWIND $pairs AS pair
+        MATCH (t:Table {{tableName: pair.tableName}})-[:belongsToSchema]->(:Schema {{schemaName: pair.schemaName}})
+        MATCH (c:Column)-[:belongsToTable]->(t)
+        MATCH (pg:PolicyGroup)-[:includesPolicy]->(p:Policy)
+        WHERE pg.policyGroupId IN $groupIds
+        MATCH (p)-[r:hasRowRule|hasColumnRule]->(c)
+        RETURN DISTINCT {{
+          tableKey: pair.schemaName + '.' + pair.tableName,
+          columnName: c.columnName,
+          policyDefinition: p.definition,
+          ruleType: CASE type(r) WHEN 'hasRowRule' THEN 'ROW' WHEN 'hasColumnRule' THEN 'MASK' END,
+          compiled:{COMPILED_POLICY_PROJECTION}
+        }} AS entitlement
+      }} AS entitlements,
+      COLLECT {{
+        UNWIND $pairs AS pair
+        MATCH (t:Table {{tableName: pair.tableName}})-[:belongsToSchema]->(:Schema {{schemaName: pair.schemaName}})
+        WHERE EXISTS {{ MATCH (:Policy)-[:hasRowRule]->(:Column)-[:belongsToTable]->(t) }}
+        RETURN DISTINCT pair.schemaName + '.' + pair.tableName AS tableKey
+      }} AS rowGovernedTables
+"""
+
+# Policy MERGEs keep an existing policy's name and definition, but refresh its compiled*
+# properties when the definition is the same one (never compiled, or by an older compiler).
+ADD_MASK_POLICY_QUERY = """
+    MERGE (s:Schema {schemaId: $schemaId})
+      ON CREATE SET s.schemaName = $schemaName
+    MERGE (t:Table {tableId: $tableId})
+      ON CREATE SET t.tableName = $tableName
+    MERGE (t)-[:belongsToSchema]->(s)
+    MERGE (c:Column {columnId: $columnId})
+      ON CREATE SET c.columnName = $columnName
+    MERGE (c)-[:belongsToTable]->(t)
+    MERGE (p:Policy {policyId: $policyId})
+      ON CREATE SET p.policyName = $policyName,
+                    p.definition = $definition,
+                    p += $compiled
+      ON MATCH SET p += CASE WHEN p.definition = $definition THEN $compiled ELSE {} END
+    MERGE (p)-[:hasColumnRule]->(c)
+    RETURN
+      p.policyId      AS policyId,
+      p.policyName    AS policyName,
+      p.definition    AS policyDefinition,
+      s.schemaId      AS schemaId,
+      s.schemaName    AS schemaName,
+      t.tableId       AS tableId,
+      t.tableName     AS tableName,
+      c.columnId      AS columnId,
+      c.columnName    AS columnName
+"""
+
+ATTACH_POLICY_GROUP_QUERY = """
+    MERGE (pg:PolicyGroup {policyGroupId: $policyGroupId})
+      ON CREATE SET pg.policyGroupName = $policyGroupName
+    WITH pg
+    MATCH (p:Policy {policyId: $policyId})
+    MERGE (pg)-[:includesPolicy]->(p)
+    RETURN pg.policyGroupId AS policyGroupId, pg.policyGroupName AS policyGroupName
+"""
+
+ADD_USER_TO_POLICY_GROUP_QUERY = """
+    MERGE (u:User {userId: $userId})
+    MERGE (pg:PolicyGroup {policyGroupId: $policyGroupId})
+      ON CREATE SET pg.policyGroupName = $policyGroupName
+    MERGE (u)-[:memberOf]->(pg)
+    RETURN u.userId AS userId,
+           pg.policyGroupId AS policyGroupId,
+           pg.policyGroupName AS policyGroupName
+"""
+
+MERGE_POLICY_INTO_GROUP_QUERY = """
+        MERGE (pg:PolicyGroup {policyGroupId: $policyGroupId})
+          ON CREATE SET pg.policyGroupName = $policyGroupName
+        MERGE (p:Policy {policyId: $policyId})
+          ON CREATE SET p.policyName = $policyName,
+                        p.definition = $definition,
+                        p += $compiled
+          ON MATCH SET p += CASE WHEN p.definition = $definition THEN $compiled ELSE {} END
+        MERGE (pg)-[:includesPolicy]->(p)
+        RETURN pg.policyGroupId   AS policyGroupId,
+               pg.policyGroupName AS policyGroupName,
+               p.policyId         AS policyId,
+               p.policyName       AS policyName,
+               p.definition       AS policyDefinition
+        """
+
+ATTACH_POLICY_TO_GROUP_QUERY = """
+        MERGE (pg:PolicyGroup {policyGroupId: $policyGroupId})
+          ON CREATE SET pg.policyGroupName = $policyGroupName
+        WITH pg
+        MATCH (p:Policy {policyId: $policyId})
+        MERGE (pg)-[:includesPolicy]->(p)
+        RETURN pg.policyGroupId   AS policyGroupId,
+               pg.policyGroupName AS policyGroupName,
+               p.policyId         AS policyId,
+               p.policyName       AS policyName,
+               p.definition       AS policyDefinition
+        """
+
+ADD_ROW_POLICY_QUERY = """
+    MERGE (s:Schema {schemaId: $schemaId})
+      ON CREATE SET s.schemaName = $schemaName
+    MERGE (t:Table {tableId: $tableId})
+      ON CREATE SET t.tableName = $tableName
+    MERGE (t)-[:belongsToSchema]->(s)
+    MERGE (c:Column {columnId: $columnId})
+      ON CREATE SET c.columnName = $columnName
+    MERGE (c)-[:belongsToTable]->(t)
+    MERGE (p:Policy {policyId: $policyId})
+      ON CREATE SET p.policyName = $policyName,
+                    p.definition = $definition,
+                    p += $compiled
+      ON MATCH SET p += CASE WHEN p.definition = $definition THEN $compiled ELSE {} END
+    MERGE (p)-[:hasRowRule]->(c)
+    RETURN
+      p.policyId      AS policyId,
+      p.policyName    AS policyName,
+      p.definition    AS policyDefinition,
+      s.schemaId      AS schemaId,
+      s.schemaName    AS schemaName,
+      t.tableId       AS tableId,
+      t.tableName     AS tableName,
+      c.columnId      AS columnId,
+      c.columnName    AS columnName
+"""
+
+BULK_UPSERT_POLICIES_QUERY = """
+    UNWIND $rows AS row
+    MERGE (s:Schema {schemaId: row.schemaId})
+      ON CREATE SET s.schemaName = row.schemaName
+    MERGE (t:Table {tableId: row.tableId})
+      ON CREATE SET t.tableName = row.tableName
+    MERGE (t)-[:belongsToSchema]->(s)
+    MERGE (c:Column {columnId: row.columnId})
+      ON CREATE SET c.columnName = row.columnName
+    MERGE (c)-[:belongsToTable]->(t)
+    MERGE (p:Policy {policyId: row.policyId})
+      ON CREATE SET p.policyName = row.policyName,
+                    p.definition = row.definition,
+                    p += row.compiled
+      ON MATCH SET p += CASE WHEN p.definition = row.definition THEN row.compiled ELSE {} END
+    FOREACH (_ IN CASE WHEN row.ruleType = 'ROW' THEN [1] ELSE [] END |
+      MERGE (p)-[:hasRowRule]->(c))
+    FOREACH (_ IN CASE WHEN row.ruleType = 'MASK' THEN [1] ELSE [] END |
+      MERGE (p)-[:hasColumnRule]->(c))
+    FOREACH (_ IN CASE WHEN row.policyGroupId IS NULL THEN [] ELSE [1] END |
+      MERGE (pg:PolicyGroup {policyGroupId: row.policyGroupId})
+        ON CREATE SET pg.policyGroupName = row.policyGroupName
+      MERGE (pg)-[:includesPolicy]->(p))
+    RETURN DISTINCT s.schemaName + '.' + t.tableName AS tableKey
+"""
+
+# ---------------------------
+# Graph version and change log
+# ---------------------------
+# Every mutation bumps the single (:EntitlementVersion) counter and appends one
+# (:EntitlementChange) per touched entity inside its own write transaction, so readers can
+# validate with CURRENT_VERSION_QUERY instead of refetching policies.
+ENTITLEMENT_VERSION_ID = "entitlement"
+
+RECORD_CHANGES_QUERY = """
+    MERGE (v:EntitlementVersion {versionId: $versionId})
+      ON CREATE SET v.version = 0
+    SET v.version = v.version + 1,
+        v.updatedAt = datetime()
+    WITH v
+    UNWIND $changes AS change
+    CREATE (:EntitlementChange {
+      version: v.version,
+      action: change.action,
+      entityType: change.entityType,
+      entityId: change.entityId,
+      relationship: change.relationship,
+      targetType: change.targetType,
+      targetId: change.targetId,
+      changedAt: v.updatedAt
+    })
+    RETURN DISTINCT v.version AS version
+"""
+
+CURRENT_VERSION_QUERY = """
+    OPTIONAL MATCH (v:EntitlementVersion {versionId: $versionId})
+    RETURN coalesce(v.version, 0) AS version
+"""
+
+CHANGES_SINCE_QUERY = """
+    MATCH (c:EntitlementChange)
+    WHERE c.version > $since
+    RETURN
+      c.version      AS version,
+      c.action       AS action,
+      c.entityType   AS entityType,
+      c.entityId     AS entityId,
+      c.relationship AS relationship,
+      c.targetType   AS targetType,
+      c.targetId     AS targetId,
+      toString(c.changedAt) AS changedAt
+    ORDER BY version, entityType, entityId
+    LIMIT $limit
+"""
+
+
+def entitlement_change(
+    action: str,
+    entity_type: str,
+    entity_id: str,
+    relationship: str | None = None,
+    target_type: str | None = None,
+    target_id: str | None = None,
+) -> Dict[str, Any]:
+    """
+    One change-log entry: action is "upsert", "delete", "link" or "unlink"; link/unlink name
+    the relationship and its target.
+    """
+    return {
+        "action": action,
+        "entityType": entity_type,
+        "entityId": entity_id,
+        "relationship": relationship,
+        "targetType": target_type,
+        "targetId": target_id,
+    }
+
+
+def record_changes(tx, changes: List[Dict[str, Any]]) -> int:
+    """
+    Bump the graph version and log the changes inside the caller's write transaction.
+    """
+    if not changes:
+        return tx.run(CURRENT_VERSION_QUERY, versionId=ENTITLEMENT_VERSION_ID).single()["version"]
+    record = tx.run(RECORD_CHANGES_QUERY, versionId=ENTITLEMENT_VERSION_ID, changes=changes).single()
+    return record["version"]
+
+
+def _table_pairs(parsed_tables: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """
+    Deduplicated [{"schemaName", "tableName"}] pairs for parsed table refs (schema defaults to "bank").
+    """
+    pairs = []
+    seen = set()
+    for t in parsed_tables or []:
+        if not t.get("table"):
+            continue
+        schema = t.get("schema") or "bank"
+        key = f"{schema}.{t['table']}"
+        if key not in seen:
+            seen.add(key)
+            pairs.append({"schemaName": schema, "tableName": t["table"]})
+    return pairs
+
+
+def _group_names(memberships: List[Dict[str, Any]]) -> List[str]:
+    """
+    Display names of policy groups, falling back to the group id when the name is empty.
+    """
+    names = []
+    for row in memberships:
+        if row["policyGroupName"]:
+            names.append(row["policyGroupName"])
+        elif row["policyGroupId"]:
+            names.append(row["policyGroupId"])
+    return names
+
+
+def _result_table_key(result: Dict[str, Any]) -> str | None:
+    if result.get("schemaName") and result.get("tableName"):
+        return f"{result['schemaName']}.{result['tableName']}"
+    return None
+
+
+@dataclass
+class EntitlementContext:
+    """
+    Everything the rewriter needs for one user and one query, fetched in a single read transaction.
+    """
+    user_id: str
+    user_groups: List[str] = field(default_factory=list)
+    entitlements_by_table: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)  # "schema.table" keys
+    row_governed_tables: List[str] = field(default_factory=list)
+
+
+@dataclass
+class BulkUpsertReport:
+    """
+    Outcome of EntitlementRepository.bulk_upsert_policies.
+    """
+    rows: int = 0
+    chunks: int = 0
+    retries: int = 0
+    seconds: float = 0.0
+    version: int | None = None  # graph version after the last committed chunk
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.rows} policy rows in {self.chunks} chunk(s), {self.retries} retries, "
+            f"{self.seconds:.2f}s ({self.rows_per_second:.1f} rows/sec)"
+        )
+
+
+_POLICY_SPEC_FIELDS = (
+    ("schema_id", "schemaId"),
+    ("schema_name", "schemaName"),
+    ("table_id", "tableId"),
+    ("table_name", "tableName"),
+    ("column_id", "columnId"),
+    ("column_name", "columnName"),
+    ("policy_id", "policyId"),
+    ("policy_name", "policyName"),
+    ("definition", "definition"),
+)
+
+
+def _policy_spec_row(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Validate one policy spec (add_mask_policy/add_row_policy keyword names plus rule_type)
+    and convert it to the camelCase row consumed by the bulk UNWIND query.
+    """
+    rule_type = str(spec.get("rule_type") or "").upper()
+    if rule_type not in ("ROW", "MASK"):
+        raise ValueError(f"rule_type must be 'ROW' or 'MASK': {spec!r}")
+    row = {"ruleType": rule_type}
+    for key, prop in _POLICY_SPEC_FIELDS:
+        if spec.get(key) is None:
+            raise ValueError(f"Missing '{key}' in policy spec: {spec!r}")
+        row[prop] = spec[key]
+    row["compiled"] = policy_properties(row["definition"])
+    if spec.get("policy_group_id") and spec.get("policy_group_name"):
+        row["policyGroupId"] = spec["policy_group_id"]
+        row["policyGroupName"] = spec["policy_group_name"]
+    else:
+        row["policyGroupId"] = None
+        row["policyGroupName"] = None
+    return row
+
+
 class EntitlementRepository:
 
-    neo4j_bolt_url = config['neo4j']["URL"]
-    username = config['neo4j']["USERNAME"]
-    password = config['neo4j']["PASSWORD"]
     database = config['neo4j']["DATABASE"]
 
-    # 1. Create driver connection to Neo4j server
-    # Adjust host/port and credentials
-    driver = GraphDatabase.driver(
-        neo4j_bolt_url,
-        auth=(username, password),
-    )
-
+    # Process-wide entitlement cache keyed by group-set fingerprint (None when disabled)
+    cache = entitlement_cache
 
+    def __init__(self, registry: Neo4jDriverRegistry = neo4j_driver_registry):
+        # Shared, pooled driver; close() only drops this repository's reference
+        self._registry = registry
+        self.driver = registry.acquire()
+        self._closed = False
 
     def close(self):
-        self.driver.close()
+        if not self._closed:
+            self._closed = True
+            self._registry.release()
+
+    def _revalidate_cache(self) -> None:
+        # drops entries another process's mutation made stale (at most once per check interval)
+        self.cache.revalidate(self.current_version)
+
+    def _invalidate(self, user_ids=(), group_ids=(), table_keys=()) -> None:
+        if self.cache is not None:
+            self.cache.invalidate_scope(user_ids=user_ids, group_ids=group_ids, table_keys=table_keys)
 
     def fetch_entitlements(self, user_id: str, schema_name: str, table_name: str) -> List[Dict[str, Any]]:
         """
         Fetch all entitlements (row rules and column mask rules) for a given user on a table within a schema.
         """
-        query = """
-        MATCH (u:User {userId: $userId})-[:memberOf]->(pg:PolicyGroup)-[:includesPolicy]->(p:Policy)
-        MATCH (t:Table {tableName: $tableName})-[:belongsToSchema]->(s:Schema {schemaName: $schemaName})
-        MATCH (c:Column)-[:belongsToTable]->(t)
-        MATCH (p)-[r:hasRowRule|hasColumnRule]->(c)
-        RETURN DISTINCT
-            c.columnName AS columnName,
-            p.definition  AS policyDefinition,
-            CASE type(r)
-                WHEN 'hasRowRule'    THEN 'ROW'
-                WHEN 'hasColumnRule' THEN 'MASK'
-            END AS ruleType
-        ORDER BY columnName, ruleType
-        """
+        if self.cache is not None:
+            tables = [{"schema": schema_name, "table": table_name}]
+            return self.fetch_entitlements_for_tables(user_id, tables)[f"{schema_name}.{table_name}"]
 
         with self.driver.session(database=self.database) as session:
             results = session.run(
-                query,
+                FETCH_ENTITLEMENTS_QUERY,
                 userId=user_id,
                 schemaName=schema_name,
                 tableName=table_name
             )
             return [dict(r) for r in results]
 
-    def fetch_user_group_names(self, user_id: str) -> List[str]:
-        query = """
-        MATCH (:User {userId: $userId})-[:memberOf]->(pg:PolicyGroup)
-        RETURN pg.policyGroupName AS policyGroupName, pg.policyGroupId AS policyGroupId
-        ORDER BY policyGroupName, policyGroupId
+    def fetch_entitlements_for_tables(
+        self, user_id: str, parsed_tables: List[Dict[str, str]]
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Fetch entitlements for every (schema, table) referenced by a query in a single round trip.
+        Returns a dict keyed by "schema.table"; tables without entitlements map to an empty list.
         """
+        pairs = _table_pairs(parsed_tables)
+        out: Dict[str, List[Dict[str, Any]]] = {
+            f"{p['schemaName']}.{p['tableName']}": [] for p in pairs
+        }
+        if not pairs:
+            return out
+        if self.cache is None:
+            out.update(self._query_entitlements_for_pairs(user_id, pairs))
+            return out
+
+        self._revalidate_cache()
+        generation = self.cache.generation
+        group_ids = group_ids_of(self.fetch_user_memberships(user_id))
+        fingerprint = group_set_fingerprint(group_ids)
+        missing = []
+        for p in pairs:
+            key = f"{p['schemaName']}.{p['tableName']}"
+            found, cached = self.cache.get(entitlements_key(fingerprint, key))
+            if found:
+                out[key] = [dict(e) for e in cached]
+            else:
+                missing.append(p)
+        if missing:
+            fetched = self._query_entitlements_for_pairs(user_id, missing)
+            for p in missing:
+                key = f"{p['schemaName']}.{p['tableName']}"
+                out[key] = fetched.get(key, [])
+                self.cache.put(
+                    entitlements_key(fingerprint, key),
+                    [dict(e) for e in out[key]],
+                    group_ids=group_ids,
+                    table_key=key,
+                    generation=generation,
+                )
+        return out
+
+    def _query_entitlements_for_pairs(
+        self, user_id: str, pairs: List[Dict[str, str]]
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        out: Dict[str, List[Dict[str, Any]]] = {}
+
         with self.driver.session(database=self.database) as session:
-            results = session.run(query, userId=user_id)
-            names = []
+            results = session.run(FETCH_ENTITLEMENTS_FOR_TABLES_QUERY, userId=user_id, pairs=pairs)
             for row in results:
-                if row["policyGroupName"]:
-                    names.append(row["policyGroupName"])
-                elif row["policyGroupId"]:
-                    names.append(row["policyGroupId"])
-            return names
+                out.setdefault(row["tableKey"], []).append(
+                    {
+                        "columnName": row["columnName"],
+                        "policyDefinition": row["policyDefinition"],
+                        "ruleType": row["ruleType"],
+                        "compiled": row["compiled"],
+                    }
+                )
+        return out
+
+    def fetch_user_memberships(self, user_id: str) -> List[Dict[str, Any]]:
+        """
+        The user's policy groups as [{"policyGroupName", "policyGroupId"}], ordered by name then id.
+        """
+        if self.cache is not None:
+            self._revalidate_cache()
+            found, cached = self.cache.get(memberships_key(user_id))
+            if found:
+                return [dict(m) for m in cached]
+            generation = self.cache.generation
+        with self.driver.session(database=self.database) as session:
+            memberships = [dict(row) for row in session.run(FETCH_USER_MEMBERSHIPS_QUERY, userId=user_id)]
+
+        if self.cache is not None:
+            self.cache.put(
+                memberships_key(user_id),
+                [dict(m) for m in memberships],
+                user_id=user_id,
+                group_ids=group_ids_of(memberships),
+                generation=generation,
+            )
+        return memberships
+
+    def fetch_user_group_names(self, user_id: str) -> List[str]:
+        return _group_names(self.fetch_user_memberships(user_id))
 
     def fetch_row_governed_tables(self, parsed_tables: List[Dict[str, str]]) -> List[str]:
         if not parsed_tables:
             return []
-        pairs = [
-            {"schemaName": t.get("schema") or "bank", "tableName": t.get("table")}
-            for t in parsed_tables
-            if t.get("table")
-        ]
-        query = """
-        UNWIND $pairs AS pair
-        MATCH (t:Table {tableName: pair.tableName})-[:belongsToSchema]->(s:Schema {schemaName: pair.schemaName})
-        MATCH (c:Column)-[:belongsToTable]->(t)
-        MATCH (:Policy)-[:hasRowRule]->(c)
-        RETURN DISTINCT s.schemaName AS schemaName, t.tableName AS tableName
-        """
+        pairs = _table_pairs(parsed_tables)
         with self.driver.session(database=self.database) as session:
-            results = session.run(query, pairs=pairs)
+            results = session.run(FETCH_ROW_GOVERNED_TABLES_QUERY, pairs=pairs)
             return [f"{row['schemaName']}.{row['tableName']}" for row in results]
 
+    def fetch_entitlement_context(
+        self, user_id: str, parsed_tables: List[Dict[str, str]], memberships: List[Dict[str, Any]] | None = None
+    ) -> EntitlementContext:
+        """
+        Fetch the user's groups, the ROW/MASK entitlements of every referenced table and the
+        row-governed table set in one query inside one read transaction. memberships, when the
+        caller already read them (fetch_user_memberships), replace the group lookup.
+        """
+        pairs = _table_pairs(parsed_tables)
+        if self.cache is not None:
+            self._revalidate_cache()
+            cached = self._cached_entitlement_context(user_id, pairs, memberships)
+            if cached is not None:
+                return cached
+            generation = self.cache.generation
+
+        if memberships is None:
+            query, params = FETCH_ENTITLEMENT_CONTEXT_QUERY, {"userId": user_id}
+        else:
+            query, params = FETCH_GROUP_ENTITLEMENT_CONTEXT_QUERY, {"groupIds": group_ids_of(memberships)}
+
+        def _read(tx):
+            return tx.run(query, pairs=pairs, **params).single()
+
+        with self.driver.session(database=self.database) as session:
+            record = session.execute_read(_read)
+
+        context = EntitlementContext(
+            user_id=user_id,
+            entitlements_by_table={f"{p['schemaName']}.{p['tableName']}": [] for p in pairs},
+        )
+        if not record:
+            return context
+
+        prefetched = memberships is not None
+        if not prefetched:
+            # same ordering as fetch_user_memberships: name, then id
+            memberships = sorted(
+                (dict(g) for g in record["userGroups"]),
+                key=lambda g: (g["policyGroupName"] is None, g["policyGroupName"] or "", g["policyGroupId"] or ""),
+            )
+        context.user_groups = _group_names(memberships)
+
+        # same ordering as fetch_entitlements: columnName, ruleType
+        for e in sorted(record["entitlements"], key=lambda e: (e["tableKey"], e["columnName"] or "", e["ruleType"] or "")):
+            context.entitlements_by_table.setdefault(e["tableKey"], []).append(
+                {
+                    "columnName": e["columnName"],
+                    "policyDefinition": e["policyDefinition"],
+                    "ruleType": e["ruleType"],
+                    "compiled": e["compiled"],
+                }
+            )
+        context.row_governed_tables = list(record["rowGovernedTables"])
+
+        if self.cache is not None:
+            # prefetched memberships were cached by their own read, under its generation
+            self._store_entitlement_context(context, memberships, generation, store_memberships=not prefetched)
+        return context
+
+    def _cached_entitlement_context(
+        self, user_id: str, pairs: List[Dict[str, str]], memberships: List[Dict[str, Any]] | None = None
+    ) -> EntitlementContext | None:
+        """
+        Assemble the context from cache only; None as soon as any piece is missing.
+        """
+        if memberships is None:
+            found, memberships = self.cache.get(memberships_key(user_id))
+            if not found:
+                return None
+        fingerprint = group_set_fingerprint(group_ids_of(memberships))
+        context = EntitlementContext(user_id=user_id, user_groups=_group_names(memberships))
+        for p in pairs:
+            key = f"{p['schemaName']}.{p['tableName']}"
+            found, entitlements = self.cache.get(entitlements_key(fingerprint, key))
+            if not found:
+                return None
+            found, governed = self.cache.get(governed_key(key))
+            if not found:
+                return None
+            context.entitlements_by_table[key] = [dict(e) for e in entitlements]
+            if governed:
+                context.row_governed_tables.append(key)
+        return context
+
+    def _store_entitlement_context(
+        self, context: EntitlementContext, memberships: List[Dict[str, Any]], generation: int,
+        store_memberships: bool = True,
+    ) -> None:
+        # generation: taken before the Neo4j read; an invalidation since then drops these puts
+        group_ids = group_ids_of(memberships)
+        fingerprint = group_set_fingerprint(group_ids)
+        if store_memberships:
+            self.cache.put(
+                memberships_key(context.user_id),
+                [dict(m) for m in memberships],
+                user_id=context.user_id,
+                group_ids=group_ids,
+                generation=generation,
+            )
+        governed = set(context.row_governed_tables)
+        for key, entitlements in context.entitlements_by_table.items():
+            self.cache.put(
+                entitlements_key(fingerprint, key),
+                [dict(e) for e in entitlements],
+                group_ids=group_ids,
+                table_key=key,
+                generation=generation,
+            )
+            self.cache.put(governed_key(key), key in governed, table_key=key, generation=generation)
+
+    def current_version(self) -> int:
+        """
+        Version of the entitlement graph; bumped by every mutation (0 before the first one).
+        """
+        with self.driver.session(database=self.database) as session:
+            record = session.run(CURRENT_VERSION_QUERY, versionId=ENTITLEMENT_VERSION_ID).single()
+        return record["version"] if record else 0
+
+    def changes_since(self, version: int, limit: int = 1000) -> List[Dict[str, Any]]:
+        """
+        Change-log entries with a version greater than the given one, oldest first.
+        """
+        with self.driver.session(database=self.database) as session:
+            results = session.run(CHANGES_SINCE_QUERY, since=version, limit=limit)
+            return [dict(r) for r in results]
+
     def add_mask_policy(
         self,
         schema_id: str, schema_name: str,
@@ -102,42 +720,9 @@ class EntitlementRepository:
         Add (or ensure) a mask policy for a column. Creates schema, table, column if missing.
         Optionally attaches the policy into a policy group.
         """
-        cypher_core = """
-        MERGE (s:Schema {schemaId: $schemaId})
-          ON CREATE SET s.schemaName = $schemaName
-        MERGE (t:Table {tableId: $tableId})
-          ON CREATE SET t.tableName = $tableName
-        MERGE (t)-[:belongsToSchema]->(s)
-        MERGE (c:Column {columnId: $columnId})
-          ON CREATE SET c.columnName = $columnName
-        MERGE (c)-[:belongsToTable]->(t)
-        MERGE (p:Policy {policyId: $policyId})
-          ON CREATE SET p.policyName = $policyName,
-                        p.definition = $definition
-        MERGE (p)-[:hasColumnRule]->(c)
-        RETURN
-          p.policyId      AS policyId,
-          p.policyName    AS policyName,
-          p.definition    AS policyDefinition,
-          s.schemaId      AS schemaId,
-          s.schemaName    AS schemaName,
-          t.tableId       AS tableId,
-          t.tableName     AS tableName,
-          c.columnId      AS columnId,
-          c.columnName    AS columnName
-        """
-        cypher_group = """
-        MERGE (pg:PolicyGroup {policyGroupId: $policyGroupId})
-          ON CREATE SET pg.policyGroupName = $policyGroupName
-        WITH pg
-        MATCH (p:Policy {policyId: $policyId})
-        MERGE (pg)-[:includesPolicy]->(p)
-        RETURN pg.policyGroupId AS policyGroupId, pg.policyGroupName AS policyGroupName
-        """
-
-        with self.driver.session(database=self.database) as session:
-            record = session.run(
-                cypher_core,
+        def _write(tx):
+            record = tx.run(
+                ADD_MASK_POLICY_QUERY,
                 schemaId=schema_id,
                 schemaName=schema_name,
                 tableId=table_id,
@@ -146,22 +731,36 @@ class EntitlementRepository:
                 columnName=column_name,
                 policyId=policy_id,
                 policyName=policy_name,
-                definition=definition
+                definition=definition,
+                compiled=policy_properties(definition)
             ).single()
 
             result = dict(record) if record else {}
+            changes = [entitlement_change("link", "Policy", policy_id, "hasColumnRule", "Column", column_id)]
 
             if policy_group_id and policy_group_name:
-                pg_rec = session.run(
-                    cypher_group,
+                pg_rec = tx.run(
+                    ATTACH_POLICY_GROUP_QUERY,
                     policyGroupId=policy_group_id,
                     policyGroupName=policy_group_name,
                     policyId=policy_id
                 ).single()
                 if pg_rec:
                     result.update(dict(pg_rec))
-
+                    changes.append(
+                        entitlement_change("link", "PolicyGroup", policy_group_id, "includesPolicy", "Policy", policy_id)
+                    )
+            result["version"] = record_changes(tx, changes)
             return result
+
+        with self.driver.session(database=self.database) as session:
+            result = session.execute_write(_write)
+
+        self._invalidate(
+            group_ids=[policy_group_id],
+            table_keys=[f"{schema_name}.{table_name}", _result_table_key(result)],
+        )
+        return result
     # ---------------------------
     # Add user to policy group
     # ---------------------------
@@ -174,23 +773,26 @@ class EntitlementRepository:
         """
         Ensure the user and policy group exist, then attach the membership relation.
         """
-        cypher = """
-        MERGE (u:User {userId: $userId})
-        MERGE (pg:PolicyGroup {policyGroupId: $policyGroupId})
-          ON CREATE SET pg.policyGroupName = $policyGroupName
-        MERGE (u)-[:memberOf]->(pg)
-        RETURN u.userId AS userId,
-               pg.policyGroupId AS policyGroupId,
-               pg.policyGroupName AS policyGroupName
-        """
-        with self.driver.session(database=self.database) as session:
-            rec = session.run(
-                cypher,
+        def _write(tx):
+            rec = tx.run(
+                ADD_USER_TO_POLICY_GROUP_QUERY,
                 userId=user_id,
                 policyGroupId=policy_group_id,
                 policyGroupName=policy_group_name
             ).single()
-            return dict(rec) if rec else {}
+            if not rec:
+                return {}
+            result = dict(rec)
+            result["version"] = record_changes(
+                tx, [entitlement_change("link", "User", user_id, "memberOf", "PolicyGroup", policy_group_id)]
+            )
+            return result
+
+        with self.driver.session(database=self.database) as session:
+            result = session.execute_write(_write)
+
+        self._invalidate(user_ids=[user_id])
+        return result
     # ---------------------------
     # Add policy to policy group
     # ---------------------------
@@ -209,50 +811,41 @@ class EntitlementRepository:
         """
         # Case A: Create-or-attach (MERGE policy)
         if policy_name is not None:
-            cypher = """
-            MERGE (pg:PolicyGroup {policyGroupId: $policyGroupId})
-              ON CREATE SET pg.policyGroupName = $policyGroupName
-            MERGE (p:Policy {policyId: $policyId})
-              ON CREATE SET p.policyName = $policyName,
-                            p.definition = $definition
-            MERGE (pg)-[:includesPolicy]->(p)
-            RETURN pg.policyGroupId   AS policyGroupId,
-                   pg.policyGroupName AS policyGroupName,
-                   p.policyId         AS policyId,
-                   p.policyName       AS policyName,
-                   p.definition       AS policyDefinition
-            """
+            cypher = MERGE_POLICY_INTO_GROUP_QUERY
             params = {
                 "policyGroupId": policy_group_id,
                 "policyGroupName": policy_group_name,
                 "policyId": policy_id,
                 "policyName": policy_name,
                 "definition": definition,
+                "compiled": policy_properties(definition),
             }
         else:
             # Case B: Attach existing policy (MATCH policy)
-            cypher = """
-            MERGE (pg:PolicyGroup {policyGroupId: $policyGroupId})
-              ON CREATE SET pg.policyGroupName = $policyGroupName
-            WITH pg
-            MATCH (p:Policy {policyId: $policyId})
-            MERGE (pg)-[:includesPolicy]->(p)
-            RETURN pg.policyGroupId   AS policyGroupId,
-                   pg.policyGroupName AS policyGroupName,
-                   p.policyId         AS policyId,
-                   p.policyName       AS policyName,
-                   p.definition       AS policyDefinition
-            """
+            cypher = ATTACH_POLICY_TO_GROUP_QUERY
             params = {
                 "policyGroupId": policy_group_id,
                 "policyGroupName": policy_group_name,
                 "policyId": policy_id,
             }
 
-        with self.driver.session(database=self.database) as session:
-            rec = session.run(cypher, **params).single()
+        def _write(tx):
+            rec = tx.run(cypher, **params).single()
             # If user tried to MATCH a non-existent policy, rec will be None
-            return dict(rec) if rec else {}
+            if not rec:
+                return {}
+            result = dict(rec)
+            changes = [entitlement_change("link", "PolicyGroup", policy_group_id, "includesPolicy", "Policy", policy_id)]
+            if policy_name is not None:
+                changes.insert(0, entitlement_change("upsert", "Policy", policy_id))
+            result["version"] = record_changes(tx, changes)
+            return result
+
+        with self.driver.session(database=self.database) as session:
+            result = session.execute_write(_write)
+
+        self._invalidate(group_ids=[policy_group_id])
+        return result
 
     # ---------------------------
     # Add row policy
@@ -270,42 +863,9 @@ class EntitlementRepository:
         Creates schema, table, and column if they do not exist.
         Optionally links the policy to a policy group.
         """
-        cypher_core = """
-        MERGE (s:Schema {schemaId: $schemaId})
-          ON CREATE SET s.schemaName = $schemaName
-        MERGE (t:Table {tableId: $tableId})
-          ON CREATE SET t.tableName = $tableName
-        MERGE (t)-[:belongsToSchema]->(s)
-        MERGE (c:Column {columnId: $columnId})
-          ON CREATE SET c.columnName = $columnName
-        MERGE (c)-[:belongsToTable]->(t)
-        MERGE (p:Policy {policyId: $policyId})
-          ON CREATE SET p.policyName = $policyName,
-                        p.definition = $definition
-        MERGE (p)-[:hasRowRule]->(c)
-        RETURN
-          p.policyId      AS policyId,
-          p.policyName    AS policyName,
-          p.definition    AS policyDefinition,
-          s.schemaId      AS schemaId,
-          s.schemaName    AS schemaName,
-          t.tableId       AS tableId,
-          t.tableName     AS tableName,
-          c.columnId      AS columnId,
-          c.columnName    AS columnName
-        """
-        cypher_group = """
-        MERGE (pg:PolicyGroup {policyGroupId: $policyGroupId})
-          ON CREATE SET pg.policyGroupName = $policyGroupName
-        WITH pg
-        MATCH (p:Policy {policyId: $policyId})
-        MERGE (pg)-[:includesPolicy]->(p)
-        RETURN pg.policyGroupId AS policyGroupId, pg.policyGroupName AS policyGroupName
-        """
-
-        with self.driver.session(database=self.database) as session:
-            record = session.run(
-                cypher_core,
+        def _write(tx):
+            record = tx.run(
+                ADD_ROW_POLICY_QUERY,
                 schemaId=schema_id,
                 schemaName=schema_name,
                 tableId=table_id,
@@ -314,19 +874,95 @@ class EntitlementRepository:
                 columnName=column_name,
                 policyId=policy_id,
                 policyName=policy_name,
-                definition=definition
+                definition=definition,
+                compiled=policy_properties(definition)
             ).single()
 
             result = dict(record) if record else {}
+            changes = [entitlement_change("link", "Policy", policy_id, "hasRowRule", "Column", column_id)]
 
             if policy_group_id and policy_group_name:
-                pg_rec = session.run(
-                    cypher_group,
+                pg_rec = tx.run(
+                    ATTACH_POLICY_GROUP_QUERY,
                     policyGroupId=policy_group_id,
                     policyGroupName=policy_group_name,
                     policyId=policy_id
                 ).single()
                 if pg_rec:
                     result.update(dict(pg_rec))
-
+                    changes.append(
+                        entitlement_change("link", "PolicyGroup", policy_group_id, "includesPolicy", "Policy", policy_id)
+                    )
+            result["version"] = record_changes(tx, changes)
             return result
+
+        with self.driver.session(database=self.database) as session:
+            result = session.execute_write(_write)
+
+        self._invalidate(
+            group_ids=[policy_group_id],
+            table_keys=[f"{schema_name}.{table_name}", _result_table_key(result)],
+        )
+        return result
+
+    # ---------------------------
+    # Bulk policy ingestion
+    # ---------------------------
+    def bulk_upsert_policies(
+        self,
+        policies: Iterable[Dict[str, Any]],
+        chunk_size: int = 1000,
+        max_retries: int = 5,
+        retry_backoff: float = 0.5,
+    ) -> BulkUpsertReport:
+        """
+        Upsert ROW/MASK policies from an iterable of specs, one UNWIND write transaction per chunk.
+
+        Each spec takes the keyword names of add_mask_policy/add_row_policy plus
+        rule_type ("ROW" or "MASK"); policy_group_id/policy_group_name are optional.
+        The iterable is consumed lazily, so generators over very large catalogs stream.
+        Chunks failing with a transient error are retried with exponential backoff.
+        """
+
+        def _write(tx, rows):
+            table_keys = [record["tableKey"] for record in tx.run(BULK_UPSERT_POLICIES_QUERY, rows=rows)]
+            changes = []
+            for row in rows:
+                relationship = "hasRowRule" if row["ruleType"] == "ROW" else "hasColumnRule"
+                changes.append(entitlement_change("link", "Policy", row["policyId"], relationship, "Column", row["columnId"]))
+                if row["policyGroupId"]:
+                    changes.append(
+                        entitlement_change("link", "PolicyGroup", row["policyGroupId"], "includesPolicy", "Policy", row["policyId"])
+                    )
+            report.version = record_changes(tx, changes)
+            return table_keys
+
+        report = BulkUpsertReport()
+        started = time.perf_counter()
+        iterator = iter(policies)
+        with self.driver.session(database=self.database) as session:
+            while True:
+                rows = [_policy_spec_row(spec) for spec in islice(iterator, chunk_size)]
+                if not rows:
+                    break
+                attempt = 0
+                while True:
+                    try:
+                        with session.begin_transaction() as tx:
+                            table_keys = _write(tx, rows)
+                            tx.commit()
+                        break
+                    except (TransientError, ServiceUnavailable, SessionExpired):
+                        if attempt >= max_retries:
+                            raise
+                        attempt += 1
+                        report.retries += 1
+                        time.sleep(retry_backoff * (2 ** (attempt - 1)))
+                report.rows += len(rows)
+                report.chunks += 1
+                self._invalidate(
+                    group_ids=[row["policyGroupId"] for row in rows],
+                    table_keys=table_keys + [f"{row['schemaName']}.{row['tableName']}" for row in rows],
+                )
+        report.seconds = time.perf_counter() - started
+        return report
@@ -0,0 +1,659 @@
+"""
+In-process entitlement graph engine with the EntitlementRepository interface.
+
+The graph (User, PolicyGroup, Policy, Schema, Table, Column and the six relationship types) is
+held in dicts and sets and answers the repository reads without any Bolt round trip. It is
+hydrated from Neo4j (from_neo4j) or from a JSON snapshot (from_snapshot / save_snapshot), so the
+rewrite pipeline, the benchmarks and the demos can run on a box with no Neo4j.
+
+    python -m graph_database.in_memory_repository --save entitlement_snapshot.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Any, Dict, FrozenSet, Iterable, List, Set, Tuple
+
+from graph_database.entitlement_util import (
+    _POLICY_SPEC_FIELDS,
+    CURRENT_VERSION_QUERY,
+    ENTITLEMENT_VERSION_ID,
+    BulkUpsertReport,
+    EntitlementContext,
+    entitlement_change,
+    _group_names,
+    _policy_spec_row,
+    _table_pairs,
+)
+from graph_database.policy_compiler import policy_properties
+from secret.secret_util import get_config
+
+# label -> identifying property
+NODE_KEYS = {
+    "User": "userId",
+    "PolicyGroup": "policyGroupId",
+    "Policy": "policyId",
+    "Schema": "schemaId",
+    "Table": "tableId",
+    "Column": "columnId",
+}
+
+# relationship type -> (source label, target label)
+RELATIONSHIPS = {
+    "memberOf": ("User", "PolicyGroup"),
+    "includesPolicy": ("PolicyGroup", "Policy"),
+    "hasRowRule": ("Policy", "Column"),
+    "hasColumnRule": ("Policy", "Column"),
+    "belongsToTable": ("Column", "Table"),
+    "belongsToSchema": ("Table", "Schema"),
+}
+
+_RULE_TYPES = {"hasRowRule": "ROW", "hasColumnRule": "MASK"}
+
+SNAPSHOT_FORMAT = 1
+
+logger = logging.getLogger(__name__)
+
+
+def _name_sort_key(value: Any) -> Tuple[bool, str]:
+    # Cypher ORDER BY sorts nulls last
+    return value is None, "" if value is None else str(value)
+
+
+def _compiled_of(policy: Dict[str, Any]) -> Dict[str, Any] | None:
+    # same shape as COMPILED_POLICY_PROJECTION; None for policies never compiled
+    if policy.get("compiledVersion") is None:
+        return None
+    return {
+        "column": policy.get("compiledColumn"),
+        "operator": policy.get("compiledOperator"),
+        "values": policy.get("compiledValues"),
+        "exceptGroups": policy.get("compiledExceptGroups"),
+        "maskMode": policy.get("compiledMaskMode"),
+        "maskExpression": policy.get("compiledMaskExpression"),
+    }
+
+
+class _Indexes:
+    """
+    Read indexes derived from the primary node/relationship maps; rebuilt lazily after writes.
+    """
+
+    def __init__(self, nodes: Dict[str, Dict[str, Dict[str, Any]]], out: Dict[str, Dict[str, Set[str]]]):
+        # "schemaName.tableName" -> table ids
+        self.tables_by_key: Dict[str, Set[str]] = {}
+        for table_id, schema_ids in out["belongsToSchema"].items():
+            table_name = nodes["Table"].get(table_id, {}).get("tableName")
+            for schema_id in schema_ids:
+                schema_name = nodes["Schema"].get(schema_id, {}).get("schemaName")
+                if table_name is not None and schema_name is not None:
+                    self.tables_by_key.setdefault(f"{schema_name}.{table_name}", set()).add(table_id)
+
+        # table id -> [(policy id, column name, rule type)]
+        self.rules_by_table: Dict[str, List[Tuple[str, Any, str]]] = {}
+        self.row_governed: Set[str] = set()
+        for rel_type, rule_type in _RULE_TYPES.items():
+            for policy_id, column_ids in out[rel_type].items():
+                for column_id in column_ids:
+                    column_name = nodes["Column"].get(column_id, {}).get("columnName")
+                    for table_id in out["belongsToTable"].get(column_id, ()):
+                        self.rules_by_table.setdefault(table_id, []).append((policy_id, column_name, rule_type))
+                        if rule_type == "ROW":
+                            self.row_governed.add(table_id)
+
+        self._policies_by_groups: Dict[FrozenSet[str], FrozenSet[str]] = {}
+
+    def policies_of(self, group_ids: FrozenSet[str], includes: Dict[str, Set[str]]) -> FrozenSet[str]:
+        policies = self._policies_by_groups.get(group_ids)
+        if policies is None:
+            policies = frozenset(p for g in group_ids for p in includes.get(g, ()))
+            self._policies_by_groups[group_ids] = policies
+        return policies
+
+
+class InMemoryEntitlementRepository:
+    """
+    Dict/set backed stand-in for EntitlementRepository with the same read and write methods
+    and the same result shapes and ordering. Writes follow the MERGE / ON CREATE SET semantics
+    of the Cypher they replace. Thread safe; close() is a no-op.
+    """
+
+    database = None
+    cache = None
+    local = True  # reads never leave the process: nothing for the pipeline to prefetch
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._nodes: Dict[str, Dict[str, Dict[str, Any]]] = {label: {} for label in NODE_KEYS}
+        self._out: Dict[str, Dict[str, Set[str]]] = {rel: {} for rel in RELATIONSHIPS}
+        self._indexes: _Indexes | None = None
+        self.loaded_at: float | None = None
+        # graph version (copied from Neo4j or the snapshot) and the changes made in this process
+        self.version = 0
+        self._changes: List[Dict[str, Any]] = []
+
+    def close(self):
+        pass
+
+    # ---------------------------
+    # Hydration
+    # ---------------------------
+    @classmethod
+    def from_neo4j(cls, driver=None, database: str | None = None) -> "InMemoryEntitlementRepository":
+        """
+        Copy the entitlement graph out of Neo4j in one read transaction.
+        """
+        from graph_database.neo4j_driver_registry import neo4j_driver_registry
+
+        owns_driver = driver is None
+        if owns_driver:
+            driver = neo4j_driver_registry.acquire()
+        database = database or neo4j_driver_registry.database
+
+        def _read(tx):
+            nodes = {
+                label: [dict(r["props"]) for r in tx.run(f"MATCH (n:{label}) RETURN properties(n) AS props")]
+                for label in NODE_KEYS
+            }
+            edges = {}
+            for rel_type, (src, dst) in RELATIONSHIPS.items():
+                query = (
+                    f"MATCH (a:{src})-[:{rel_type}]->(b:{dst}) "
+                    f"RETURN DISTINCT a.{NODE_KEYS[src]} AS src, b.{NODE_KEYS[dst]} AS dst"
+                )
+                edges[rel_type] = [(r["src"], r["dst"]) for r in tx.run(query)]
+            version = tx.run(CURRENT_VERSION_QUERY, versionId=ENTITLEMENT_VERSION_ID).single()["version"]
+            return nodes, edges, version
+
+        try:
+            with driver.session(database=database) as session:
+                nodes, edges, version = session.execute_read(_read)
+        finally:
+            if owns_driver:
+                neo4j_driver_registry.release()
+
+        repo = cls()
+        repo._load(nodes, edges, version)
+        return repo
+
+    @classmethod
+    def from_snapshot(cls, path: str) -> "InMemoryEntitlementRepository":
+        with open(path, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+        if snapshot.get("format") != SNAPSHOT_FORMAT:
+            raise ValueError(f"Unsupported entitlement snapshot format in {path}: {snapshot.get('format')!r}")
+        repo = cls()
+        repo._load(
+            snapshot["nodes"],
+            {rel: [tuple(edge) for edge in edges] for rel, edges in snapshot["relationships"].items()},
+            snapshot.get("version", 0),
+        )
+        return repo
+
+    def save_snapshot(self, path: str) -> None:
+        with self._lock:
+            snapshot = {
+                "format": SNAPSHOT_FORMAT,
+                "version": self.version,
+                "nodes": {label: list(by_id.values()) for label, by_id in self._nodes.items()},
+                "relationships": {
+                    rel: sorted([src, dst] for src, targets in by_src.items() for dst in targets)
+                    for rel, by_src in self._out.items()
+                },
+            }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, indent=1, default=str)
+
+    def replace_with(self, other: "InMemoryEntitlementRepository") -> None:
+        """
+        Take over another engine's graph and version (a reload); readers holding this
+        instance see the new graph from their next call.
+        """
+        with other._lock:
+            nodes, out, version = other._nodes, other._out, other.version
+        with self._lock:
+            self._nodes, self._out = nodes, out
+            self._indexes = None
+            self.loaded_at = time.time()
+            self.version = version
+            self._changes = []
+
+    def _load(
+        self,
+        nodes: Dict[str, List[Dict[str, Any]]],
+        edges: Dict[str, Iterable[Tuple[str, str]]],
+        version: int = 0,
+    ) -> None:
+        with self._lock:
+            for label, key in NODE_KEYS.items():
+                self._nodes[label] = {n[key]: dict(n) for n in nodes.get(label, []) if n.get(key) is not None}
+            for rel_type in RELATIONSHIPS:
+                self._out[rel_type] = {}
+                for src, dst in edges.get(rel_type, []):
+                    self._out[rel_type].setdefault(src, set()).add(dst)
+            self._indexes = None
+            self.loaded_at = time.time()
+            self.version = version
+            self._changes = []
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "nodes": {label: len(by_id) for label, by_id in self._nodes.items()},
+                "relationships": {rel: sum(len(t) for t in by_src.values()) for rel, by_src in self._out.items()},
+                "loaded_at": self.loaded_at,
+                "version": self.version,
+            }
+
+    def column_catalog_rows(self) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        (rows, version): one row per Column with its table and schema, the shape of
+        column_catalog.FETCH_COLUMN_CATALOG_QUERY.
+        """
+        with self._lock:
+            rows = []
+            for column_id, table_ids in self._out["belongsToTable"].items():
+                column = self._nodes["Column"].get(column_id, {})
+                for table_id in table_ids:
+                    table = self._nodes["Table"].get(table_id, {})
+                    for schema_id in self._out["belongsToSchema"].get(table_id, ()):
+                        rows.append({
+                            "schemaName": self._nodes["Schema"].get(schema_id, {}).get("schemaName"),
+                            "tableName": table.get("tableName"),
+                            "columnName": column.get("columnName"),
+                            "ordinalPosition": column.get("ordinalPosition"),
+                            "dataType": column.get("dataType"),
+                        })
+            return rows, self.version
+
+    # ---------------------------
+    # Version and change log
+    # ---------------------------
+    def _record_changes(self, changes: List[Dict[str, Any]]) -> int:
+        self.version += 1
+        changed_at = datetime.now(timezone.utc).isoformat()
+        for change in changes:
+            self._changes.append(dict(change, version=self.version, changedAt=changed_at))
+        return self.version
+
+    def current_version(self) -> int:
+        with self._lock:
+            return self.version
+
+    def changes_since(self, version: int, limit: int = 1000) -> List[Dict[str, Any]]:
+        """
+        Changes made through this instance after the given version (earlier history stays in Neo4j).
+        """
+        with self._lock:
+            return [dict(c) for c in self._changes if c["version"] > version][:limit]
+
+    # ---------------------------
+    # Reads
+    # ---------------------------
+    def _index(self) -> _Indexes:
+        if self._indexes is None:
+            self._indexes = _Indexes(self._nodes, self._out)
+        return self._indexes
+
+    def _entitlements_for_key(self, index: _Indexes, policies: FrozenSet[str], table_key: str) -> List[Dict[str, Any]]:
+        rows: Dict[Tuple[Any, Any, str], Dict[str, Any] | None] = {}
+        policy_nodes = self._nodes["Policy"]
+        for table_id in index.tables_by_key.get(table_key, ()):
+            for policy_id, column_name, rule_type in index.rules_by_table.get(table_id, ()):
+                if policy_id in policies:
+                    policy = policy_nodes.get(policy_id, {})
+                    rows.setdefault((column_name, policy.get("definition"), rule_type), _compiled_of(policy))
+        ordered = sorted(rows, key=lambda r: (_name_sort_key(r[0]), r[2], _name_sort_key(r[1])))
+        return [
+            {"columnName": c, "policyDefinition": d, "ruleType": r, "compiled": rows[(c, d, r)]}
+            for c, d, r in ordered
+        ]
+
+    def _user_policies(self, index: _Indexes, user_id: str) -> FrozenSet[str]:
+        group_ids = frozenset(self._out["memberOf"].get(user_id, ()))
+        return index.policies_of(group_ids, self._out["includesPolicy"])
+
+    def fetch_entitlements(self, user_id: str, schema_name: str, table_name: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            index = self._index()
+            return self._entitlements_for_key(index, self._user_policies(index, user_id), f"{schema_name}.{table_name}")
+
+    def fetch_entitlements_for_tables(
+        self, user_id: str, parsed_tables: List[Dict[str, str]]
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        with self._lock:
+            index = self._index()
+            policies = self._user_policies(index, user_id)
+            return {
+                key: self._entitlements_for_key(index, policies, key)
+                for key in (f"{p['schemaName']}.{p['tableName']}" for p in _table_pairs(parsed_tables))
+            }
+
+    def fetch_user_memberships(self, user_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            groups = self._nodes["PolicyGroup"]
+            memberships = [
+                {"policyGroupName": groups.get(g, {}).get("policyGroupName"), "policyGroupId": g}
+                for g in self._out["memberOf"].get(user_id, ())
+            ]
+        memberships.sort(key=lambda m: (_name_sort_key(m["policyGroupName"]), _name_sort_key(m["policyGroupId"])))
+        return memberships
+
+    def fetch_user_group_names(self, user_id: str) -> List[str]:
+        return _group_names(self.fetch_user_memberships(user_id))
+
+    def fetch_row_governed_tables(self, parsed_tables: List[Dict[str, str]]) -> List[str]:
+        with self._lock:
+            index = self._index()
+            return [
+                key
+                for key in (f"{p['schemaName']}.{p['tableName']}" for p in _table_pairs(parsed_tables))
+                if not index.row_governed.isdisjoint(index.tables_by_key.get(key, ()))
+            ]
+
+    def fetch_entitlement_context(
+        self, user_id: str, parsed_tables: List[Dict[str, str]], memberships: List[Dict[str, Any]] | None = None
+    ) -> EntitlementContext:
+        # memberships (a caller's prefetch) are not needed: the local lookup is as cheap
+        with self._lock:
+            return EntitlementContext(
+                user_id=user_id,
+                user_groups=self.fetch_user_group_names(user_id),
+                entitlements_by_table=self.fetch_entitlements_for_tables(user_id, parsed_tables),
+                row_governed_tables=self.fetch_row_governed_tables(parsed_tables),
+            )
+
+    # ---------------------------
+    # Writes (MERGE semantics)
+    # ---------------------------
+    def _merge_node(self, label: str, node_id: str, on_create: Dict[str, Any] | None = None) -> Dict[str, Any]:
+        by_id = self._nodes[label]
+        node = by_id.get(node_id)
+        if node is None:
+            node = {NODE_KEYS[label]: node_id}
+            node.update(on_create or {})
+            by_id[node_id] = node
+            self._indexes = None
+        return node
+
+    def _merge_rel(self, rel_type: str, src: str, dst: str) -> None:
+        targets = self._out[rel_type].setdefault(src, set())
+        if dst not in targets:
+            targets.add(dst)
+            self._indexes = None
+
+    def _merge_policy(self, policy_id: str, policy_name: str | None, definition: str | None) -> Dict[str, Any]:
+        # as the Cypher MERGEs: an existing policy keeps its name and definition, and its
+        # compiled* properties are refreshed only for the same definition
+        policy = self._nodes["Policy"].get(policy_id)
+        if policy is None:
+            return self._merge_node(
+                "Policy", policy_id, {"policyName": policy_name, "definition": definition, **policy_properties(definition)}
+            )
+        if definition is not None and policy.get("definition") == definition:
+            policy.update(policy_properties(definition))
+            self._indexes = None
+        return policy
+
+    def _merge_column_policy(self, rel_type: str, row: Dict[str, Any]) -> Dict[str, Any]:
+        schema = self._merge_node("Schema", row["schemaId"], {"schemaName": row["schemaName"]})
+        table = self._merge_node("Table", row["tableId"], {"tableName": row["tableName"]})
+        self._merge_rel("belongsToSchema", row["tableId"], row["schemaId"])
+        column = self._merge_node("Column", row["columnId"], {"columnName": row["columnName"]})
+        self._merge_rel("belongsToTable", row["columnId"], row["tableId"])
+        policy = self._merge_policy(row["policyId"], row["policyName"], row["definition"])
+        self._merge_rel(rel_type, row["policyId"], row["columnId"])
+        return {
+            "policyId": policy["policyId"],
+            "policyName": policy.get("policyName"),
+            "policyDefinition": policy.get("definition"),
+            "schemaId": schema["schemaId"],
+            "schemaName": schema.get("schemaName"),
+            "tableId": table["tableId"],
+            "tableName": table.get("tableName"),
+            "columnId": column["columnId"],
+            "columnName": column.get("columnName"),
+        }
+
+    def _attach_policy_group(self, policy_group_id: str, policy_group_name: str, policy_id: str) -> Dict[str, Any]:
+        group = self._merge_node("PolicyGroup", policy_group_id, {"policyGroupName": policy_group_name})
+        self._merge_rel("includesPolicy", policy_group_id, policy_id)
+        return {"policyGroupId": group["policyGroupId"], "policyGroupName": group.get("policyGroupName")}
+
+    def _add_column_policy(self, rel_type: str, policy_group_id, policy_group_name, **spec) -> Dict[str, Any]:
+        row = {prop: spec[key] for key, prop in _POLICY_SPEC_FIELDS}
+        with self._lock:
+            result = self._merge_column_policy(rel_type, row)
+            changes = [entitlement_change("link", "Policy", row["policyId"], rel_type, "Column", row["columnId"])]
+            if policy_group_id and policy_group_name:
+                result.update(self._attach_policy_group(policy_group_id, policy_group_name, row["policyId"]))
+                changes.append(
+                    entitlement_change("link", "PolicyGroup", policy_group_id, "includesPolicy", "Policy", row["policyId"])
+                )
+            result["version"] = self._record_changes(changes)
+        return result
+
+    def add_mask_policy(
+        self,
+        schema_id: str, schema_name: str,
+        table_id: str, table_name: str,
+        column_id: str, column_name: str,
+        policy_id: str, policy_name: str, definition: str,
+        policy_group_id: str = None, policy_group_name: str = None
+    ) -> Dict[str, Any]:
+        return self._add_column_policy(
+            "hasColumnRule", policy_group_id, policy_group_name,
+            schema_id=schema_id, schema_name=schema_name, table_id=table_id, table_name=table_name,
+            column_id=column_id, column_name=column_name,
+            policy_id=policy_id, policy_name=policy_name, definition=definition,
+        )
+
+    def add_row_policy(
+        self,
+        schema_id: str, schema_name: str,
+        table_id: str, table_name: str,
+        column_id: str, column_name: str,
+        policy_id: str, policy_name: str, definition: str,
+        policy_group_id: str = None, policy_group_name: str = None
+    ) -> Dict[str, Any]:
+        return self._add_column_policy(
+            "hasRowRule", policy_group_id, policy_group_name,
+            schema_id=schema_id, schema_name=schema_name, table_id=table_id, table_name=table_name,
+            column_id=column_id, column_name=column_name,
+            policy_id=policy_id, policy_name=policy_name, definition=definition,
+        )
+
+    def add_user_to_policy_group(self, user_id: str, policy_group_id: str, policy_group_name: str) -> Dict[str, Any]:
+        with self._lock:
+            self._merge_node("User", user_id)
+            group = self._merge_node("PolicyGroup", policy_group_id, {"policyGroupName": policy_group_name})
+            self._merge_rel("memberOf", user_id, policy_group_id)
+            return {
+                "userId": user_id,
+                "policyGroupId": group["policyGroupId"],
+                "policyGroupName": group.get("policyGroupName"),
+                "version": self._record_changes(
+                    [entitlement_change("link", "User", user_id, "memberOf", "PolicyGroup", policy_group_id)]
+                ),
+            }
+
+    def add_policy_to_group(
+        self,
+        policy_id: str,
+        policy_group_id: str,
+        policy_group_name: str,
+        policy_name: str | None = None,
+        definition: str | None = None,
+    ) -> dict:
+        with self._lock:
+            group = self._merge_node("PolicyGroup", policy_group_id, {"policyGroupName": policy_group_name})
+            if policy_name is not None:
+                self._merge_policy(policy_id, policy_name, definition)
+            policy = self._nodes["Policy"].get(policy_id)
+            if policy is None:
+                return {}
+            self._merge_rel("includesPolicy", policy_group_id, policy_id)
+            changes = [entitlement_change("link", "PolicyGroup", policy_group_id, "includesPolicy", "Policy", policy_id)]
+            if policy_name is not None:
+                changes.insert(0, entitlement_change("upsert", "Policy", policy_id))
+            return {
+                "policyGroupId": group["policyGroupId"],
+                "policyGroupName": group.get("policyGroupName"),
+                "policyId": policy["policyId"],
+                "policyName": policy.get("policyName"),
+                "policyDefinition": policy.get("definition"),
+                "version": self._record_changes(changes),
+            }
+
+    def bulk_upsert_policies(
+        self,
+        policies: Iterable[Dict[str, Any]],
+        chunk_size: int = 1000,
+        max_retries: int = 5,
+        retry_backoff: float = 0.5,
+    ) -> BulkUpsertReport:
+        """
+        Same spec format as EntitlementRepository.bulk_upsert_policies; each chunk is applied
+        under the lock (max_retries/retry_backoff are accepted for interface parity).
+        """
+        report = BulkUpsertReport()
+        started = time.perf_counter()
+        iterator = iter(policies)
+        while True:
+            rows = [_policy_spec_row(spec) for spec in islice(iterator, chunk_size)]
+            if not rows:
+                break
+            with self._lock:
+                changes = []
+                for row in rows:
+                    rel_type = "hasRowRule" if row["ruleType"] == "ROW" else "hasColumnRule"
+                    self._merge_column_policy(rel_type, row)
+                    changes.append(entitlement_change("link", "Policy", row["policyId"], rel_type, "Column", row["columnId"]))
+                    if row["policyGroupId"]:
+                        self._attach_policy_group(row["policyGroupId"], row["policyGroupName"], row["policyId"])
+                        changes.append(
+                            entitlement_change(
+                                "link", "PolicyGroup", row["policyGroupId"], "includesPolicy", "Policy", row["policyId"]
+                            )
+                        )
+                report.version = self._record_changes(changes)
+            report.rows += len(rows)
+            report.chunks += 1
+        report.seconds = time.perf_counter() - started
+        return report
+
+
+_shared_lock = threading.Lock()
+_shared_repository: InMemoryEntitlementRepository | None = None
+_shared_snapshot = ""
+_shared_refresh_interval = 5.0
+_shared_refresh_timeout = 2.0
+_shared_source_version: Any = None
+_shared_checked_at = 0.0
+_shared_pending: Future | None = None
+
+# source checks and reloads, off the lock readers take; one at a time is enough
+_refresh_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="entitlement-refresh")
+
+
+def _neo4j_version() -> int:
+    from graph_database.neo4j_driver_registry import neo4j_driver_registry
+
+    driver = neo4j_driver_registry.acquire()
+    try:
+        with driver.session(database=neo4j_driver_registry.database) as session:
+            return session.execute_read(
+                lambda tx: tx.run(CURRENT_VERSION_QUERY, versionId=ENTITLEMENT_VERSION_ID).single()["version"]
+            )
+    finally:
+        neo4j_driver_registry.release()
+
+
+def _source_version(snapshot: str) -> Any:
+    # a snapshot changes when it is rewritten; Neo4j bumps its graph version on every mutation
+    if snapshot:
+        stat = os.stat(snapshot)
+        return stat.st_mtime_ns, stat.st_size
+    return _neo4j_version()
+
+
+def _hydrate(snapshot: str) -> InMemoryEntitlementRepository:
+    if snapshot:
+        return InMemoryEntitlementRepository.from_snapshot(snapshot)
+    return InMemoryEntitlementRepository.from_neo4j()
+
+
+def _refresh_shared(repository: InMemoryEntitlementRepository, snapshot: str, known_version: Any) -> None:
+    global _shared_source_version
+    version = _source_version(snapshot)
+    if version != known_version:
+        repository.replace_with(_hydrate(snapshot))
+        with _shared_lock:
+            _shared_source_version = version
+
+
+def shared_in_memory_repository() -> InMemoryEntitlementRepository:
+    """
+    Process-wide engine, hydrated on first use from [entitlement] SNAPSHOT when set,
+    otherwise from Neo4j. At most every [entitlement] REFRESH_INTERVAL seconds the source is
+    checked (the Neo4j graph version, or the snapshot file) and the engine reloaded in place
+    when it changed, so a revoked grant stops applying within one interval. Local writes to
+    the engine are replaced by the reload.
+
+    The check runs on a worker thread, waited for at most [entitlement] REFRESH_TIMEOUT
+    seconds; while it runs, or when it fails (Neo4j down), the current graph keeps serving.
+    """
+    global _shared_repository, _shared_snapshot, _shared_refresh_interval, _shared_refresh_timeout
+    global _shared_source_version, _shared_checked_at, _shared_pending
+    with _shared_lock:
+        now = time.monotonic()
+        if _shared_repository is None:
+            config = get_config()
+            _shared_snapshot = config.get("entitlement", "SNAPSHOT", fallback="").strip()
+            _shared_refresh_interval = config.getfloat("entitlement", "REFRESH_INTERVAL", fallback=5.0)
+            _shared_refresh_timeout = config.getfloat("entitlement", "REFRESH_TIMEOUT", fallback=2.0)
+            # versioned before the load: a change made during it is picked up by the next check
+            _shared_source_version = _source_version(_shared_snapshot)
+            _shared_repository = _hydrate(_shared_snapshot)
+            _shared_checked_at = now
+            return _shared_repository
+        repository = _shared_repository
+        due = _shared_refresh_interval >= 0 and now - _shared_checked_at >= _shared_refresh_interval
+        if due:
+            _shared_checked_at = now  # one checker per interval
+            pending = _shared_pending
+            if pending is None or pending.done():
+                pending = _shared_pending = _refresh_pool.submit(
+                    _refresh_shared, repository, _shared_snapshot, _shared_source_version
+                )
+    if due:
+        try:
+            # a check that outlives the timeout finishes in the background
+            pending.result(timeout=_shared_refresh_timeout)
+        except Exception as exc:
+            logger.warning(
+                "in-memory entitlement graph: source check failed (%s: %s); serving version %s",
+                type(exc).__name__, exc, repository.version,
+            )
+    return repository
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--save", required=True, help="snapshot file to write")
+    args = parser.parse_args()
+
+    repo = InMemoryEntitlementRepository.from_neo4j()
+    repo.save_snapshot(args.save)
+    print(f"saved {args.save}: {repo.stats()}")
+
+
+if __name__ == "__main__":
+    main()
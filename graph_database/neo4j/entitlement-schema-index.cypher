@@ -18,3 +18,25 @@ FOR (c:Schema) REQUIRE c.schemaId IS UNIQUE;
 CREATE CONSTRAINT user_id IF NOT EXISTS
 FOR (u:User) REQUIRE u.userId IS UNIQUE;
 
+// === Name lookups (kept in sync with graph_database/entitlement_schema.py) ===
+CREATE INDEX policy_group_name IF NOT EXISTS
+FOR (n:PolicyGroup) ON (n.policyGroupName);
+
+CREATE INDEX policy_name IF NOT EXISTS
+FOR (n:Policy) ON (n.policyName);
+
+CREATE INDEX schema_name IF NOT EXISTS
+FOR (n:Schema) ON (n.schemaName);
+
+CREATE INDEX table_name IF NOT EXISTS
+FOR (n:Table) ON (n.tableName);
+
+CREATE INDEX column_name IF NOT EXISTS
+FOR (n:Column) ON (n.columnName);
+
+// === Graph version / change log ===
+CREATE CONSTRAINT unique_entitlementVersionId IF NOT EXISTS
+FOR (n:EntitlementVersion) REQUIRE n.versionId IS UNIQUE;
+
+CREATE INDEX entitlement_change_version IF NOT EXISTS
+FOR (n:EntitlementChange) ON (n.version);
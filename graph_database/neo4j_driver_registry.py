@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import atexit
+import threading
+import time
+from typing import Any, Dict
+
+from neo4j import AsyncGraphDatabase, GraphDatabase
+
+from secret.secret_util import get_config
+
+
+def _driver_settings() -> Dict[str, Any]:
+    """
+    Connection and pool settings from the [neo4j] section of system_config.ini.
+    """
+    config = get_config()
+    return {
+        "url": config["neo4j"]["URL"],
+        "auth": (config["neo4j"]["USERNAME"], config["neo4j"]["PASSWORD"]),
+        "database": config["neo4j"]["DATABASE"],
+        "max_connection_pool_size": config.getint("neo4j", "MAX_CONNECTION_POOL_SIZE", fallback=100),
+        "connection_acquisition_timeout": config.getfloat("neo4j", "CONNECTION_ACQUISITION_TIMEOUT", fallback=60.0),
+        "max_connection_lifetime": config.getfloat("neo4j", "MAX_CONNECTION_LIFETIME", fallback=3600.0),
+    }
+
+
+class Neo4jDriverRegistry:
+    """
+    One lazily created, reference-counted Neo4j driver (and connection pool) per process.
+
+    Holders call acquire() once and release() when done; the driver is closed when the last
+    reference is released, or at interpreter exit. Long-lived holders (the FastAPI lifespan,
+    the rewrite pipeline) keep the pool warm for short-lived ones such as EntitlementRepository.
+    Async callers use acquire_async() / release_async(), which manage a separate AsyncDriver
+    with the same settings.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._driver = None
+        self._settings: Dict[str, Any] | None = None
+        self._refs = 0
+        self._created = 0
+        self._created_at: float | None = None
+        # AsyncDriver for async callers (FastAPI); bound to the event loop it is first used on
+        self._async_driver = None
+        self._async_refs = 0
+        self._async_created = 0
+
+    @property
+    def database(self) -> str:
+        return self.settings["database"]
+
+    @property
+    def settings(self) -> Dict[str, Any]:
+        if self._settings is None:
+            self._settings = _driver_settings()
+        return self._settings
+
+    def _driver_kwargs(self) -> Dict[str, Any]:
+        settings = self.settings
+        return {
+            "auth": settings["auth"],
+            "max_connection_pool_size": settings["max_connection_pool_size"],
+            "connection_acquisition_timeout": settings["connection_acquisition_timeout"],
+            "max_connection_lifetime": settings["max_connection_lifetime"],
+        }
+
+    def acquire(self):
+        with self._lock:
+            if self._driver is None:
+                self._driver = GraphDatabase.driver(self.settings["url"], **self._driver_kwargs())
+                self._created += 1
+                self._created_at = time.time()
+            self._refs += 1
+            return self._driver
+
+    def release(self) -> None:
+        with self._lock:
+            if self._refs == 0:
+                return
+            self._refs -= 1
+            if self._refs == 0:
+                self._close_locked()
+
+    def close(self) -> None:
+        """Close the driver regardless of outstanding references (shutdown path)."""
+        with self._lock:
+            self._refs = 0
+            self._close_locked()
+
+    def _close_locked(self) -> None:
+        if self._driver is not None:
+            self._driver.close()
+            self._driver = None
+            self._created_at = None
+
+    def acquire_async(self):
+        with self._lock:
+            if self._async_driver is None:
+                self._async_driver = AsyncGraphDatabase.driver(self.settings["url"], **self._driver_kwargs())
+                self._async_created += 1
+            self._async_refs += 1
+            return self._async_driver
+
+    async def release_async(self) -> None:
+        with self._lock:
+            if self._async_refs == 0:
+                return
+            self._async_refs -= 1
+            if self._async_refs > 0:
+                return
+            driver, self._async_driver = self._async_driver, None
+        if driver is not None:
+            await driver.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            settings = self.settings
+            stats: Dict[str, Any] = {
+                "open": self._driver is not None,
+                "references": self._refs,
+                "drivers_created": self._created,
+                "created_at": self._created_at,
+                "max_connection_pool_size": settings["max_connection_pool_size"],
+                "connection_acquisition_timeout": settings["connection_acquisition_timeout"],
+                "max_connection_lifetime": settings["max_connection_lifetime"],
+            }
+            if self._driver is not None:
+                stats.update(_pool_usage(self._driver))
+            stats["async"] = {
+                "open": self._async_driver is not None,
+                "references": self._async_refs,
+                "drivers_created": self._async_created,
+            }
+            if self._async_driver is not None:
+                stats["async"].update(_pool_usage(self._async_driver, locked=False))
+            return stats
+
+
+def _pool_usage(driver, locked: bool = True) -> Dict[str, Any]:
+    """
+    Best-effort connection counts; the driver does not expose its pool publicly.
+    The async pool guards itself with an asyncio lock, so it is read without locking.
+    """
+    try:
+        pool = driver._pool
+        if locked:
+            with pool.lock:
+                connections = [c for conns in pool.connections.values() for c in conns]
+        else:
+            connections = [c for conns in list(pool.connections.values()) for c in list(conns)]
+        in_use = sum(1 for c in connections if getattr(c, "in_use", False))
+        return {
+            "connections_total": len(connections),
+            "connections_in_use": in_use,
+            "connections_idle": len(connections) - in_use,
+            "addresses": [str(address) for address in list(pool.connections)],
+        }
+    except Exception:
+        return {}
+
+
+# Process-wide registry shared by EntitlementRepository, the rewrite pipeline and the webapp
+neo4j_driver_registry = Neo4jDriverRegistry()
+atexit.register(neo4j_driver_registry.close)
@@ -0,0 +1,190 @@
+"""
+Compile free-text policy definitions into structured predicates stored on the Policy node.
+
+    "Allow access only to rows where dept_name = 'Finance'"
+        -> compiledColumn=dept_name, compiledOperator="=", compiledValues=["Finance"]
+    "Mask salary ...: masked for all users EXCEPT members of Client Support Team"
+        -> compiledMaskMode="full", compiledExceptGroups=["Client Support Team"]
+
+EntitlementRepository and the webapp write these properties with every definition they
+create; the rewriter reads them instead of parsing definitions per request. Existing
+policies are compiled in bulk with:
+
+    python -m graph_database.policy_compiler            # policies never compiled or compiled by an older version
+    python -m graph_database.policy_compiler --all      # recompile every policy
+"""
+from __future__ import annotations
+
+import argparse
+import re
+from typing import Any, Dict, List
+
+# Bump when the compiled representation changes; the backfill recompiles older policies
+COMPILER_VERSION = 1
+
+_EXCEPT_GROUPS = re.compile(r"except\s+members\s+of\s+(.+?)(?:[.;]|$)", re.IGNORECASE)
+_IN_PREDICATE = re.compile(r"([A-Za-z_][\w.]*)\s+in\s*\(([^)]*)\)", re.IGNORECASE)
+_EQ_PREDICATE = re.compile(r"([A-Za-z_][\w.]*)\s*=\s*('[^']*'|\"[^\"]*\"|[^\s;,)]+)")
+_NO_MASK = re.compile(r"\bno\s+mask\b", re.IGNORECASE)
+_MASK = re.compile(r"\bmask", re.IGNORECASE)
+_MASK_EXPRESSION = re.compile(
+    r"(?:value\s+of|replaced?\s+(?:by|with)|with|as)\s+(-?\d+(?:\.\d+)?|null|'[^']*')", re.IGNORECASE
+)
+
+
+def _unquote(value: str) -> str:
+    value = value.strip().strip(";").strip()
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "'\"":
+        return value[1:-1]
+    return value
+
+
+def compile_definition(definition: str | None) -> Dict[str, Any]:
+    """
+    Structured form of a policy definition:
+    {"column", "operator", "values", "exceptGroups", "maskMode", "maskExpression"}.
+    Row aspects (column/operator/values) are None when the text has no predicate; maskMode is
+    "none" for explicit no-mask policies, "full" when the text mentions masking, else None.
+    """
+    text = (definition or "").strip()
+    compiled: Dict[str, Any] = {
+        "column": None,
+        "operator": None,
+        "values": [],
+        "exceptGroups": [],
+        "maskMode": None,
+        "maskExpression": None,
+    }
+    if not text:
+        return compiled
+
+    match = _EXCEPT_GROUPS.search(text)
+    if match:
+        compiled["exceptGroups"] = [g.strip() for g in match.group(1).split(",") if g.strip()]
+
+    match = _IN_PREDICATE.search(text)
+    if match:
+        compiled["column"] = match.group(1).split(".")[-1]
+        compiled["operator"] = "IN"
+        compiled["values"] = [v for v in (_unquote(v) for v in match.group(2).split(",")) if v]
+    else:
+        match = _EQ_PREDICATE.search(text)
+        if match and _unquote(match.group(2)):
+            compiled["column"] = match.group(1).split(".")[-1]
+            compiled["operator"] = "="
+            compiled["values"] = [_unquote(match.group(2))]
+
+    if _NO_MASK.search(text):
+        compiled["maskMode"] = "none"
+    elif _MASK.search(text):
+        compiled["maskMode"] = "full"
+        match = _MASK_EXPRESSION.search(text)
+        if match:
+            compiled["maskExpression"] = match.group(1).upper() if match.group(1).lower() == "null" else match.group(1)
+    return compiled
+
+
+def policy_properties(definition: str | None) -> Dict[str, Any]:
+    """
+    compiled* properties to SET on a Policy node for the given definition.
+    """
+    compiled = compile_definition(definition)
+    return {
+        "compiledVersion": COMPILER_VERSION,
+        "compiledColumn": compiled["column"],
+        "compiledOperator": compiled["operator"],
+        "compiledValues": compiled["values"],
+        "compiledExceptGroups": compiled["exceptGroups"],
+        "compiledMaskMode": compiled["maskMode"],
+        "compiledMaskExpression": compiled["maskExpression"],
+    }
+
+
+def compiled_policy(entitlement: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The compiled form of an entitlement row: the stored one when the repository returned it,
+    otherwise compiled from policyDefinition (policies written before compilation existed).
+    """
+    compiled = entitlement.get("compiled")
+    if compiled:
+        return compiled
+    return compile_definition(entitlement.get("policyDefinition") or entitlement.get("definition"))
+
+
+# Cypher map projection of the stored compiled properties (null when never compiled)
+COMPILED_POLICY_PROJECTION = """
+        CASE WHEN p.compiledVersion IS NULL THEN null ELSE {
+          column: p.compiledColumn,
+          operator: p.compiledOperator,
+          values: p.compiledValues,
+          exceptGroups: p.compiledExceptGroups,
+          maskMode: p.compiledMaskMode,
+          maskExpression: p.compiledMaskExpression
+        } END"""
+
+FETCH_POLICIES_TO_COMPILE_QUERY = """
+    MATCH (p:Policy)
+    WHERE $all OR p.compiledVersion IS NULL OR p.compiledVersion < $compilerVersion
+    RETURN p.policyId AS policyId, p.definition AS definition
+"""
+
+SET_COMPILED_POLICIES_QUERY = """
+    UNWIND $rows AS row
+    MATCH (p:Policy {policyId: row.policyId})
+    SET p += row.compiled
+"""
+
+
+def backfill(compile_all: bool = False, chunk_size: int = 1000, driver=None, database: str | None = None) -> int:
+    """
+    Compile stored policies in chunks (one write transaction each, version bumped per chunk).
+    Returns the number of policies compiled.
+    """
+    from graph_database.entitlement_util import entitlement_change, record_changes
+    from graph_database.neo4j_driver_registry import neo4j_driver_registry
+
+    owns_driver = driver is None
+    if owns_driver:
+        driver = neo4j_driver_registry.acquire()
+    database = database or neo4j_driver_registry.database
+
+    def _write(tx, rows: List[Dict[str, Any]]):
+        tx.run(SET_COMPILED_POLICIES_QUERY, rows=rows).consume()
+        record_changes(tx, [entitlement_change("upsert", "Policy", row["policyId"]) for row in rows])
+
+    compiled = 0
+    try:
+        with driver.session(database=database) as session:
+            policies = [
+                dict(r)
+                for r in session.run(
+                    FETCH_POLICIES_TO_COMPILE_QUERY, all=compile_all, compilerVersion=COMPILER_VERSION
+                )
+            ]
+            for start in range(0, len(policies), chunk_size):
+                rows = [
+                    {"policyId": p["policyId"], "compiled": policy_properties(p["definition"])}
+                    for p in policies[start:start + chunk_size]
+                    if p["policyId"] is not None
+                ]
+                if rows:
+                    session.execute_write(_write, rows)
+                    compiled += len(rows)
+    finally:
+        if owns_driver:
+            neo4j_driver_registry.release()
+    return compiled
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--all", action="store_true", help="recompile every policy, not only stale ones")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    count = backfill(compile_all=args.all, chunk_size=args.chunk_size)
+    print(f"compiled policies: {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+from __future__ import annotations
+from relational_database.mysql.mysql_entitlement_util import *
+# compiled StateGraph reused across queries, or the fast path ([entitlement] PIPELINE)
+from relational_database.mysql.entitlement_pipeline import run_query
+
+# ---- Example ---------------------------------------------------------
+if __name__ == "__main__":
+    user = "user-alice"
+    # user = "user-bob"
+    q = """
+    SELECT e.emp_id, e.first_name, e.last_name, e.salary
+    FROM bank.employee e
+    JOIN bank.department d ON e.dept_id = d.dept_id
+    """
+    result = run_query(user, q)
+    print("---- TRACE ----")
+    for m in result.get("messages", []):
+        print("•", m)
+    print("\n---- REWRITTEN SQL ----")
+    print(result.get("rewritten_sql"))
+    print("\n---- ROWS ----")
+    for row in result.get("rows", []):
+        print(row)
\ No newline at end of file
@@ -0,0 +1,199 @@
+"""
+Apache Arrow output for executed entitled queries (optional dependency: pip install pyarrow).
+
+Column batches from columnar_fetch become pyarrow.RecordBatch objects with one typed array per
+column, so pandas/Spark/DuckDB consumers read the result without a Python object per cell.
+The schema is fixed for the whole stream, as the IPC stream format requires. Columns take the
+type the JDBC cursor declares; the others (SQLite, getObject columns) are inferred from the
+first batches, held back until each column showed a non-NULL value, and later batches whose
+values infer differently are cast to the schema instead of failing mid-response.
+
+    reader = record_batch_reader(executor.stream(sql))
+    df = reader.read_pandas()
+"""
+from __future__ import annotations
+
+import io
+import logging
+from typing import Iterator, List
+
+from relational_database.columnar_fetch import ColumnBatch, value_kind
+from relational_database.result_stream import StreamingResult
+
+logger = logging.getLogger(__name__)
+
+
+def arrow_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+    except ImportError as exc:
+        raise ImportError("Arrow output needs pyarrow: pip install pyarrow") from exc
+    return pyarrow
+
+
+def _arrow_type(pa, kind: str | None):
+    return {
+        "int": pa.int32(),
+        "long": pa.int64(),
+        "float": pa.float64(),
+        "bool": pa.bool_(),
+        "str": pa.string(),
+        "date": pa.date32(),
+        "time": pa.string(),  # Arrow cannot cast text to time64
+        "timestamp": pa.timestamp("us"),
+        "bytes": pa.binary(),
+    }.get(kind)
+
+
+# batches held back to type columns the cursor does not declare before the schema is fixed
+INFERENCE_BATCHES = 4
+
+_CONVERSION_ERRORS = (TypeError, ValueError, OverflowError)
+
+
+def _inferred_type(pa, values: List):
+    try:
+        return pa.array(values).type
+    except (pa.ArrowException, *_CONVERSION_ERRORS):
+        return pa.string()  # mixed Python types (SQLite's dynamic typing)
+
+
+def _promote(pa, known, inferred):
+    # int64 + double -> double, null + x -> x, decimals widen; anything else becomes text
+    if known is None:
+        return inferred
+    try:
+        return pa.unify_schemas(
+            [pa.schema([("c", known)]), pa.schema([("c", inferred)])], promote_options="permissive"
+        ).field("c").type
+    except pa.ArrowException:
+        return pa.string()
+
+
+def _declared_types(result: StreamingResult) -> List[int | None]:
+    return getattr(result, "types", None) or [None] * len(result.columns)
+
+
+def _schema(pa, result: StreamingResult, batches: List[ColumnBatch], exhausted: bool):
+    declared = _declared_types(result)
+    fields = []
+    for i, name in enumerate(result.columns):
+        arrow_type = _arrow_type(pa, value_kind(declared[i]))
+        if arrow_type is None:
+            # no JDBC type (SQLite, getObject columns): promote over the held-back batches
+            for batch in batches:
+                arrow_type = _promote(pa, arrow_type, _inferred_type(pa, batch.data[i]))
+            if arrow_type is None or (pa.types.is_null(arrow_type) and not exhausted):
+                # nothing but NULLs so far: text takes whatever follows (an empty result stays null)
+                arrow_type = pa.null() if exhausted else pa.string()
+        fields.append(pa.field(name, arrow_type))
+    return pa.schema(fields)
+
+
+def _fitted(pa, values: List, arrow_type):
+    # values that do not convert to the fixed schema's type: cast instead of failing mid-stream
+    if pa.types.is_string(arrow_type):
+        return pa.array([None if v is None else str(v) for v in values], type=arrow_type)
+    fitted = []
+    for value in values:
+        try:
+            fitted.append(pa.scalar(value).cast(arrow_type, safe=False).as_py())
+        except (pa.ArrowException, *_CONVERSION_ERRORS):
+            fitted.append(None)
+    logger.warning("arrow: %s values cast lossily (or nulled) to the stream's %s", _inferred_type(pa, values), arrow_type)
+    return pa.array(fitted, type=arrow_type)
+
+
+def _array(pa, values: List, arrow_type, declared: bool):
+    try:
+        if declared:
+            if pa.types.is_date(arrow_type) or pa.types.is_timestamp(arrow_type):
+                # the readers yield ISO text (jaydebeapi's representation); Arrow parses it in C++
+                return pa.array(values, type=pa.string()).cast(arrow_type)
+            return pa.array(values, type=arrow_type)
+        # pa.array(type=int64) would truncate 3.5 silently; a safe cast refuses it
+        array = pa.array(values)
+        return array if array.type == arrow_type else array.cast(arrow_type)
+    except (pa.ArrowException, *_CONVERSION_ERRORS):
+        return _fitted(pa, values, arrow_type)
+
+
+def _typed_batches(pa, result: StreamingResult):
+    """
+    (schema, iterator of RecordBatch). Columns the cursor declares a type for keep it; the
+    others are typed from up to INFERENCE_BATCHES batches, held back until no column is all-NULL.
+    """
+    batches = result.column_batches()
+    held: List[ColumnBatch] = []
+    exhausted = False
+    untyped = [i for i, sql_type in enumerate(_declared_types(result)) if value_kind(sql_type) is None]
+    while untyped and len(held) < INFERENCE_BATCHES:
+        batch = next(batches, None)
+        if batch is None:
+            exhausted = True
+            break
+        held.append(batch)
+        untyped = [i for i in untyped if all(value is None for value in batch.data[i])]
+    schema = _schema(pa, result, held, exhausted)
+    declared = [value_kind(sql_type) is not None for sql_type in _declared_types(result)]
+
+    def _convert(batch: ColumnBatch):
+        return pa.RecordBatch.from_arrays(
+            [_array(pa, values, field.type, known) for values, field, known in zip(batch.data, schema, declared)],
+            schema=schema,
+        )
+
+    def _all():
+        for batch in held:
+            yield _convert(batch)
+        for batch in batches:
+            yield _convert(batch)
+
+    return schema, _all()
+
+
+def record_batches(result: StreamingResult) -> Iterator:
+    """
+    pyarrow.RecordBatch per fetch batch; the pooled connection is released when exhausted.
+    """
+    _, batches = _typed_batches(_pyarrow(), result)
+    yield from batches
+
+
+def record_batch_reader(result: StreamingResult):
+    """
+    A pyarrow.RecordBatchReader over the result (read_all(), read_pandas(), to DuckDB/Polars).
+    """
+    pa = _pyarrow()
+    schema, batches = _typed_batches(pa, result)
+    return pa.RecordBatchReader.from_batches(schema, batches)
+
+
+def ipc_stream_chunks(result: StreamingResult) -> Iterator[bytes]:
+    """
+    Arrow IPC stream bytes: schema message, then one chunk per record batch, then end-of-stream.
+    """
+    pa = _pyarrow()
+    reader = record_batch_reader(result)
+    sink = io.BytesIO()
+
+    def _drain() -> bytes:
+        data = sink.getvalue()
+        sink.seek(0)
+        sink.truncate(0)
+        return data
+
+    with pa.ipc.new_stream(sink, reader.schema) as writer:
+        yield _drain()
+        for batch in reader:
+            writer.write_batch(batch)
+            yield _drain()
+    yield _drain()
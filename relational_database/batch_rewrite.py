@@ -0,0 +1,234 @@
+"""
+Batch entitlement rewrite of many (user_id, sql) pairs, e.g. a nightly check of query logs.
+
+run_query rebuilds the pipeline and fetches entitlements per query. Here the pairs are grouped
+by user, packed into tasks of about chunk_size queries and fanned out over a
+ProcessPoolExecutor: each worker parses every query of a user once, fetches the entitlement
+context once for the union of that user's tables, then rewrites each query with its own slice
+of it. sqlglot work is CPU-bound, so throughput grows with worker processes, not threads.
+Results are yielded in input order as soon as the tasks before them are done.
+
+    for result in rewrite_batch(pairs, workers=8):
+        print(result.index, result.rewritten_sql or result.error)
+
+    python -m relational_database.batch_rewrite queries.jsonl --out rewritten.jsonl --workers 8
+
+Workers read entitlements through the pipeline's repository ([entitlement] BACKEND); pass
+snapshot= to load an in-memory entitlement snapshot once per worker instead.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from graph_database.in_memory_repository import InMemoryEntitlementRepository
+from relational_database.executor import shared_executor
+from relational_database.mysql import mysql_entitlement_util as util
+from relational_database.parsed_query import parse_query
+
+DEFAULT_CHUNK_SIZE = 256
+
+# (user_id, [(index, sql), ...]) groups; one task holds one or more users
+Task = List[Tuple[str, List[Tuple[int, str]]]]
+
+
+@dataclass
+class BatchRewriteResult:
+    index: int
+    user_id: str
+    input_sql: str
+    rewritten_sql: str | None = None
+    error: str | None = None
+
+
+_worker_repository = None
+
+
+def _init_worker(snapshot: str | None) -> None:
+    global _worker_repository
+    if snapshot:
+        _worker_repository = InMemoryEntitlementRepository.from_snapshot(snapshot)
+
+
+def _repository():
+    return _worker_repository if _worker_repository is not None else util._entitlement_repository()
+
+
+def _rewrite_user(user_id: str, items: List[Tuple[int, str]], dialect: str) -> List[BatchRewriteResult]:
+    results: Dict[int, BatchRewriteResult] = {}
+    parsed = []
+    for index, sql in items:
+        result = results[index] = BatchRewriteResult(index=index, user_id=user_id, input_sql=sql)
+        try:
+            query = parse_query(sql, "mysql")
+            parsed.append((result, query, query.parsed_tables()))
+        except Exception as exc:
+            result.error = f"parse: {exc}"
+
+    union: Dict[Tuple[str, str], Dict[str, str]] = {}
+    for _, _, tables in parsed:
+        for table in tables:
+            union.setdefault(((table.get("schema") or "bank"), table.get("table")), table)
+    try:
+        repo = _repository()
+        try:
+            context = repo.fetch_entitlement_context(user_id, list(union.values()))
+        finally:
+            repo.close()
+    except Exception as exc:
+        for result, _, _ in parsed:
+            result.error = f"entitlements: {exc}"
+        return list(results.values())
+
+    governed = set(context.row_governed_tables)
+    for result, query, tables in parsed:
+        keys = {f"{t.get('schema') or 'bank'}.{t.get('table')}" for t in tables if t.get("table")}
+        try:
+            result.rewritten_sql = util.llm_rewrite_all(
+                result.input_sql,
+                tables,
+                # only this query's tables: the rewriter filters every table it is given
+                {key: context.entitlements_by_table.get(key, []) for key in keys},
+                context.user_groups,
+                sorted(governed & keys),
+                query,
+                dialect,
+            )
+        except Exception as exc:
+            result.error = f"rewrite: {exc}"
+    return list(results.values())
+
+
+def _run_task(task: Task, dialect: str) -> List[BatchRewriteResult]:
+    results: List[BatchRewriteResult] = []
+    for user_id, items in task:
+        results.extend(_rewrite_user(user_id, items, dialect))
+    return results
+
+
+def plan_tasks(pairs: Iterable[Tuple[str, str]], chunk_size: int = DEFAULT_CHUNK_SIZE) -> List[Task]:
+    """
+    Group pairs by user (first-seen order) and pack the groups into tasks of about chunk_size
+    queries; a user with more queries than that is split across tasks.
+    """
+    by_user: Dict[str, List[Tuple[int, str]]] = {}
+    for index, (user_id, sql) in enumerate(pairs):
+        by_user.setdefault(user_id, []).append((index, sql))
+
+    tasks: List[Task] = []
+    current: Task = []
+    size = 0
+    for user_id, items in by_user.items():
+        for start in range(0, len(items), chunk_size):
+            part = items[start:start + chunk_size]
+            if size and size + len(part) > chunk_size:
+                tasks.append(current)
+                current, size = [], 0
+            current.append((user_id, part))
+            size += len(part)
+    if current:
+        tasks.append(current)
+    return tasks
+
+
+def rewrite_batch(
+    pairs: Iterable[Tuple[str, str]],
+    workers: int | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    dialect: str | None = None,
+    snapshot: str | None = None,
+    executor: Executor | None = None,
+) -> Iterator[BatchRewriteResult]:
+    """
+    Rewrite every (user_id, sql) pair and yield one BatchRewriteResult per pair, in input order.
+
+    workers defaults to os.cpu_count(); workers=0 runs everything in this process. dialect
+    defaults to the shared executor's. A failing query gets its error in result.error and
+    does not stop the batch. executor= reuses an existing pool across batches (its workers
+    must have been started with initializer=_init_worker for snapshot= to apply).
+    """
+    if dialect is None:
+        dialect = shared_executor().dialect
+    tasks = plan_tasks(pairs, chunk_size)
+    total = sum(len(items) for task in tasks for _, items in task)
+    if workers == 0 and executor is None:
+        global _worker_repository
+        previous = _worker_repository
+        _init_worker(snapshot)
+        try:
+            finished = (result for task in tasks for result in _run_task(task, dialect))
+            yield from _in_order(finished, total)
+        finally:
+            _worker_repository = previous
+        return
+
+    pool = executor or ProcessPoolExecutor(
+        max_workers=workers or os.cpu_count(), initializer=_init_worker, initargs=(snapshot,)
+    )
+    try:
+        futures = [pool.submit(_run_task, task, dialect) for task in tasks]
+        finished = (result for future in as_completed(futures) for result in future.result())
+        yield from _in_order(finished, total)
+    finally:
+        if executor is None:
+            pool.shutdown(cancel_futures=True)
+
+
+def _in_order(finished: Iterable[BatchRewriteResult], total: int) -> Iterator[BatchRewriteResult]:
+    pending: Dict[int, BatchRewriteResult] = {}
+    next_index = 0
+    for result in finished:
+        pending[result.index] = result
+        while next_index in pending:
+            yield pending.pop(next_index)
+            next_index += 1
+    if next_index != total:
+        raise RuntimeError(f"batch rewrite returned {next_index} of {total} results")
+
+
+def _read_pairs(path: str) -> Iterator[Tuple[str, str]]:
+    with (sys.stdin if path == "-" else open(path, "r", encoding="utf-8")) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                yield record["user_id"], record["sql"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help='JSONL file of {"user_id", "sql"} records ("-" for stdin)')
+    parser.add_argument("--out", default="-", help="JSONL file for the results (default stdout)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (0: in-process)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--dialect", default=None, help="output dialect (default: the [executor] backend's)")
+    parser.add_argument("--snapshot", default=None, help="in-memory entitlement snapshot for the workers")
+    args = parser.parse_args()
+
+    # under "python -m" this module is __main__, whose functions the workers cannot unpickle
+    from relational_database import batch_rewrite
+
+    started = time.perf_counter()
+    count = errors = 0
+    out = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8")
+    try:
+        for result in batch_rewrite.rewrite_batch(
+            _read_pairs(args.input), args.workers, args.chunk_size, args.dialect, args.snapshot
+        ):
+            out.write(json.dumps(asdict(result), ensure_ascii=False) + "\n")
+            count += 1
+            errors += result.error is not None
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    seconds = time.perf_counter() - started
+    print(f"rewrote {count} queries ({errors} errors) in {seconds:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
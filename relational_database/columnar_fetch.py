@@ -0,0 +1,205 @@
+"""
+Column-wise conversion of JDBC result sets behind jaydebeapi cursors.
+
+jaydebeapi's fetchmany() looks up every cell's SQL type through ResultSetMetaData, reads it
+with getObject() and often unboxes it with one more call: two to three JNI calls per cell.
+fetch_columnar() reads the metadata once, binds one typed getter per column
+(getLong/getDouble/getString/...) and fills one Python list per column. Cells are still read
+one JNI call at a time (JDBC has no bulk column read): one call per cell, plus a wasNull()
+for primitive columns the metadata reports as nullable. Values are the ones jaydebeapi's
+default converters produce, so callers can switch without changing types.
+
+Cursors that are not jaydebeapi cursors (no Java result set) are transposed from fetchmany().
+"""
+from __future__ import annotations
+
+import datetime as dt
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List
+
+# java.sql.Types codes
+_BIT, _TINYINT, _SMALLINT, _INTEGER, _BIGINT = -7, -6, 5, 4, -5
+_FLOAT, _REAL, _DOUBLE, _NUMERIC, _DECIMAL = 6, 7, 8, 2, 3
+_CHAR, _VARCHAR, _LONGVARCHAR, _NCHAR, _NVARCHAR, _LONGNVARCHAR = 1, 12, -1, -15, -9, -16
+_DATE, _TIME, _TIMESTAMP, _BOOLEAN = 91, 92, 93, 16
+_BINARY, _VARBINARY, _LONGVARBINARY, _BLOB, _CLOB, _NCLOB = -2, -3, -4, 2004, 2005, 2011
+
+# ResultSetMetaData.isNullable(): the column never holds NULL
+_COLUMN_NO_NULLS = 0
+
+# java.sql.Types code -> kind of Python value the reader produces (None: whatever getObject returns)
+_VALUE_KINDS = {
+    **dict.fromkeys((_TINYINT, _SMALLINT), "int"),
+    # getLong: MySQL INT UNSIGNED is reported as INTEGER and exceeds 2^31 - 1
+    **dict.fromkeys((_INTEGER, _BIGINT), "long"),
+    **dict.fromkeys((_FLOAT, _REAL, _DOUBLE, _NUMERIC, _DECIMAL), "float"),
+    **dict.fromkeys((_BIT, _BOOLEAN), "bool"),
+    **dict.fromkeys((_CHAR, _VARCHAR, _LONGVARCHAR, _NCHAR, _NVARCHAR, _LONGNVARCHAR, _CLOB, _NCLOB), "str"),
+    _DATE: "date",
+    _TIME: "time",
+    _TIMESTAMP: "timestamp",
+    **dict.fromkeys((_BINARY, _VARBINARY, _LONGVARBINARY, _BLOB), "bytes"),
+}
+
+
+def value_kind(sql_type: int | None) -> str | None:
+    """
+    Kind of Python value fetch_columnar yields for a java.sql.Types code: "int", "long",
+    "float", "bool", "str", "date"/"time"/"timestamp" (ISO text, like jaydebeapi), "bytes" or None.
+    """
+    return _VALUE_KINDS.get(sql_type)
+
+
+@dataclass
+class ColumnBatch:
+    """
+    Up to batch_size rows of a result, stored column-wise: data[i] holds column i's values.
+    types holds the java.sql.Types code of each column when the cursor is a JDBC one.
+    """
+    columns: List[str]
+    data: List[List[Any]] = field(default_factory=list)
+    types: List[int] | None = None
+
+    @property
+    def num_rows(self) -> int:
+        return len(self.data[0]) if self.data else 0
+
+    def column(self, name: str) -> List[Any]:
+        return self.data[self.columns.index(name)]
+
+    def to_dict(self) -> Dict[str, List[Any]]:
+        return dict(zip(self.columns, self.data))
+
+    def rows(self) -> List[tuple]:
+        return list(zip(*self.data))
+
+    def records(self) -> List[Dict[str, Any]]:
+        return [dict(zip(self.columns, row)) for row in zip(*self.data)]
+
+
+def _nullable(getter: Callable[[int], Any], was_null: Callable[[], bool], cast: Callable[[Any], Any]):
+    # primitive getters return 0/false for SQL NULL; wasNull() tells them apart
+    def read(col: int):
+        value = getter(col)
+        return None if was_null() else cast(value)
+    return read
+
+
+def _not_null(getter: Callable[[int], Any], cast: Callable[[Any], Any]):
+    # NOT NULL columns: no wasNull() round trip per cell
+    def read(col: int):
+        return cast(getter(col))
+    return read
+
+
+def _object(getter: Callable[[int], Any], cast: Callable[[Any], Any]):
+    def read(col: int):
+        value = getter(col)
+        return None if value is None else cast(value)
+    return read
+
+
+def _to_timestamp(value) -> str:
+    # same text jaydebeapi's _to_datetime produces
+    parsed = dt.datetime.strptime(str(value)[:19], "%Y-%m-%d %H:%M:%S")
+    return str(parsed.replace(microsecond=int(str(value.getNanos())[:6])))
+
+
+def _reader(rs, sql_type: int, nullable: bool = True) -> Callable[[int], Any]:
+    """
+    A reader for one column of the given java.sql.Types code, bound to the result set once.
+    """
+    kind = value_kind(sql_type)
+
+    def primitive(getter, cast):
+        return _nullable(getter, rs.wasNull, cast) if nullable else _not_null(getter, cast)
+
+    if kind == "int":
+        return primitive(rs.getInt, int)
+    if kind == "long":
+        return primitive(rs.getLong, int)
+    if kind == "float":
+        return primitive(rs.getDouble, float)
+    if kind == "bool":
+        return primitive(rs.getBoolean, bool)
+    if kind == "str":
+        return _object(rs.getString, str)
+    if kind == "date":
+        return _object(rs.getDate, lambda v: str(v)[:10])
+    if kind == "time":
+        return _object(rs.getTime, lambda v: str(v)[:8])
+    if kind == "timestamp":
+        return _object(rs.getTimestamp, _to_timestamp)
+    if kind == "bytes":
+        return _object(rs.getBytes, bytes)
+    return _object(rs.getObject, lambda v: v)
+
+
+def column_names(cursor) -> List[str]:
+    return [d[0] for d in (cursor.description or [])]
+
+
+def column_types(cursor) -> List[int] | None:
+    """
+    java.sql.Types code of each column of an executed jaydebeapi cursor; None for other cursors.
+    """
+    meta = getattr(cursor, "_meta", None)
+    if getattr(cursor, "_rs", None) is None or meta is None:
+        return None
+    return [int(meta.getColumnType(col)) for col in range(1, meta.getColumnCount() + 1)]
+
+
+def fetch_columnar(cursor, batch_size: int = 10000) -> Iterator[ColumnBatch]:
+    """
+    Yield ColumnBatch objects of at most batch_size rows from an executed cursor.
+    """
+    columns = column_names(cursor)
+    rs = getattr(cursor, "_rs", None)
+    meta = getattr(cursor, "_meta", None)
+    if rs is None or meta is None:
+        yield from _fetch_transposed(cursor, columns, batch_size)
+        return
+
+    try:
+        rs.setFetchSize(batch_size)  # driver hint for rows per network round trip
+    except Exception:
+        pass
+    types = column_types(cursor)
+    readers = [
+        (col, _reader(rs, sql_type, nullable=int(meta.isNullable(col)) != _COLUMN_NO_NULLS))
+        for col, sql_type in enumerate(types, start=1)
+    ]
+    next_row = rs.next
+    while True:
+        data: List[List[Any]] = [[] for _ in columns]
+        appends = [values.append for values in data]
+        count = 0
+        while count < batch_size and next_row():
+            for (col, read), append in zip(readers, appends):
+                append(read(col))
+            count += 1
+        if not count:
+            return
+        yield ColumnBatch(columns=columns, data=data, types=types)
+        if count < batch_size:
+            return
+
+
+def _fetch_transposed(cursor, columns: List[str], batch_size: int) -> Iterator[ColumnBatch]:
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield ColumnBatch(columns=columns, data=[list(values) for values in zip(*rows)])
+
+
+def fetch_all_columnar(cursor, batch_size: int = 10000) -> ColumnBatch:
+    """
+    The whole result as one ColumnBatch (lists per column, no per-row objects).
+    """
+    columns = column_names(cursor)
+    result = ColumnBatch(columns=columns, data=[[] for _ in columns])
+    for batch in fetch_columnar(cursor, batch_size):
+        for values, chunk in zip(result.data, batch.data):
+            values.extend(chunk)
+    return result
@@ -0,0 +1,311 @@
+"""
+Pluggable SQL executors for the rewrite pipeline.
+
+execute_node runs the rewritten SQL on whichever backend [executor] BACKEND names:
+
+    mysql   MySQL over JDBC (pooled, see jdbc_pool)          dialect "mysql"
+    oracle  Oracle over JDBC (pooled)                         dialect "oracle"
+    sqlite  embedded SQLite seeded with the bank sample data  dialect "sqlite"
+
+The rewriter emits SQL in the executor's dialect, so the whole parse -> entitle -> rewrite ->
+execute pipeline runs (and can be load-tested) on one machine with SQLITE_DATABASE=:memory:
+and no JVM or database server. DuckDB is not bundled; the sqlite backend needs only the stdlib.
+"""
+from __future__ import annotations
+
+import itertools
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import sqlglot
+from sqlglot import exp as E
+
+from relational_database.columnar_fetch import fetch_all_columnar
+from relational_database.jdbc_pool import jdbc_pool
+from relational_database.parsed_query import DEFAULT_SCHEMA
+from relational_database.result_stream import StreamingResult
+from secret.secret_util import get_config
+
+SEED_SQL = Path(__file__).resolve().parents[1] / "demo" / "scripts" / "seed_mysql.sql"
+
+
+class StatementCanceller:
+    """
+    Lets another thread cancel the statement an execute() call is running (request deadlines,
+    client disconnects): the executor binds the running statement's cancel, cancel() calls it.
+    A cancel that comes before the statement starts keeps it from starting.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cancel: Callable[[], None] | None = None
+        self.cancelled = False
+
+    def bind(self, cancel: Callable[[], None]) -> None:
+        with self._lock:
+            if self.cancelled:
+                raise InterruptedError("statement cancelled before it started")
+            self._cancel = cancel
+
+    def unbind(self) -> None:
+        with self._lock:
+            self._cancel = None
+
+    def cancel(self) -> None:
+        # under the lock, so the executor cannot close the statement while it is being cancelled
+        with self._lock:
+            self.cancelled = True
+            if self._cancel is not None:
+                self._cancel()
+
+
+def _cancel_jdbc_statement(cursor) -> None:
+    # jaydebeapi keeps the running PreparedStatement in _prep; Statement.cancel() is the
+    # one JDBC call meant to come from another thread
+    statement = getattr(cursor, "_prep", None)
+    if statement is not None:
+        statement.cancel()
+
+
+class Executor:
+    """
+    Runs SQL written in `dialect` and returns rows as tuples (what run_mysql_query returned).
+    execute() takes an optional StatementCanceller to stop the statement from another thread.
+    """
+
+    name = ""
+    dialect = ""
+
+    def execute(self, sql: str, canceller: StatementCanceller | None = None) -> List[tuple]:
+        raise NotImplementedError
+
+    def execute_columnar(self, sql: str) -> Dict[str, List[Any]]:
+        raise NotImplementedError
+
+    def stream(self, sql: str, fetch_size: int | None = None) -> StreamingResult:
+        raise NotImplementedError
+
+    def execute_update(self, sql: str, rows: List[tuple] | None = None) -> None:
+        """
+        Run a statement that returns no rows (DDL/DML), once per parameter row ("?" markers)
+        when rows is given; committed when it returns.
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class JdbcExecutor(Executor):
+    """
+    Executor over the process-wide JDBC pool of one system_config.ini section.
+    """
+
+    def __init__(self, section: str, dialect: str):
+        self.name = section
+        self.section = section
+        self.dialect = dialect
+
+    def execute(self, sql: str, canceller: StatementCanceller | None = None) -> List[tuple]:
+        with jdbc_pool(self.section).connection() as conn:
+            cur = conn.cursor()
+            try:
+                if canceller is not None:
+                    canceller.bind(lambda: _cancel_jdbc_statement(cur))
+                cur.execute(sql)
+                return cur.fetchall()
+            finally:
+                if canceller is not None:
+                    canceller.unbind()
+                cur.close()
+
+    def execute_columnar(self, sql: str) -> Dict[str, List[Any]]:
+        with jdbc_pool(self.section).connection() as conn:
+            cur = conn.cursor()
+            try:
+                cur.execute(sql)
+                return fetch_all_columnar(cur).to_dict()
+            finally:
+                cur.close()
+
+    def stream(self, sql: str, fetch_size: int | None = None) -> StreamingResult:
+        return StreamingResult(sql, section=self.section, fetch_size=fetch_size)
+
+    def execute_update(self, sql: str, rows: List[tuple] | None = None) -> None:
+        # pooled JDBC connections are in autocommit mode
+        with jdbc_pool(self.section).connection() as conn:
+            cur = conn.cursor()
+            try:
+                if rows is None:
+                    cur.execute(sql)
+                else:
+                    cur.executemany(sql, rows)
+            finally:
+                cur.close()
+
+
+class MySQLJdbcExecutor(JdbcExecutor):
+    def __init__(self):
+        super().__init__("mysql", "mysql")
+
+
+class OracleJdbcExecutor(JdbcExecutor):
+    def __init__(self):
+        super().__init__("oracle", "oracle")
+
+
+def seed_bank_schema(conn: sqlite3.Connection, seed_file: Path = SEED_SQL, extra_employees: int = 0) -> None:
+    """
+    Load the MySQL sample schema/data into the attached "bank" database, transpiled to SQLite.
+    extra_employees adds synthetic employees spread over the seeded departments (load tests).
+    """
+    for statement in sqlglot.parse(seed_file.read_text(), read="mysql"):
+        if statement is None:
+            continue
+        if isinstance(statement, E.Create) and statement.args.get("kind") == "SCHEMA":
+            continue  # the schema is the ATTACHed database
+        for reference in statement.find_all(E.Reference):
+            # SQLite foreign keys name a table in the same database, unqualified
+            for table in reference.find_all(E.Table):
+                table.set("db", None)
+        conn.execute(statement.sql(dialect="sqlite"))
+    if extra_employees:
+        dept_ids = [row[0] for row in conn.execute(f"SELECT dept_id FROM {DEFAULT_SCHEMA}.department")]
+        rows = (
+            (f"First{n}", f"Last{n}", "Associate", 50000.0 + (n % 500) * 100, "2023-01-01", dept_id)
+            for n, dept_id in zip(range(extra_employees), itertools.cycle(dept_ids))
+        )
+        conn.executemany(
+            f"INSERT INTO {DEFAULT_SCHEMA}.employee "
+            "(first_name, last_name, job_title, salary, hire_date, dept_id) VALUES (?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+    conn.commit()
+
+
+class _SQLiteConnections:
+    """
+    Pool-shaped (acquire/release) source of SQLite connections for StreamingResult: one
+    connection per borrower, all attached to the same bank database.
+    """
+
+    def __init__(self, executor: "SQLiteExecutor"):
+        self._executor = executor
+
+    def acquire(self, timeout: float | None = None):
+        return self._executor._connect()
+
+    def release(self, conn, validate: bool = False) -> None:
+        conn.close()
+
+
+class SQLiteExecutor(Executor):
+    """
+    Embedded SQLite with the bank sample schema ATTACHed as "bank".
+
+    database ":memory:" (the default) keeps the bank database in a shared-cache in-memory
+    database that lives as long as the executor; a file path persists it (seeded only when
+    empty). Each call opens its own connection, so concurrent requests do not serialize on
+    one handle.
+    """
+
+    name = "sqlite"
+    dialect = "sqlite"
+    _instances = itertools.count()
+
+    def __init__(self, database: str = ":memory:", seed: bool = True, extra_employees: int = 0):
+        if database == ":memory:":
+            self._bank_uri = f"file:entitlement_bank_{next(self._instances)}?mode=memory&cache=shared"
+        else:
+            self._bank_uri = Path(database).resolve().as_uri()
+        # keeps a shared in-memory database alive between calls
+        self._anchor = self._connect()
+        if seed and not self._anchor.execute(
+            f"SELECT 1 FROM {DEFAULT_SCHEMA}.sqlite_master WHERE type = 'table' AND name = 'employee'"
+        ).fetchone():
+            seed_bank_schema(self._anchor, extra_employees=extra_employees)
+        self._connections = _SQLiteConnections(self)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect("file::memory:", uri=True, check_same_thread=False)
+        conn.execute(f"ATTACH DATABASE ? AS {DEFAULT_SCHEMA}", (self._bank_uri,))
+        return conn
+
+    def execute(self, sql: str, canceller: StatementCanceller | None = None) -> List[tuple]:
+        conn = self._connect()
+        try:
+            if canceller is not None:
+                canceller.bind(conn.interrupt)
+            return conn.execute(sql).fetchall()
+        finally:
+            if canceller is not None:
+                canceller.unbind()
+            conn.close()
+
+    def execute_columnar(self, sql: str) -> Dict[str, List[Any]]:
+        conn = self._connect()
+        try:
+            return fetch_all_columnar(conn.execute(sql)).to_dict()
+        finally:
+            conn.close()
+
+    def stream(self, sql: str, fetch_size: int | None = None) -> StreamingResult:
+        return StreamingResult(sql, section="sqlite", fetch_size=fetch_size, pool=self._connections)
+
+    def execute_update(self, sql: str, rows: List[tuple] | None = None) -> None:
+        conn = self._connect()
+        try:
+            if rows is None:
+                conn.execute(sql)
+            else:
+                conn.executemany(sql, rows)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def close(self) -> None:
+        self._anchor.close()
+
+
+_EXECUTORS = {
+    "mysql": MySQLJdbcExecutor,
+    "oracle": OracleJdbcExecutor,
+}
+
+_executor: Executor | None = None
+_executor_lock = threading.Lock()
+
+
+def executor_from_config() -> Executor:
+    config = get_config()
+    backend = config.get("executor", "BACKEND", fallback="mysql").strip().lower()
+    if backend == "sqlite":
+        return SQLiteExecutor(
+            database=config.get("executor", "SQLITE_DATABASE", fallback=":memory:") or ":memory:",
+            extra_employees=config.getint("executor", "SQLITE_EXTRA_EMPLOYEES", fallback=0),
+        )
+    if backend not in _EXECUTORS:
+        raise ValueError(f"[executor] BACKEND must be one of mysql, oracle, sqlite: {backend!r}")
+    return _EXECUTORS[backend]()
+
+
+def shared_executor() -> Executor:
+    """
+    The process-wide executor the pipeline runs rewritten SQL on, created on first use.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = executor_from_config()
+        return _executor
+
+
+def set_shared_executor(executor: Executor | None) -> None:
+    """
+    Replace the process-wide executor (benchmarks and local runs pick a backend in code).
+    """
+    global _executor
+    with _executor_lock:
+        _executor = executor
@@ -0,0 +1,353 @@
+"""
+Bounded, warm JDBC connection pools for the jaydebeapi executors.
+
+jaydebeapi.connect() goes through JPype (starting the JVM and loading the driver class on first
+use) and opens a new JDBC session every time. The pools here start the JVM once with every
+configured driver jar on the classpath, keep up to POOL_MAX_SIZE connections per database
+section of system_config.ini, validate connections that sat idle, recycle them after
+POOL_MAX_LIFETIME and record how long callers waited to acquire one.
+
+    with jdbc_pool("mysql").connection() as conn:
+        cur = conn.cursor()
+        ...
+"""
+from __future__ import annotations
+
+import atexit
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, Iterator
+
+from secret.secret_util import get_config
+
+# Sections with a JDBC driver; their jars all go on the one JVM classpath
+JDBC_SECTIONS = ("mysql", "oracle")
+
+_DEFAULT_DRIVERS = {
+    "mysql": "com.mysql.cj.jdbc.Driver",
+    "oracle": "oracle.jdbc.OracleDriver",
+}
+_DEFAULT_VALIDATION_QUERIES = {
+    "mysql": "SELECT 1",
+    "oracle": "SELECT 1 FROM DUAL",
+}
+
+_jvm_lock = threading.Lock()
+
+
+def _pool_settings(section: str) -> Dict[str, Any]:
+    """
+    Connection and pool settings from the given section of system_config.ini.
+    """
+    config = get_config()
+    return {
+        "jar": config[section]["JDBC_JAR"],
+        "url": config[section]["JDBC_URL"],
+        "username": config[section]["USERNAME"],
+        "password": config[section]["PASSWORD"],
+        "driver": config.get(section, "DRIVER", fallback=_DEFAULT_DRIVERS.get(section)),
+        "min_size": config.getint(section, "POOL_MIN_SIZE", fallback=1),
+        "max_size": config.getint(section, "POOL_MAX_SIZE", fallback=8),
+        "acquire_timeout": config.getfloat(section, "POOL_ACQUIRE_TIMEOUT", fallback=30.0),
+        "max_lifetime": config.getfloat(section, "POOL_MAX_LIFETIME", fallback=1800.0),
+        "validate_after": config.getfloat(section, "POOL_VALIDATE_AFTER", fallback=30.0),
+        "validation_query": config.get(
+            section, "POOL_VALIDATION_QUERY", fallback=_DEFAULT_VALIDATION_QUERIES.get(section, "SELECT 1")
+        ),
+    }
+
+
+def _configured_jars() -> list:
+    config = get_config()
+    jars = []
+    for section in JDBC_SECTIONS:
+        if config.has_section(section):
+            for jar in config.get(section, "JDBC_JAR", fallback="").split(os.pathsep):
+                if jar and jar not in jars:
+                    jars.append(jar)
+    return jars
+
+
+def ensure_jvm() -> bool:
+    """
+    Start the JVM once per process with every configured driver jar (plus CLASSPATH) on the
+    classpath; jaydebeapi reuses a running JVM. Returns True if this call started it.
+    """
+    import jpype
+
+    with _jvm_lock:
+        if jpype.isJVMStarted():
+            return False
+        classpath = _configured_jars()
+        if os.environ.get("CLASSPATH"):
+            classpath.extend(os.environ["CLASSPATH"].split(os.pathsep))
+        args = [f"-Djava.class.path={os.pathsep.join(classpath)}"] if classpath else []
+        jpype.startJVM(jpype.getDefaultJVMPath(), *args)
+        return True
+
+
+def _jdbc_connect(settings: Dict[str, Any]):
+    import jaydebeapi
+
+    ensure_jvm()
+    return jaydebeapi.connect(
+        jclassname=settings["driver"],
+        url=settings["url"],
+        driver_args=[settings["username"], settings["password"]],
+        jars=settings["jar"],
+    )
+
+
+@dataclass
+class _PooledConnection:
+    conn: Any
+    created_at: float
+    last_used: float
+
+
+class JdbcConnectionPool:
+    """
+    A bounded pool of jaydebeapi connections for one database section.
+
+    acquire() hands out the most recently used idle connection, validating it first when it
+    has been idle longer than validate_after and replacing it once older than max_lifetime;
+    it opens a new connection while fewer than max_size exist and otherwise waits up to
+    acquire_timeout. Callers use the connection() context manager, which returns the
+    connection on exit and re-validates it if the block raised.
+    """
+
+    def __init__(self, section: str, connect: Callable[[Dict[str, Any]], Any] = _jdbc_connect,
+                 settings: Dict[str, Any] | None = None):
+        self.section = section
+        self.settings = settings or _pool_settings(section)
+        self._connect = connect
+        self._cond = threading.Condition()
+        self._idle: Deque[_PooledConnection] = deque()
+        self._in_use: Dict[int, _PooledConnection] = {}
+        self._size = 0
+        self._closed = False
+        self.created = 0
+        self.recycled = 0
+        self.validation_failures = 0
+        self.acquisitions = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def _open(self) -> _PooledConnection:
+        conn = self._connect(self.settings)
+        if isinstance(conn, dict) and "error" in conn:
+            raise ConnectionError(conn["error"])
+        now = time.monotonic()
+        with self._cond:
+            self.created += 1
+        return _PooledConnection(conn=conn, created_at=now, last_used=now)
+
+    def _is_valid(self, pooled: _PooledConnection) -> bool:
+        try:
+            jconn = getattr(pooled.conn, "jconn", None)
+            if jconn is not None:
+                return bool(jconn.isValid(max(1, int(self.settings["acquire_timeout"]))))
+            cur = pooled.conn.cursor()
+            try:
+                cur.execute(self.settings["validation_query"])
+                cur.fetchall()
+            finally:
+                cur.close()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close_quietly(pooled: _PooledConnection) -> None:
+        try:
+            pooled.conn.close()
+        except Exception:
+            pass
+
+    def _discard(self, pooled: _PooledConnection) -> None:
+        self._close_quietly(pooled)
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def acquire(self, timeout: float | None = None):
+        """
+        Borrow a connection; raises TimeoutError when none frees up within the timeout.
+        """
+        timeout = self.settings["acquire_timeout"] if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        while True:
+            pooled = None
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise RuntimeError(f"{self.section} connection pool is closed")
+                    if self._idle:
+                        pooled = self._idle.pop()
+                        break
+                    if self._size < self.settings["max_size"]:
+                        self._size += 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.timeouts += 1
+                        raise TimeoutError(
+                            f"no {self.section} connection available within {timeout:.1f}s "
+                            f"(max_size={self.settings['max_size']})"
+                        )
+                    self._cond.wait(remaining)
+
+            if pooled is None:
+                try:
+                    pooled = self._open()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+            else:
+                now = time.monotonic()
+                if now - pooled.created_at > self.settings["max_lifetime"]:
+                    with self._cond:
+                        self.recycled += 1
+                    self._discard(pooled)
+                    continue
+                if now - pooled.last_used > self.settings["validate_after"] and not self._is_valid(pooled):
+                    with self._cond:
+                        self.validation_failures += 1
+                    self._discard(pooled)
+                    continue
+
+            waited = time.monotonic() - started
+            with self._cond:
+                self._in_use[id(pooled.conn)] = pooled
+                self.acquisitions += 1
+                self.wait_seconds_total += waited
+                self.wait_seconds_max = max(self.wait_seconds_max, waited)
+            return pooled.conn
+
+    def release(self, conn, validate: bool = False) -> None:
+        """
+        Return a borrowed connection; with validate=True it is checked (and dropped if broken) first.
+        """
+        with self._cond:
+            pooled = self._in_use.pop(id(conn), None)
+        if pooled is None:
+            return
+        if validate and not self._is_valid(pooled):
+            with self._cond:
+                self.validation_failures += 1
+            self._discard(pooled)
+            return
+        with self._cond:
+            if self._closed:
+                closed = True
+            else:
+                closed = False
+                pooled.last_used = time.monotonic()
+                self._idle.append(pooled)
+                self._cond.notify()
+        if closed:
+            self._discard(pooled)
+
+    @contextmanager
+    def connection(self, timeout: float | None = None) -> Iterator[Any]:
+        conn = self.acquire(timeout)
+        failed = False
+        try:
+            yield conn
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self.release(conn, validate=failed)
+
+    def warm(self) -> int:
+        """
+        Start the JVM and open connections until min_size are idle. Returns how many were opened.
+        """
+        opened = 0
+        while True:
+            with self._cond:
+                if self._closed or len(self._idle) >= self.settings["min_size"] \
+                        or self._size >= self.settings["max_size"]:
+                    return opened
+                self._size += 1
+            try:
+                pooled = self._open()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                raise
+            with self._cond:
+                self._idle.append(pooled)
+                self._cond.notify()
+            opened += 1
+
+    def close(self) -> None:
+        """Close idle connections now and borrowed ones as they are released."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for pooled in idle:
+            self._close_quietly(pooled)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "section": self.section,
+                "closed": self._closed,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": len(self._in_use),
+                "min_size": self.settings["min_size"],
+                "max_size": self.settings["max_size"],
+                "created": self.created,
+                "recycled": self.recycled,
+                "validation_failures": self.validation_failures,
+                "acquisitions": self.acquisitions,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": self.wait_seconds_total,
+                "wait_seconds_max": self.wait_seconds_max,
+                "wait_seconds_avg": (self.wait_seconds_total / self.acquisitions) if self.acquisitions else 0.0,
+            }
+
+
+_pools: Dict[str, JdbcConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def jdbc_pool(section: str) -> JdbcConnectionPool:
+    """
+    The process-wide pool for a database section ("mysql", "oracle"), created on first use.
+    """
+    with _pools_lock:
+        pool = _pools.get(section)
+        if pool is None or pool._closed:
+            pool = _pools[section] = JdbcConnectionPool(section)
+        return pool
+
+
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    with _pools_lock:
+        pools = list(_pools.values())
+    return {pool.section: pool.stats() for pool in pools}
+
+
+def close_pools() -> None:
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+atexit.register(close_pools)
@@ -0,0 +1,344 @@
+"""
+Column masks for the rule-based rewriter, for any table and column.
+
+build_mask_map() turns the effective MASK entitlements into a (schema, table, column) ->
+mask expression map once per rewrite; apply_masks() then makes one pass over the projection
+of each SELECT that reads a masked table (the outermost query, CTE bodies, derived tables,
+subqueries), so values are masked where the table is introduced and every outer scope only
+sees the masked values:
+
+    e.salary, salary        -> 0.00 AS salary     (qualified or unqualified, any alias)
+    e.salary AS pay         -> 0.00 AS pay
+    SUM(e.salary)           -> SUM(0.00)
+    *, e.*                  -> the masked table's columns with the masked ones replaced;
+                               unmasked tables stay as t.*
+
+The other clauses of the SELECT see the masked values too, so a masked column cannot be
+probed through filtering, grouping or sorting (WHERE e.salary > 100000, ORDER BY salary):
+
+    WHERE / HAVING / JOIN ON      e.salary -> 0.00, also from a correlated subquery
+    ORDER BY e.salary             the key is dropped (sorting by a constant)
+    GROUP BY e.salary             the key is dropped (GROUP BY NULL when it was the only one)
+
+A bare ORDER BY name that is an output column of the SELECT sorts by that output, as in MySQL,
+and is kept.
+
+Expanding a star needs the masked table's column names, which come from column_resolver: the
+column catalog (graph_database.column_catalog) for tables synced from information_schema,
+otherwise a zero-row SELECT * on the shared executor, cached per table until the catalog version
+changes.
+"""
+from __future__ import annotations
+
+import threading
+from typing import Any, Callable, Dict, List, Set, Tuple
+
+from sqlglot import exp as E
+
+from graph_database.column_catalog import shared_column_catalog
+from graph_database.policy_compiler import compiled_policy
+from relational_database.executor import shared_executor
+from relational_database.parsed_query import DEFAULT_SCHEMA, ParsedQuery, TableRef
+
+# what masks without an expression produce (the sample salary masks have always shown 0.00)
+DEFAULT_MASK_EXPRESSION = "0.00"
+
+MaskMap = Dict[Tuple[str, str, str], E.Expression]
+
+
+def mask_literal(mask_expression: str | None) -> E.Expression | None:
+    """
+    SQL literal for a compiled mask expression (number, NULL or quoted string).
+    """
+    if not mask_expression:
+        return None
+    if mask_expression.upper() == "NULL":
+        return E.Null()
+    if mask_expression.startswith("'") and mask_expression.endswith("'"):
+        return E.Literal.string(mask_expression[1:-1])
+    return E.Literal.number(mask_expression)
+
+
+def build_mask_map(effective_entitlements: Dict[str, List[Dict[str, Any]]]) -> MaskMap:
+    """
+    (schema, table, column), lower-cased -> mask expression. "No mask" policies do not mask;
+    of several masks on one column the first one applies.
+    """
+    masks: MaskMap = {}
+    for table_key, ents in effective_entitlements.items():
+        schema, table = table_key.lower().split(".", 1)
+        for e in ents:
+            column_name = e.get("columnName")
+            if e.get("ruleType") != "MASK" or not column_name:
+                continue
+            compiled = compiled_policy(e)
+            if compiled.get("maskMode") == "none":
+                continue
+            key = (schema, table, column_name.lower())
+            if key not in masks:
+                masks[key] = mask_literal(compiled.get("maskExpression")) or mask_literal(DEFAULT_MASK_EXPRESSION)
+    return masks
+
+
+_columns_cache: Dict[str, List[str]] = {}
+_columns_version: int | None = None  # catalog version the cached columns were read under
+_columns_lock = threading.Lock()
+
+
+def catalog_version() -> int | None:
+    catalog = shared_column_catalog()
+    return catalog.version() if catalog is not None else None
+
+
+def executor_columns(table_key: str) -> List[str]:
+    """
+    Column names of "schema.table" in select-* order, read from the executor once per catalog
+    version: a catalog sync (or any other graph change) drops them, so a DDL picked up by the
+    sync is picked up here too.
+    """
+    global _columns_version
+    version = catalog_version()
+    with _columns_lock:
+        if version != _columns_version:
+            _columns_cache.clear()
+            _columns_version = version
+        cached = _columns_cache.get(table_key)
+    if cached is None:
+        cached = list(shared_executor().execute_columnar(f"SELECT * FROM {table_key} WHERE 1 = 0"))
+        with _columns_lock:
+            _columns_cache[table_key] = cached
+    return cached
+
+
+def catalog_columns(table_key: str) -> List[str] | None:
+    """
+    Column names of "schema.table" from the column catalog; None when it does not fully know the table.
+    """
+    catalog = shared_column_catalog()
+    return catalog.columns(table_key) if catalog is not None else None
+
+
+def resolve_columns(table_key: str) -> List[str]:
+    columns = catalog_columns(table_key)
+    return columns if columns is not None else executor_columns(table_key)
+
+
+# "schema.table" -> column names, used to expand stars over masked tables
+column_resolver: Callable[[str], List[str]] = resolve_columns
+
+
+def _table_masks(masks: MaskMap, ref: TableRef) -> Dict[str, E.Expression]:
+    schema, table = (ref.schema or DEFAULT_SCHEMA).lower(), ref.table.lower()
+    return {column: mask for (s, t, column), mask in masks.items() if s == schema and t == table}
+
+
+def _is_star(item: E.Expression) -> bool:
+    return isinstance(item, E.Star) or (isinstance(item, E.Column) and isinstance(item.this, E.Star))
+
+
+def _source_name(source: E.Expression) -> str | None:
+    return source.alias_or_name or None
+
+
+def _source_names(select: E.Select) -> Set[str]:
+    from_ = select.args.get("from_")
+    sources = ([from_.this] if from_ is not None else []) + [join.this for join in select.args.get("joins") or []]
+    return {name.lower() for name in map(_source_name, sources) if name}
+
+
+class _ScopeMasks:
+    """
+    Masked tables of one SELECT, by the qualifier their columns use in it.
+    """
+
+    def __init__(self, scope: E.Select, refs: List[TableRef], masks: MaskMap):
+        self.scope = scope
+        self.refs = {ref.qualifier.lower(): ref for ref in refs}
+        self.by_qualifier: Dict[str, Tuple[TableRef, Dict[str, E.Expression]]] = {}
+        for ref in refs:
+            table_masks = _table_masks(masks, ref)
+            if table_masks:
+                self.by_qualifier[ref.qualifier.lower()] = (ref, table_masks)
+
+    def mask_for(self, column: E.Column) -> E.Expression | None:
+        name = column.name.lower()
+        if column.table:
+            entry = self.by_qualifier.get(column.table.lower())
+            return entry[1].get(name) if entry else None
+        # unqualified: the column can only belong to one of the scope's tables
+        for _, table_masks in self.by_qualifier.values():
+            if name in table_masks:
+                return table_masks[name]
+        return None
+
+    def resolves_here(self, column: E.Column) -> bool:
+        """
+        Whether the column is one of this SELECT's: its own, or a qualified correlated reference
+        from a subquery that no scope in between shadows.
+        """
+        select = column.find_ancestor(E.Select)
+        if select is self.scope:
+            return True
+        if not column.table:
+            return False
+        qualifier = column.table.lower()
+        while select is not None and select is not self.scope:
+            if qualifier in _source_names(select):
+                return False
+            select = select.find_ancestor(E.Select)
+        return select is self.scope
+
+    def masked(self, column: E.Column) -> E.Expression | None:
+        if isinstance(column.this, E.Star) or not self.resolves_here(column):
+            return None
+        return self.mask_for(column)
+
+    def mask_references(self, node: E.Expression) -> None:
+        for column in list(node.find_all(E.Column)):
+            mask = self.masked(column)
+            if mask is not None:
+                column.replace(mask.copy())
+
+    def mask_clauses(self) -> None:
+        """
+        WHERE, JOIN ON, GROUP BY, HAVING, QUALIFY and ORDER BY over the masked values (after the
+        projection, whose output names ORDER BY may refer to).
+        """
+        scope = self.scope
+        for key in ("where", "having", "qualify"):
+            if scope.args.get(key) is not None:
+                self.mask_references(scope.args[key])
+        for join in scope.args.get("joins") or []:
+            if join.args.get("on") is not None:
+                self.mask_references(join.args["on"])
+
+        group = scope.args.get("group")
+        if group is not None and group.expressions:
+            keys = []
+            for key in group.expressions:
+                if isinstance(key, E.Column) and self.masked(key) is not None:
+                    continue  # a constant: one group either way
+                self.mask_references(key)
+                keys.append(key)
+            group.set("expressions", keys or [E.Null()])
+
+        order = scope.args.get("order")
+        if order is not None:
+            outputs = {item.alias_or_name.lower() for item in scope.expressions if item.alias_or_name}
+            keys = []
+            for ordered in order.expressions:
+                key = ordered.this
+                if isinstance(key, E.Column):
+                    if not key.table and key.name.lower() in outputs:
+                        keys.append(ordered)  # the output column, masked by the projection if at all
+                        continue
+                    if self.masked(key) is not None:
+                        continue  # a constant sort key; a bare integer literal would mean a position
+                self.mask_references(ordered)
+                keys.append(ordered)
+            if keys:
+                order.set("expressions", keys)
+            else:
+                scope.set("order", None)
+
+    def expand(self, qualifier: str, skip: Set[str] = frozenset()) -> List[E.Expression]:
+        ref, table_masks = self.by_qualifier[qualifier.lower()]
+        items: List[E.Expression] = []
+        for column in column_resolver(ref.table_key):
+            if column.lower() in skip:
+                continue
+            mask = table_masks.get(column.lower())
+            if mask is not None:
+                items.append(E.Alias(this=mask.copy(), alias=E.Identifier(this=column)))
+            else:
+                items.append(E.Column(this=E.Identifier(this=column), table=E.Identifier(this=ref.qualifier)))
+        return items
+
+    def joined_sources(self) -> List[Tuple[E.Expression, E.Join | None]]:
+        from_ = self.scope.args.get("from_")
+        sources = [(from_.this, None)] if from_ is not None else []
+        return sources + [(join.this, join) for join in self.scope.args.get("joins") or []]
+
+    def source_columns(self, name: str, source: E.Expression) -> List[str]:
+        ref = self.refs.get(name.lower())
+        if ref is not None:
+            return column_resolver(ref.table_key)
+        columns = source.this.named_selects if isinstance(source, E.Subquery) else []
+        if not columns or "*" in columns:
+            raise ValueError(f"cannot expand * over masked columns: unknown columns of {source.sql()}")
+        return columns
+
+    def merged_columns(
+        self, join: E.Join | None, source: E.Expression, earlier: List[Tuple[str, E.Expression]]
+    ) -> Set[str]:
+        """
+        Columns a USING / NATURAL join merges into ones an earlier source of "*" already output.
+        """
+        if join is None:
+            return set()
+        if join.args.get("using"):
+            return {column.name.lower() for column in join.args["using"]}
+        if (join.method or "").upper() == "NATURAL":
+            seen = {c.lower() for name, src in earlier for c in self.source_columns(name, src)}
+            return {c.lower() for c in self.source_columns(_source_name(source), source)} & seen
+        return set()
+
+    def mask_item(self, item: E.Expression) -> List[E.Expression]:
+        if _is_star(item):
+            if isinstance(item, E.Column) and item.table:
+                qualifier = item.table
+                return self.expand(qualifier) if qualifier.lower() in self.by_qualifier else [item]
+            # "*": every source in order, only the masked ones (and those sharing columns
+            # through USING / NATURAL, which "*" outputs once) spelled out
+            expanded: List[E.Expression] = []
+            earlier: List[Tuple[str, E.Expression]] = []
+            for source, join in self.joined_sources():
+                name = _source_name(source)
+                if not name:
+                    raise ValueError(f"cannot expand * over masked columns: unnamed source {source.sql()}")
+                merged = self.merged_columns(join, source, earlier)
+                if name.lower() in self.by_qualifier:
+                    expanded.extend(self.expand(name, skip=merged))
+                elif merged:
+                    expanded.extend(
+                        E.Column(this=E.Identifier(this=column), table=E.Identifier(this=name))
+                        for column in self.source_columns(name, source)
+                        if column.lower() not in merged
+                    )
+                else:
+                    expanded.append(E.Column(this=E.Star(), table=E.Identifier(this=name)))
+                earlier.append((name, source))
+            return expanded
+
+        inner = item.this if isinstance(item, E.Alias) else item
+        if isinstance(inner, E.Column):
+            mask = self.mask_for(inner)
+            if mask is None:
+                return [item]
+            return [E.Alias(this=mask.copy(), alias=E.Identifier(this=item.alias_or_name))]
+
+        # expressions over masked columns (SUM(e.salary), e.salary * 12, correlated subqueries)
+        self.mask_references(item)
+        return [item]
+
+
+def apply_masks(query: ParsedQuery, masks: MaskMap) -> None:
+    """
+    Mask the projection and the other clauses of every SELECT of the query that reads a masked
+    table, in place.
+    """
+    if not masks:
+        return
+    by_scope: Dict[int, Tuple[E.Select, List[TableRef]]] = {}
+    for ref in query.tables:
+        if isinstance(ref.scope, E.Select):
+            by_scope.setdefault(id(ref.scope), (ref.scope, []))[1].append(ref)
+    for scope, refs in by_scope.values():
+        scope_masks = _ScopeMasks(scope, refs, masks)
+        if not scope_masks.by_qualifier:
+            continue
+        expressions: List[E.Expression] = []
+        for item in scope.expressions:
+            expressions.extend(scope_masks.mask_item(item))
+        scope.set("expressions", expressions)
+        scope_masks.mask_clauses()
@@ -0,0 +1,175 @@
+"""
+Runners for the parse -> entitlements -> rewrite -> execute pipeline.
+
+    graph  the LangGraph StateGraph, compiled once per process and reused (compiled_app())
+    fast   the same node functions called in order on one AppState dict, with no graph
+           framework in between; while the SQL is parsed, the user's group lookup runs on a
+           worker thread (it only needs the user id) and the entitlement read that follows
+           starts from its result instead of looking the groups up again
+
+Both modes return the same AppState. run_query() picks the mode from [entitlement] PIPELINE
+(default graph, which keeps LangGraph tracing); run_query_fast() and run_query_graph() force one.
+run_query_async() is the fast path for an event loop: every stage runs off the loop and the
+execute stage on a caller-supplied, bounded pool; cancelling it (a deadline, a client that
+went away) stops the pipeline before its next stage, and the caller's StatementCanceller
+stops a statement the database is already running.
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from relational_database.executor import StatementCanceller
+from relational_database.mysql import mysql_entitlement_util as util
+from relational_database.mysql.mysql_entitlement_util import (
+    AppState,
+    entitlements_node,
+    execute_node,
+    parse_node,
+    rewrite_node,
+)
+from secret.secret_util import get_config
+
+PIPELINE_MODES = ("graph", "fast")
+
+
+def _mode_from_config() -> str:
+    mode = get_config().get("entitlement", "PIPELINE", fallback="graph").strip().lower() or "graph"
+    if mode not in PIPELINE_MODES:
+        raise ValueError(f"[entitlement] PIPELINE must be one of {PIPELINE_MODES}, got {mode!r}")
+    return mode
+
+
+# Process-wide default pipeline mode (the config file is read once, at import)
+pipeline_mode = _mode_from_config()
+
+
+# ---- graph mode ------------------------------------------------------
+def build_app():
+    """
+    The four nodes wired as a linear LangGraph StateGraph (compiled on every call).
+    """
+    from langgraph.graph import END, START, StateGraph
+
+    g = StateGraph(AppState)
+    g.add_node("parse", parse_node)
+    g.add_node("entitlements", entitlements_node)
+    g.add_node("rewrite", rewrite_node)
+    g.add_node("execute", execute_node)
+
+    g.add_edge(START, "parse")
+    g.add_edge("parse", "entitlements")
+    g.add_edge("entitlements", "rewrite")
+    g.add_edge("rewrite", "execute")
+    g.add_edge("execute", END)
+    return g.compile()
+
+
+_app = None
+_app_lock = threading.Lock()
+
+
+def compiled_app():
+    """
+    The compiled graph, built on first use and shared by every query of the process.
+    """
+    global _app
+    with _app_lock:
+        if _app is None:
+            _app = build_app()
+        return _app
+
+
+def run_query_graph(user_id: str, sql: str) -> AppState:
+    initial: AppState = {"user_id": user_id, "input_sql": sql}
+    return compiled_app().invoke(initial)
+
+
+# ---- fast mode -------------------------------------------------------
+# group lookups overlapped with parsing; they are short graph reads, a few threads suffice
+_prefetch_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="entitlement-prefetch")
+
+
+def _prefetch_memberships(repo, user_id: str) -> List[Dict[str, Any]]:
+    try:
+        return repo.fetch_user_memberships(user_id)
+    finally:
+        repo.close()
+
+
+def _start_prefetch(user_id: str):
+    repo = util._entitlement_repository()
+    # the in-memory graph has no round trip to overlap
+    if getattr(repo, "local", False):
+        repo.close()
+        return None
+    return _prefetch_pool.submit(_prefetch_memberships, repo, user_id)
+
+
+def prepare_fast(user_id: str, sql: str) -> AppState:
+    """
+    parse -> entitlements -> rewrite as direct calls, with the group lookup overlapping the parse.
+    """
+    state: AppState = {"user_id": user_id, "input_sql": sql}
+    prefetch = _start_prefetch(user_id)
+    state = parse_node(state)  # on a parse error the prefetch just finishes in the background
+    if prefetch is not None:
+        state["user_memberships"] = prefetch.result()
+    state = entitlements_node(state)
+    return rewrite_node(state)
+
+
+def run_query_fast(user_id: str, sql: str) -> AppState:
+    return execute_node(prepare_fast(user_id, sql))
+
+
+# ---- async fast mode -------------------------------------------------
+def _prefetch_groups(user_id: str) -> List[Dict[str, Any]] | None:
+    repo = util._entitlement_repository()
+    if getattr(repo, "local", False):
+        repo.close()
+        return None
+    return _prefetch_memberships(repo, user_id)
+
+
+async def prepare_async(user_id: str, sql: str) -> AppState:
+    """
+    prepare_fast for an event loop: parse and the group lookup run concurrently in threads,
+    then entitlements and rewrite. A thread already running is not interrupted by cancellation,
+    its result is dropped.
+    """
+    state: AppState = {"user_id": user_id, "input_sql": sql}
+    state, memberships = await asyncio.gather(
+        asyncio.to_thread(parse_node, state),
+        asyncio.to_thread(_prefetch_groups, user_id),
+    )
+    if memberships is not None:
+        state["user_memberships"] = memberships
+    state = await asyncio.to_thread(entitlements_node, state)
+    return await asyncio.to_thread(rewrite_node, state)
+
+
+async def run_query_async(
+    user_id: str, sql: str, execute_pool: Executor | None = None, canceller: StatementCanceller | None = None
+) -> AppState:
+    """
+    prepare_async, then execute_node on execute_pool (the loop's default executor when None).
+    Queries waiting for a pool thread that are cancelled never reach the database; one already
+    running stops only when the caller also calls canceller.cancel().
+    """
+    state = await prepare_async(user_id, sql)
+    return await asyncio.get_running_loop().run_in_executor(execute_pool, execute_node, state, canceller)
+
+
+def run_query(user_id: str, sql: str, mode: str | None = None) -> AppState:
+    """
+    Run one query through the pipeline in `mode` ("graph" or "fast"; default [entitlement] PIPELINE).
+    """
+    mode = mode or pipeline_mode
+    if mode == "fast":
+        return run_query_fast(user_id, sql)
+    if mode == "graph":
+        return run_query_graph(user_id, sql)
+    raise ValueError(f"unknown pipeline mode {mode!r}, expected one of {PIPELINE_MODES}")
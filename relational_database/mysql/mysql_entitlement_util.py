@@ -1,14 +1,42 @@
 import json
+import logging
 import os
 
 from graph_database.entitlement_util import EntitlementRepository
+from graph_database.in_memory_repository import shared_in_memory_repository
+from graph_database.neo4j_driver_registry import neo4j_driver_registry
+from graph_database.policy_compiler import compiled_policy
 import sqlglot
-from sqlglot import parse_one
 from sqlglot import exp as E
 from typing import Any, Dict, List, Tuple, TypedDict
 import re
-from relational_database.mysql.mysql_connection import mysql_connection
+from relational_database.jdbc_pool import jdbc_pool
+from relational_database.mask_engine import apply_masks, build_mask_map, catalog_version
+from relational_database.parsed_query import ParsedQuery, TableRef, parse_query
+from relational_database.arrow_result import record_batch_reader
+from relational_database.executor import StatementCanceller, shared_executor
+from relational_database.result_stream import EmptyResult, StreamingResult
+from relational_database.rewrite_decision import ALLOW, DENY, REWRITE, RewriteDecision, decision_stats, projected_columns
+from relational_database.rewrite_cache import entitlement_fingerprint, rewrite_cache
+from relational_database.value_sets import value_set_store
+from secret.secret_util import get_config
 
+logger = logging.getLogger(__name__)
+
+# where row filters go: "scoped" = the JOIN ... ON / CTE body / subquery WHERE that introduces
+# the table, "outer" = the WHERE of the outermost SELECT, or of each set-operation branch, that
+# reads the table (the original behavior; tables only read by subqueries are filtered there)
+ROW_FILTER_PLACEMENTS = ("scoped", "outer")
+
+
+def _placement_from_config() -> str:
+    placement = get_config().get("entitlement", "ROW_FILTER_PLACEMENT", fallback="scoped").strip().lower()
+    if placement not in ROW_FILTER_PLACEMENTS:
+        raise ValueError(f"[entitlement] ROW_FILTER_PLACEMENT must be scoped or outer: {placement!r}")
+    return placement
+
+
+row_filter_placement = _placement_from_config()
 
 
 def get_sql(text: str) -> str:
@@ -17,7 +45,8 @@ def get_sql(text: str) -> str:
     If wrapped in ```sql ... ```, extract the SQL inside.
     Otherwise, return an empty string.
     """
-    sql_keywords = ("SELECT", "INSERT", "UPDATE", "DELETE", "CREATE", "DROP", "ALTER")
+    # WITH: CTE queries; "(": a parenthesized SELECT or UNION branch
+    sql_keywords = ("SELECT", "WITH", "(", "INSERT", "UPDATE", "DELETE", "CREATE", "DROP", "ALTER")
     stripped = text.strip()
     if any(stripped.upper().startswith(k) for k in sql_keywords):
         return stripped
@@ -25,13 +54,6 @@ def get_sql(text: str) -> str:
     return match.group(1).strip() if match else ""
 
 
-def _extract_except_group(policy_definition: str) -> str | None:
-    if not policy_definition:
-        return None
-    match = re.search(r"except\s+members\s+of\s+(.+?)(?:[.;]|$)", policy_definition, re.IGNORECASE)
-    return match.group(1).strip() if match else None
-
-
 def _effective_entitlements_for_user(
     entitlements_by_table: Dict[str, List[Dict[str, Any]]], user_groups: List[str]
 ) -> Dict[str, List[Dict[str, Any]]]:
@@ -40,14 +62,15 @@ def _effective_entitlements_for_user(
     for table_key, entitlements in entitlements_by_table.items():
         next_entitlements = []
         for entitlement in entitlements:
-            exception_group = _extract_except_group(entitlement.get("policyDefinition", ""))
-            if exception_group and exception_group.lower() in group_names:
+            except_groups = compiled_policy(entitlement).get("exceptGroups") or []
+            if any(g.strip().lower() in group_names for g in except_groups):
                 continue
             next_entitlements.append(entitlement)
         filtered[table_key] = next_entitlements
     return filtered
 
-def llm_rewrite_all(original_sql, parsed_tables, entitlements_by_table, user_groups=None, row_governed_tables=None):
+def llm_rewrite_all(original_sql, parsed_tables, entitlements_by_table, user_groups=None, row_governed_tables=None,
+                    parsed_query=None, dialect="mysql"):
     REWRITER_SYSTEM_PROMPT = """You are a precise SQL rewriter that applies entitlement rules for ALL tables in the query.
     Input contains: original SQL, parsed tables (with aliases), and entitlements_by_table keyed by "schema.table".
     Rules:
@@ -72,6 +95,8 @@ def llm_rewrite_all(original_sql, parsed_tables, entitlements_by_table, user_gro
             effective_entitlements,
             user_groups or [],
             row_governed_tables or [],
+            parsed_query,
+            dialect,
         )
 
     llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
@@ -88,85 +113,71 @@ def llm_rewrite_all(original_sql, parsed_tables, entitlements_by_table, user_gro
             HumanMessage(content=json.dumps(payload, ensure_ascii=True)),
         ]
     )
-    return msg.content.strip()
+    rewritten = msg.content.strip()
+    if dialect != "mysql":
+        rewritten = sqlglot.transpile(get_sql(rewritten) or rewritten, read="mysql", write=dialect)[0]
+    return rewritten
 
 def fetch_all_entitlements_for_tables(user_id: str, parsed_tables: List[Dict[str, str]]) -> Dict[str, List[Dict[str, Any]]]:
-    repo = EntitlementRepository()
-    out: Dict[str, List[Dict[str, Any]]] = {}
+    repo = _entitlement_repository()
     try:
-        for t in parsed_tables:
-            schema = t["schema"] or "bank"
-            table = t["table"]
-            key = f"{schema}.{table}"              # <-- string key
-            if key not in out:
-                out[key] = repo.fetch_entitlements(user_id, schema, table)
+        # one UNWIND round trip for all tables, keyed by "schema.table"
+        return repo.fetch_entitlements_for_tables(user_id, parsed_tables)
     finally:
         repo.close()
-    return out
 
 def rule_based_rewrite_all(original_sql: str,
                            parsed_tables: List[Dict[str, str]],
                            entitlements_by_table: Dict[str, List[Dict[str, Any]]],
                            user_groups: List[str] | None = None,
-                           row_governed_tables: List[str] | None = None) -> str:
-    expr = parse_one(original_sql, read="mysql")
+                           row_governed_tables: List[str] | None = None,
+                           parsed_query: ParsedQuery | None = None,
+                           dialect: str = "mysql",
+                           placement: str | None = None) -> str:
+    """
+    parsed_query, when given, is the AST parse_node built for original_sql; it is rewritten
+    in place instead of parsing the SQL again. The input is MySQL; the result is generated
+    in `dialect` (the executor's). placement ("scoped"/"outer") defaults to
+    [entitlement] ROW_FILTER_PLACEMENT.
+    """
+    placement = placement or row_filter_placement
     effective_entitlements = _effective_entitlements_for_user(entitlements_by_table, user_groups or [])
-    governed_tables = set(row_governed_tables or [])
-
-    # build alias map: (schema, table) -> alias (internal tuples ok, not stored in state)
-    alias_map = {}
-    for t in expr.find_all(sqlglot.exp.Table):
-        schema = str(t.db) if t.db else None
-        table  = str(t.this) if t.this else None
-        alias_exp = t.args.get("alias")
-        alias = str(alias_exp.this) if (alias_exp and alias_exp.this) else None
-        if table:
-            alias_map[(schema, table)] = alias
+    governed_tables = sorted(set(row_governed_tables or []))
 
-    # ROW filters
-    row_values: Dict[Tuple[str | None, str, str], List[str]] = {}
-    for key, ents in effective_entitlements.items():
-        # key format "schema.table"
-        schema, table = key.split(".", 1)
-        schema = schema or None
-        for e in ents:
-            column_name = e.get("columnName")
-            if e.get("ruleType") == "ROW" and column_name:
-                definition = (e.get("policyDefinition") or e.get("definition") or "").strip()
-                if column_name in definition and "=" in definition:
-                    rhs = definition.split("=", 1)[1].strip().strip(";")
-                    value = rhs.strip("'").strip('"')
-                    if value:
-                        bucket_key = (schema, table, column_name)
-                        row_values.setdefault(bucket_key, [])
-                        if value not in row_values[bucket_key]:
-                            row_values[bucket_key].append(value)
-
-    row_preds = []
-    for (schema, table, column_name), values in row_values.items():
-        alias = alias_map.get((schema, table))
-        col = E.Column(this=E.Identifier(this=column_name))
-        if alias:
-            col = E.Column(this=E.Identifier(this=column_name), table=E.Identifier(this=alias))
-        if len(values) == 1:
-            pred = E.EQ(this=col, expression=E.Literal.string(values[0]))
+    def _rewrite(sql: str) -> str:
+        nonlocal parsed_query
+        if parsed_query is not None and sql == parsed_query.sql:
+            # the shared AST is mutated, so it serves at most one rewrite
+            query, parsed_query = parsed_query, None
         else:
-            pred = E.In(
-                this=col,
-                expressions=[E.Literal.string(value) for value in values],
-            )
-        row_preds.append(pred)
-
-    if row_preds:
-        combined = row_preds[0]
-        for p in row_preds[1:]:
-            combined = E.And(this=combined, expression=p)
-        where = expr.args.get("where")
-        if where and where.this:
-            where.this = E.And(this=where.this, expression=combined)
-        else:
-            expr.set("where", E.Where(this=combined))
+            query = parse_query(sql, "mysql")
+        return _rule_based_rewrite(query, parsed_tables, effective_entitlements, governed_tables, dialect, placement)
+
+    if rewrite_cache is None:
+        return _rewrite(original_sql)
+    # same query shape + same effective entitlements + same columns -> reuse the rewritten template
+    entitlement_key = entitlement_fingerprint(
+        effective_entitlements, governed_tables, dialect, placement, value_set_store.threshold, value_set_store.table,
+        _columns_version(effective_entitlements),
+    )
+    return rewrite_cache.rewrite(original_sql, "mysql", entitlement_key, _rewrite)
 
+def _columns_version(effective_entitlements: Dict[str, List[Dict[str, Any]]]) -> int | None:
+    """
+    Column catalog version a masked rewrite depends on (a "*" over a masked table is spelled
+    out column by column); None when no MASK rule applies and the columns do not matter.
+    """
+    if any(e.get("ruleType") == "MASK" for ents in effective_entitlements.values() for e in ents):
+        return catalog_version()
+    return None
+
+def _denied_tables(parsed_tables: List[Dict[str, str]],
+                   effective_entitlements: Dict[str, List[Dict[str, Any]]],
+                   row_governed_tables) -> List[str]:
+    """
+    Row-governed tables of the query that have no effective ROW rule for the user.
+    """
+    governed_tables = set(row_governed_tables)
     denied_tables = []
     for parsed in parsed_tables:
         schema = parsed.get("schema") or "bank"
@@ -174,7 +185,7 @@ def rule_based_rewrite_all(original_sql: str,
         if not table:
             continue
         table_key = f"{schema}.{table}"
-        if table_key not in governed_tables:
+        if table_key not in governed_tables or table_key in denied_tables:
             continue
         effective_rows = [
             entitlement
@@ -183,111 +194,158 @@ def rule_based_rewrite_all(original_sql: str,
         ]
         if not effective_rows:
             denied_tables.append(table_key)
+    return denied_tables
 
-    if denied_tables:
-        deny_pred = E.EQ(this=E.Literal.number("1"), expression=E.Literal.number("0"))
-        where = expr.args.get("where")
-        if where and where.this:
-            where.this = E.And(this=where.this, expression=deny_pred)
-        else:
-            expr.set("where", E.Where(this=deny_pred))
+def _rules_in_force(effective_entitlements: Dict[str, List[Dict[str, Any]]]) -> bool:
+    for ents in effective_entitlements.values():
+        for e in ents:
+            compiled = compiled_policy(e)
+            if e.get("ruleType") == "ROW" and compiled.get("values"):
+                return True
+            if e.get("ruleType") == "MASK" and compiled.get("maskMode") != "none":
+                return True
+    return False
+
+def rewrite_decision(state: "AppState", columns: List[str] | None = None) -> RewriteDecision:
+    """
+    allow / rewrite / deny for a state that went through rewrite_node's rewrite, with the
+    projected columns of the input query (taken before its AST was rewritten in place).
+    """
+    effective_entitlements = _effective_entitlements_for_user(
+        state.get("entitlements_by_table", {}), state.get("user_groups", [])
+    )
+    denied = _denied_tables(state.get("parsed_tables", []), effective_entitlements, state.get("row_governed_tables", []))
+    if denied:
+        action = DENY
+    elif _rules_in_force(effective_entitlements):
+        action = REWRITE
+    else:
+        action = ALLOW
+    return RewriteDecision(action=action, sql=state["rewritten_sql"], columns=columns, denied_tables=denied)
 
-    # MASK salary
-    mask_needed = False
-    emp_alias = None
+def _rule_based_rewrite(query: ParsedQuery,
+                        parsed_tables: List[Dict[str, str]],
+                        effective_entitlements: Dict[str, List[Dict[str, Any]]],
+                        row_governed_tables: List[str],
+                        dialect: str = "mysql",
+                        placement: str = "scoped") -> str:
+    expr = query.ast
+    governed_tables = set(row_governed_tables)
+
+    # ROW filters
+    row_values: Dict[Tuple[str, str], List[str]] = {}
     for key, ents in effective_entitlements.items():
-        _, table = key.split(".", 1)
-        if table == "employee" and any(e.get("ruleType") == "MASK" and e.get("columnName") == "salary" for e in ents):
-            mask_needed = True
-            # find alias for employee
-            for (sch, tbl), a in alias_map.items():
-                if tbl == "employee":
-                    emp_alias = a
-                    break
-            break
-
-    if mask_needed:
-        new_exprs = []
-        for item in expr.expressions:
-            inner = item.this if isinstance(item, E.Alias) else item
-            is_salary = isinstance(inner, E.Column) and str(inner.this).lower() == "salary"
-            if is_salary:
-                tname = str(inner.table) if inner.table else None
-                if emp_alias is None or tname is None or tname == emp_alias:
-                    masked = E.Alias(this=E.Literal.number("0.00"), alias=E.Identifier(this="salary"))
-                    new_exprs.append(masked)
+        # key format "schema.table"
+        for e in ents:
+            column_name = e.get("columnName")
+            if e.get("ruleType") == "ROW" and column_name:
+                compiled = compiled_policy(e)
+                if (compiled.get("column") or "").lower() != column_name.lower():
                     continue
-            new_exprs.append(item)
-        expr.set("expressions", new_exprs)
+                bucket = row_values.setdefault((key, column_name), [])
+                for value in compiled.get("values") or []:
+                    if value and value not in bucket:
+                        bucket.append(value)
 
-    return expr.sql(dialect="mysql")
+    filters_by_table: Dict[str, List[Tuple[str, List[str]]]] = {}
+    for (key, column_name), values in row_values.items():
+        if values:
+            filters_by_table.setdefault(key, []).append((column_name, values))
+    # outer: the WHERE of each result SELECT (every branch of a set operation) that reads the table
+    outer_scopes = {id(branch) for branch in _result_branches(expr)} if placement == "outer" else set()
+    for key, filters in filters_by_table.items():
+        # every reference gets its own filter, in the scope that introduces it
+        for ref in query.refs_for(key):
+            qualifier = _scoped_qualifier(ref)
+            pred = _conjoin([_row_predicate(qualifier, column, values) for column, values in filters])
+            if id(ref.scope) in outer_scopes:
+                _and_where(ref.scope, pred)
+            else:
+                # scoped, and in outer mode the tables of subqueries the outer WHERE cannot see
+                _place_row_filter(query, ref, pred)
+
+    if _denied_tables(parsed_tables, effective_entitlements, governed_tables):
+        # every branch of a set operation, so no branch can return rows on its own
+        branches = _result_branches(expr) or [expr]
+        for branch in branches:
+            _and_where(branch, E.EQ(this=E.Literal.number("1"), expression=E.Literal.number("0")))
+
+    # MASK: every masked column of every table, one pass over each SELECT that reads one
+    apply_masks(query, build_mask_map(effective_entitlements))
+
+    return query.sql_out(dialect)
 
 class AppState(TypedDict, total=False):
     user_id: str
     input_sql: str
+    parsed_query: ParsedQuery  # AST + table/alias index, parsed once and rewritten in place
     parsed_tables: List[Dict[str, str]]
+    user_memberships: List[Dict[str, Any]]  # the user's groups when prefetched (fast path)
     entitlements_by_table: Dict[str, List[Dict[str, Any]]]  # <-- string keys
     user_groups: List[str]
     row_governed_tables: List[str]
+    dialect: str  # SQL dialect of the executor; the rewriter emits this
     rewritten_sql: str
+    decision: RewriteDecision  # allow / rewrite / deny + projected columns
     rows: List[Dict[str, Any]]
+    columns: List[str] | None
     messages: List[str]
 # ---- MySQL executor --------------------------------------------------
 def run_mysql_query(sql: str) -> List[Dict[str, Any]]:
-    print(sql)
-    mysql_conn = mysql_connection()
-    cur = mysql_conn.cursor()
-    try:
-        cur.execute(sql)
-        rows = cur.fetchall()
-        return rows
-    finally:
-        cur.close()
+    logger.debug("Running on mysql: %s", sql)
+    # pooled, already-open connection (JVM started once) instead of a jaydebeapi.connect per query
+    with jdbc_pool("mysql").connection() as mysql_conn:
+        cur = mysql_conn.cursor()
+        try:
+            cur.execute(sql)
+            rows = cur.fetchall()
+            return rows
+        finally:
+            cur.close()
 def parse_tables(sql: str) -> List[Dict[str, str]]:
     """
     Extract (schema, table, alias) for all table refs in the query.
     """
-    try:
-        expr = parse_one(sql, read="mysql")
-    except Exception:
-        expr = parse_one(sql)
-    out: List[Dict[str, str]] = []
-    for t in expr.find_all(sqlglot.exp.Table):
-        table = str(t.this) if t.this else None
-        schema = str(t.db) if t.db else None
-        alias_exp: E.Alias = t.args.get("alias")
-        alias = str(alias_exp.this) if (alias_exp and alias_exp.this) else None
-        if table:
-            out.append({"schema": schema, "table": table, "alias": alias})
-    # dedupe by (schema, table, alias)
-    seen = set()
-    deduped = []
-    for x in out:
-        key = (x["schema"], x["table"], x["alias"])
-        if key not in seen:
-            deduped.append(x); seen.add(key)
-    return deduped
+    return parse_query(sql, "mysql").parsed_tables()
 # ---- Helpers ---------------------------------------------------------
 def _append_msg(state: AppState, msg: str) -> None:
     state.setdefault("messages", []).append(msg)
 
 
+def _executable_sql(state: AppState) -> str:
+    sql = get_sql(state["rewritten_sql"])
+    if not sql:
+        raise ValueError(f"Rewrite did not produce a SQL statement: {state['rewritten_sql']!r}")
+    return sql
+
+
+_pipeline_holds_driver = False
+
+
+def _hold_neo4j_driver() -> None:
+    """
+    The pipeline keeps one registry reference for the life of the process, so the
+    per-query EntitlementRepository instances reuse the pooled driver instead of reopening it.
+    """
+    global _pipeline_holds_driver
+    if not _pipeline_holds_driver:
+        neo4j_driver_registry.acquire()
+        _pipeline_holds_driver = True
+
 
-# ---- AST helpers for alias mapping and rewriting --------------------
-def _build_alias_map(expr: E.Expression) -> Dict[Tuple[str|None, str], str|None]:
+def _entitlement_repository():
     """
-    Map (schema, table) -> alias (or None if no alias).
+    Repository the pipeline reads entitlements from: Neo4j by default, or the process-wide
+    in-memory graph when [entitlement] BACKEND = memory (no graph round trips per query).
     """
-    amap: Dict[Tuple[str|None, str], str|None] = {}
-    for t in expr.find_all(E.Table):
-        schema = str(t.db) if t.db else None
-        table = str(t.this) if t.this else None
-        alias_exp: E.Alias = t.args.get("alias")
-        alias = str(alias_exp.this) if (alias_exp and alias_exp.this) else None
-        if table:
-            amap[(schema, table)] = alias
-    return amap
+    if get_config().get("entitlement", "BACKEND", fallback="neo4j").strip().lower() == "memory":
+        return shared_in_memory_repository()
+    _hold_neo4j_driver()
+    return EntitlementRepository()
 
+
+
+# ---- AST helpers for rewriting --------------------------------------
 def _and_where(expr: E.Expression, pred: E.Expression) -> None:
     """
     AND-conjoin a predicate into the query's WHERE clause.
@@ -295,26 +353,122 @@ def _and_where(expr: E.Expression, pred: E.Expression) -> None:
     """
     where = expr.args.get("where")
     if where and where.this:
-        where.this = E.And(this=where.this, expression=pred)
+        where.set("this", E.And(this=where.this, expression=pred))
     else:
         expr.set("where", E.Where(this=pred))
+
+
+def _result_branches(expr: E.Expression) -> List[E.Select]:
+    """
+    The SELECTs whose rows make up the result: the query itself, or every branch of a
+    (possibly parenthesized, nested) UNION / INTERSECT / EXCEPT.
+    """
+    if isinstance(expr, E.SetOperation):
+        return _result_branches(expr.this) + _result_branches(expr.expression)
+    if isinstance(expr, E.Subquery):
+        return _result_branches(expr.this)
+    return [expr] if isinstance(expr, E.Select) else []
+
+
+def _and_on(join: E.Join, pred: E.Expression) -> None:
+    on = join.args.get("on")
+    join.set("on", E.And(this=on, expression=pred) if on is not None else pred)
+
+
+def _conjoin(preds: List[E.Expression]) -> E.Expression:
+    combined = preds[0]
+    for p in preds[1:]:
+        combined = E.And(this=combined, expression=p)
+    return combined
+
+
+def _row_predicate(qualifier: str | None, column_name: str, values: List[str]) -> E.Expression:
+    col = E.Column(this=E.Identifier(this=column_name))
+    if qualifier:
+        col = E.Column(this=E.Identifier(this=column_name), table=E.Identifier(this=qualifier))
+    if len(values) == 1:
+        return E.EQ(this=col, expression=E.Literal.string(values[0]))
+    if value_set_store.applies(values):
+        # large sets: semi-join against the entitlement value table instead of a literal list
+        return value_set_store.predicate(col, values)
+    return E.In(this=col, expressions=[E.Literal.string(value) for value in values])
+
+
+def _scoped_qualifier(ref: TableRef) -> str | None:
+    # unaliased tables are qualified by name only where another table shares the scope
+    if ref.alias:
+        return ref.alias
+    return ref.table if isinstance(ref.scope, E.Select) and ref.scope.args.get("joins") else None
+
+
+def _place_row_filter(query: ParsedQuery, ref: TableRef, pred: E.Expression) -> None:
+    """
+    AND a table's row filter in at the innermost scope that introduces the table, so the
+    database can apply it before joining/aggregating:
+
+    - the table's own INNER/LEFT JOIN ... ON (for a LEFT JOIN this is what filtering the
+      table itself means: unmatched outer rows are kept, hidden rows are not joined);
+    - otherwise the WHERE of the SELECT it is in (the CTE body, derived table or subquery);
+    - a table a RIGHT/FULL JOIN can null-extend becomes a filtered derived table instead,
+      since neither ON nor WHERE filters just that table there.
+    """
+    node, scope = ref.node, ref.scope
+    if not isinstance(scope, E.Select):
+        _and_where(query.ast, pred)
+        return
+    joins = scope.args.get("joins") or []
+    null_extended = any(j.side in ("RIGHT", "FULL") for j in joins)
+    parent = node.parent
+    if isinstance(parent, E.Join) and parent.this is node:
+        if parent.side in ("", "LEFT") and parent.args.get("on") is not None:
+            _and_on(parent, pred)
+            return
+        if not parent.side and not null_extended:
+            _and_where(scope, pred)
+            return
+    elif isinstance(parent, E.From) and not null_extended:
+        _and_where(scope, pred)
+        return
+    _filtered_derived_table(ref, pred)
+
+
+def _filtered_derived_table(ref: TableRef, pred: E.Expression) -> None:
+    """
+    Replace the table reference with (SELECT * FROM table WHERE pred) under the same alias
+    (the table name when unaliased), so the outer columns resolve as before.
+    """
+    table = ref.node.copy()
+    table.set("alias", None)
+    # inside the derived table the columns belong to its only table
+    for col in pred.find_all(E.Column):
+        col.set("table", None)
+    inner = E.select("*").from_(table).where(pred)
+    ref.node.replace(E.Subquery(this=inner, alias=E.TableAlias(this=E.Identifier(this=ref.qualifier))))
+
+
 # ---- Nodes -----------------------------------------------------------
 def parse_node(state: AppState) -> AppState:
     _append_msg(state, "Parsing SQL for table references (multi-table, alias-aware).")
-    parsed = parse_tables(state["input_sql"])
+    parsed_query = parse_query(state["input_sql"], "mysql")
+    parsed = parsed_query.parsed_tables()
+    state["parsed_query"] = parsed_query
     state["parsed_tables"] = parsed
     _append_msg(state, f"Tables found: {parsed}")
     return state
 
 def entitlements_node(state: AppState) -> AppState:
     _append_msg(state, "Fetching entitlements for all tables.")
-    repo = EntitlementRepository()
+    repo = _entitlement_repository()
     try:
-        ent_by_tbl = fetch_all_entitlements_for_tables(state["user_id"], state["parsed_tables"])
-        user_groups = repo.fetch_user_group_names(state["user_id"])
-        row_governed_tables = repo.fetch_row_governed_tables(state["parsed_tables"])
+        # groups, per-table ROW/MASK entitlements and row-governed tables in one read transaction
+        context = repo.fetch_entitlement_context(
+            state["user_id"], state["parsed_tables"], memberships=state.get("user_memberships")
+        )
     finally:
         repo.close()
+    ent_by_tbl = context.entitlements_by_table
+    user_groups = context.user_groups
+    row_governed_tables = context.row_governed_tables
     state["entitlements_by_table"] = ent_by_tbl
     state["user_groups"] = user_groups
     state["row_governed_tables"] = row_governed_tables
@@ -327,20 +481,91 @@ def entitlements_node(state: AppState) -> AppState:
 
 def rewrite_node(state: AppState) -> AppState:
     _append_msg(state, "Rewriting SQL using entitlements across all tables.")
+    parsed_query = state.get("parsed_query")
+    # the rewriter may mutate the AST, the output columns do not change
+    columns = projected_columns(parsed_query.ast) if parsed_query is not None else None
     rewritten = llm_rewrite_all(
         state["input_sql"],
         state.get("parsed_tables", []),
         state.get("entitlements_by_table", {}),
         state.get("user_groups", []),
         state.get("row_governed_tables", []),
+        state.get("parsed_query"),
+        state.setdefault("dialect", shared_executor().dialect),
     )
     state["rewritten_sql"] = rewritten
+    decision = state["decision"] = rewrite_decision(state, columns)
+    decision_stats.record(decision)
+    if decision.action == DENY:
+        _append_msg(state, f"Denied: no effective row rule on {', '.join(decision.denied_tables)}.")
     return state
 
-def execute_node(state: AppState) -> AppState:
-    _append_msg(state, "Executing rewritten SQL in MySQL.")
-    rewritten_sql = get_sql(state["rewritten_sql"])
-    rows = run_mysql_query(rewritten_sql)
+def execute_node(state: AppState, canceller: StatementCanceller | None = None) -> AppState:
+    """
+    Run the rewritten SQL on the shared executor; canceller lets another thread stop it.
+    """
+    executor = shared_executor()
+    decision = state.get("decision")
+    if decision is not None:
+        decision_stats.record_execution(decision)
+        state["columns"] = decision.columns
+        if decision.short_circuits:
+            state["rows"] = []
+            _append_msg(state, f"Returned an empty result for the denied query without querying {executor.name}.")
+            return state
+    _append_msg(state, f"Executing rewritten SQL on {executor.name}.")
+    rewritten_sql = _executable_sql(state)
+    value_set_store.provision(rewritten_sql)  # large row-filter value sets, stored on first use
+    rows = executor.execute(rewritten_sql, canceller)
     state["rows"] = rows
     _append_msg(state, f"Returned {len(rows)} rows.")
     return state
+
+
+def execute_stream_node(state: AppState, fetch_size: int | None = None) -> StreamingResult | EmptyResult:
+    """
+    Streaming counterpart of execute_node: runs the rewritten SQL and returns a StreamingResult
+    whose batches() generator yields rows fetchmany-sized, instead of storing them in state.
+    A denied query with known columns gets an EmptyResult without a database round trip.
+    """
+    executor = shared_executor()
+    rewritten_sql = _executable_sql(state)
+    decision = state.get("decision")
+    if decision is not None:
+        decision_stats.record_execution(decision)
+        if decision.short_circuits:
+            _append_msg(state, f"Streaming an empty result for the denied query without querying {executor.name}.")
+            return EmptyResult(rewritten_sql, decision.columns, fetch_size)
+    value_set_store.provision(rewritten_sql)
+    result = executor.stream(rewritten_sql, fetch_size=fetch_size)
+    _append_msg(state, f"Streaming rewritten SQL from {executor.name} in batches of {result.fetch_size}.")
+    return result
+
+
+def run_query_stream(user_id: str, sql: str, fetch_size: int | None = None) -> Tuple[AppState, StreamingResult | EmptyResult]:
+    """
+    parse -> entitlements -> rewrite, then execute_stream_node. Rows are never collected in
+    AppState, so memory stays bounded by one batch.
+    """
+    state: AppState = {"user_id": user_id, "input_sql": sql}
+    for node in (parse_node, entitlements_node, rewrite_node):
+        state = node(state)
+    return state, execute_stream_node(state, fetch_size)
+
+
+def execute_arrow_node(state: AppState, fetch_size: int | None = None):
+    """
+    Arrow counterpart of execute_stream_node: a pyarrow.RecordBatchReader over the rewritten
+    SQL's result, one record batch per fetch batch (requires pyarrow).
+    """
+    return record_batch_reader(execute_stream_node(state, fetch_size))
+
+
+def run_query_arrow(user_id: str, sql: str, fetch_size: int | None = None):
+    """
+    parse -> entitlements -> rewrite, then execute_arrow_node. Returns (state, RecordBatchReader).
+    """
+    state: AppState = {"user_id": user_id, "input_sql": sql}
+    for node in (parse_node, entitlements_node, rewrite_node):
+        state = node(state)
+    return state, execute_arrow_node(state, fetch_size)
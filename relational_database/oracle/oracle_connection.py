@@ -1,4 +1,6 @@
 from secret.secret_util import get_config
+from relational_database.columnar_fetch import fetch_all_columnar
+from relational_database.jdbc_pool import jdbc_pool
 import jaydebeapi
 from typing import Any, Dict, List, Literal, Optional
 
@@ -26,12 +28,33 @@ def oracle_connection():
         return [{"error": str(e)}]
 
 def oracle_query(sql: str, conn) -> List[Dict[str, Any]]:
+    """
+    Rows as dicts. Errors are raised, not returned, so a pooled connection that failed is
+    validated (and dropped if broken) instead of going back to the pool as is.
+    """
+    curs = conn.cursor()
     try:
-        curs = conn.cursor()
         curs.execute(sql)
-        cols = [d[0] for d in curs.description]
-        rows = [dict(zip(cols, r)) for r in curs.fetchall()]
+        return fetch_all_columnar(curs).records()
+    finally:
         curs.close()
-        return rows
-    except Exception as e:
-        return [{"error": str(e)}]
\ No newline at end of file
+
+
+def oracle_query_columnar(sql: str, conn) -> Dict[str, List[Any]]:
+    """
+    Result as {column: [values]}; no per-row objects are built.
+    """
+    curs = conn.cursor()
+    try:
+        curs.execute(sql)
+        return fetch_all_columnar(curs).to_dict()
+    finally:
+        curs.close()
+
+
+def run_oracle_query(sql: str) -> List[Dict[str, Any]]:
+    """
+    oracle_query on a connection borrowed from the process-wide Oracle pool.
+    """
+    with jdbc_pool("oracle").connection() as conn:
+        return oracle_query(sql, conn)
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+from sqlglot import exp as E
+from sqlglot import parse_one
+
+DEFAULT_SCHEMA = "bank"
+
+
+@dataclass
+class TableRef:
+    """
+    One physical table reference in the statement and the SELECT scope it belongs to.
+    """
+    schema: str | None
+    table: str
+    alias: str | None
+    node: E.Table = field(repr=False, compare=False)
+    scope: E.Expression | None = field(repr=False, compare=False)  # enclosing SELECT
+    depth: int = 0  # 0 = outermost SELECT, +1 per enclosing subquery/CTE
+
+    @property
+    def table_key(self) -> str:
+        return f"{self.schema or DEFAULT_SCHEMA}.{self.table}"
+
+    @property
+    def qualifier(self) -> str:
+        """Name columns of this table are qualified with in its scope."""
+        return self.alias or self.table
+
+
+@dataclass
+class ParsedQuery:
+    """
+    A statement parsed once, with its table/alias index. The pipeline carries it from
+    parse_node to the rewriter, which mutates `ast` in place.
+    """
+    sql: str
+    dialect: str
+    ast: E.Expression = field(repr=False)
+    tables: List[TableRef] = field(default_factory=list)
+
+    def parsed_tables(self) -> List[Dict[str, str]]:
+        """
+        [{"schema", "table", "alias"}] deduplicated by (schema, table, alias), in query order.
+        """
+        out: List[Dict[str, str]] = []
+        seen = set()
+        for ref in self.tables:
+            key = (ref.schema, ref.table, ref.alias)
+            if key not in seen:
+                seen.add(key)
+                out.append({"schema": ref.schema, "table": ref.table, "alias": ref.alias})
+        return out
+
+    def refs_for(self, table_key: str) -> List[TableRef]:
+        return [ref for ref in self.tables if ref.table_key == table_key]
+
+    def alias_for(self, table_key: str) -> str | None:
+        """
+        Alias of the outermost reference to "schema.table" (None when unaliased or absent).
+        """
+        refs = sorted(self.refs_for(table_key), key=lambda ref: ref.depth)
+        return refs[0].alias if refs else None
+
+    def alias_map(self) -> Dict[Tuple[str | None, str], str | None]:
+        return {(ref.schema, ref.table): ref.alias for ref in self.tables}
+
+    def sql_out(self, dialect: str | None = None) -> str:
+        """SQL text of the (possibly rewritten) AST, in `dialect` (default: the one it was parsed with)."""
+        return self.ast.sql(dialect=dialect or self.dialect)
+
+
+def _cte_names(ast: E.Expression) -> set:
+    return {cte.alias_or_name for cte in ast.find_all(E.CTE) if cte.alias_or_name}
+
+
+def _scope_of(node: E.Expression) -> Tuple[E.Expression | None, int]:
+    scope = node.find_ancestor(E.Select, E.Union)
+    depth = 0
+    parent = scope.parent if scope is not None else None
+    while parent is not None:
+        if isinstance(parent, (E.Select, E.Union)):
+            depth += 1
+        parent = parent.parent
+    return scope, depth
+
+
+def parse_query(sql: str, dialect: str = "mysql") -> ParsedQuery:
+    """
+    Parse SQL once (falling back to sqlglot's default dialect) and index every physical table
+    reference; references to CTEs defined in the statement are not tables and are skipped.
+    """
+    try:
+        ast = parse_one(sql, read=dialect)
+    except Exception:
+        ast = parse_one(sql)
+    ctes = _cte_names(ast)
+    parsed = ParsedQuery(sql=sql, dialect=dialect, ast=ast)
+    for t in ast.find_all(E.Table):
+        table = str(t.this) if t.this else None
+        schema = str(t.db) if t.db else None
+        if not table or (schema is None and table in ctes):
+            continue
+        alias_exp = t.args.get("alias")
+        alias = str(alias_exp.this) if (alias_exp and alias_exp.this) else None
+        scope, depth = _scope_of(t)
+        parsed.tables.append(TableRef(schema=schema, table=table, alias=alias, node=t, scope=scope, depth=depth))
+    return parsed
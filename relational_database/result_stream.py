@@ -0,0 +1,195 @@
+"""
+Streaming query execution: row batches straight from the JDBC cursor, encoded as NDJSON or CSV.
+
+fetchall() materializes the whole entitled result before the first byte goes out. Here the
+cursor is drained fetch_size rows at a time (columnar_fetch) and every stage is a generator,
+so at most one batch (plus the encoder's buffer for it) is held in memory whatever the
+result size.
+
+    result = stream_query(sql, "mysql", fetch_size=500)
+    for chunk in ndjson_chunks(result.columns, result.batches()):
+        ...
+"""
+from __future__ import annotations
+
+import csv
+import datetime as dt
+import decimal
+import io
+import json
+from typing import Any, Callable, Iterable, Iterator, List, Sequence
+
+from relational_database.columnar_fetch import ColumnBatch, column_types, fetch_columnar
+from relational_database.jdbc_pool import jdbc_pool
+from secret.secret_util import get_config
+
+FORMATS = ("ndjson", "csv", "arrow")
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+
+def default_fetch_size(section: str = "mysql") -> int:
+    return get_config().getint(section, "FETCH_SIZE", fallback=500)
+
+
+class StreamingResult:
+    """
+    An executed statement whose rows are read lazily.
+
+    The pooled connection is held until batches() is exhausted or closed (or close() is
+    called), then returned to the pool. columns (and, for JDBC cursors, the java.sql.Types
+    codes in types) are known as soon as the statement ran.
+    """
+
+    def __init__(self, sql: str, section: str = "mysql", fetch_size: int | None = None, pool=None):
+        self.sql = sql
+        self.section = section
+        self.fetch_size = fetch_size or default_fetch_size(section)
+        self.rows = 0
+        # anything with acquire() / release(conn, validate=...); the section's JDBC pool by default
+        self._pool = pool or jdbc_pool(section)
+        self._conn = self._pool.acquire()
+        self._cursor = None
+        try:
+            self._cursor = self._conn.cursor()
+            self._cursor.execute(sql)
+            self.columns = [d[0] for d in (self._cursor.description or [])]
+            self.types = column_types(self._cursor)
+        except BaseException:
+            self._release(failed=True)
+            raise
+
+    def _release(self, failed: bool = False) -> None:
+        if self._conn is None:
+            return
+        try:
+            if self._cursor is not None:
+                self._cursor.close()
+        except Exception:
+            failed = True
+        finally:
+            conn, self._conn, self._cursor = self._conn, None, None
+            self._pool.release(conn, validate=failed)
+
+    def column_batches(self) -> Iterator[ColumnBatch]:
+        """
+        Column-wise batches converted with one typed getter per column (see columnar_fetch).
+        """
+        if self._conn is None:
+            return
+        failed = False
+        try:
+            for batch in fetch_columnar(self._cursor, self.fetch_size):
+                self.rows += batch.num_rows
+                yield batch
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self._release(failed=failed)
+
+    def batches(self) -> Iterator[List[tuple]]:
+        for batch in self.column_batches():
+            yield batch.rows()
+
+    def close(self) -> None:
+        self._release()
+
+    def __enter__(self) -> "StreamingResult":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class EmptyResult:
+    """
+    StreamingResult-shaped result with known columns and no rows, produced without a
+    database round trip (denied queries).
+    """
+
+    def __init__(self, sql: str, columns: List[str], fetch_size: int | None = None):
+        self.sql = sql
+        self.columns = list(columns)
+        self.types = None
+        self.fetch_size = fetch_size or 0
+        self.rows = 0
+
+    def column_batches(self) -> Iterator[ColumnBatch]:
+        return iter(())
+
+    def batches(self) -> Iterator[List[tuple]]:
+        return iter(())
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "EmptyResult":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def stream_query(sql: str, section: str = "mysql", fetch_size: int | None = None, pool=None) -> StreamingResult:
+    return StreamingResult(sql, section=section, fetch_size=fetch_size, pool=pool)
+
+
+def _json_default(value: Any):
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if isinstance(value, (dt.date, dt.datetime, dt.time)):
+        return value.isoformat()
+    if isinstance(value, (bytes, bytearray)):
+        return value.hex()
+    return str(value)
+
+
+def ndjson_chunks(columns: Sequence[str], batches: Iterable[List[tuple]]) -> Iterator[bytes]:
+    """
+    One JSON object per row, one newline-delimited chunk per batch.
+    """
+    for rows in batches:
+        lines = [json.dumps(dict(zip(columns, row)), default=_json_default, ensure_ascii=False) for row in rows]
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def csv_chunks(columns: Sequence[str], batches: Iterable[List[tuple]]) -> Iterator[bytes]:
+    """
+    Header chunk, then one CSV chunk per batch.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def _drain() -> bytes:
+        data = buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate(0)
+        return data
+
+    writer.writerow(columns)
+    yield _drain()
+    for rows in batches:
+        writer.writerows(rows)
+        yield _drain()
+
+
+ENCODERS: dict[str, Callable[[Sequence[str], Iterable[List[tuple]]], Iterator[bytes]]] = {
+    "ndjson": ndjson_chunks,
+    "csv": csv_chunks,
+}
+
+
+def encode(result: StreamingResult, fmt: str) -> Iterator[bytes]:
+    if fmt == "arrow":
+        # Arrow IPC is built from column batches, not rows (pyarrow is optional)
+        from relational_database.arrow_result import ipc_stream_chunks
+
+        return ipc_stream_chunks(result)
+    if fmt not in ENCODERS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}: {fmt!r}")
+    return ENCODERS[fmt](result.columns, result.batches())
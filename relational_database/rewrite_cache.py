@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, Dict, Hashable, List, Tuple
+
+from secret.secret_util import get_config
+
+PLACEHOLDER = "?"
+
+# Literals that are lifted to placeholders: plain single-quoted strings without escapes and
+# plain decimal numbers. sqlglot regenerates both verbatim, so substituting them back into a
+# rewritten template is exact. Anything else (escaped strings, exponents, hex) stays in the
+# template text and therefore in the fingerprint.
+_LIFTABLE_STRING = re.compile(r"'[^'\\]*'\Z")
+_LIFTABLE_NUMBER = re.compile(r"\d+(?:\.\d+)?\Z")
+
+
+@lru_cache(maxsize=None)
+def _lexer(dialect: str) -> "re.Pattern[str]":
+    # MySQL also treats '#' as a line comment
+    line_comment = r"--[^\n]*|\#[^\n]*" if dialect == "mysql" else r"--[^\n]*"
+    return re.compile(
+        rf"""
+          (?P<comment>{line_comment}|/\*.*?\*/)
+        | (?P<string>'(?:[^'\\]|\\.|'')*')
+        | (?P<quoted>"(?:[^"\\]|\\.|"")*"|`(?:[^`]|``)*`)
+        | (?P<ident>[A-Za-z_][A-Za-z0-9_$]*)
+        | (?P<number>\d+(?:\.\d+)?(?:[eE][+-]?\d+)?|\.\d+)
+        | (?P<placeholder>\?)
+        | (?P<space>\s+)
+        | (?P<other>.)
+        """,
+        re.VERBOSE | re.DOTALL,
+    )
+
+
+@dataclass
+class LiftedSQL:
+    template: str
+    literals: List[str]
+    fingerprint: str
+
+
+def lift_literals(sql: str, dialect: str = "mysql") -> LiftedSQL | None:
+    """
+    Normalize SQL into a literal-free template ("?" per lifted literal, whitespace collapsed)
+    plus the lifted literals in order. None when the SQL already uses "?" placeholders.
+    """
+    parts: List[str] = []
+    literals: List[str] = []
+    for match in _lexer(dialect).finditer(sql):
+        kind, text = match.lastgroup, match.group()
+        if kind == "placeholder":
+            return None
+        if kind == "space":
+            if parts and parts[-1] != " ":
+                parts.append(" ")
+        elif (kind == "string" and _LIFTABLE_STRING.match(text)) or (
+            kind == "number" and _LIFTABLE_NUMBER.match(text)
+        ):
+            literals.append(text)
+            parts.append(PLACEHOLDER)
+        else:
+            parts.append(text)
+    template = "".join(parts).strip()
+    fingerprint = hashlib.sha1(template.encode("utf-8")).hexdigest()
+    return LiftedSQL(template=template, literals=literals, fingerprint=fingerprint)
+
+
+def _split_on_placeholders(sql: str, dialect: str) -> List[str]:
+    """
+    Text segments of rewritten template SQL between its "?" tokens (never inside strings/comments).
+    """
+    segments: List[str] = []
+    current: List[str] = []
+    for match in _lexer(dialect).finditer(sql):
+        if match.lastgroup == "placeholder":
+            segments.append("".join(current))
+            current = []
+        else:
+            current.append(match.group())
+    segments.append("".join(current))
+    return segments
+
+
+def entitlement_fingerprint(*parts: Any) -> str:
+    """
+    Stable hash of the effective entitlements (and anything else) a rewrite depends on.
+    """
+    payload = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _render(segments: List[str], literals: List[str]) -> str:
+    out = [segments[0]]
+    for literal, segment in zip(literals, segments[1:]):
+        out.append(literal)
+        out.append(segment)
+    return "".join(out)
+
+
+@dataclass
+class _Plan:
+    segments: List[str] | None  # None: this shape cannot be served from a template
+    rewrite_seconds: float
+
+
+class RewriteCache:
+    """
+    Bounded LRU of compiled rewrite plans keyed by (SQL fingerprint, entitlement fingerprint, dialect).
+
+    On a miss the SQL is rewritten normally, then its literal-free template is rewritten too;
+    the plan is kept only if substituting the literals into the rewritten template reproduces
+    the real rewrite exactly. Shapes that fail the check are remembered and always rewritten.
+    A hit substitutes the literals into the stored template without touching sqlglot.
+    """
+
+    def __init__(self, max_entries: int = 5000):
+        self.max_entries = max_entries
+        self._plans: "OrderedDict[Hashable, _Plan]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.uncacheable = 0
+        self.evictions = 0
+        self.saved_seconds = 0.0
+
+    def rewrite(
+        self,
+        sql: str,
+        dialect: str,
+        entitlement_key: str,
+        rewrite_fn: Callable[[str], str],
+    ) -> str:
+        lifted = lift_literals(sql, dialect)
+        if lifted is None:
+            with self._lock:
+                self.bypassed += 1
+            return rewrite_fn(sql)
+
+        key: Tuple[str, str, str] = (lifted.fingerprint, entitlement_key, dialect)
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is not None:
+                self._plans.move_to_end(key)
+        if plan is not None and plan.segments is not None:
+            started = time.perf_counter()
+            rewritten = _render(plan.segments, lifted.literals)
+            with self._lock:
+                self.hits += 1
+                self.saved_seconds += max(0.0, plan.rewrite_seconds - (time.perf_counter() - started))
+            return rewritten
+
+        started = time.perf_counter()
+        rewritten = rewrite_fn(sql)
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.misses += 1
+        if plan is not None:
+            return rewritten
+
+        self._store(key, self._compile(lifted, rewritten, dialect, rewrite_fn), elapsed)
+        return rewritten
+
+    def _compile(
+        self, lifted: LiftedSQL, rewritten: str, dialect: str, rewrite_fn: Callable[[str], str]
+    ) -> List[str] | None:
+        try:
+            segments = _split_on_placeholders(rewrite_fn(lifted.template), dialect)
+        except Exception:
+            return None
+        if len(segments) != len(lifted.literals) + 1:
+            return None
+        return segments if _render(segments, lifted.literals) == rewritten else None
+
+    def _store(self, key: Hashable, segments: List[str] | None, rewrite_seconds: float) -> None:
+        with self._lock:
+            if segments is None:
+                self.uncacheable += 1
+            self._plans[key] = _Plan(segments=segments, rewrite_seconds=rewrite_seconds)
+            self._plans.move_to_end(key)
+            while len(self._plans) > self.max_entries:
+                self._plans.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._plans.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._plans),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "bypassed": self.bypassed,
+                "uncacheable_shapes": self.uncacheable,
+                "evictions": self.evictions,
+                "saved_seconds": self.saved_seconds,
+            }
+
+
+def _cache_from_config() -> RewriteCache | None:
+    config = get_config()
+    if not config.getboolean("rewrite_cache", "ENABLED", fallback=True):
+        return None
+    return RewriteCache(max_entries=config.getint("rewrite_cache", "MAX_ENTRIES", fallback=5000))
+
+
+# Process-wide rewrite plan cache used by the rule-based rewriter (None when disabled)
+rewrite_cache = _cache_from_config()
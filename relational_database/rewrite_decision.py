@@ -0,0 +1,79 @@
+"""
+Structured outcome of an entitlement rewrite, and counters for what the execute stage did with it.
+
+    allow    no rule in force on the query's tables; the SQL runs as written
+    rewrite  row filters and/or masks were applied
+    deny     a row-governed table has no effective ROW rule, so the result is empty
+
+A denied query is not sent to the database when its projected columns are known: the
+execute stage answers with an empty result of that shape. With `SELECT *` the columns are
+only known to the database, so the rewritten SQL (which carries `1 = 0`) still runs.
+"""
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from sqlglot import exp as E
+
+ALLOW, REWRITE, DENY = "allow", "rewrite", "deny"
+
+
+@dataclass
+class RewriteDecision:
+    action: str
+    sql: str
+    columns: List[str] | None = None  # projected column names; None when the projection has a star
+    denied_tables: List[str] = field(default_factory=list)
+
+    @property
+    def short_circuits(self) -> bool:
+        """Denied with a known shape: answer locally instead of running the SQL."""
+        return self.action == DENY and self.columns is not None
+
+
+def projected_columns(ast: E.Expression) -> List[str] | None:
+    """
+    Output column names of a statement (the first branch of a UNION); None if any item is a star.
+    """
+    select = ast
+    while isinstance(select, E.SetOperation):
+        select = select.this
+    if isinstance(select, E.Subquery):
+        return projected_columns(select.this)
+    if not isinstance(select, E.Select):
+        return None
+    columns = []
+    for item in select.expressions:
+        if isinstance(item, E.Star) or (isinstance(item, E.Column) and isinstance(item.this, E.Star)):
+            return None
+        columns.append(item.output_name or item.sql(dialect="mysql"))
+    return columns
+
+
+class DecisionStats:
+    """
+    Process-wide counters of rewrite decisions and of denied queries answered locally.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: Dict[str, int] = {ALLOW: 0, REWRITE: 0, DENY: 0, "short_circuits": 0, "denied_round_trips": 0}
+
+    def record(self, decision: RewriteDecision) -> None:
+        with self._lock:
+            self._counts[decision.action] += 1
+
+    def record_execution(self, decision: RewriteDecision) -> None:
+        if decision.action != DENY:
+            return
+        with self._lock:
+            self._counts["short_circuits" if decision.short_circuits else "denied_round_trips"] += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+
+decision_stats = DecisionStats()
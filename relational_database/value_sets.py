@@ -0,0 +1,192 @@
+"""
+Entitlement value tables: large row-filter value sets stored as rows, joined instead of listed.
+
+A user in many row-filter groups can end up with thousands of allowed values (cost centers,
+account ids), and `col IN ('a', 'b', ...)` then costs parse, plan and network time on every
+query. At or above [entitlement] VALUE_SET_THRESHOLD values the rewriter emits instead
+
+    col IN (SELECT value FROM bank.entitlement_value_set WHERE set_id = '<sha1 of the values>')
+
+which the database runs as a semi-join on the (set_id, value) primary key. Its id is a hash
+of its contents, so the rows never change and are shared by every query, user and process
+that has the same value set. Rewriting writes nothing (/api/rewrite and batch rewrites stay
+read-only): the rewriter registers the set, and the execute path stores the sets a statement
+reads (provision()) before running it, once per process. Writers only insert the rows a set
+is missing and never delete any, so a set another process is reading never shrinks.
+
+The table is created when first needed, without CREATE TABLE IF NOT EXISTS (Oracle before 23c
+has none); DBAs can create it up front instead. Sets with a value longer than the value
+column (255 bytes) are emitted as IN (...) literals.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import threading
+from typing import Any, Dict, Iterable, List
+
+import sqlglot
+from sqlglot import exp as E
+
+from relational_database.executor import Executor, shared_executor
+from secret.secret_util import get_config
+
+DEFAULT_TABLE = "bank.entitlement_value_set"
+
+# bytes, so a value fits MySQL VARCHAR(255) characters and Oracle VARCHAR2(255) bytes alike
+MAX_VALUE_BYTES = 255
+
+_CREATE_TABLE = """
+    CREATE TABLE {table} (
+        set_id CHAR(40) NOT NULL,
+        value VARCHAR(255) NOT NULL,
+        PRIMARY KEY (set_id, value)
+    )
+"""
+
+_SET_ID = re.compile(r"set_id = '([0-9a-f]{40})'")
+
+
+def value_set_id(values: Iterable[str]) -> str:
+    return hashlib.sha1(json.dumps(sorted(set(values)), ensure_ascii=True).encode("utf-8")).hexdigest()
+
+
+class ValueSetStore:
+    """
+    Writes value sets to the entitlement value table of an executor (the shared one by
+    default) and builds the semi-join predicates that read them back.
+    """
+
+    def __init__(self, threshold: int = 0, table: str = DEFAULT_TABLE, executor: Executor | None = None,
+                 chunk_size: int = 1000):
+        self.threshold = threshold  # 0: never, always emit IN (...) literals
+        self.table = table
+        self.chunk_size = chunk_size
+        self._executor = executor
+        self._known: set = set()  # sets stored in the table
+        self._registered: Dict[str, List[str]] = {}  # set_id -> values, emitted but not stored yet
+        self._table_ready = False
+        self._lock = threading.Lock()
+        self._stats = {"sets_written": 0, "values_written": 0, "sets_reused": 0, "predicates": 0}
+
+    @property
+    def executor(self) -> Executor:
+        return self._executor or shared_executor()
+
+    def applies(self, values: List[str]) -> bool:
+        return (
+            bool(self.threshold)
+            and len(values) >= self.threshold
+            and all(len(value.encode("utf-8")) <= MAX_VALUE_BYTES for value in values)
+        )
+
+    def _sql(self, sql: str) -> str:
+        return sqlglot.transpile(sql, read="mysql", write=self.executor.dialect)[0]
+
+    def _table_exists(self) -> bool:
+        try:
+            self.executor.execute(self._sql(f"SELECT 1 FROM {self.table} WHERE 1 = 0"))
+        except Exception:
+            return False
+        return True
+
+    def _ensure_table(self) -> None:
+        if self._table_ready:
+            return
+        if not self._table_exists():
+            try:
+                self.executor.execute_update(self._sql(_CREATE_TABLE.format(table=self.table)))
+            except Exception:
+                # another process created it meanwhile
+                if not self._table_exists():
+                    raise
+        self._table_ready = True
+
+    def ensure(self, values: List[str]) -> str:
+        """
+        Make sure the value set is in the table; returns its set_id.
+        """
+        unique = sorted(set(values))
+        set_id = value_set_id(unique)
+        with self._lock:
+            if set_id in self._known:
+                self._stats["sets_reused"] += 1
+                return set_id
+            self._ensure_table()
+            stored = self._stored_values(set_id)
+            missing = [value for value in unique if value not in stored]
+            if missing:
+                self._write(set_id, missing, len(unique))
+            self._known.add(set_id)
+        return set_id
+
+    def _stored_values(self, set_id: str) -> set:
+        rows = self.executor.execute(self._sql(f"SELECT value FROM {self.table} WHERE set_id = '{set_id}'"))
+        return {row[0] for row in rows}
+
+    def _write(self, set_id: str, missing: List[str], size: int) -> None:
+        # insert-if-absent: rows of a partial set (interrupted writer) are kept and completed
+        insert = f"INSERT INTO {self.table} (set_id, value) VALUES (?, ?)"
+        try:
+            for start in range(0, len(missing), self.chunk_size):
+                self.executor.execute_update(insert, [(set_id, value) for value in missing[start:start + self.chunk_size]])
+        except Exception:
+            # another process wrote the same rows concurrently; fine if the set is complete now
+            if len(self._stored_values(set_id)) != size:
+                raise
+            return
+        self._stats["sets_written"] += 1
+        self._stats["values_written"] += len(missing)
+
+    def provision(self, sql: str) -> None:
+        """
+        Store the registered value sets a statement reads; the execute path calls this before
+        running the statement. Sets this process did not register are left to their writer.
+        """
+        if not self.threshold or self.table not in sql:
+            return
+        for set_id in _SET_ID.findall(sql):
+            with self._lock:
+                values = self._registered.get(set_id)
+            if values is not None:
+                self.ensure(values)
+                with self._lock:
+                    self._registered.pop(set_id, None)
+
+    def predicate(self, column: E.Column, values: List[str]) -> E.Expression:
+        """
+        column IN (SELECT value FROM <table> WHERE set_id = '<id>'). Nothing is written here:
+        the set is registered and stored by provision() when a statement using it runs.
+        """
+        unique = sorted(set(values))
+        set_id = value_set_id(unique)
+        with self._lock:
+            if set_id not in self._known:
+                self._registered[set_id] = unique
+        subquery = sqlglot.parse_one(f"SELECT value FROM {self.table} WHERE set_id = '{set_id}'", read="mysql")
+        with self._lock:
+            self._stats["predicates"] += 1
+        return E.In(this=column, query=E.Subquery(this=subquery))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "threshold": self.threshold,
+                "table": self.table,
+                "sets_known": len(self._known),
+                "sets_registered": len(self._registered),
+                **self._stats,
+            }
+
+
+def _store_from_config() -> ValueSetStore:
+    config = get_config()
+    return ValueSetStore(
+        threshold=config.getint("entitlement", "VALUE_SET_THRESHOLD", fallback=0),
+        table=config.get("entitlement", "VALUE_SET_TABLE", fallback=DEFAULT_TABLE) or DEFAULT_TABLE,
+    )
+
+
+# Process-wide value set store used by the rule-based rewriter (threshold 0: disabled)
+value_set_store = _store_from_config()
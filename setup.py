@@ -28,6 +28,8 @@ setup(
             "venv.*",
             "resource",
             "resource.*",
+            "manual_tests",
+            "manual_tests.*",
         )
     ),
     include_package_data=True,
@@ -0,0 +1,60 @@
+"""
+Shared fixtures: the sample entitlement graph in the in-memory engine, and the embedded SQLite
+executor seeded from demo/scripts/seed_mysql.sql, so the whole pipeline runs without Neo4j,
+MySQL or a JVM.
+"""
+from __future__ import annotations
+
+import pytest
+
+from relational_database import mask_engine
+from relational_database.executor import SQLiteExecutor, set_shared_executor
+from relational_database.mysql import mysql_entitlement_util as util
+from relational_database.mysql.entitlement_pipeline import run_query_fast
+from sample_entitlements import sample_repository
+
+
+@pytest.fixture
+def repository(monkeypatch):
+    repo = sample_repository()
+    monkeypatch.setattr(util, "_entitlement_repository", lambda: repo)
+    return repo
+
+
+@pytest.fixture
+def sqlite_executor():
+    executor = SQLiteExecutor()
+    set_shared_executor(executor)
+    yield executor
+    set_shared_executor(None)
+    executor.close()
+
+
+class FakeColumnCatalog:
+    """Column catalog that knows no table (stars expand from the executor) at a settable version."""
+
+    def __init__(self):
+        self.current = 1
+
+    def version(self):
+        return self.current
+
+    def columns(self, table_key):
+        return None
+
+
+@pytest.fixture
+def catalog(monkeypatch):
+    fake = FakeColumnCatalog()
+    monkeypatch.setattr(mask_engine, "shared_column_catalog", lambda: fake)
+    monkeypatch.setattr(mask_engine, "_columns_cache", {})
+    monkeypatch.setattr(mask_engine, "_columns_version", None)
+    return fake
+
+
+@pytest.fixture
+def run_query(repository, sqlite_executor, catalog):
+    """
+    parse -> entitlements -> rewrite -> execute on the sample graph and SQLite; returns AppState.
+    """
+    return run_query_fast
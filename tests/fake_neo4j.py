@@ -0,0 +1,139 @@
+"""
+A minimal stand-in for the neo4j driver API the repository code uses: sessions with run(),
+execute_read(), execute_write() and begin_transaction(), and FakeAsyncDriver for the
+AsyncDriver API of the web application. Every query goes to a handler(query, params) that
+returns the result rows as dicts.
+"""
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List
+
+Handler = Callable[[str, Dict[str, Any]], List[Dict[str, Any]] | None]
+
+
+class FakeResult(list):
+    def single(self):
+        return self[0] if self else None
+
+    def consume(self):
+        return None
+
+    def data(self):
+        return [dict(row) for row in self]
+
+
+class FakeTransaction:
+    def __init__(self, session: "FakeSession"):
+        self.session = session
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query: str, parameters: Dict[str, Any] | None = None, **params) -> FakeResult:
+        return self.session.run(query, parameters, **params)
+
+    def commit(self):
+        self.session.driver.commits += 1
+
+    def rollback(self):
+        pass
+
+
+class FakeSession:
+    def __init__(self, driver: "FakeDriver", database: str | None):
+        self.driver = driver
+        self.database = database
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query: str, parameters: Dict[str, Any] | None = None, **params) -> FakeResult:
+        params = {**(parameters or {}), **params}
+        self.driver.queries.append((query, params))
+        return FakeResult(self.driver.handler(query, params) or [])
+
+    def execute_read(self, work, *args, **kwargs):
+        return work(self, *args, **kwargs)
+
+    def execute_write(self, work, *args, **kwargs):
+        self.driver.writes += 1
+        return work(self, *args, **kwargs)
+
+    def begin_transaction(self) -> FakeTransaction:
+        return FakeTransaction(self)
+
+    def close(self):
+        pass
+
+
+class FakeDriver:
+    def __init__(self, handler: Handler):
+        self.handler = handler
+        self.queries: List[tuple] = []
+        self.writes = 0
+        self.commits = 0
+        self.closed = False
+
+    def session(self, database: str | None = None, **config) -> FakeSession:
+        return FakeSession(self, database)
+
+    def close(self):
+        self.closed = True
+
+
+class FakeAsyncResult:
+    def __init__(self, rows: List[Dict[str, Any]]):
+        self._rows = rows
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for row in self._rows:
+            yield row
+
+    async def single(self):
+        return self._rows[0] if self._rows else None
+
+    async def consume(self):
+        return None
+
+
+class FakeAsyncSession:
+    """AsyncSession counterpart of FakeSession (and its own transaction for execute_*)."""
+
+    def __init__(self, driver: "FakeAsyncDriver", database: str | None):
+        self.driver = driver
+        self.database = database
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def run(self, query: str, parameters: Dict[str, Any] | None = None, **params) -> FakeAsyncResult:
+        params = {**(parameters or {}), **params}
+        self.driver.queries.append((query, params))
+        return FakeAsyncResult(self.driver.handler(query, params) or [])
+
+    async def execute_read(self, work, *args, **kwargs):
+        return await work(self, *args, **kwargs)
+
+    async def execute_write(self, work, *args, **kwargs):
+        self.driver.writes += 1
+        return await work(self, *args, **kwargs)
+
+
+class FakeAsyncDriver(FakeDriver):
+    def session(self, database: str | None = None, **config) -> FakeAsyncSession:
+        return FakeAsyncSession(self, database)
+
+    async def close(self):
+        self.closed = True
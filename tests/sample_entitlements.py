@@ -0,0 +1,53 @@
+"""
+The sample entitlement graph of demo/scripts/seed_neo4j.cypher, built in the in-memory engine.
+"""
+from __future__ import annotations
+
+from graph_database.in_memory_repository import InMemoryEntitlementRepository
+
+SAMPLE_GROUPS = {
+    "all_employees_pg": "All Employees",
+    "finance_pg": "Finance Group",
+    "hr_pg": "HR Group",
+    "it_pg": "IT Group",
+    "client_support_pg": "Client Support Team",
+}
+
+SAMPLE_MEMBERSHIPS = [
+    ("user-alice", "all_employees_pg"),
+    ("user-alice", "finance_pg"),
+    ("user-bob", "all_employees_pg"),
+    ("user-bob", "client_support_pg"),
+    ("user-carol", "all_employees_pg"),
+    ("user-carol", "it_pg"),
+    ("user-tom", "all_employees_pg"),
+    ("user-tom", "hr_pg"),
+]
+
+
+def _row_filter(repo, policy_id: str, dept_name: str, group_id: str) -> None:
+    repo.add_row_policy(
+        "bank", "bank", "department", "department", "bank.department.dept_name", "dept_name",
+        policy_id, f"{dept_name} Department Only", f"Allow access only to rows where dept_name = '{dept_name}'",
+        group_id, SAMPLE_GROUPS[group_id],
+    )
+
+
+def sample_repository(memberships=SAMPLE_MEMBERSHIPS) -> InMemoryEntitlementRepository:
+    """
+    The seed_neo4j.cypher graph: salary masked except for Client Support, department rows
+    filtered per Finance / HR / IT group.
+    """
+    repo = InMemoryEntitlementRepository()
+    repo.add_mask_policy(
+        "bank", "bank", "employee", "employee", "bank.employee.salary", "salary",
+        "mask_salary_v1", "Mask Salary",
+        "Mask salary for bank.employee: masked for all users EXCEPT members of Client Support Team",
+        "all_employees_pg", SAMPLE_GROUPS["all_employees_pg"],
+    )
+    _row_filter(repo, "row_filter_finance_only", "Finance", "finance_pg")
+    _row_filter(repo, "row_filter_hr_only", "HR", "hr_pg")
+    _row_filter(repo, "row_filter_it_only", "IT", "it_pg")
+    for user_id, group_id in memberships:
+        repo.add_user_to_policy_group(user_id, group_id, SAMPLE_GROUPS[group_id])
+    return repo
@@ -0,0 +1,97 @@
+import logging
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+
+from relational_database.arrow_result import INFERENCE_BATCHES, ipc_stream_chunks, record_batch_reader
+from relational_database.columnar_fetch import ColumnBatch
+from relational_database.result_stream import EmptyResult
+
+
+class DeclaredResult:
+    """A StreamingResult-shaped result whose cursor declared java.sql.Types codes."""
+
+    def __init__(self, columns, types, batches):
+        self.columns = columns
+        self.types = types
+        self._batches = batches
+
+    def column_batches(self):
+        for data in self._batches:
+            yield ColumnBatch(columns=self.columns, data=data, types=self.types)
+
+
+def _read_ipc(result):
+    return pa.ipc.open_stream(b"".join(ipc_stream_chunks(result))).read_all()
+
+
+def test_ipc_stream_round_trips_the_result(sqlite_executor):
+    table = _read_ipc(sqlite_executor.stream(
+        "SELECT emp_id, first_name, salary FROM bank.employee ORDER BY emp_id", fetch_size=2
+    ))
+
+    assert table.schema.types == [pa.int64(), pa.string(), pa.float64()]
+    assert table.column("emp_id").to_pylist() == [1, 2, 3, 4, 5]
+    assert table.column("first_name").to_pylist()[0] == "Alice"
+    assert table.column("salary").to_pylist()[0] == 85000
+
+
+def test_column_null_in_the_first_batch_is_typed_by_later_ones(sqlite_executor):
+    table = _read_ipc(sqlite_executor.stream(
+        "SELECT emp_id, CASE WHEN emp_id > 2 THEN emp_id * 10 END AS late FROM bank.employee ORDER BY emp_id",
+        fetch_size=2,
+    ))
+
+    assert table.schema.field("late").type == pa.int64()
+    assert table.column("late").to_pylist() == [None, None, 30, 40, 50]
+
+
+def test_column_null_past_the_inference_window_becomes_text(sqlite_executor):
+    late_row = 2 * INFERENCE_BATCHES + 1
+    table = _read_ipc(sqlite_executor.stream(
+        f"WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < {late_row}) "
+        f"SELECT i, CASE WHEN i = {late_row} THEN i END AS late FROM n",
+        fetch_size=2,
+    ))
+
+    assert table.schema.field("late").type == pa.string()
+    assert table.column("late").to_pylist()[-1] == str(late_row)
+
+
+def test_later_batch_of_another_type_is_cast_not_raised(sqlite_executor, caplog):
+    with caplog.at_level(logging.WARNING, logger="relational_database.arrow_result"):
+        table = _read_ipc(sqlite_executor.stream(
+            "SELECT CASE WHEN emp_id < 3 THEN emp_id ELSE emp_id + 0.5 END AS x FROM bank.employee ORDER BY emp_id",
+            fetch_size=2,
+        ))
+
+    assert table.schema.field("x").type == pa.int64()
+    assert table.column("x").to_pylist() == [1, 2, 3, 4, 5]
+    assert "cast lossily" in caplog.text
+
+
+def test_declared_types_fix_the_schema_even_without_rows():
+    reader = record_batch_reader(DeclaredResult(["emp_id", "last_name", "hired"], [4, 12, 93], []))
+
+    assert reader.schema.types == [pa.int64(), pa.string(), pa.timestamp("us")]
+    assert reader.read_all().num_rows == 0
+
+
+def test_declared_types_win_over_all_null_batches():
+    result = DeclaredResult(["emp_id", "hired"], [-5, 91], [[[None], [None]], [[7], ["2020-03-15"]]])
+
+    table = _read_ipc(result)
+
+    assert table.schema.types == [pa.int64(), pa.date32()]
+    assert table.column("hired").to_pylist()[1].isoformat() == "2020-03-15"
+
+
+def test_empty_result_without_declared_types_is_null_typed(sqlite_executor):
+    denied = _read_ipc(EmptyResult("SELECT 1", ["first_name", "salary"]))
+    no_rows = _read_ipc(sqlite_executor.stream("SELECT emp_id, first_name FROM bank.employee WHERE 1 = 0"))
+
+    assert denied.schema.names == ["first_name", "salary"]
+    assert denied.schema.types == [pa.null(), pa.null()]
+    assert no_rows.schema.types == [pa.null(), pa.null()]
+    assert no_rows.num_rows == 0
@@ -0,0 +1,54 @@
+"""
+Batch rewrite on the sample graph: same SQL as the per-query pipeline, input order, per-query
+errors, and worker processes loading an in-memory snapshot.
+"""
+from __future__ import annotations
+
+from relational_database.batch_rewrite import plan_tasks, rewrite_batch
+
+PAIRS = [
+    ("user-alice", "SELECT first_name, salary FROM bank.employee WHERE emp_id = 1"),
+    ("user-bob", "SELECT first_name, salary FROM bank.employee WHERE emp_id = 1"),
+    ("user-alice", "SELECT dept_name FROM bank.department"),
+    ("user-carol", "SELECT d.dept_name, e.salary FROM bank.department d JOIN bank.employee e ON e.dept_id = d.dept_id"),
+    ("user-alice", "SELECT e.first_name FROM bank.employee e JOIN bank.department d ON e.dept_id = d.dept_id"),
+]
+
+
+def test_plan_tasks_groups_by_user_and_splits_at_the_chunk_size():
+    pairs = [("a", "q0"), ("b", "q1"), ("a", "q2"), ("a", "q3"), ("c", "q4")]
+    assert plan_tasks(pairs, chunk_size=2) == [
+        [("a", [(0, "q0"), (2, "q2")])],
+        [("a", [(3, "q3")]), ("b", [(1, "q1")])],
+        [("c", [(4, "q4")])],
+    ]
+
+
+def test_in_process_batch_matches_the_pipeline(run_query):
+    results = list(rewrite_batch(PAIRS, workers=0))
+    assert [r.index for r in results] == list(range(len(PAIRS)))
+    for result, (user_id, sql) in zip(results, PAIRS):
+        assert result.error is None
+        assert (result.user_id, result.input_sql) == (user_id, sql)
+        assert result.rewritten_sql == run_query(user_id, sql)["rewritten_sql"]
+    assert "0.00 AS salary" in results[0].rewritten_sql
+    assert "0.00 AS salary" not in results[1].rewritten_sql
+    assert "'Finance'" in results[2].rewritten_sql
+
+
+def test_a_failing_query_does_not_stop_the_batch(run_query):
+    pairs = [PAIRS[0], ("user-alice", "SELECT FROM WHERE ("), PAIRS[2]]
+    results = list(rewrite_batch(pairs, workers=0))
+    assert [r.index for r in results] == [0, 1, 2]
+    assert results[1].error.startswith("parse:") and results[1].rewritten_sql is None
+    assert results[0].rewritten_sql and results[2].rewritten_sql
+
+
+def test_worker_processes_rewrite_from_a_snapshot(run_query, repository, tmp_path):
+    snapshot = tmp_path / "entitlements.json"
+    repository.save_snapshot(str(snapshot))
+    expected = [r.rewritten_sql for r in rewrite_batch(PAIRS, workers=0)]
+
+    results = list(rewrite_batch(PAIRS, workers=2, chunk_size=2, dialect="sqlite", snapshot=str(snapshot)))
+    assert [r.index for r in results] == list(range(len(PAIRS)))
+    assert [r.rewritten_sql for r in results] == expected
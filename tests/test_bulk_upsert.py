@@ -0,0 +1,136 @@
+"""
+Bulk policy upsert: chunking, retries of transient errors and cache eviction on a fake driver,
+and the same specs applied to the in-memory graph.
+"""
+from __future__ import annotations
+
+import pytest
+from neo4j.exceptions import TransientError
+
+from fake_neo4j import FakeDriver
+from graph_database.entitlement_cache import EntitlementCache, entitlements_key
+from graph_database.entitlement_util import (
+    BULK_UPSERT_POLICIES_QUERY,
+    RECORD_CHANGES_QUERY,
+    EntitlementRepository,
+)
+from graph_database.in_memory_repository import InMemoryEntitlementRepository
+
+
+class _Registry:
+    def __init__(self, driver):
+        self._driver = driver
+
+    def acquire(self):
+        return self._driver
+
+    def release(self):
+        pass
+
+
+def _spec(n: int, rule_type: str = "MASK", group: bool = True) -> dict:
+    spec = {
+        "rule_type": rule_type,
+        "schema_id": "bank", "schema_name": "bank",
+        "table_id": "bank.employee", "table_name": "employee",
+        "column_id": f"bank.employee.col{n}", "column_name": f"col{n}",
+        "policy_id": f"policy_{n}", "policy_name": f"Policy {n}",
+        "definition": f"Mask col{n} for all users",
+    }
+    if group:
+        spec.update(policy_group_id="all_employees_pg", policy_group_name="All Employees")
+    return spec
+
+
+class _Graph:
+    """Answers the bulk and change-log queries; fails the first `transient` bulk writes."""
+
+    def __init__(self, transient: int = 0):
+        self.transient = transient
+        self.chunks = []
+        self.changes = []
+        self.version = 0
+        self.driver = FakeDriver(self.handle)
+
+    def handle(self, query, params):
+        if query == BULK_UPSERT_POLICIES_QUERY:
+            if self.transient:
+                self.transient -= 1
+                raise TransientError("deadlock detected")
+            self.chunks.append(params["rows"])
+            return [{"tableKey": "bank.employee"}]
+        if query == RECORD_CHANGES_QUERY:
+            self.version += 1
+            self.changes.append(params["changes"])
+            return [{"version": self.version}]
+        return []
+
+    def repository(self) -> EntitlementRepository:
+        repo = EntitlementRepository(registry=_Registry(self.driver))
+        repo.cache = EntitlementCache(check_interval=-1)
+        return repo
+
+
+def test_policies_are_written_one_transaction_per_chunk():
+    graph = _Graph()
+    specs = (_spec(n, "ROW" if n == 4 else "MASK", group=n != 3) for n in range(5))
+    report = graph.repository().bulk_upsert_policies(specs, chunk_size=2)
+
+    assert [len(rows) for rows in graph.chunks] == [2, 2, 1]
+    assert graph.driver.commits == 3
+    assert (report.rows, report.chunks, report.retries, report.version) == (5, 3, 0, 3)
+    first = graph.chunks[0][0]
+    assert first["ruleType"] == "MASK" and first["policyGroupId"] == "all_employees_pg"
+    assert first["compiled"]  # compiled on the client, stored with the policy
+    assert graph.chunks[1][1]["policyGroupId"] is None
+    # a policy link per row, a group link per grouped row
+    assert [len(changes) for changes in graph.changes] == [4, 3, 2]
+    assert graph.changes[2][0]["relationship"] == "hasRowRule"
+
+
+def test_transient_errors_are_retried():
+    graph = _Graph(transient=2)
+    report = graph.repository().bulk_upsert_policies([_spec(0)], retry_backoff=0)
+    assert (report.rows, report.chunks, report.retries) == (1, 1, 2)
+
+
+def test_retries_are_bounded():
+    graph = _Graph(transient=3)
+    with pytest.raises(TransientError):
+        graph.repository().bulk_upsert_policies([_spec(0)], max_retries=2, retry_backoff=0)
+    assert graph.chunks == []
+
+
+def test_upsert_evicts_the_cached_entitlements_of_the_table():
+    graph = _Graph()
+    repo = graph.repository()
+    key = entitlements_key("fingerprint", "bank.employee")
+    repo.cache.put(key, [], table_key="bank.employee")
+    repo.bulk_upsert_policies([_spec(0)])
+    assert repo.cache.get(key) == (False, None)
+
+
+def test_invalid_spec_is_rejected_before_writing():
+    graph = _Graph()
+    with pytest.raises(ValueError, match="rule_type"):
+        graph.repository().bulk_upsert_policies([_spec(0, rule_type="DENY")])
+    with pytest.raises(ValueError, match="column_id"):
+        graph.repository().bulk_upsert_policies([{**_spec(0), "column_id": None}])
+    assert graph.chunks == []
+
+
+def test_in_memory_upsert_grants_the_policies():
+    repo = InMemoryEntitlementRepository()
+    repo.add_user_to_policy_group("user-alice", "all_employees_pg", "All Employees")
+    report = repo.bulk_upsert_policies((_spec(n) for n in range(3)), chunk_size=2)
+    assert (report.rows, report.chunks, report.version) == (3, 2, repo.current_version())
+
+    context = repo.fetch_entitlement_context("user-alice", [{"schema": "bank", "table": "employee"}])
+    masked = context.entitlements_by_table["bank.employee"]
+    assert sorted(e["columnName"] for e in masked) == ["col0", "col1", "col2"]
+    assert {e["ruleType"] for e in masked} == {"MASK"}
+
+    # upserting again changes nothing but the version
+    repo.bulk_upsert_policies([_spec(0)])
+    again = repo.fetch_entitlement_context("user-alice", [{"schema": "bank", "table": "employee"}])
+    assert again.entitlements_by_table == context.entitlements_by_table
@@ -0,0 +1,175 @@
+import logging
+import threading
+
+import pytest
+
+from fake_neo4j import FakeDriver
+from graph_database.column_catalog import (
+    FETCH_COLUMN_CATALOG_QUERY,
+    PRUNE_COLUMNS_QUERY,
+    SYNC_COLUMNS_QUERY,
+    ColumnCatalog,
+    sync_from_information_schema,
+)
+from graph_database.entitlement_util import CURRENT_VERSION_QUERY, RECORD_CHANGES_QUERY
+
+
+class CatalogGraph:
+    """
+    Column rows and a version counter behind a FakeDriver; `fail` or `hang` break reads.
+    """
+
+    def __init__(self, rows, version=1):
+        self.rows = list(rows)
+        self.version = version
+        self.fail = False
+        self.hang = None  # threading.Event the read waits on
+        self.protected = set()  # columnIds a policy points at
+        self.driver = FakeDriver(self.handle)
+
+    def handle(self, query, params):
+        if self.hang is not None:
+            self.hang.wait(5)
+        if self.fail:
+            raise ConnectionError("neo4j unavailable")
+        if query == FETCH_COLUMN_CATALOG_QUERY:
+            return [dict(r) for r in self.rows]
+        if query == CURRENT_VERSION_QUERY:
+            return [{"version": self.version}]
+        if query == RECORD_CHANGES_QUERY:
+            self.version += 1
+            return [{"version": self.version}]
+        if query == SYNC_COLUMNS_QUERY:
+            for row in params["rows"]:
+                self.rows = [r for r in self.rows if _column_id(r) != row["columnId"]]
+                self.rows.append({k: row[k] for k in ("schemaName", "tableName", "columnName", "ordinalPosition", "dataType")})
+            return []
+        if query == PRUNE_COLUMNS_QUERY:
+            deleted = [c for c in params["columnIds"] if c not in self.protected]
+            self.rows = [r for r in self.rows if _column_id(r) not in deleted]
+            return [{"columnId": c} for c in deleted]
+        raise AssertionError(f"unexpected query: {query}")
+
+
+def _column_id(row):
+    return f"{row['schemaName']}.{row['tableName']}.{row['columnName']}"
+
+
+def _row(table, column, position=None, data_type=None, schema="bank"):
+    return {"schemaName": schema, "tableName": table, "columnName": column,
+            "ordinalPosition": position, "dataType": data_type}
+
+
+SYNCED = [_row("department", "dept_name", 2, "varchar"), _row("department", "dept_id", 1, "int")]
+SEEDED = [_row("employee", "salary")]
+
+
+def test_columns_in_ordinal_order_for_synced_tables_only():
+    graph = CatalogGraph(SYNCED + SEEDED)
+    catalog = ColumnCatalog(check_interval=0, driver=graph.driver)
+
+    assert catalog.columns("BANK.department") == ["dept_id", "dept_name"]
+    assert catalog.columns("bank.employee") is None
+    assert catalog.columns("bank.employee", complete_only=False) == ["salary"]
+    assert catalog.has_column("bank.department", "DEPT_NAME") is True
+    assert catalog.has_column("bank.employee", "salary") is None
+    assert catalog.resolve("dept_id", ["bank.department", "bank.employee"]) == ["bank.department"]
+    assert catalog.version() == 1
+
+
+def test_reloads_only_when_the_graph_version_changes():
+    graph = CatalogGraph(SYNCED)
+    catalog = ColumnCatalog(check_interval=0, driver=graph.driver)
+    catalog.columns("bank.department")
+    catalog.columns("bank.department")
+    assert catalog.stats()["loads"] == 1
+
+    graph.rows.append(_row("department", "location", 3, "varchar"))
+    graph.version = 2
+    assert catalog.columns("bank.department") == ["dept_id", "dept_name", "location"]
+    assert catalog.stats()["loads"] == 2
+    assert catalog.version() == 2
+
+
+def test_failed_version_check_serves_the_last_index(caplog):
+    graph = CatalogGraph(SYNCED)
+    catalog = ColumnCatalog(check_interval=0, driver=graph.driver)
+    assert catalog.version() == 1
+
+    graph.fail = True
+    with caplog.at_level(logging.WARNING, logger="graph_database.column_catalog"):
+        assert catalog.columns("bank.department") == ["dept_id", "dept_name"]
+    assert "version check failed (ConnectionError" in caplog.text
+    assert "serving the index of version 1" in caplog.text
+    assert catalog.stats()["check_failures"] == 1
+
+
+def test_hanging_version_check_is_bounded_by_the_timeout(caplog):
+    graph = CatalogGraph(SYNCED)
+    catalog = ColumnCatalog(check_interval=0, driver=graph.driver, check_timeout=0.05)
+    catalog.version()
+
+    graph.hang = threading.Event()
+    try:
+        with caplog.at_level(logging.WARNING, logger="graph_database.column_catalog"):
+            assert catalog.columns("bank.department") == ["dept_id", "dept_name"]
+            # the check still running is waited on again, not queued behind
+            assert catalog.columns("bank.department") == ["dept_id", "dept_name"]
+        assert "TimeoutError" in caplog.text
+        assert catalog.stats()["check_failures"] == 2
+    finally:
+        graph.hang.set()
+
+
+def test_unreachable_graph_without_an_index_yields_unknown():
+    graph = CatalogGraph(SYNCED)
+    graph.fail = True
+    catalog = ColumnCatalog(check_interval=0, driver=graph.driver)
+
+    assert catalog.version() is None
+    assert catalog.columns("bank.department") is None
+
+    graph.fail = False
+    assert catalog.columns("bank.department") == ["dept_id", "dept_name"]
+
+
+def test_sync_writes_only_new_and_changed_columns():
+    graph = CatalogGraph(SYNCED + SEEDED)
+    source = [
+        {"schemaName": "bank", "tableName": "department", "columnName": "dept_id", "ordinalPosition": 1, "dataType": "int"},
+        {"schemaName": "bank", "tableName": "department", "columnName": "dept_name", "ordinalPosition": 2, "dataType": "text"},
+        {"schemaName": "bank", "tableName": "department", "columnName": "location", "ordinalPosition": 3, "dataType": "varchar"},
+        {"schemaName": "bank", "tableName": "employee", "columnName": "salary", "ordinalPosition": 1, "dataType": "decimal"},
+    ]
+
+    report = sync_from_information_schema(["bank"], source_rows=source, chunk_size=2, driver=graph.driver)
+
+    assert (report.added, report.updated, report.unchanged) == (1, 2, 1)
+    assert graph.driver.writes == 2  # three changed columns, chunks of two
+    assert report.version == 3
+    assert report.kept == []
+
+    again = sync_from_information_schema(["bank"], source_rows=source, driver=graph.driver)
+    assert (again.added, again.updated, again.unchanged) == (0, 0, 4)
+    assert graph.driver.writes == 2
+
+
+@pytest.mark.parametrize("prune", [False, True])
+def test_sync_prunes_columns_gone_from_the_database_unless_under_a_policy(prune):
+    graph = CatalogGraph(SYNCED + [_row("employee", "salary", 1, "decimal"), _row("employee", "bonus", 2, "decimal")])
+    graph.protected = {"bank.employee.salary"}
+    source = [
+        {"schemaName": "bank", "tableName": "department", "columnName": "dept_id", "ordinalPosition": 1, "dataType": "int"},
+        {"schemaName": "bank", "tableName": "department", "columnName": "dept_name", "ordinalPosition": 2, "dataType": "varchar"},
+    ]
+
+    report = sync_from_information_schema(["bank"], prune=prune, source_rows=source, driver=graph.driver)
+
+    if prune:
+        assert report.removed == 1
+        assert report.kept == ["bank.employee.salary"]
+        assert "bank.employee.bonus" not in {_column_id(r) for r in graph.rows}
+    else:
+        assert report.removed == 0
+        assert report.kept == ["bank.employee.bonus", "bank.employee.salary"]
+        assert graph.driver.writes == 0
@@ -0,0 +1,153 @@
+"""
+fetch_columnar over a jaydebeapi-shaped cursor (a fake java.sql.ResultSet that counts its
+calls) and over plain DB-API cursors (SQLite).
+"""
+from __future__ import annotations
+
+import datetime as dt
+
+from relational_database.columnar_fetch import column_types, fetch_all_columnar, fetch_columnar
+
+INTEGER, BIGINT, DOUBLE, VARCHAR, DATE, TIMESTAMP = 4, -5, 8, 12, 91, 93
+NO_NULLS, NULLABLE = 0, 1
+
+
+class _JavaDate:
+    def __init__(self, text):
+        self._text = text
+
+    def __str__(self):
+        return self._text
+
+
+class _JavaTimestamp(_JavaDate):
+    def __init__(self, text, nanos):
+        super().__init__(text)
+        self._nanos = nanos
+
+    def getNanos(self):
+        return self._nanos
+
+
+class _ResultSet:
+    """Rows of Python values behind the JDBC getters; primitive getters return 0 for NULL."""
+
+    def __init__(self, rows):
+        self._rows = rows
+        self._row = -1
+        self._last = None
+        self.calls = 0
+
+    def setFetchSize(self, size):
+        pass
+
+    def next(self):
+        self._row += 1
+        return self._row < len(self._rows)
+
+    def _get(self, col, null=None):
+        self.calls += 1
+        self._last = self._rows[self._row][col - 1]
+        return null if self._last is None else self._last
+
+    def wasNull(self):
+        self.calls += 1
+        return self._last is None
+
+    def getLong(self, col):
+        return self._get(col, 0)
+
+    def getInt(self, col):
+        value = self._get(col, 0)
+        if not -2**31 <= value < 2**31:
+            raise OverflowError("getInt on a value wider than 32 bits")
+        return value
+
+    def getDouble(self, col):
+        return self._get(col, 0.0)
+
+    def getString(self, col):
+        return self._get(col)
+
+    getDate = getTimestamp = getObject = getString
+
+
+class _Meta:
+    def __init__(self, types, nullable):
+        self._types = types
+        self._nullable = nullable
+
+    def getColumnCount(self):
+        return len(self._types)
+
+    def getColumnType(self, col):
+        return self._types[col - 1]
+
+    def isNullable(self, col):
+        return self._nullable[col - 1]
+
+
+class _JdbcCursor:
+    def __init__(self, columns, types, nullable, rows):
+        self.description = [(name,) for name in columns]
+        self._rs = _ResultSet(rows)
+        self._meta = _Meta(types, nullable)
+
+
+def test_typed_getters_read_jaydebeapi_values():
+    cursor = _JdbcCursor(
+        ["id", "name", "amount", "day", "at"],
+        [INTEGER, VARCHAR, DOUBLE, DATE, TIMESTAMP],
+        [NULLABLE] * 5,
+        [
+            (1, "a", 1.25, _JavaDate("2020-01-02"), _JavaTimestamp("2020-01-02 03:04:05.0", 120000000)),
+            (None, None, None, None, None),
+        ],
+    )
+
+    batch = fetch_all_columnar(cursor)
+
+    assert column_types(cursor) == [INTEGER, VARCHAR, DOUBLE, DATE, TIMESTAMP]
+    assert batch.to_dict() == {
+        "id": [1, None],
+        "name": ["a", None],
+        "amount": [1.25, None],
+        "day": ["2020-01-02", None],
+        "at": [str(dt.datetime(2020, 1, 2, 3, 4, 5, 120000)), None],
+    }
+
+
+def test_integer_columns_read_unsigned_values_past_32_bits():
+    cursor = _JdbcCursor(["id"], [INTEGER], [NO_NULLS], [(4_294_967_295,), (7,)])
+    assert fetch_all_columnar(cursor).column("id") == [4_294_967_295, 7]
+
+
+def test_not_null_primitive_columns_skip_was_null():
+    rows = [(n, n * 2) for n in range(10)]
+    not_null = _JdbcCursor(["a", "b"], [BIGINT, BIGINT], [NO_NULLS, NO_NULLS], rows)
+    nullable = _JdbcCursor(["a", "b"], [BIGINT, BIGINT], [NULLABLE, NULLABLE], rows)
+
+    assert fetch_all_columnar(not_null).rows() == fetch_all_columnar(nullable).rows() == rows
+    assert not_null._rs.calls == 20  # one getter call per cell
+    assert nullable._rs.calls == 40  # plus wasNull()
+
+
+def test_batches_hold_at_most_batch_size_rows():
+    cursor = _JdbcCursor(["n"], [BIGINT], [NO_NULLS], [(n,) for n in range(5)])
+    batches = list(fetch_columnar(cursor, batch_size=2))
+    assert [batch.num_rows for batch in batches] == [2, 2, 1]
+    assert all(batch.types == [BIGINT] for batch in batches)
+
+
+def test_plain_cursors_are_transposed(sqlite_executor):
+    conn = sqlite_executor._connect()
+    try:
+        cursor = conn.execute("SELECT emp_id, first_name FROM bank.employee ORDER BY emp_id")
+        assert column_types(cursor) is None
+        batches = list(fetch_columnar(cursor, batch_size=2))
+    finally:
+        conn.close()
+
+    assert [batch.num_rows for batch in batches] == [2, 2, 1]
+    assert batches[0].records() == [{"emp_id": 1, "first_name": "Alice"}, {"emp_id": 2, "first_name": "Bob"}]
+    assert batches[0].types is None
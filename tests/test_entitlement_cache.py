@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import threading
+
+from graph_database.entitlement_cache import EntitlementCache, memberships_key
+from graph_database.entitlement_util import CURRENT_VERSION_QUERY, EntitlementRepository
+
+
+class _Session:
+    def __init__(self, on_read, on_version):
+        self._on_read = on_read
+        self._on_version = on_version
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, **params):
+        if query == CURRENT_VERSION_QUERY:
+            return _Result([{"version": self._on_version()}])
+        return self._on_read()
+
+
+class _Result(list):
+    def single(self):
+        return self[0] if self else None
+
+
+class _Driver:
+    def __init__(self, on_read, on_version):
+        self._on_read = on_read
+        self._on_version = on_version
+
+    def session(self, database=None):
+        return _Session(self._on_read, self._on_version)
+
+
+class _Registry:
+    def __init__(self, driver):
+        self._driver = driver
+
+    def acquire(self):
+        return self._driver
+
+    def release(self):
+        pass
+
+
+def _repository(cache: EntitlementCache, on_read, on_version=lambda: 0) -> EntitlementRepository:
+    repo = EntitlementRepository(registry=_Registry(_Driver(on_read, on_version)))
+    repo.cache = cache
+    return repo
+
+
+def test_put_with_a_stale_generation_is_dropped():
+    cache = EntitlementCache()
+    generation = cache.generation
+    cache.invalidate_user("user-alice")
+    cache.put(memberships_key("user-alice"), [], user_id="user-alice", generation=generation)
+    assert cache.get(memberships_key("user-alice")) == (False, None)
+    assert cache.stats()["stale_puts"] == 1
+
+
+def test_invalidation_during_the_neo4j_read_is_not_undone():
+    cache = EntitlementCache()
+
+    def read_then_revoke():
+        # the membership is revoked (and its scope invalidated) while this read is in flight
+        cache.invalidate_scope(user_ids=["user-alice"])
+        return [{"policyGroupName": "Finance Group", "policyGroupId": "finance_pg"}]
+
+    repo = _repository(cache, read_then_revoke)
+    assert repo.fetch_user_memberships("user-alice")[0]["policyGroupId"] == "finance_pg"
+    assert cache.get(memberships_key("user-alice")) == (False, None)
+
+
+def test_read_without_invalidation_is_cached():
+    cache = EntitlementCache()
+    repo = _repository(cache, lambda: [{"policyGroupName": "Finance Group", "policyGroupId": "finance_pg"}])
+    repo.fetch_user_memberships("user-alice")
+    found, memberships = cache.get(memberships_key("user-alice"))
+    assert found and memberships[0]["policyGroupId"] == "finance_pg"
+
+
+class _Graph:
+    """Memberships and version of a graph another process mutates."""
+
+    def __init__(self):
+        self.version = 7
+        self.groups = ["finance_pg"]
+        self.reads = 0
+
+    def read(self):
+        self.reads += 1
+        return [{"policyGroupName": g, "policyGroupId": g} for g in self.groups]
+
+
+def test_mutation_by_another_process_clears_the_cache_at_the_next_check():
+    cache = EntitlementCache(check_interval=0)
+    graph = _Graph()
+    repo = _repository(cache, graph.read, lambda: graph.version)
+    assert repo.fetch_user_group_names("user-alice") == ["finance_pg"]
+    assert repo.fetch_user_group_names("user-alice") == ["finance_pg"]
+    assert graph.reads == 1
+
+    # revoked elsewhere: nothing in this process invalidated the entry, only the version moved
+    graph.groups, graph.version = [], 8
+    assert repo.fetch_user_group_names("user-alice") == []
+    assert graph.reads == 2
+    assert cache.stats()["version"] == 8
+    assert cache.stats()["version_clears"] == 1
+
+
+def test_version_is_checked_at_most_once_per_interval():
+    cache = EntitlementCache(check_interval=60)
+    graph = _Graph()
+    checks = []
+
+    def version():
+        checks.append(graph.version)
+        return graph.version
+
+    repo = _repository(cache, graph.read, version)
+    repo.fetch_user_group_names("user-alice")
+    graph.groups, graph.version = [], 8
+    assert repo.fetch_user_group_names("user-alice") == ["finance_pg"]  # until the next check
+    assert checks == [7]
+
+
+def test_failed_version_check_keeps_serving_the_entries(caplog):
+    cache = EntitlementCache(check_interval=0)
+    graph = _Graph()
+    repo = _repository(cache, graph.read, lambda: graph.version)
+    repo.fetch_user_group_names("user-alice")
+
+    def unreachable():
+        raise ConnectionError("neo4j unreachable")
+
+    repo = _repository(cache, graph.read, unreachable)
+    assert repo.fetch_user_group_names("user-alice") == ["finance_pg"]
+    assert graph.reads == 1
+    assert cache.stats()["check_failures"] == 1
+    assert "version check failed" in caplog.text
+
+
+def test_hanging_version_check_does_not_block_the_lookup():
+    cache = EntitlementCache(check_interval=0, check_timeout=0.05)
+    graph = _Graph()
+    repo = _repository(cache, graph.read, lambda: graph.version)
+    repo.fetch_user_group_names("user-alice")
+
+    release = threading.Event()
+
+    def hanging():
+        release.wait(5)
+        return graph.version
+
+    repo = _repository(cache, graph.read, hanging)
+    try:
+        assert repo.fetch_user_group_names("user-alice") == ["finance_pg"]
+        assert cache.stats()["check_failures"] == 1
+    finally:
+        release.set()
@@ -0,0 +1,128 @@
+"""
+The fast paths hand the prefetched group lookup to the entitlement read instead of repeating it.
+"""
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from graph_database import entitlement_util as eu
+from graph_database.entitlement_cache import EntitlementCache, memberships_key
+from relational_database.mysql import entitlement_pipeline as pipeline
+from relational_database.mysql import mysql_entitlement_util as util
+
+SQL = "SELECT e.first_name, d.dept_name FROM bank.employee e JOIN bank.department d ON e.dept_id = d.dept_id"
+
+
+class _RemoteRepository:
+    """The sample in-memory graph posing as a Neo4j-backed repository, recording its reads."""
+
+    local = False
+
+    def __init__(self, repo, calls):
+        self._repo = repo
+        self._calls = calls
+
+    def fetch_user_memberships(self, user_id):
+        self._calls.append(("memberships", user_id))
+        return self._repo.fetch_user_memberships(user_id)
+
+    def fetch_entitlement_context(self, user_id, parsed_tables, memberships=None):
+        self._calls.append(("context", memberships))
+        return self._repo.fetch_entitlement_context(user_id, parsed_tables)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def calls(monkeypatch, repository, sqlite_executor, catalog):
+    calls = []
+    monkeypatch.setattr(util, "_entitlement_repository", lambda: _RemoteRepository(repository, calls))
+    return calls
+
+
+ALICE_GROUPS = [
+    {"policyGroupName": "All Employees", "policyGroupId": "all_employees_pg"},
+    {"policyGroupName": "Finance Group", "policyGroupId": "finance_pg"},
+]
+
+
+def test_fast_path_reuses_the_prefetched_groups(calls):
+    state = pipeline.run_query_fast("user-alice", SQL)
+    assert calls == [("memberships", "user-alice"), ("context", ALICE_GROUPS)]
+    assert state["rows"] == [("Alice", "Finance"), ("Bob", "Finance")]
+
+
+def test_async_path_reuses_the_prefetched_groups(calls):
+    state = asyncio.run(pipeline.run_query_async("user-alice", SQL))
+    assert calls == [("memberships", "user-alice"), ("context", ALICE_GROUPS)]
+    assert state["user_groups"] == ["All Employees", "Finance Group"]
+
+
+def test_in_memory_graph_is_not_prefetched(run_query):
+    state = run_query("user-alice", SQL)
+    assert "user_memberships" not in state
+    assert state["user_groups"] == ["All Employees", "Finance Group"]
+
+
+class _Record(dict):
+    def single(self):
+        return self
+
+
+class _Session:
+    def __init__(self, queries):
+        self._queries = queries
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute_read(self, work):
+        return work(self)
+
+    def run(self, query, **params):
+        self._queries.append((query, params))
+        return _Record(
+            entitlements=[{
+                "tableKey": "bank.department", "columnName": "dept_name", "ruleType": "ROW",
+                "policyDefinition": "Allow access only to rows where dept_name = 'Finance'", "compiled": None,
+            }],
+            rowGovernedTables=["bank.department"],
+        )
+
+
+class _Registry:
+    def __init__(self, queries):
+        self._driver = type("Driver", (), {"session": lambda _, database=None: _Session(queries)})()
+
+    def acquire(self):
+        return self._driver
+
+    def release(self):
+        pass
+
+
+def test_repository_reads_entitlements_of_the_given_groups():
+    queries = []
+    repo = eu.EntitlementRepository(registry=_Registry(queries))
+    repo.cache = EntitlementCache(check_interval=-1)  # only the entitlement read
+    context = repo.fetch_entitlement_context(
+        "user-alice", [{"schema": "bank", "table": "department"}], memberships=ALICE_GROUPS
+    )
+
+    [(query, params)] = queries
+    assert query == eu.FETCH_GROUP_ENTITLEMENT_CONTEXT_QUERY
+    assert params["groupIds"] == ["all_employees_pg", "finance_pg"]
+    assert context.user_groups == ["All Employees", "Finance Group"]
+    assert context.row_governed_tables == ["bank.department"]
+    # the prefetch caches the memberships under its own generation, the context read does not
+    assert repo.cache.get(memberships_key("user-alice")) == (False, None)
+    assert repo.fetch_entitlement_context(
+        "user-alice", [{"schema": "bank", "table": "department"}], memberships=ALICE_GROUPS
+    ).entitlements_by_table == context.entitlements_by_table
+    assert len(queries) == 1
@@ -0,0 +1,72 @@
+"""
+Schema bootstrap against a fake driver that keeps the created constraint/index names, and the
+EXPLAIN report's plan walk.
+"""
+from __future__ import annotations
+
+import re
+
+from fake_neo4j import FakeDriver
+from graph_database.entitlement_schema import (
+    REPOSITORY_QUERIES,
+    SCHEMA_STATEMENTS,
+    _walk_plan,
+    ensure_schema,
+)
+
+WANTED = sorted(statement.split()[2] for statement in SCHEMA_STATEMENTS)
+
+
+def _schema_driver(existing=()):
+    names = set(existing)
+
+    def handler(query, params):
+        if query.startswith("SHOW "):
+            return [{"name": name} for name in sorted(names)]
+        if query.startswith("CREATE "):
+            names.add(query.split()[2])
+        return []
+
+    return FakeDriver(handler), names
+
+
+def test_ensure_schema_creates_what_is_missing_and_is_idempotent():
+    driver, names = _schema_driver(existing=["unique_userId"])
+    first = ensure_schema(driver, database="neo4j")
+    assert first["existing"] == ["unique_userId"]
+    assert first["created"] == [name for name in WANTED if name != "unique_userId"]
+    assert set(WANTED) <= names
+
+    second = ensure_schema(driver, database="neo4j")
+    assert second == {"created": [], "existing": WANTED}
+
+
+def test_every_schema_statement_is_if_not_exists():
+    assert all(" IF NOT EXISTS " in statement for statement in SCHEMA_STATEMENTS)
+
+
+def test_sample_parameters_cover_every_repository_query():
+    for name, (query, params) in REPOSITORY_QUERIES.items():
+        used = set(re.findall(r"\$(\w+)", query))
+        assert used <= set(params), f"{name} is missing sample parameters {sorted(used - set(params))}"
+
+
+def test_plan_walk_separates_index_seeks_from_label_scans():
+    plan = {
+        "operatorType": "ProduceResults@neo4j",
+        "children": [
+            {
+                "operatorType": "Expand(All)@neo4j",
+                "children": [
+                    {"operatorType": "NodeUniqueIndexSeek@neo4j", "args": {"Details": "UNIQUE u:User(userId)"}},
+                    {"operatorType": "NodeByLabelScan@neo4j", "args": {"Details": "c:Column"}},
+                ],
+            }
+        ],
+    }
+    usage = {"indexes": [], "scans": []}
+    _walk_plan(plan, usage)
+    assert usage == {
+        "indexes": ["NodeUniqueIndexSeek: UNIQUE u:User(userId)"],
+        "scans": ["NodeByLabelScan: c:Column"],
+    }
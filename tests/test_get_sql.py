@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+import pytest
+
+from relational_database.mysql import mysql_entitlement_util as util
+
+
+@pytest.mark.parametrize(
+    "text, sql",
+    [
+        ("  SELECT 1 ", "SELECT 1"),
+        ("with t AS (SELECT 1 AS x) SELECT x FROM t", "with t AS (SELECT 1 AS x) SELECT x FROM t"),
+        ("(SELECT 1) UNION (SELECT 2)", "(SELECT 1) UNION (SELECT 2)"),
+        ("Here you go:\n```sql\nWITH t AS (SELECT 1) SELECT * FROM t\n```", "WITH t AS (SELECT 1) SELECT * FROM t"),
+        ("no statement here", ""),
+    ],
+)
+def test_get_sql(text, sql):
+    assert util.get_sql(text) == sql
+
+
+def test_execute_node_refuses_text_without_sql(sqlite_executor):
+    with pytest.raises(ValueError, match="did not produce a SQL statement"):
+        util.execute_node({"rewritten_sql": "Sorry, I cannot rewrite this query."})
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import configparser
+import os
+import threading
+import time
+
+import pytest
+
+from graph_database import in_memory_repository as memory
+from relational_database.mysql import mysql_entitlement_util as util
+from relational_database.mysql.entitlement_pipeline import run_query_fast
+from sample_entitlements import SAMPLE_MEMBERSHIPS, sample_repository
+
+DEPARTMENTS_SQL = "SELECT d.dept_id, d.dept_name FROM bank.department d ORDER BY d.dept_id"
+
+
+@pytest.fixture
+def shared_from_snapshot(tmp_path, monkeypatch, sqlite_executor):
+    snapshot = tmp_path / "entitlements.json"
+    sample_repository().save_snapshot(str(snapshot))
+
+    config = configparser.ConfigParser()
+    config["entitlement"] = {"BACKEND": "memory", "SNAPSHOT": str(snapshot), "REFRESH_INTERVAL": "0"}
+    monkeypatch.setattr(memory, "get_config", lambda: config)
+    monkeypatch.setattr(memory, "_shared_repository", None)
+    monkeypatch.setattr(util, "_entitlement_repository", memory.shared_in_memory_repository)
+    return snapshot
+
+
+def _rewrite_snapshot(path, memberships) -> None:
+    before = os.stat(path).st_mtime_ns
+    sample_repository(memberships).save_snapshot(str(path))
+    os.utime(path, ns=(before + 1_000_000_000, before + 1_000_000_000))
+
+
+def test_revoked_membership_stops_returning_rows(shared_from_snapshot):
+    assert run_query_fast("user-alice", DEPARTMENTS_SQL)["rows"] == [(1, "Finance")]
+
+    revoked = [m for m in SAMPLE_MEMBERSHIPS if m != ("user-alice", "finance_pg")]
+    _rewrite_snapshot(shared_from_snapshot, revoked)
+
+    state = run_query_fast("user-alice", DEPARTMENTS_SQL)
+    assert state["decision"].action == "deny"
+    assert state["rows"] == []
+
+
+def test_reload_keeps_the_shared_instance(shared_from_snapshot):
+    first = memory.shared_in_memory_repository()
+    _rewrite_snapshot(shared_from_snapshot, SAMPLE_MEMBERSHIPS[:1])
+    assert memory.shared_in_memory_repository() is first
+    assert first.fetch_user_group_names("user-bob") == []
+
+
+def test_unchanged_source_is_not_reloaded(shared_from_snapshot, monkeypatch):
+    memory.shared_in_memory_repository()
+    monkeypatch.setattr(memory, "_hydrate", lambda snapshot: pytest.fail("reloaded an unchanged snapshot"))
+    memory.shared_in_memory_repository()
+
+
+def test_failed_source_check_keeps_serving_the_loaded_graph(shared_from_snapshot, monkeypatch, caplog):
+    first = memory.shared_in_memory_repository()
+
+    def unreachable(snapshot):
+        raise ConnectionError("neo4j unavailable")
+
+    monkeypatch.setattr(memory, "_source_version", unreachable)
+    with caplog.at_level("WARNING", logger="graph_database.in_memory_repository"):
+        state = run_query_fast("user-alice", DEPARTMENTS_SQL)
+
+    assert memory.shared_in_memory_repository() is first
+    assert state["rows"] == [(1, "Finance")]
+    assert "source check failed (ConnectionError: neo4j unavailable)" in caplog.text
+
+
+def test_hanging_source_check_does_not_block_readers(shared_from_snapshot, monkeypatch):
+    first = memory.shared_in_memory_repository()
+    release = threading.Event()
+    monkeypatch.setattr(memory, "_shared_refresh_timeout", 0.05)
+    monkeypatch.setattr(memory, "_source_version", lambda snapshot: release.wait(5))
+    try:
+        started = time.monotonic()
+        assert memory.shared_in_memory_repository() is first
+        assert memory.shared_in_memory_repository() is first
+        assert time.monotonic() - started < 1
+        assert first.fetch_user_group_names("user-alice") == ["All Employees", "Finance Group"]
+    finally:
+        release.set()
+        memory._shared_pending.result(timeout=5)
@@ -0,0 +1,175 @@
+"""
+JdbcConnectionPool with a fake connect(): no JVM, no database.
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from relational_database.executor import MySQLJdbcExecutor
+from relational_database.jdbc_pool import JdbcConnectionPool
+
+
+class _Cursor:
+    def __init__(self, conn):
+        self._conn = conn
+
+    def execute(self, sql):
+        if self._conn.broken:
+            raise ConnectionError("connection reset")
+
+    def fetchall(self):
+        return [(1,)]
+
+    def close(self):
+        pass
+
+
+class _Connection:
+    def __init__(self, number):
+        self.number = number
+        self.broken = False
+        self.closed = False
+
+    def cursor(self):
+        return _Cursor(self)
+
+    def close(self):
+        self.closed = True
+
+
+class _Connect:
+    def __init__(self):
+        self.opened = []
+
+    def __call__(self, settings):
+        conn = _Connection(len(self.opened) + 1)
+        self.opened.append(conn)
+        return conn
+
+
+def _pool(**overrides):
+    settings = {
+        "min_size": 1,
+        "max_size": 2,
+        "acquire_timeout": 1.0,
+        "max_lifetime": 1800.0,
+        "validate_after": 30.0,
+        "validation_query": "SELECT 1",
+        **overrides,
+    }
+    connect = _Connect()
+    return JdbcConnectionPool("mysql", connect=connect, settings=settings), connect
+
+
+def test_acquire_times_out_at_max_size():
+    pool, connect = _pool(max_size=2)
+    pool.acquire()
+    pool.acquire()
+    with pytest.raises(TimeoutError):
+        pool.acquire(timeout=0.05)
+    assert len(connect.opened) == 2
+    assert pool.stats()["timeouts"] == 1
+
+
+def test_acquire_waits_for_a_release_at_max_size():
+    pool, connect = _pool(max_size=1)
+    first = pool.acquire()
+    acquired = []
+    waiter = threading.Thread(target=lambda: acquired.append(pool.acquire(timeout=5.0)))
+    waiter.start()
+    time.sleep(0.05)
+    assert not acquired  # blocked: the only connection is borrowed
+
+    pool.release(first)
+    waiter.join(timeout=5.0)
+    assert acquired == [first]
+    assert len(connect.opened) == 1
+    assert pool.stats()["wait_seconds_max"] >= 0.04
+
+
+def test_connection_past_max_lifetime_is_recycled():
+    pool, connect = _pool(max_lifetime=0.05)
+    first = pool.acquire()
+    pool.release(first)
+    time.sleep(0.06)
+
+    second = pool.acquire()
+    assert second is not first and first.closed
+    assert pool.stats()["recycled"] == 1
+    assert pool.stats()["size"] == 1
+
+
+def test_failed_block_validates_and_drops_a_broken_connection():
+    pool, connect = _pool()
+    with pytest.raises(ConnectionError):
+        with pool.connection() as conn:
+            conn.broken = True
+            conn.cursor().execute("SELECT 1")
+    assert conn.closed
+    assert pool.stats()["validation_failures"] == 1
+    assert pool.stats()["size"] == 0
+
+    with pool.connection() as fresh:
+        assert fresh is not conn
+
+
+def test_failed_block_keeps_a_healthy_connection():
+    pool, connect = _pool()
+    with pytest.raises(ValueError):
+        with pool.connection() as conn:
+            raise ValueError("bad query")
+    assert not conn.closed
+    with pool.connection() as again:
+        assert again is conn
+
+
+def test_idle_connection_is_validated_before_reuse():
+    pool, connect = _pool(validate_after=0.0)
+    conn = pool.acquire()
+    pool.release(conn)
+    conn.broken = True  # e.g. the server closed it while idle
+    time.sleep(0.01)
+
+    replacement = pool.acquire()
+    assert replacement is not conn and conn.closed
+    assert pool.stats()["validation_failures"] == 1
+
+
+def test_webapp_startup_warms_the_executor_pool(monkeypatch):
+    from webapp import main
+
+    pool, connect = _pool(min_size=2, max_size=4)
+    monkeypatch.setattr(main, "shared_executor", lambda: MySQLJdbcExecutor())
+    monkeypatch.setattr(main, "jdbc_pool", lambda section: pool)
+
+    asyncio.run(main._warm_executor_pool())
+
+    assert len(connect.opened) == 2
+    assert pool.stats()["size"] == 2
+
+
+def test_webapp_startup_skips_warming_the_sqlite_executor(monkeypatch, sqlite_executor):
+    from webapp import main
+
+    monkeypatch.setattr(main, "jdbc_pool", lambda section: pytest.fail("warmed a JDBC pool for SQLite"))
+    asyncio.run(main._warm_executor_pool())
+
+
+def test_oracle_query_error_drops_the_broken_connection(monkeypatch):
+    pytest.importorskip("jaydebeapi")
+    from relational_database.oracle import oracle_connection
+
+    pool, connect = _pool()
+    monkeypatch.setattr(oracle_connection, "jdbc_pool", lambda section: pool)
+    conn = pool.acquire()
+    conn.broken = True
+    pool.release(conn)
+
+    with pytest.raises(ConnectionError):
+        oracle_connection.run_oracle_query("SELECT 1 FROM dual")
+    assert conn.closed
+    assert pool.stats()["validation_failures"] == 1
@@ -0,0 +1,175 @@
+"""
+Column masks through the pipeline on SQLite: user-alice sees bank.employee.salary masked (0.00),
+user-bob (Client Support) sees it unmasked. Star expansion reads column names from the executor.
+"""
+from __future__ import annotations
+
+import pytest
+
+from relational_database import mask_engine
+
+EMPLOYEE_1 = (1, "Alice", "Wang", "Financial Analyst", 0.0, "2020-03-15", 1)
+MASKED_EMPLOYEE = "e.emp_id, e.first_name, e.last_name, e.job_title, 0.00 AS salary, e.hire_date"
+
+
+def test_star_spells_out_the_masked_table(run_query, catalog):
+    state = run_query("user-alice", "SELECT * FROM bank.employee e WHERE e.emp_id = 1")
+    assert state["rewritten_sql"] == f"SELECT {MASKED_EMPLOYEE}, e.dept_id FROM bank.employee AS e WHERE e.emp_id = 1"
+    assert state["rows"] == [EMPLOYEE_1]
+
+
+def test_star_is_kept_for_an_unmasked_user(run_query, catalog):
+    state = run_query("user-bob", "SELECT * FROM bank.employee e WHERE e.emp_id = 1")
+    assert state["rewritten_sql"] == "SELECT * FROM bank.employee AS e WHERE e.emp_id = 1"
+    assert state["rows"][0][4] == 85000.0
+
+
+def test_qualified_star_only_expands_the_masked_table(run_query, catalog):
+    state = run_query(
+        "user-alice",
+        "SELECT d.*, e.* FROM bank.department d JOIN bank.employee e ON e.dept_id = d.dept_id WHERE e.emp_id = 1",
+    )
+    assert state["rewritten_sql"] == (
+        f"SELECT d.*, {MASKED_EMPLOYEE}, e.dept_id FROM bank.department AS d "
+        "JOIN bank.employee AS e ON e.dept_id = d.dept_id WHERE e.emp_id = 1 AND d.dept_name = 'Finance'"
+    )
+    assert state["rows"] == [(1, "Finance", "New York") + EMPLOYEE_1]
+
+
+@pytest.mark.parametrize(
+    "sql, rewritten",
+    [
+        (
+            "SELECT * FROM bank.employee e JOIN bank.department d USING (dept_id) WHERE e.emp_id = 1",
+            f"SELECT {MASKED_EMPLOYEE}, e.dept_id, d.dept_name, d.location FROM bank.employee AS e "
+            "JOIN bank.department AS d USING (dept_id) WHERE e.emp_id = 1 AND d.dept_name = 'Finance'",
+        ),
+        (
+            "SELECT * FROM bank.employee e NATURAL JOIN bank.department d WHERE e.emp_id = 1",
+            f"SELECT {MASKED_EMPLOYEE}, e.dept_id, d.dept_name, d.location FROM bank.employee AS e "
+            "NATURAL JOIN bank.department AS d WHERE e.emp_id = 1 AND d.dept_name = 'Finance'",
+        ),
+    ],
+    ids=["using", "natural"],
+)
+def test_star_outputs_merged_join_columns_once(run_query, catalog, sql, rewritten):
+    state = run_query("user-alice", sql)
+    assert state["rewritten_sql"] == rewritten
+    assert state["rows"] == [EMPLOYEE_1 + ("Finance", "New York")]
+
+
+def test_star_drops_merged_columns_of_the_masked_table(run_query, catalog):
+    state = run_query(
+        "user-alice", "SELECT * FROM bank.department d JOIN bank.employee e USING (dept_id) WHERE e.emp_id = 1"
+    )
+    assert state["rewritten_sql"] == (
+        f"SELECT d.*, {MASKED_EMPLOYEE} FROM bank.department AS d "
+        "JOIN bank.employee AS e USING (dept_id) WHERE e.emp_id = 1 AND d.dept_name = 'Finance'"
+    )
+    assert state["rows"] == [(1, "Finance", "New York") + EMPLOYEE_1[:-1]]
+
+
+@pytest.mark.parametrize(
+    "sql, rewritten, rows",
+    [
+        (
+            "SELECT e.first_name, e.salary AS pay FROM bank.employee e WHERE e.emp_id = 1",
+            "SELECT e.first_name, 0.00 AS pay FROM bank.employee AS e WHERE e.emp_id = 1",
+            [("Alice", 0.0)],
+        ),
+        (
+            "SELECT salary FROM bank.employee WHERE emp_id = 1",
+            "SELECT 0.00 AS salary FROM bank.employee WHERE emp_id = 1",
+            [(0.0,)],
+        ),
+        (
+            "SELECT SUM(e.salary) AS total FROM bank.employee e",
+            "SELECT SUM(0.00) AS total FROM bank.employee AS e",
+            [(0.0,)],
+        ),
+        (
+            "SELECT x.pay FROM (SELECT e.salary AS pay FROM bank.employee e WHERE e.emp_id = 1) x",
+            "SELECT x.pay FROM (SELECT 0.00 AS pay FROM bank.employee AS e WHERE e.emp_id = 1) AS x",
+            [(0.0,)],
+        ),
+    ],
+    ids=["aliased", "unqualified", "aggregate", "derived table"],
+)
+def test_masks_follow_aliases(run_query, catalog, sql, rewritten, rows):
+    state = run_query("user-alice", sql)
+    assert state["rewritten_sql"] == rewritten
+    assert state["rows"] == rows
+
+
+def test_no_mask_policy_does_not_mask(run_query, repository, catalog):
+    repository.add_mask_policy(
+        "bank", "bank", "department", "department", "bank.department.location", "location",
+        "no_mask_location", "Location", "No mask on location for the Finance group",
+        "finance_pg", "Finance Group",
+    )
+    state = run_query("user-alice", "SELECT * FROM bank.department d")
+    assert state["rewritten_sql"] == "SELECT * FROM bank.department AS d WHERE d.dept_name = 'Finance'"
+    assert state["rows"] == [(1, "Finance", "New York")]
+
+
+def test_executor_columns_follow_the_catalog_version(sqlite_executor, catalog):
+    assert mask_engine.executor_columns("bank.department") == ["dept_id", "dept_name", "location"]
+    sqlite_executor.execute_update("ALTER TABLE bank.department ADD COLUMN region TEXT")
+
+    assert mask_engine.executor_columns("bank.department") == ["dept_id", "dept_name", "location"]
+    catalog.current += 1
+    assert mask_engine.executor_columns("bank.department") == ["dept_id", "dept_name", "location", "region"]
+
+
+@pytest.mark.parametrize(
+    "sql, rewritten, rows",
+    [
+        (
+            "SELECT first_name FROM bank.employee ORDER BY salary DESC",
+            "SELECT first_name FROM bank.employee",
+            [("Alice",), ("Bob",), ("Carol",), ("David",), ("Eva",)],
+        ),
+        (
+            "SELECT e.first_name FROM bank.employee e WHERE e.salary > 100000",
+            "SELECT e.first_name FROM bank.employee AS e WHERE 0.00 > 100000",
+            [],
+        ),
+        (
+            "SELECT salary, COUNT(*) AS n FROM bank.employee GROUP BY salary",
+            "SELECT 0.00 AS salary, COUNT(*) AS n FROM bank.employee GROUP BY NULL",
+            [(0.0, 5)],
+        ),
+        (
+            "SELECT dept_id FROM bank.employee GROUP BY dept_id HAVING MAX(salary) > 90000",
+            "SELECT dept_id FROM bank.employee GROUP BY dept_id HAVING MAX(0.00) > 90000",
+            [],
+        ),
+        (
+            "SELECT e.first_name FROM bank.employee e "
+            "WHERE EXISTS (SELECT 1 FROM bank.employee m WHERE m.dept_id = e.dept_id AND e.salary > m.salary)",
+            "SELECT e.first_name FROM bank.employee AS e "
+            "WHERE EXISTS(SELECT 1 FROM bank.employee AS m WHERE m.dept_id = e.dept_id AND 0.00 > 0.00)",
+            [],
+        ),
+        (
+            "SELECT first_name AS salary FROM bank.employee ORDER BY salary DESC",
+            "SELECT first_name AS salary FROM bank.employee ORDER BY salary DESC",
+            [("Eva",), ("David",), ("Carol",), ("Bob",), ("Alice",)],
+        ),
+    ],
+    ids=["order by", "where", "group by", "having", "correlated subquery", "order by output alias"],
+)
+def test_masked_columns_cannot_be_probed_outside_the_projection(run_query, catalog, sql, rewritten, rows):
+    state = run_query("user-alice", sql)
+    assert state["rewritten_sql"] == rewritten
+    assert state["rows"] == rows
+
+
+def test_unmasked_user_filters_and_sorts_on_the_real_values(run_query, catalog):
+    state = run_query(
+        "user-bob", "SELECT e.first_name FROM bank.employee e WHERE e.salary > 90000 ORDER BY e.salary DESC"
+    )
+    assert state["rewritten_sql"] == (
+        "SELECT e.first_name FROM bank.employee AS e WHERE e.salary > 90000 ORDER BY e.salary DESC"
+    )
+    assert state["rows"] == [("Bob",), ("Carol",)]
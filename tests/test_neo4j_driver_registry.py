@@ -0,0 +1,93 @@
+"""
+The process-wide driver registry: one driver per process, closed with its last reference.
+"""
+from __future__ import annotations
+
+import pytest
+
+from fake_neo4j import FakeDriver
+from graph_database import neo4j_driver_registry as registry_module
+from graph_database.neo4j_driver_registry import Neo4jDriverRegistry
+
+SETTINGS = {
+    "url": "neo4j://graph:7687",
+    "auth": ("neo4j", "secret"),
+    "database": "entitlement",
+    "max_connection_pool_size": 10,
+    "connection_acquisition_timeout": 5.0,
+    "max_connection_lifetime": 600.0,
+}
+
+
+class _GraphDatabase:
+    def __init__(self):
+        self.created = []
+
+    def driver(self, url, **kwargs):
+        driver = FakeDriver(lambda query, params: [])
+        self.created.append((url, kwargs, driver))
+        return driver
+
+
+@pytest.fixture
+def graph_database(monkeypatch):
+    fake = _GraphDatabase()
+    monkeypatch.setattr(registry_module, "GraphDatabase", fake)
+    return fake
+
+
+def _registry() -> Neo4jDriverRegistry:
+    registry = Neo4jDriverRegistry()
+    registry._settings = dict(SETTINGS)
+    return registry
+
+
+def test_holders_share_one_driver_with_the_pool_settings(graph_database):
+    registry = _registry()
+    first, second = registry.acquire(), registry.acquire()
+    assert first is second
+    [(url, kwargs, _)] = graph_database.created
+    assert url == "neo4j://graph:7687"
+    assert kwargs == {
+        "auth": ("neo4j", "secret"),
+        "max_connection_pool_size": 10,
+        "connection_acquisition_timeout": 5.0,
+        "max_connection_lifetime": 600.0,
+    }
+    assert registry.database == "entitlement"
+
+
+def test_driver_is_closed_with_the_last_reference(graph_database):
+    registry = _registry()
+    driver = registry.acquire()
+    registry.acquire()
+    registry.release()
+    assert not driver.closed and registry.stats()["references"] == 1
+    registry.release()
+    assert driver.closed and not registry.stats()["open"]
+
+    # a later holder gets a new driver; extra releases are ignored
+    registry.release()
+    assert registry.acquire() is not driver
+    assert registry.stats()["drivers_created"] == 2
+
+
+def test_close_ignores_outstanding_references(graph_database):
+    registry = _registry()
+    driver = registry.acquire()
+    registry.acquire()
+    registry.close()
+    assert driver.closed
+    assert registry.stats()["references"] == 0
+
+
+def test_repository_close_drops_only_its_own_reference(graph_database):
+    from graph_database.entitlement_util import EntitlementRepository
+
+    registry = _registry()
+    driver = registry.acquire()  # a long-lived holder, e.g. the rewrite pipeline
+    repo = EntitlementRepository(registry=registry)
+    assert repo.driver is driver
+    repo.close()
+    repo.close()
+    assert not driver.closed and registry.stats()["references"] == 1
@@ -0,0 +1,114 @@
+"""
+Compiled policy payloads: what the repositories write ($compiled) is what the read
+projection returns and what the rewriter applies; re-adding a policy refreshes it.
+"""
+from __future__ import annotations
+
+import re
+
+import pytest
+
+from fake_neo4j import FakeDriver
+from graph_database.entitlement_cache import EntitlementCache
+from graph_database.entitlement_util import (
+    ADD_MASK_POLICY_QUERY,
+    ADD_ROW_POLICY_QUERY,
+    BULK_UPSERT_POLICIES_QUERY,
+    MERGE_POLICY_INTO_GROUP_QUERY,
+    EntitlementRepository,
+)
+from graph_database.in_memory_repository import _compiled_of
+from graph_database.policy_compiler import COMPILED_POLICY_PROJECTION, compile_definition, policy_properties
+
+DEFINITIONS = [
+    "Allow access only to rows where dept_name = 'Finance'",
+    "Allow rows where region IN ('EMEA', 'APAC')",
+    "Mask salary for bank.employee: masked for all users EXCEPT members of Client Support Team, HR Group",
+    "Mask ssn with value of 0",
+    "No mask on hire_date",
+    "",
+]
+
+FINANCE_FILTER = "Allow access only to rows where dept_name = 'Finance'"
+
+
+class _Registry:
+    def __init__(self, driver):
+        self._driver = driver
+
+    def acquire(self):
+        return self._driver
+
+    def release(self):
+        pass
+
+
+@pytest.mark.parametrize("definition", DEFINITIONS)
+def test_stored_properties_read_back_as_the_compiled_definition(definition):
+    # Policy node properties -> COMPILED_POLICY_PROJECTION shape (the in-memory graph's reader)
+    assert _compiled_of(policy_properties(definition)) == compile_definition(definition)
+
+
+def test_projection_reads_every_written_property():
+    projected = dict(re.findall(r"(\w+): p\.(compiled\w+)", COMPILED_POLICY_PROJECTION))
+    written = policy_properties(FINANCE_FILTER)
+    assert set(projected.values()) == set(written) - {"compiledVersion"}
+    assert set(projected) == set(compile_definition(FINANCE_FILTER))
+    assert "p.compiledVersion IS NULL" in COMPILED_POLICY_PROJECTION
+
+
+def test_repository_writes_the_compiled_payload():
+    driver = FakeDriver(lambda query, params: [{"version": 1}] if "EntitlementVersion" in query else [])
+    repo = EntitlementRepository(registry=_Registry(driver))
+    repo.cache = EntitlementCache(check_interval=-1)
+    repo.add_row_policy(
+        "bank", "bank", "department", "department", "bank.department.dept_name", "dept_name",
+        "row_filter_finance_only", "Finance Department Only", FINANCE_FILTER,
+    )
+    [params] = [params for query, params in driver.queries if query == ADD_ROW_POLICY_QUERY]
+    assert params["compiled"] == policy_properties(FINANCE_FILTER)
+
+
+@pytest.mark.parametrize(
+    "query", [ADD_MASK_POLICY_QUERY, ADD_ROW_POLICY_QUERY, MERGE_POLICY_INTO_GROUP_QUERY, BULK_UPSERT_POLICIES_QUERY]
+)
+def test_policy_merges_set_the_compiled_payload_on_create_and_on_match(query):
+    payload = "row.compiled" if "UNWIND $rows" in query else "$compiled"
+    assert re.search(rf"ON CREATE SET[^;]*?p \+= {re.escape(payload)}\s+ON MATCH SET p \+= CASE", query)
+
+
+def test_rewriter_applies_the_stored_compiled_filter(run_query, repository):
+    # the stored values, not the definition text, decide the filter
+    policy = repository._nodes["Policy"]["row_filter_finance_only"]
+    policy["compiledValues"] = ["IT"]
+    repository._indexes = None
+    state = run_query("user-alice", "SELECT dept_name FROM bank.department")
+    assert "'IT'" in state["rewritten_sql"] and "'Finance'" not in state["rewritten_sql"]
+    assert state["rows"] == [("IT",)]
+
+
+def test_readding_a_policy_compiles_one_that_never_was(run_query, repository):
+    policy = repository._nodes["Policy"]["row_filter_finance_only"]
+    for key in list(policy):
+        if key.startswith("compiled"):
+            del policy[key]
+    repository._indexes = None
+    context = repository.fetch_entitlement_context("user-alice", [{"schema": "bank", "table": "department"}])
+    assert [e["compiled"] for e in context.entitlements_by_table["bank.department"]] == [None]
+
+    repository.add_row_policy(
+        "bank", "bank", "department", "department", "bank.department.dept_name", "dept_name",
+        "row_filter_finance_only", "Finance Department Only", FINANCE_FILTER,
+    )
+    context = repository.fetch_entitlement_context("user-alice", [{"schema": "bank", "table": "department"}])
+    [entitlement] = context.entitlements_by_table["bank.department"]
+    assert entitlement["compiled"] == compile_definition(FINANCE_FILTER)
+
+
+def test_readding_with_another_definition_keeps_the_stored_policy(repository):
+    before = dict(repository._nodes["Policy"]["row_filter_finance_only"])
+    repository.add_row_policy(
+        "bank", "bank", "department", "department", "bank.department.dept_name", "dept_name",
+        "row_filter_finance_only", "Finance Department Only", "Allow access only to rows where dept_name = 'HR'",
+    )
+    assert repository._nodes["Policy"]["row_filter_finance_only"] == before
@@ -0,0 +1,100 @@
+"""
+/api/query deadlines and disconnects stop the statement in the database, and SQL the pipeline
+cannot run is a 400, not a 500.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import HTTPException
+
+from webapp import query_api
+
+# a statement SQLite needs minutes for, unless interrupted
+SLOW_SQL = (
+    "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 1000000000) "
+    "SELECT COUNT(*) FROM n"
+)
+
+
+class _Request:
+    """Starlette Request stand-in: disconnected after the given number of polls."""
+
+    def __init__(self, disconnect_after=None):
+        self._polls = 0
+        self._disconnect_after = disconnect_after
+
+    async def is_disconnected(self):
+        self._polls += 1
+        return self._disconnect_after is not None and self._polls > self._disconnect_after
+
+
+@pytest.fixture
+def execute_pool(monkeypatch, run_query):
+    # one worker: a statement left running would block every later query
+    pool = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(query_api, "_execute_pool", pool)
+    monkeypatch.setattr(query_api, "DISCONNECT_POLL_SECONDS", 0.05)
+    yield pool
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _query(sql, request=None, timeout_seconds=None):
+    req = query_api.QueryRequest(user_id="user-alice", sql=sql, timeout_seconds=timeout_seconds)
+    return asyncio.run(query_api.run_entitled_query(req, request or _Request()))
+
+
+def _worker_is_free(pool):
+    started = time.monotonic()
+    pool.submit(lambda: None).result(timeout=5)
+    return time.monotonic() - started < 5
+
+
+def test_query_returns_the_entitled_rows(execute_pool):
+    response = _query("SELECT first_name FROM bank.employee ORDER BY emp_id")
+
+    assert response["rows"] == [["Alice"], ["Bob"], ["Carol"], ["David"], ["Eva"]]
+    assert response["row_count"] == 5
+
+
+def test_deadline_cancels_the_running_statement(execute_pool):
+    with pytest.raises(HTTPException) as raised:
+        _query(SLOW_SQL, timeout_seconds=0.3)
+
+    assert raised.value.status_code == 504
+    assert _worker_is_free(execute_pool)
+    assert _query("SELECT first_name FROM bank.employee ORDER BY emp_id")["row_count"] == 5
+
+
+def test_client_disconnect_cancels_the_running_statement(execute_pool):
+    with pytest.raises(HTTPException) as raised:
+        _query(SLOW_SQL, request=_Request(disconnect_after=3), timeout_seconds=30)
+
+    assert raised.value.status_code == 499
+    assert _worker_is_free(execute_pool)
+
+
+@pytest.mark.parametrize("sql, detail", [
+    ("SELECT 'unterminated", "invalid SQL: Error tokenizing"),
+    ("SELECT first_name FROM bank.employee WHERE (", "invalid SQL:"),
+    ("SHOW TABLES", "Rewrite did not produce a SQL statement"),
+])
+def test_sql_the_pipeline_cannot_run_is_a_bad_request(execute_pool, sql, detail):
+    with pytest.raises(HTTPException) as raised:
+        _query(sql)
+
+    assert raised.value.status_code == 400
+    assert raised.value.detail.startswith(detail)
+
+
+def test_rewrite_and_stream_map_invalid_sql_to_bad_request(execute_pool):
+    rewrite = query_api.QueryRequest(user_id="user-alice", sql="SELECT 'unterminated")
+    stream = query_api.QueryStreamRequest(user_id="user-alice", sql="SHOW TABLES")
+
+    for call in (query_api.rewrite_entitled_query(rewrite, _Request()), query_api.stream_entitled_query(stream)):
+        with pytest.raises(HTTPException) as raised:
+            asyncio.run(call)
+        assert raised.value.status_code == 400
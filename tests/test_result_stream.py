@@ -0,0 +1,125 @@
+"""
+Streaming execution on SQLite: batches of fetch_size rows, NDJSON/CSV encoding of the entitled
+result, the pooled connection handed back however the stream ends, and /api/query/stream.
+"""
+from __future__ import annotations
+
+import asyncio
+import csv
+import datetime as dt
+import decimal
+import io
+import json
+
+import pytest
+
+from relational_database.mysql.mysql_entitlement_util import run_query_stream
+from relational_database.result_stream import EmptyResult, csv_chunks, encode, ndjson_chunks, stream_query
+from webapp import query_api
+
+EMPLOYEES_SQL = "SELECT emp_id, first_name, salary FROM bank.employee ORDER BY emp_id"
+
+
+class _CountingPool:
+    """The SQLite executor's connection source, counting borrowed connections."""
+
+    def __init__(self, executor):
+        self._connections = executor._connections
+        self.borrowed = 0
+        self.failed = 0
+
+    def acquire(self, timeout=None):
+        self.borrowed += 1
+        return self._connections.acquire(timeout)
+
+    def release(self, conn, validate=False):
+        self.borrowed -= 1
+        self.failed += validate
+        self._connections.release(conn, validate)
+
+
+def test_rows_come_in_fetch_size_batches(sqlite_executor):
+    pool = _CountingPool(sqlite_executor)
+    result = stream_query(EMPLOYEES_SQL, fetch_size=2, pool=pool)
+    assert result.columns == ["emp_id", "first_name", "salary"]
+    assert [len(rows) for rows in result.batches()] == [2, 2, 1]
+    assert result.rows == 5
+    assert pool.borrowed == 0
+
+
+def test_closing_an_unfinished_stream_returns_the_connection(sqlite_executor):
+    pool = _CountingPool(sqlite_executor)
+    with stream_query(EMPLOYEES_SQL, fetch_size=2, pool=pool) as result:
+        batches = result.batches()
+        assert len(next(batches)) == 2
+        assert pool.borrowed == 1
+        batches.close()
+    assert pool.borrowed == 0
+
+    never_read = stream_query(EMPLOYEES_SQL, pool=pool)
+    never_read.close()
+    assert (pool.borrowed, pool.failed) == (0, 0)
+
+
+def test_a_failing_statement_releases_the_connection_for_validation(sqlite_executor):
+    pool = _CountingPool(sqlite_executor)
+    with pytest.raises(Exception):
+        stream_query("SELECT nope FROM bank.employee", pool=pool)
+    assert (pool.borrowed, pool.failed) == (0, 1)
+
+
+def test_ndjson_stream_of_the_entitled_result(run_query):
+    state, result = run_query_stream("user-alice", EMPLOYEES_SQL, fetch_size=2)
+    lines = b"".join(encode(result, "ndjson")).decode("utf-8").splitlines()
+    records = [json.loads(line) for line in lines]
+    assert records == [
+        {"emp_id": row[0], "first_name": row[1], "salary": row[2]}
+        for row in run_query("user-alice", EMPLOYEES_SQL)["rows"]
+    ]
+    assert {r["salary"] for r in records} == {0.0}  # masked for alice
+    assert "rows" not in state
+
+
+def test_csv_stream_has_a_header_then_one_chunk_per_batch(run_query):
+    _, result = run_query_stream("user-bob", EMPLOYEES_SQL, fetch_size=2)
+    chunks = list(encode(result, "csv"))
+    assert len(chunks) == 4
+    rows = list(csv.reader(io.StringIO(b"".join(chunks).decode("utf-8"))))
+    assert rows[0] == ["emp_id", "first_name", "salary"]
+    assert rows[1] == ["1", "Alice", "85000.0"]  # unmasked for bob
+    assert len(rows) == 6
+
+
+def test_denied_query_streams_no_rows_without_a_database_round_trip(run_query, sqlite_executor, monkeypatch):
+    monkeypatch.setattr(sqlite_executor, "stream", lambda *a, **k: pytest.fail("the denied query reached the executor"))
+    _, result = run_query_stream("user-bob", "SELECT dept_id, dept_name FROM bank.department")
+    assert isinstance(result, EmptyResult)
+    assert result.columns == ["dept_id", "dept_name"]
+    assert list(encode(result, "ndjson")) == []
+    assert list(encode(result, "csv")) == [b"dept_id,dept_name\r\n"]
+
+
+def test_encoders_convert_decimals_dates_and_bytes():
+    row = (decimal.Decimal("12.50"), dt.date(2020, 3, 15), b"\x01\xff", None)
+    columns = ["amount", "day", "raw", "missing"]
+    [chunk] = list(ndjson_chunks(columns, [[row]]))
+    assert json.loads(chunk) == {"amount": "12.50", "day": "2020-03-15", "raw": "01ff", "missing": None}
+    assert b"".join(csv_chunks(columns, [[row]])) == b"amount,day,raw,missing\r\n12.50,2020-03-15,b'\\x01\\xff',\r\n"
+
+
+def test_unknown_format_is_rejected(sqlite_executor):
+    with sqlite_executor.stream(EMPLOYEES_SQL) as result:
+        with pytest.raises(ValueError):
+            encode(result, "xml")
+
+
+def test_stream_endpoint_sends_the_encoded_result(run_query):
+    async def _body():
+        response = await query_api.stream_entitled_query(
+            query_api.QueryStreamRequest(user_id="user-alice", sql=EMPLOYEES_SQL, format="ndjson", fetch_size=2)
+        )
+        assert response.media_type == "application/x-ndjson"
+        return b"".join([chunk async for chunk in response.body_iterator])
+
+    lines = asyncio.run(_body()).decode("utf-8").splitlines()
+    assert [json.loads(line)["emp_id"] for line in lines] == [1, 2, 3, 4, 5]
@@ -0,0 +1,52 @@
+"""
+The rewrite plan cache in the pipeline: a hit renders the same SQL as a fresh rewrite, and a
+column catalog change (star expansion over a masked table) misses.
+"""
+from __future__ import annotations
+
+import pytest
+
+from relational_database.mysql import mysql_entitlement_util as util
+from relational_database.rewrite_cache import RewriteCache
+
+
+@pytest.fixture
+def plans(monkeypatch):
+    cache = RewriteCache()
+    monkeypatch.setattr(util, "rewrite_cache", cache)
+    return cache
+
+
+def _fresh_rewrite(run_query, monkeypatch, user_id, sql):
+    with monkeypatch.context() as m:
+        m.setattr(util, "rewrite_cache", None)
+        return run_query(user_id, sql)["rewritten_sql"]
+
+
+@pytest.mark.parametrize(
+    "user_id, template",
+    [
+        ("user-alice", "SELECT * FROM bank.employee e WHERE e.emp_id = {}"),
+        ("user-alice", "SELECT e.first_name, d.dept_name FROM bank.employee e "
+                       "JOIN bank.department d ON e.dept_id = d.dept_id WHERE e.emp_id = {}"),
+        ("user-bob", "SELECT e.first_name, e.salary FROM bank.employee e WHERE e.emp_id = {}"),
+    ],
+    ids=["masked star", "row filter", "unmasked"],
+)
+def test_hit_matches_a_fresh_rewrite(run_query, plans, monkeypatch, user_id, template):
+    run_query(user_id, template.format(1))
+    state = run_query(user_id, template.format(2))
+    assert plans.stats()["hits"] == 1
+    assert state["rewritten_sql"] == _fresh_rewrite(run_query, monkeypatch, user_id, template.format(2))
+
+
+def test_catalog_change_misses(run_query, plans, catalog, sqlite_executor):
+    sql = "SELECT * FROM bank.employee e WHERE e.emp_id = 1"
+    run_query("user-alice", sql)
+    sqlite_executor.execute_update("ALTER TABLE bank.employee ADD COLUMN badge TEXT")
+    catalog.current += 1
+
+    state = run_query("user-alice", sql)
+    assert plans.stats()["hits"] == 0
+    assert state["rewritten_sql"].startswith("SELECT e.emp_id, e.first_name, e.last_name, e.job_title, 0.00 AS salary")
+    assert "e.badge FROM" in state["rewritten_sql"]
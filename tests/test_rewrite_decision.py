@@ -0,0 +1,119 @@
+"""
+allow / rewrite / deny decisions of the pipeline on the sample graph, loaded from a JSON snapshot
+into the in-memory engine as with [entitlement] BACKEND = memory.
+"""
+from __future__ import annotations
+
+import pytest
+
+from graph_database.in_memory_repository import InMemoryEntitlementRepository
+from relational_database.mysql import mysql_entitlement_util as util
+from relational_database.rewrite_decision import ALLOW, DENY, REWRITE, decision_stats
+from sample_entitlements import sample_repository
+
+
+@pytest.fixture
+def repository(tmp_path, monkeypatch):
+    snapshot = tmp_path / "entitlements.json"
+    sample_repository().save_snapshot(str(snapshot))
+    repo = InMemoryEntitlementRepository.from_snapshot(str(snapshot))
+    monkeypatch.setattr(util, "_entitlement_repository", lambda: repo)
+    return repo
+
+
+def test_no_rule_in_force_allows(run_query):
+    # salary is masked for everyone except Client Support, department is not read
+    state = run_query("user-bob", "SELECT e.first_name, e.salary FROM bank.employee e WHERE e.emp_id = 1")
+    decision = state["decision"]
+    assert (decision.action, decision.denied_tables) == (ALLOW, [])
+    assert decision.sql == "SELECT e.first_name, e.salary FROM bank.employee AS e WHERE e.emp_id = 1"
+    assert state["rows"] == [("Alice", 85000.0)]
+
+
+@pytest.mark.parametrize(
+    "user_id, sql, rewritten, rows",
+    [
+        (
+            "user-alice",
+            "SELECT e.first_name, e.salary FROM bank.employee e WHERE e.emp_id = 1",
+            "SELECT e.first_name, 0.00 AS salary FROM bank.employee AS e WHERE e.emp_id = 1",
+            [("Alice", 0.0)],
+        ),
+        (
+            "user-tom",
+            "SELECT d.dept_name FROM bank.department d",
+            "SELECT d.dept_name FROM bank.department AS d WHERE d.dept_name = 'HR'",
+            [("HR",)],
+        ),
+    ],
+    ids=["mask", "row filter"],
+)
+def test_rules_in_force_rewrite(run_query, user_id, sql, rewritten, rows):
+    state = run_query(user_id, sql)
+    decision = state["decision"]
+    assert (decision.action, decision.sql, decision.denied_tables) == (REWRITE, rewritten, [])
+    assert state["rows"] == rows
+
+
+@pytest.mark.parametrize("user_id", ["user-sam", "user-bob"])
+def test_governed_table_without_a_row_rule_is_denied_without_a_round_trip(run_query, user_id):
+    before = decision_stats.stats()
+    state = run_query(user_id, "SELECT d.dept_id, d.dept_name FROM bank.department d")
+    decision = state["decision"]
+    assert (decision.action, decision.denied_tables) == (DENY, ["bank.department"])
+    assert decision.short_circuits
+    assert (state["rows"], state["columns"]) == ([], ["dept_id", "dept_name"])
+    assert decision_stats.stats()["short_circuits"] == before["short_circuits"] + 1
+
+
+def test_denied_star_query_runs_the_empty_rewrite(run_query):
+    before = decision_stats.stats()
+    state = run_query("user-sam", "SELECT * FROM bank.department")
+    decision = state["decision"]
+    assert (decision.action, decision.columns, decision.short_circuits) == (DENY, None, False)
+    assert decision.sql == "SELECT * FROM bank.department WHERE 1 = 0"
+    assert state["rows"] == []
+    assert decision_stats.stats()["denied_round_trips"] == before["denied_round_trips"] + 1
+
+
+def test_one_denied_table_denies_the_join(run_query):
+    state = run_query(
+        "user-sam",
+        "SELECT e.first_name, d.dept_name FROM bank.employee e JOIN bank.department d ON e.dept_id = d.dept_id",
+    )
+    assert (state["decision"].action, state["decision"].denied_tables) == (DENY, ["bank.department"])
+    assert state["rows"] == []
+
+
+@pytest.mark.parametrize(
+    "sql, rewritten",
+    [
+        (
+            "SELECT * FROM bank.department UNION SELECT * FROM bank.department",
+            "SELECT * FROM bank.department WHERE 1 = 0 UNION SELECT * FROM bank.department WHERE 1 = 0",
+        ),
+        (
+            "SELECT * FROM bank.department UNION ALL SELECT * FROM bank.department WHERE dept_id = 1",
+            "SELECT * FROM bank.department WHERE 1 = 0 "
+            "UNION ALL SELECT * FROM bank.department WHERE dept_id = 1 AND 1 = 0",
+        ),
+        (
+            "(SELECT dept_id FROM bank.department) UNION (SELECT dept_id FROM bank.department WHERE dept_id = 1) "
+            "ORDER BY dept_id",
+            "(SELECT dept_id FROM bank.department WHERE 1 = 0) "
+            "UNION (SELECT dept_id FROM bank.department WHERE dept_id = 1 AND 1 = 0) ORDER BY dept_id",
+        ),
+        (
+            "SELECT first_name FROM bank.employee UNION SELECT dept_name FROM bank.department",
+            "SELECT first_name FROM bank.employee WHERE 1 = 0 UNION SELECT dept_name FROM bank.department WHERE 1 = 0",
+        ),
+    ],
+    ids=["union star", "union all", "parenthesized", "denied table in one branch"],
+)
+def test_denied_set_operation_is_empty_in_every_branch(run_query, sqlite_executor, sql, rewritten):
+    state = run_query("user-bob", sql)
+    decision = state["decision"]
+    assert (decision.action, decision.sql) == (DENY, rewritten)
+    assert state["rows"] == []
+    if not decision.sql.startswith("("):  # SQLite has no parenthesized compound SELECTs
+        assert sqlite_executor.execute(decision.sql) == []
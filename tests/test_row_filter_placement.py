@@ -0,0 +1,150 @@
+"""
+Scoped row-filter placement, run end to end on SQLite: user-alice is in the Finance group, so
+bank.department is filtered to dept_name = 'Finance' wherever it is introduced.
+"""
+from __future__ import annotations
+
+import pytest
+
+from relational_database.mysql import mysql_entitlement_util as util
+
+CASES = {
+    "inner join": (
+        "SELECT e.emp_id, d.dept_name FROM bank.employee e "
+        "JOIN bank.department d ON e.dept_id = d.dept_id ORDER BY e.emp_id",
+        "SELECT e.emp_id, d.dept_name FROM bank.employee AS e "
+        "JOIN bank.department AS d ON e.dept_id = d.dept_id AND d.dept_name = 'Finance' ORDER BY e.emp_id",
+        [(1, "Finance"), (2, "Finance")],
+    ),
+    # the filtered table is null-extended: every employee, department data only where visible
+    "left join, filtered table on the right": (
+        "SELECT e.emp_id, d.dept_name FROM bank.employee e "
+        "LEFT JOIN bank.department d ON e.dept_id = d.dept_id ORDER BY e.emp_id",
+        "SELECT e.emp_id, d.dept_name FROM bank.employee AS e "
+        "LEFT JOIN bank.department AS d ON e.dept_id = d.dept_id AND d.dept_name = 'Finance' ORDER BY e.emp_id",
+        [(1, "Finance"), (2, "Finance"), (3, None), (4, None), (5, None)],
+    ),
+    "left join, filtered table preserved": (
+        "SELECT d.dept_name, e.emp_id FROM bank.department d "
+        "LEFT JOIN bank.employee e ON e.dept_id = d.dept_id ORDER BY e.emp_id",
+        "SELECT d.dept_name, e.emp_id FROM bank.department AS d "
+        "LEFT JOIN bank.employee AS e ON e.dept_id = d.dept_id WHERE d.dept_name = 'Finance' ORDER BY e.emp_id",
+        [("Finance", 1), ("Finance", 2)],
+    ),
+    "right join, filtered table preserved": (
+        "SELECT e.emp_id, d.dept_name FROM bank.employee e "
+        "RIGHT JOIN bank.department d ON e.dept_id = d.dept_id ORDER BY e.emp_id",
+        "SELECT e.emp_id, d.dept_name FROM bank.employee AS e "
+        "RIGHT JOIN (SELECT * FROM bank.department WHERE dept_name = 'Finance') AS d "
+        "ON e.dept_id = d.dept_id ORDER BY e.emp_id",
+        [(1, "Finance"), (2, "Finance")],
+    ),
+    "right join, filtered table null-extended": (
+        "SELECT e.emp_id, d.dept_name FROM bank.department d "
+        "RIGHT JOIN bank.employee e ON e.dept_id = d.dept_id ORDER BY e.emp_id",
+        "SELECT e.emp_id, d.dept_name FROM (SELECT * FROM bank.department WHERE dept_name = 'Finance') AS d "
+        "RIGHT JOIN bank.employee AS e ON e.dept_id = d.dept_id ORDER BY e.emp_id",
+        [(1, "Finance"), (2, "Finance"), (3, None), (4, None), (5, None)],
+    ),
+    # hidden departments are neither joined nor returned as unmatched rows
+    "full join": (
+        "SELECT e.emp_id, d.dept_name FROM bank.employee e "
+        "FULL JOIN bank.department d ON e.dept_id = d.dept_id ORDER BY e.emp_id",
+        "SELECT e.emp_id, d.dept_name FROM bank.employee AS e "
+        "FULL JOIN (SELECT * FROM bank.department WHERE dept_name = 'Finance') AS d "
+        "ON e.dept_id = d.dept_id ORDER BY e.emp_id",
+        [(1, "Finance"), (2, "Finance"), (3, None), (4, None), (5, None)],
+    ),
+    "subquery": (
+        "SELECT e.emp_id FROM bank.employee e "
+        "WHERE e.dept_id IN (SELECT d.dept_id FROM bank.department d) ORDER BY e.emp_id",
+        "SELECT e.emp_id FROM bank.employee AS e "
+        "WHERE e.dept_id IN (SELECT d.dept_id FROM bank.department AS d WHERE d.dept_name = 'Finance') "
+        "ORDER BY e.emp_id",
+        [(1,), (2,)],
+    ),
+    "derived table": (
+        "SELECT x.dept_name FROM (SELECT dept_id, dept_name FROM bank.department) x ORDER BY x.dept_name",
+        "SELECT x.dept_name FROM (SELECT dept_id, dept_name FROM bank.department WHERE dept_name = 'Finance') "
+        "AS x ORDER BY x.dept_name",
+        [("Finance",)],
+    ),
+    "union": (
+        "SELECT dept_name AS name FROM bank.department UNION SELECT first_name FROM bank.employee ORDER BY name",
+        "SELECT dept_name AS name FROM bank.department WHERE dept_name = 'Finance' "
+        "UNION SELECT first_name FROM bank.employee ORDER BY name",
+        [("Alice",), ("Bob",), ("Carol",), ("David",), ("Eva",), ("Finance",)],
+    ),
+}
+
+
+@pytest.mark.parametrize("sql, rewritten, rows", CASES.values(), ids=list(CASES))
+def test_scoped_placement(run_query, sql, rewritten, rows):
+    state = run_query("user-alice", sql)
+    assert state["rewritten_sql"] == rewritten
+    assert state["rows"] == rows
+
+
+def test_outer_placement_filters_the_left_join_result(run_query, monkeypatch):
+    monkeypatch.setattr(util, "row_filter_placement", "outer")
+    state = run_query("user-alice", CASES["left join, filtered table on the right"][0])
+    assert state["rewritten_sql"] == (
+        "SELECT e.emp_id, d.dept_name FROM bank.employee AS e "
+        "LEFT JOIN bank.department AS d ON e.dept_id = d.dept_id WHERE d.dept_name = 'Finance' ORDER BY e.emp_id"
+    )
+    assert state["rows"] == [(1, "Finance"), (2, "Finance")]
+
+
+def test_several_groups_filter_with_in(run_query, repository):
+    repository.add_user_to_policy_group("user-alice", "hr_pg", "HR Group")
+    state = run_query("user-alice", "SELECT d.dept_name FROM bank.department d ORDER BY d.dept_id")
+    assert state["rewritten_sql"] == (
+        "SELECT d.dept_name FROM bank.department AS d WHERE d.dept_name IN ('Finance', 'HR') ORDER BY d.dept_id"
+    )
+    assert state["rows"] == [("Finance",), ("HR",)]
+
+
+def test_cte_body_is_filtered_and_executed(run_query):
+    state = run_query(
+        "user-alice",
+        "WITH fin AS (SELECT dept_id, dept_name FROM bank.department) "
+        "SELECT e.emp_id, f.dept_name FROM bank.employee e JOIN fin f ON f.dept_id = e.dept_id ORDER BY e.emp_id",
+    )
+    assert state["rewritten_sql"] == (
+        "WITH fin AS (SELECT dept_id, dept_name FROM bank.department WHERE dept_name = 'Finance') "
+        "SELECT e.emp_id, f.dept_name FROM bank.employee AS e JOIN fin AS f ON f.dept_id = e.dept_id ORDER BY e.emp_id"
+    )
+    assert state["rows"] == [(1, "Finance"), (2, "Finance")]
+
+
+@pytest.mark.parametrize(
+    "sql, rewritten, rows",
+    [
+        (
+            "SELECT dept_name FROM bank.department UNION ALL SELECT dept_name FROM bank.department WHERE dept_id = 1",
+            "SELECT dept_name FROM bank.department WHERE dept_name = 'Finance' "
+            "UNION ALL SELECT dept_name FROM bank.department WHERE dept_id = 1 AND dept_name = 'Finance'",
+            [("Finance",), ("Finance",)],
+        ),
+        (
+            "SELECT e.emp_id FROM bank.employee e "
+            "WHERE e.dept_id IN (SELECT d.dept_id FROM bank.department d) ORDER BY e.emp_id",
+            "SELECT e.emp_id FROM bank.employee AS e "
+            "WHERE e.dept_id IN (SELECT d.dept_id FROM bank.department AS d WHERE d.dept_name = 'Finance') "
+            "ORDER BY e.emp_id",
+            [(1,), (2,)],
+        ),
+        (
+            "SELECT a.dept_name, b.dept_name FROM bank.department a JOIN bank.department b ON a.dept_id = b.dept_id",
+            "SELECT a.dept_name, b.dept_name FROM bank.department AS a JOIN bank.department AS b "
+            "ON a.dept_id = b.dept_id WHERE a.dept_name = 'Finance' AND b.dept_name = 'Finance'",
+            [("Finance", "Finance")],
+        ),
+    ],
+    ids=["union all", "subquery", "self join"],
+)
+def test_outer_placement_filters_each_branch_and_reference(run_query, monkeypatch, sql, rewritten, rows):
+    monkeypatch.setattr(util, "row_filter_placement", "outer")
+    state = run_query("user-alice", sql)
+    assert state["rewritten_sql"] == rewritten
+    assert state["rows"] == rows
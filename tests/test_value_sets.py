@@ -0,0 +1,152 @@
+"""
+Row filters at or above VALUE_SET_THRESHOLD, emitted as a semi-join on the value table of the
+SQLite executor.
+"""
+from __future__ import annotations
+
+import pytest
+
+from relational_database.executor import Executor, SQLiteExecutor
+from relational_database.mysql import mysql_entitlement_util as util
+from relational_database.mysql.entitlement_pipeline import prepare_fast
+from relational_database.rewrite_cache import RewriteCache
+from relational_database.value_sets import ValueSetStore, value_set_id
+
+DEPARTMENTS = ["Finance", "HR", "IT"]
+
+
+class _RecordingExecutor(SQLiteExecutor):
+    def __init__(self):
+        super().__init__()
+        self.updates = []
+
+    def execute_update(self, sql, rows=None):
+        self.updates.append(sql)
+        super().execute_update(sql, rows)
+
+
+class _OracleExecutor(Executor):
+    """Records statements in the Oracle dialect; the value table exists once created."""
+
+    name = dialect = "oracle"
+
+    def __init__(self, created_elsewhere=False):
+        self.statements = []
+        self.table_exists = False
+        self._created_elsewhere = created_elsewhere
+
+    def execute(self, sql, canceller=None):
+        self.statements.append(sql)
+        if not self.table_exists:
+            raise RuntimeError("ORA-00942: table or view does not exist")
+        return []
+
+    def execute_update(self, sql, rows=None):
+        self.statements.append(sql)
+        if self._created_elsewhere:
+            self.table_exists = True
+            raise RuntimeError("ORA-00955: name is already used by an existing object")
+        self.table_exists = True
+
+
+@pytest.fixture
+def store(monkeypatch, sqlite_executor):
+    store = ValueSetStore(threshold=3, executor=sqlite_executor, chunk_size=2)
+    monkeypatch.setattr(util, "value_set_store", store)
+    # cached templates were registered with another store
+    monkeypatch.setattr(util, "rewrite_cache", RewriteCache())
+    return store
+
+
+def _stored(executor, set_id):
+    return sorted(v for (v,) in executor.execute(f"SELECT value FROM {ValueSetStore().table} WHERE set_id = '{set_id}'"))
+
+
+def test_filter_above_threshold_joins_the_value_table(run_query, repository, store, sqlite_executor):
+    repository.add_user_to_policy_group("user-alice", "hr_pg", "HR Group")
+    repository.add_user_to_policy_group("user-alice", "it_pg", "IT Group")
+    state = run_query("user-alice", "SELECT d.dept_name FROM bank.department d ORDER BY d.dept_id")
+
+    set_id = value_set_id(DEPARTMENTS)
+    assert state["rewritten_sql"] == (
+        "SELECT d.dept_name FROM bank.department AS d WHERE d.dept_name IN "
+        f"(SELECT value FROM bank.entitlement_value_set WHERE set_id = '{set_id}') ORDER BY d.dept_id"
+    )
+    assert state["rows"] == [("Finance",), ("IT",), ("HR",)]
+    assert _stored(sqlite_executor, set_id) == DEPARTMENTS
+
+
+def test_filter_below_threshold_lists_the_values(run_query, repository, store):
+    repository.add_user_to_policy_group("user-alice", "hr_pg", "HR Group")
+    state = run_query("user-alice", "SELECT d.dept_name FROM bank.department d ORDER BY d.dept_id")
+    assert "IN ('Finance', 'HR')" in state["rewritten_sql"]
+    assert store.stats()["predicates"] == 0
+
+
+def test_partial_set_is_completed_without_deleting_rows():
+    executor = _RecordingExecutor()
+    try:
+        set_id = value_set_id(DEPARTMENTS)
+        first = ValueSetStore(threshold=3, executor=executor)
+        first._ensure_table()
+        # an interrupted writer left part of the set behind
+        executor.execute_update(f"INSERT INTO {first.table} (set_id, value) VALUES (?, ?)", [(set_id, "HR")])
+        executor.updates.clear()
+
+        assert first.ensure(DEPARTMENTS) == set_id
+        assert _stored(executor, set_id) == DEPARTMENTS
+        assert not any(sql.lstrip().upper().startswith("DELETE") for sql in executor.updates)
+        assert first.stats()["values_written"] == 2
+
+        # another process finds the set complete and writes nothing
+        executor.updates.clear()
+        second = ValueSetStore(threshold=3, executor=executor)
+        assert second.ensure(list(reversed(DEPARTMENTS))) == set_id
+        assert not any(sql.lstrip().upper().startswith("INSERT") for sql in executor.updates)
+        assert second.stats()["sets_written"] == 0
+    finally:
+        executor.close()
+
+
+def test_rewriting_writes_nothing_until_the_query_runs(repository, catalog, monkeypatch):
+    executor = _RecordingExecutor()
+    try:
+        monkeypatch.setattr(util, "shared_executor", lambda: executor)
+        store = ValueSetStore(threshold=3, executor=executor)
+        monkeypatch.setattr(util, "value_set_store", store)
+        monkeypatch.setattr(util, "rewrite_cache", RewriteCache())
+        repository.add_user_to_policy_group("user-alice", "hr_pg", "HR Group")
+        repository.add_user_to_policy_group("user-alice", "it_pg", "IT Group")
+
+        state = prepare_fast("user-alice", "SELECT d.dept_name FROM bank.department d ORDER BY d.dept_id")
+        assert value_set_id(DEPARTMENTS) in state["rewritten_sql"]
+        assert executor.updates == []
+        assert store.stats()["sets_registered"] == 1
+
+        state = util.execute_node(state)
+        assert state["rows"] == [("Finance",), ("IT",), ("HR",)]
+        assert store.stats()["sets_written"] == 1
+        assert store.stats()["sets_registered"] == 0
+    finally:
+        executor.close()
+
+
+def test_values_longer_than_the_value_column_stay_literals():
+    store = ValueSetStore(threshold=2)
+    assert store.applies(["a" * 255, "b"])
+    assert not store.applies(["a" * 256, "b"])
+    assert not store.applies(["\u00e9" * 128, "b"])  # 256 bytes in UTF-8
+
+
+@pytest.mark.parametrize("created_elsewhere", [False, True])
+def test_value_table_is_created_without_if_not_exists(created_elsewhere):
+    executor = _OracleExecutor(created_elsewhere)
+    store = ValueSetStore(threshold=3, executor=executor)
+
+    store._ensure_table()
+
+    creates = [sql for sql in executor.statements if sql.lstrip().upper().startswith("CREATE")]
+    assert len(creates) == 1
+    assert "IF NOT EXISTS" not in creates[0].upper()
+    assert "VARCHAR2(255)" in creates[0]
+    assert store._table_ready
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import asyncio
+
+from webapp import main
+
+
+class _Session:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute_write(self, work):
+        return await work(object())
+
+
+class _Driver:
+    def session(self, database=None):
+        return _Session()
+
+
+class _RecordingCache:
+    def __init__(self):
+        self.scopes = []
+
+    def invalidate_scope(self, **scope):
+        self.scopes.append(scope)
+
+
+def test_rename_invalidates_the_old_and_the_new_table_key(monkeypatch):
+    scopes = iter([
+        {"user_ids": [], "group_ids": [], "table_keys": ["bank.employee"]},  # before the write
+        {"user_ids": [], "group_ids": [], "table_keys": ["bank.staff"]},  # after it
+    ])
+
+    async def entity_cache_scope(session, label, entity_id):
+        return next(scopes)
+
+    async def no_op(*args, **kwargs):
+        return 7
+
+    cache = _RecordingCache()
+    monkeypatch.setattr(main, "entitlement_cache", cache)
+    monkeypatch.setattr(main, "_neo4j_driver", lambda: (_Driver(), "entitlement"))
+    monkeypatch.setattr(main, "_entity_cache_scope", entity_cache_scope)
+    monkeypatch.setattr(main, "_run_consume", no_op)
+    monkeypatch.setattr(main, "_record_changes", no_op)
+
+    request = main.EntityMutationRequest(entity_type="table", entity_id="employee", properties={"tableName": "staff"})
+    response = asyncio.run(main.create_entity(request))
+
+    assert response["version"] == 7
+    assert cache.scopes == [{"user_ids": [], "group_ids": [], "table_keys": ["bank.employee", "bank.staff"]}]
+
+
+def test_union_of_cache_scopes_keeps_each_key_once():
+    assert main._union_cache_scopes(
+        {"user_ids": ["user-alice"], "group_ids": ["finance_pg"]},
+        {"user_ids": ["user-alice", "user-bob"], "table_keys": ["bank.employee"]},
+    ) == {"user_ids": ["user-alice", "user-bob"], "group_ids": ["finance_pg"], "table_keys": ["bank.employee"]}
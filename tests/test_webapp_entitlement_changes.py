@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import asyncio
+
+from webapp import main
+
+
+def _change(version, entity_id):
+    return {"version": version, "action": "UPDATE", "entityType": "PolicyGroup", "entityId": entity_id}
+
+
+# versions 1 and 3 touch one entity each, version 2 three
+CHANGES = [_change(1, "a"), _change(2, "b"), _change(2, "c"), _change(2, "d"), _change(3, "e")]
+
+
+class _Session:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class _Driver:
+    def session(self, database=None):
+        return _Session()
+
+
+def _changes_api(monkeypatch, changes=CHANGES, current=3):
+    async def run_single(session, query, **params):
+        return {"version": current}
+
+    async def run_all(session, query, since, limit):
+        return [c for c in changes if c["version"] > since][:limit]
+
+    monkeypatch.setattr(main, "_neo4j_driver", lambda: (_Driver(), "entitlement"))
+    monkeypatch.setattr(main, "_run_single", run_single)
+    monkeypatch.setattr(main, "_run_all", run_all)
+    return lambda since, limit: asyncio.run(main.get_entitlement_changes(since=since, limit=limit))
+
+
+def test_truncated_page_stops_before_a_split_version(monkeypatch):
+    get = _changes_api(monkeypatch)
+    page = get(0, 3)
+    assert [c["entityId"] for c in page["changes"]] == ["a"]
+    assert (page["has_more"], page["next_since"], page["version"]) == (True, 1, 3)
+
+
+def test_paging_from_next_since_delivers_every_change_once(monkeypatch):
+    get = _changes_api(monkeypatch)
+    seen, since = [], 0
+    while True:
+        page = get(since, 2)
+        seen += [c["entityId"] for c in page["changes"]]
+        since = page["next_since"]
+        if not page["has_more"]:
+            break
+    assert seen == ["a", "b", "c", "d", "e"]
+    assert since == 3
+
+
+def test_version_larger_than_the_page_is_delivered_whole(monkeypatch):
+    get = _changes_api(monkeypatch)
+    page = get(0, 1)
+    assert [c["entityId"] for c in page["changes"]] == ["a"]
+    page = get(1, 2)  # version 2 alone has three changes
+    assert [c["entityId"] for c in page["changes"]][:3] == ["b", "c", "d"]
+    assert page["next_since"] >= 2
+
+
+def test_last_page_resumes_from_the_graph_version(monkeypatch):
+    get = _changes_api(monkeypatch, current=4)  # version 4 touched nothing that is logged
+    page = get(2, 10)
+    assert [c["entityId"] for c in page["changes"]] == ["e"]
+    assert (page["has_more"], page["next_since"], page["version"]) == (False, 4, 4)
@@ -0,0 +1,133 @@
+"""
+Async web handlers on a fake AsyncDriver: reads, membership writes with their change-log
+version and cache eviction, and the lifespan's shared driver reference.
+"""
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from fake_neo4j import FakeAsyncDriver
+from graph_database import neo4j_driver_registry as registry_module
+from graph_database.entitlement_cache import EntitlementCache, memberships_key
+from graph_database.entitlement_util import CURRENT_VERSION_QUERY, RECORD_CHANGES_QUERY
+from graph_database.neo4j_driver_registry import Neo4jDriverRegistry
+from webapp import main
+
+
+class _Graph:
+    """Users, groups and memberships answering the handlers' queries."""
+
+    def __init__(self):
+        self.users = {"user-bob", "user-alice"}
+        self.groups = {"finance_pg": "Finance Group"}
+        self.memberships = set()
+        self.version = 0
+        self.changes = []
+        self.driver = FakeAsyncDriver(self.handle)
+
+    def handle(self, query, params):
+        if query == RECORD_CHANGES_QUERY:
+            self.version += 1
+            self.changes.extend(params["changes"])
+            return [{"version": self.version}]
+        if query == CURRENT_VERSION_QUERY:
+            return [{"version": self.version}]
+        if "MATCH (u:User)" in query:
+            return [{"userId": user_id} for user_id in sorted(self.users)]
+        if "RETURN pg.policyGroupId AS id" in query:
+            return [{"id": params["group_id"]}] if params["group_id"] in self.groups else []
+        if "MERGE (u)-[:memberOf]->(pg)" in query:
+            self.users.add(params["user_id"])
+            self.memberships.add((params["user_id"], params["group_id"]))
+            return []
+        if "DELETE r" in query:
+            pair = (params["user_id"], params["group_id"])
+            deleted = int(pair in self.memberships)
+            self.memberships.discard(pair)
+            return [{"deleted": deleted}]
+        raise AssertionError(f"unexpected query: {query}")
+
+
+@pytest.fixture
+def graph(monkeypatch):
+    graph = _Graph()
+    monkeypatch.setattr(main, "_app_driver", graph.driver)
+    monkeypatch.setattr(main, "entitlement_cache", EntitlementCache(check_interval=-1))
+    return graph
+
+
+def test_users_are_read_through_the_async_driver(graph):
+    assert asyncio.run(main.get_users()) == [{"user_id": "user-alice"}, {"user_id": "user-bob"}]
+
+
+def test_assign_records_the_change_and_evicts_the_user(graph):
+    main.entitlement_cache.put(memberships_key("user-alice"), [], user_id="user-alice")
+    response = asyncio.run(main.assign_user_to_group(main.MembershipRequest(user_id="user-alice", group_id="finance_pg")))
+
+    assert response == {"ok": True, "action": "assign", "user_id": "user-alice", "group_id": "finance_pg", "version": 1}
+    assert graph.memberships == {("user-alice", "finance_pg")}
+    assert [(c["action"], c["entityId"], c["targetId"]) for c in graph.changes] == [("link", "user-alice", "finance_pg")]
+    assert graph.driver.writes == 1
+    assert main.entitlement_cache.get(memberships_key("user-alice")) == (False, None)
+
+
+def test_assign_to_an_unknown_group_is_404_without_a_write(graph):
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(main.assign_user_to_group(main.MembershipRequest(user_id="user-alice", group_id="nope_pg")))
+    assert raised.value.status_code == 404
+    assert graph.driver.writes == 0 and graph.version == 0
+
+
+def test_revoke_logs_a_change_only_when_a_membership_was_deleted(graph):
+    graph.memberships.add(("user-alice", "finance_pg"))
+    request = main.MembershipRequest(user_id="user-alice", group_id="finance_pg")
+
+    first = asyncio.run(main.revoke_user_from_group(request))
+    assert (first["deleted"], first["version"]) == (1, 1)
+    again = asyncio.run(main.revoke_user_from_group(request))
+    assert (again["deleted"], again["version"]) == (0, 1)
+    assert [c["action"] for c in graph.changes] == ["unlink"]
+
+
+def test_handlers_without_a_driver_are_503(monkeypatch):
+    monkeypatch.setattr(main, "_app_driver", None)
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(main.get_users())
+    assert raised.value.status_code == 503
+
+
+def test_lifespan_holds_one_async_driver_reference(monkeypatch):
+    created = []
+
+    class _AsyncGraphDatabase:
+        @staticmethod
+        def driver(url, **kwargs):
+            created.append(FakeAsyncDriver(lambda query, params: []))
+            return created[-1]
+
+    async def _skip():
+        return None
+
+    registry = Neo4jDriverRegistry()
+    registry._settings = {
+        "url": "neo4j://graph:7687", "auth": ("neo4j", "secret"), "database": "entitlement",
+        "max_connection_pool_size": 10, "connection_acquisition_timeout": 5.0, "max_connection_lifetime": 600.0,
+    }
+    monkeypatch.setattr(registry_module, "AsyncGraphDatabase", _AsyncGraphDatabase)
+    monkeypatch.setattr(main, "neo4j_driver_registry", registry)
+    monkeypatch.setattr(main, "_bootstrap_schema", _skip)
+    monkeypatch.setattr(main, "_warm_executor_pool", _skip)
+
+    async def _serve():
+        async with main.lifespan(main.app):
+            driver, database = main._neo4j_driver()
+            assert (driver, database) == (created[0], "entitlement")
+            assert registry.stats()["async"]["references"] == 1
+
+    asyncio.run(_serve())
+    assert len(created) == 1 and created[0].closed
+    assert main._app_driver is None
+    assert registry.stats()["async"] == {"open": False, "references": 0, "drivers_created": 1}
@@ -1,24 +1,93 @@
 from __future__ import annotations
 
+import asyncio
 import json
+import logging
 import os
 import re
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Tuple
 
 from fastapi import FastAPI, HTTPException
 from fastapi.responses import FileResponse
 from fastapi.staticfiles import StaticFiles
-from neo4j import GraphDatabase
 from pydantic import BaseModel
 
+from graph_database.column_catalog import shared_column_catalog
+from graph_database.entitlement_cache import entitlement_cache
+from graph_database.entitlement_schema import ensure_schema
+from graph_database.entitlement_util import (
+    CHANGES_SINCE_QUERY,
+    CURRENT_VERSION_QUERY,
+    ENTITLEMENT_VERSION_ID,
+    RECORD_CHANGES_QUERY,
+    entitlement_change,
+)
+from graph_database.neo4j_driver_registry import neo4j_driver_registry
+from graph_database.policy_compiler import policy_properties
+from relational_database.executor import JdbcExecutor, shared_executor
+from relational_database.jdbc_pool import jdbc_pool, pool_stats
+from relational_database.rewrite_cache import rewrite_cache
+from relational_database.rewrite_decision import decision_stats
+from webapp.query_api import router as query_router
 from secret.secret_util import get_config
 
 
 BASE_DIR = Path(__file__).resolve().parent
 STATIC_DIR = BASE_DIR / "static"
 
-app = FastAPI(title="Onto2AI Entitlement Manager", version="1.1.0")
+logger = logging.getLogger(__name__)
+
+_app_driver = None
+
+
+async def _bootstrap_schema() -> None:
+    """
+    Create missing entitlement constraints/indexes; a failure (e.g. Neo4j not up yet, or a
+    read-only user) is logged and does not block startup.
+    """
+    if not get_config().getboolean("neo4j", "ENSURE_SCHEMA_ON_STARTUP", fallback=True):
+        return
+    try:
+        result = await asyncio.to_thread(ensure_schema)
+        if result["created"]:
+            logger.info("Created Neo4j constraints/indexes: %s", ", ".join(result["created"]))
+    except Exception as exc:
+        logger.warning("Neo4j schema bootstrap skipped: %s", exc)
+
+
+async def _warm_executor_pool() -> None:
+    """
+    Start the JVM and open the executor's POOL_MIN_SIZE JDBC connections before the first
+    query instead of during it; a failure (database not up yet) is logged and does not block
+    startup, the pool then connects on first use.
+    """
+    try:
+        executor = shared_executor()
+        if not isinstance(executor, JdbcExecutor):
+            return  # SQLite: nothing to warm
+        opened = await asyncio.to_thread(jdbc_pool(executor.section).warm)
+        logger.info("Opened %d %s JDBC connection(s)", opened, executor.section)
+    except Exception as exc:
+        logger.warning("JDBC pool warm-up skipped: %s", exc)
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    global _app_driver
+    _app_driver = neo4j_driver_registry.acquire_async()
+    await _bootstrap_schema()
+    await _warm_executor_pool()
+    try:
+        yield
+    finally:
+        _app_driver = None
+        await neo4j_driver_registry.release_async()
+
+
+app = FastAPI(title="Onto2AI Entitlement Manager", version="1.1.0", lifespan=lifespan)
+app.include_router(query_router)
 app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
 
 
@@ -43,11 +112,40 @@ class ChatExplorerRequest(BaseModel):
 
 
 def _neo4j_driver():
-    cfg = get_config()["neo4j"]
-    return GraphDatabase.driver(
-        cfg["URL"],
-        auth=(cfg["USERNAME"], cfg["PASSWORD"]),
-    ), cfg["DATABASE"]
+    """
+    The process-wide pooled AsyncDriver; the app lifespan holds a registry reference so the
+    pool stays warm between requests. Callers must not close it.
+    """
+    if _app_driver is None:
+        raise HTTPException(status_code=503, detail="Neo4j driver is not available")
+    return _app_driver, neo4j_driver_registry.database
+
+
+async def _run_all(session, query: str, **params) -> List[Any]:
+    result = await session.run(query, **params)
+    return [record async for record in result]
+
+
+async def _run_single(session, query: str, **params):
+    result = await session.run(query, **params)
+    return await result.single()
+
+
+async def _run_consume(session, query: str, **params):
+    result = await session.run(query, **params)
+    return await result.consume()
+
+
+async def _record_changes(tx, changes: List[Dict[str, Any]]) -> int:
+    """
+    Bump the entitlement graph version and log the changes in the mutation's own write
+    transaction; with no changes (a no-op delete) the current version is returned.
+    """
+    if not changes:
+        record = await _run_single(tx, CURRENT_VERSION_QUERY, versionId=ENTITLEMENT_VERSION_ID)
+    else:
+        record = await _run_single(tx, RECORD_CHANGES_QUERY, versionId=ENTITLEMENT_VERSION_ID, changes=changes)
+    return record["version"]
 
 
 ENTITY_CONFIG = {
@@ -115,6 +213,80 @@ def _entity_config(entity_type: str) -> Dict[str, str | None]:
     return config
 
 
+# Entitlement-cache scope affected by a mutation of one entity, read before the mutation runs
+ENTITY_CACHE_SCOPE_QUERIES = {
+    "User": """
+        MATCH (n:User {userId: $entity_id})
+        RETURN [n.userId] AS userIds, [] AS groupIds, [] AS tableKeys
+    """,
+    "PolicyGroup": """
+        MATCH (n:PolicyGroup {policyGroupId: $entity_id})
+        RETURN [] AS userIds, [n.policyGroupId] AS groupIds, [] AS tableKeys
+    """,
+    "Policy": """
+        MATCH (n:Policy {policyId: $entity_id})
+        RETURN
+          [] AS userIds,
+          COLLECT { MATCH (pg:PolicyGroup)-[:includesPolicy]->(n) RETURN pg.policyGroupId } AS groupIds,
+          COLLECT {
+            MATCH (n)-[:hasRowRule|hasColumnRule]->(:Column)-[:belongsToTable]->(t:Table)-[:belongsToSchema]->(s:Schema)
+            RETURN s.schemaName + '.' + t.tableName
+          } AS tableKeys
+    """,
+    "Column": """
+        MATCH (n:Column {columnId: $entity_id})
+        RETURN
+          [] AS userIds,
+          [] AS groupIds,
+          COLLECT {
+            MATCH (n)-[:belongsToTable]->(t:Table)-[:belongsToSchema]->(s:Schema)
+            RETURN s.schemaName + '.' + t.tableName
+          } AS tableKeys
+    """,
+    "Table": """
+        MATCH (n:Table {tableId: $entity_id})
+        RETURN
+          [] AS userIds,
+          [] AS groupIds,
+          COLLECT { MATCH (n)-[:belongsToSchema]->(s:Schema) RETURN s.schemaName + '.' + n.tableName } AS tableKeys
+    """,
+    "Schema": """
+        MATCH (n:Schema {schemaId: $entity_id})
+        RETURN
+          [] AS userIds,
+          [] AS groupIds,
+          COLLECT { MATCH (t:Table)-[:belongsToSchema]->(n) RETURN n.schemaName + '.' + t.tableName } AS tableKeys
+    """,
+}
+
+
+async def _entity_cache_scope(session, label: str, entity_id: str) -> Dict[str, List[str]]:
+    if entitlement_cache is None:
+        return {}
+    record = await _run_single(session, ENTITY_CACHE_SCOPE_QUERIES[label], entity_id=entity_id)
+    if not record:
+        return {}
+    return {
+        "user_ids": record["userIds"],
+        "group_ids": record["groupIds"],
+        "table_keys": record["tableKeys"],
+    }
+
+
+def _union_cache_scopes(*scopes: Dict[str, List[str]]) -> Dict[str, List[str]]:
+    union: Dict[str, List[str]] = {}
+    for scope in scopes:
+        for key, values in scope.items():
+            union.setdefault(key, [])
+            union[key].extend(v for v in values if v not in union[key])
+    return union
+
+
+def _invalidate_entitlement_cache(**scope) -> None:
+    if entitlement_cache is not None and scope:
+        entitlement_cache.invalidate_scope(**scope)
+
+
 def _known_labels() -> List[str]:
     return ["User", "PolicyGroup", "Policy", "Schema", "Table", "Column"]
 
@@ -285,7 +457,7 @@ def _fallback_chat_plan(question: str) -> Dict[str, str]:
     }
 
 
-def _generate_chat_cypher(question: str) -> Dict[str, str]:
+async def _generate_chat_cypher(question: str) -> Dict[str, str]:
     try:
         from langchain_core.messages import HumanMessage, SystemMessage
         from langchain_openai import ChatOpenAI
@@ -296,7 +468,7 @@ def _generate_chat_cypher(question: str) -> Dict[str, str]:
         return _fallback_chat_plan(question)
 
     llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
-    msg = llm.invoke(
+    msg = await llm.ainvoke(
         [
             SystemMessage(content=_cypher_schema_prompt()),
             HumanMessage(content=question),
@@ -324,95 +496,94 @@ def _ensure_read_only_cypher(cypher: str):
         raise HTTPException(status_code=400, detail="Generated Cypher must be read-only")
 
 
-def _graph_payload(limit: int = 1500) -> Dict[str, Any]:
+async def _graph_payload(limit: int = 1500) -> Dict[str, Any]:
     driver, database = _neo4j_driver()
     labels = ["User", "PolicyGroup", "Policy", "Schema", "Table", "Column"]
     rel_types = ["memberOf", "includesPolicy", "hasRowRule", "hasColumnRule", "belongsToTable", "belongsToSchema"]
-    try:
-        with driver.session(database=database) as session:
-            node_rows = session.run(
-                """
-                MATCH (n)
-                WHERE any(l IN labels(n) WHERE l IN $labels)
-                RETURN n
-                LIMIT $limit
-                """,
-                labels=labels,
-                limit=limit,
-            )
-            link_rows = session.run(
-                """
-                MATCH (a)-[r]->(b)
-                WHERE any(l IN labels(a) WHERE l IN $labels)
-                  AND any(l IN labels(b) WHERE l IN $labels)
-                  AND type(r) IN $rel_types
-                RETURN a, r, b
-                LIMIT $limit
-                """,
-                labels=labels,
-                rel_types=rel_types,
-                limit=limit,
-            )
+    async with driver.session(database=database) as session:
+        node_rows = await _run_all(
+            session,
+            """
+            MATCH (n)
+            WHERE any(l IN labels(n) WHERE l IN $labels)
+            RETURN n
+            LIMIT $limit
+            """,
+            labels=labels,
+            limit=limit,
+        )
+        link_rows = await _run_all(
+            session,
+            """
+            MATCH (a)-[r]->(b)
+            WHERE any(l IN labels(a) WHERE l IN $labels)
+              AND any(l IN labels(b) WHERE l IN $labels)
+              AND type(r) IN $rel_types
+            RETURN a, r, b
+            LIMIT $limit
+            """,
+            labels=labels,
+            rel_types=rel_types,
+            limit=limit,
+        )
+
+        node_map: Dict[str, Dict[str, Any]] = {}
+        links: List[Dict[str, Any]] = []
+        rel_seen = set()
+
+        for row in node_rows:
+            n = row["n"]
+            node_id = n.element_id
+            if node_id not in node_map:
+                n_labels = list(n.labels)
+                node_map[node_id] = {
+                    "key": node_id,
+                    "label": n_labels[0] if n_labels else "Node",
+                    "labels": n_labels,
+                    "properties": dict(n.items()),
+                }
 
-            node_map: Dict[str, Dict[str, Any]] = {}
-            links: List[Dict[str, Any]] = []
-            rel_seen = set()
-
-            for row in node_rows:
-                n = row["n"]
-                node_id = n.element_id
-                if node_id not in node_map:
-                    n_labels = list(n.labels)
-                    node_map[node_id] = {
-                        "key": node_id,
-                        "label": n_labels[0] if n_labels else "Node",
-                        "labels": n_labels,
-                        "properties": dict(n.items()),
+        for row in link_rows:
+            a = row["a"]
+            b = row["b"]
+            r = row["r"]
+            a_id = a.element_id
+            b_id = b.element_id
+            r_id = r.element_id
+
+            if a_id not in node_map:
+                a_labels = list(a.labels)
+                node_map[a_id] = {
+                    "key": a_id,
+                    "label": a_labels[0] if a_labels else "Node",
+                    "labels": a_labels,
+                    "properties": dict(a.items()),
+                }
+            if b_id not in node_map:
+                b_labels = list(b.labels)
+                node_map[b_id] = {
+                    "key": b_id,
+                    "label": b_labels[0] if b_labels else "Node",
+                    "labels": b_labels,
+                    "properties": dict(b.items()),
+                }
+            if r_id not in rel_seen:
+                rel_seen.add(r_id)
+                links.append(
+                    {
+                        "key": r_id,
+                        "from": a_id,
+                        "to": b_id,
+                        "type": r.type,
+                        "properties": dict(r.items()),
                     }
+                )
 
-            for row in link_rows:
-                a = row["a"]
-                b = row["b"]
-                r = row["r"]
-                a_id = a.element_id
-                b_id = b.element_id
-                r_id = r.element_id
-
-                if a_id not in node_map:
-                    a_labels = list(a.labels)
-                    node_map[a_id] = {
-                        "key": a_id,
-                        "label": a_labels[0] if a_labels else "Node",
-                        "labels": a_labels,
-                        "properties": dict(a.items()),
-                    }
-                if b_id not in node_map:
-                    b_labels = list(b.labels)
-                    node_map[b_id] = {
-                        "key": b_id,
-                        "label": b_labels[0] if b_labels else "Node",
-                        "labels": b_labels,
-                        "properties": dict(b.items()),
-                    }
-                if r_id not in rel_seen:
-                    rel_seen.add(r_id)
-                    links.append(
-                        {
-                            "key": r_id,
-                            "from": a_id,
-                            "to": b_id,
-                            "type": r.type,
-                            "properties": dict(r.items()),
-                        }
-                    )
-
-            return {"nodes": list(node_map.values()), "links": links}
-    finally:
-        driver.close()
+        return {"nodes": list(node_map.values()), "links": links}
 
 
 @app.post("/api/entities/create")
-def create_entity(req: EntityMutationRequest):
+async def create_entity(req: EntityMutationRequest):
     config = _entity_config(req.entity_type)
     props = {k: v for k, v in (req.properties or {}).items() if isinstance(v, str) and v.strip()}
     entity_id = (req.entity_id or props.get(config["id_field"]) or "").strip()
@@ -420,56 +591,80 @@ def create_entity(req: EntityMutationRequest):
         raise HTTPException(status_code=400, detail="entity_id is required")
 
     driver, database = _neo4j_driver()
-    try:
-        with driver.session(database=database) as session:
-            props[config["id_field"]] = entity_id
-
-            assignments = ", ".join(f"n.{key} = ${key}" for key in props)
-            session.run(
+    async with driver.session(database=database) as session:
+        # the old names (before a rename or move) key cached entries as much as the new ones
+        scope_before = await _entity_cache_scope(session, config["label"], entity_id)
+        props[config["id_field"]] = entity_id
+        if config["label"] == "Policy" and "definition" in props:
+            # store the structured form alongside the text so the rewriter never parses it
+            props.update(policy_properties(props["definition"]))
+
+        assignments = ", ".join(f"n.{key} = ${key}" for key in props)
+
+        async def _write(tx):
+            await _run_consume(
+                tx,
                 f"""
                 MERGE (n:{config["label"]} {{{config["id_field"]}: ${config["id_field"]}}})
                 SET {assignments}
                 """,
                 **props,
-            ).consume()
+            )
+            return await _record_changes(tx, [entitlement_change("upsert", config["label"], entity_id)])
 
-            return {"ok": True, "action": "create", "entity_type": req.entity_type, "entity_id": entity_id}
-    finally:
-        driver.close()
+        version = await session.execute_write(_write)
+        # renamed groups/tables/schemas and redefined policies change cached entitlements
+        scope_after = await _entity_cache_scope(session, config["label"], entity_id)
+        _invalidate_entitlement_cache(**_union_cache_scopes(scope_before, scope_after))
+
+        return {
+            "ok": True,
+            "action": "create",
+            "entity_type": req.entity_type,
+            "entity_id": entity_id,
+            "version": version,
+        }
 
 
 @app.post("/api/entities/delete")
-def delete_entity(req: EntityMutationRequest):
+async def delete_entity(req: EntityMutationRequest):
     config = _entity_config(req.entity_type)
     entity_id = (req.entity_id or "").strip()
     if not entity_id:
         raise HTTPException(status_code=400, detail="entity_id is required")
 
     driver, database = _neo4j_driver()
-    try:
-        with driver.session(database=database) as session:
-            summary = session.run(
+    async with driver.session(database=database) as session:
+        cache_scope = await _entity_cache_scope(session, config["label"], entity_id)
+
+        async def _write(tx):
+            summary = await _run_single(
+                tx,
                 f"""
                 MATCH (n:{config["label"]} {{{config["id_field"]}: $entity_id}})
                 DETACH DELETE n
                 RETURN count(n) AS deleted
                 """,
                 entity_id=entity_id,
-            ).single()
+            )
             deleted = int(summary["deleted"]) if summary and summary["deleted"] is not None else 0
-            return {
-                "ok": True,
-                "action": "delete",
-                "entity_type": req.entity_type,
-                "entity_id": entity_id,
-                "deleted": deleted,
-            }
-    finally:
-        driver.close()
+            changes = [entitlement_change("delete", config["label"], entity_id)] if deleted else []
+            return deleted, await _record_changes(tx, changes)
+
+        deleted, version = await session.execute_write(_write)
+        _invalidate_entitlement_cache(**cache_scope)
+        return {
+            "ok": True,
+            "action": "delete",
+            "entity_type": req.entity_type,
+            "entity_id": entity_id,
+            "deleted": deleted,
+            "version": version,
+        }
 
 
 @app.get("/api/entities/{entity_type}/meta")
-def get_entity_meta(entity_type: str):
+async def get_entity_meta(entity_type: str):
     config = _entity_config(entity_type)
     return {
         "entity_type": entity_type,
@@ -481,171 +676,249 @@ def get_entity_meta(entity_type: str):
 
 
 @app.get("/api/entities/{entity_type}")
-def list_entities(entity_type: str):
+async def list_entities(entity_type: str):
     config = _entity_config(entity_type)
     id_field = config["id_field"]
     name_field = config["name_field"]
 
     driver, database = _neo4j_driver()
-    try:
-        with driver.session(database=database) as session:
-            return_fields = [f"n.{id_field} AS entity_id"]
-            if name_field:
-                return_fields.append(f"n.{name_field} AS display_name")
-            return_fields.append("properties(n) AS properties")
-            order_field = name_field or id_field
-            rows = session.run(
-                f"""
-                MATCH (n:{config["label"]})
-                RETURN {", ".join(return_fields)}
-                ORDER BY n.{order_field}, n.{id_field}
-                """
-            )
-            return [
-                {
-                    "entity_id": r["entity_id"],
-                    "display_name": r.get("display_name"),
-                    "properties": r["properties"],
-                }
-                for r in rows
-                if r["entity_id"]
-            ]
-    finally:
-        driver.close()
+    async with driver.session(database=database) as session:
+        return_fields = [f"n.{id_field} AS entity_id"]
+        if name_field:
+            return_fields.append(f"n.{name_field} AS display_name")
+        return_fields.append("properties(n) AS properties")
+        order_field = name_field or id_field
+        rows = await _run_all(
+            session,
+            f"""
+            MATCH (n:{config["label"]})
+            RETURN {", ".join(return_fields)}
+            ORDER BY n.{order_field}, n.{id_field}
+            """
+        )
+        return [
+            {
+                "entity_id": r["entity_id"],
+                "display_name": r.get("display_name"),
+                "properties": r["properties"],
+            }
+            for r in rows
+            if r["entity_id"]
+        ]
 
 
 @app.get("/api/dashboard")
-def get_dashboard():
+async def get_dashboard():
     driver, database = _neo4j_driver()
-    try:
-        with driver.session(database=database) as session:
-            entity_rows = session.run(
-                """
-                MATCH (n)
-                UNWIND labels(n) AS label
-                WITH label
-                WHERE label IN $labels
-                RETURN label AS entityType, count(*) AS count
-                ORDER BY entityType
-                """,
-                labels=_known_labels(),
-            )
-            relationship_rows = session.run(
-                """
-                MATCH ()-[r]->()
-                WHERE type(r) IN $rel_types
-                RETURN type(r) AS relationshipType, count(*) AS count
-                ORDER BY relationshipType
-                """,
-                rel_types=_known_rel_types(),
-            )
-            return {
-                "entity_counts": [
-                    {"entity_type": row["entityType"], "count": row["count"]}
-                    for row in entity_rows
-                ],
-                "relationship_counts": [
-                    {"relationship_type": row["relationshipType"], "count": row["count"]}
-                    for row in relationship_rows
-                ],
-            }
-    finally:
-        driver.close()
+    async with driver.session(database=database) as session:
+        entity_rows = await _run_all(
+            session,
+            """
+            MATCH (n)
+            UNWIND labels(n) AS label
+            WITH label
+            WHERE label IN $labels
+            RETURN label AS entityType, count(*) AS count
+            ORDER BY entityType
+            """,
+            labels=_known_labels(),
+        )
+        relationship_rows = await _run_all(
+            session,
+            """
+            MATCH ()-[r]->()
+            WHERE type(r) IN $rel_types
+            RETURN type(r) AS relationshipType, count(*) AS count
+            ORDER BY relationshipType
+            """,
+            rel_types=_known_rel_types(),
+        )
+        return {
+            "entity_counts": [
+                {"entity_type": row["entityType"], "count": row["count"]}
+                for row in entity_rows
+            ],
+            "relationship_counts": [
+                {"relationship_type": row["relationshipType"], "count": row["count"]}
+                for row in relationship_rows
+            ],
+        }
+
+
+@app.get("/api/entitlement-cache/stats")
+async def get_entitlement_cache_stats():
+    if entitlement_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **entitlement_cache.stats()}
+
+
+@app.get("/api/rewrite-cache/stats")
+async def get_rewrite_cache_stats():
+    if rewrite_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **rewrite_cache.stats()}
+
+
+@app.get("/api/column-catalog/stats")
+async def get_column_catalog_stats():
+    catalog = shared_column_catalog()
+    if catalog is None:
+        return {"enabled": False}
+    return {"enabled": True, **catalog.stats()}
+
+
+@app.get("/api/rewrite-decisions/stats")
+async def get_rewrite_decision_stats():
+    return decision_stats.stats()
+
+
+@app.get("/api/entitlement-version")
+async def get_entitlement_version():
+    driver, database = _neo4j_driver()
+    async with driver.session(database=database) as session:
+        record = await _run_single(session, CURRENT_VERSION_QUERY, versionId=ENTITLEMENT_VERSION_ID)
+        return {"version": record["version"] if record else 0}
+
+
+def _complete_versions(rows: List[Dict[str, Any]], limit: int) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    The first `limit` of `rows` (fetched with limit + 1), without a trailing version the limit
+    cut in two, so a client resuming after the last delivered version misses no change.
+    """
+    if len(rows) <= limit:
+        return rows, False
+    page, cut = rows[:limit], rows[limit]["version"]
+    return [row for row in page if row["version"] != cut], True
+
+
+@app.get("/api/entitlement-changes")
+async def get_entitlement_changes(since: int = 0, limit: int = 1000):
+    """
+    Changes after `since`, oldest first, in whole versions. Resume from `next_since` while
+    `has_more`; `version` is the graph version when the page was read.
+    """
+    if since < 0 or limit < 1:
+        raise HTTPException(status_code=400, detail="since must be >= 0 and limit >= 1")
+    page_size = min(limit, 10000)
+    driver, database = _neo4j_driver()
+    async with driver.session(database=database) as session:
+        current = await _run_single(session, CURRENT_VERSION_QUERY, versionId=ENTITLEMENT_VERSION_ID)
+        while True:
+            rows = await _run_all(session, CHANGES_SINCE_QUERY, since=since, limit=page_size + 1)
+            changes, has_more = _complete_versions([dict(row) for row in rows], page_size)
+            if changes or not has_more:
+                break
+            page_size *= 2  # one version has more changes than the page holds: deliver all of it
+        version = current["version"] if current else 0
+        last = changes[-1]["version"] if changes else since
+        return {
+            "version": max(version, last),
+            "since": since,
+            "changes": changes,
+            "has_more": has_more,
+            "next_since": last if has_more else max(version, last),
+        }
+
+
+@app.get("/api/neo4j/pool-stats")
+async def get_neo4j_pool_stats():
+    return neo4j_driver_registry.stats()
+
+
+@app.get("/api/jdbc/pool-stats")
+async def get_jdbc_pool_stats():
+    return pool_stats()
 
 
 @app.get("/api/search")
-def search_entities(q: str):
+async def search_entities(q: str):
     term = q.strip().lower()
     if not term:
         return []
     driver, database = _neo4j_driver()
-    try:
-        with driver.session(database=database) as session:
-            rows = session.run(
-                """
-                MATCH (n)
-                WHERE any(l IN labels(n) WHERE l IN $labels)
-                  AND any(k IN keys(properties(n)) WHERE toLower(toString(properties(n)[k])) CONTAINS $term)
-                RETURN labels(n) AS labels, properties(n) AS properties
-                LIMIT 50
-                """,
-                labels=_known_labels(),
-                term=term,
+    async with driver.session(database=database) as session:
+        rows = await _run_all(
+            session,
+            """
+            MATCH (n)
+            WHERE any(l IN labels(n) WHERE l IN $labels)
+              AND any(k IN keys(properties(n)) WHERE toLower(toString(properties(n)[k])) CONTAINS $term)
+            RETURN labels(n) AS labels, properties(n) AS properties
+            LIMIT 50
+            """,
+            labels=_known_labels(),
+            term=term,
+        )
+        results = []
+        for row in rows:
+            labels = row["labels"] or []
+            properties = row["properties"] or {}
+            results.append(
+                {
+                    "label": labels[0] if labels else "Node",
+                    "labels": labels,
+                    "properties": properties,
+                }
             )
-            results = []
-            for row in rows:
-                labels = row["labels"] or []
-                properties = row["properties"] or {}
-                results.append(
-                    {
-                        "label": labels[0] if labels else "Node",
-                        "labels": labels,
-                        "properties": properties,
-                    }
-                )
-            return results
-    finally:
-        driver.close()
+        return results
 
 
 @app.get("/api/search/relationships")
-def search_relationships(q: str):
+async def search_relationships(q: str):
     term = q.strip().lower()
     if not term:
         return []
     driver, database = _neo4j_driver()
-    try:
-        with driver.session(database=database) as session:
-            rows = session.run(
-                """
-                MATCH (a)-[r]->(b)
-                WHERE type(r) IN $rel_types
-                  AND (
-                    toLower(type(r)) CONTAINS $term OR
-                    any(k IN keys(properties(r)) WHERE toLower(toString(properties(r)[k])) CONTAINS $term)
-                  )
-                RETURN
-                  type(r) AS relationshipType,
-                  properties(r) AS properties,
-                  labels(a) AS fromLabels,
-                  properties(a) AS fromProperties,
-                  labels(b) AS toLabels,
-                  properties(b) AS toProperties
-                LIMIT 50
-                """,
-                rel_types=_known_rel_types(),
-                term=term,
+    async with driver.session(database=database) as session:
+        rows = await _run_all(
+            session,
+            """
+            MATCH (a)-[r]->(b)
+            WHERE type(r) IN $rel_types
+              AND (
+                toLower(type(r)) CONTAINS $term OR
+                any(k IN keys(properties(r)) WHERE toLower(toString(properties(r)[k])) CONTAINS $term)
+              )
+            RETURN
+              type(r) AS relationshipType,
+              properties(r) AS properties,
+              labels(a) AS fromLabels,
+              properties(a) AS fromProperties,
+              labels(b) AS toLabels,
+              properties(b) AS toProperties
+            LIMIT 50
+            """,
+            rel_types=_known_rel_types(),
+            term=term,
+        )
+        results = []
+        for row in rows:
+            results.append(
+                {
+                    "type": row["relationshipType"],
+                    "properties": row["properties"] or {},
+                    "from": {
+                        "label": (row["fromLabels"] or ["Node"])[0],
+                        "labels": row["fromLabels"] or [],
+                        "properties": row["fromProperties"] or {},
+                    },
+                    "to": {
+                        "label": (row["toLabels"] or ["Node"])[0],
+                        "labels": row["toLabels"] or [],
+                        "properties": row["toProperties"] or {},
+                    },
+                }
             )
-            results = []
-            for row in rows:
-                results.append(
-                    {
-                        "type": row["relationshipType"],
-                        "properties": row["properties"] or {},
-                        "from": {
-                            "label": (row["fromLabels"] or ["Node"])[0],
-                            "labels": row["fromLabels"] or [],
-                            "properties": row["fromProperties"] or {},
-                        },
-                        "to": {
-                            "label": (row["toLabels"] or ["Node"])[0],
-                            "labels": row["toLabels"] or [],
-                            "properties": row["toProperties"] or {},
-                        },
-                    }
-                )
-            return results
-    finally:
-        driver.close()
+        return results
 
 
 @app.post("/api/chat-explorer")
-def chat_explorer(req: ChatExplorerRequest):
+async def chat_explorer(req: ChatExplorerRequest):
     question = req.question.strip()
     if not question:
         raise HTTPException(status_code=400, detail="question is required")
 
-    plan = _generate_chat_cypher(question)
+    plan = await _generate_chat_cypher(question)
     cypher = plan["cypher"].strip()
     _ensure_read_only_cypher(cypher)
 
@@ -654,11 +927,8 @@ def chat_explorer(req: ChatExplorerRequest):
         params["term"] = question.strip().lower()
 
     driver, database = _neo4j_driver()
-    try:
-        with driver.session(database=database) as session:
-            rows = list(session.run(cypher, **params))
-    finally:
-        driver.close()
+    async with driver.session(database=database) as session:
+        rows = await _run_all(session, cypher, **params)
 
     graph_like = _is_graph_result(rows)
     result_mode = "graph" if graph_like or (plan["result_mode"] == "graph" and not rows) else "table"
@@ -676,155 +946,150 @@ def chat_explorer(req: ChatExplorerRequest):
 
 
 @app.get("/")
-def index():
+async def index():
     return FileResponse(str(STATIC_DIR / "index.html"))
 
 
 @app.get("/api/graph")
-def get_graph(limit: int = 1500):
-    return _graph_payload(limit=limit)
+async def get_graph(limit: int = 1500):
+    return await _graph_payload(limit=limit)
 
 
 @app.get("/api/users")
-def get_users():
+async def get_users():
     driver, database = _neo4j_driver()
-    try:
-        with driver.session(database=database) as session:
-            rows = session.run(
-                """
-                MATCH (u:User)
-                RETURN u.userId AS userId
-                ORDER BY userId
-                """
-            )
-            return [{"user_id": r["userId"]} for r in rows if r["userId"]]
-    finally:
-        driver.close()
+    async with driver.session(database=database) as session:
+        rows = await _run_all(
+            session,
+            """
+            MATCH (u:User)
+            RETURN u.userId AS userId
+            ORDER BY userId
+            """
+        )
+        return [{"user_id": r["userId"]} for r in rows if r["userId"]]
 
 
 @app.get("/api/users/{user_id}/group-options")
-def get_user_group_options(user_id: str):
+async def get_user_group_options(user_id: str):
     driver, database = _neo4j_driver()
-    try:
-        with driver.session(database=database) as session:
-            rows = session.run(
-                """
-                MATCH (pg:PolicyGroup)
-                OPTIONAL MATCH (u:User {userId: $user_id})-[r:memberOf]->(pg)
-                RETURN
-                  pg.policyGroupId AS groupId,
-                  pg.policyGroupName AS groupName,
-                  count(r) > 0 AS isMember
-                ORDER BY groupName, groupId
-                """,
-                user_id=user_id,
-            )
-            entitle_to = []
-            revoke_from = []
-            for r in rows:
-                item = {"group_id": r["groupId"], "group_name": r["groupName"]}
-                if r["isMember"]:
-                    revoke_from.append(item)
-                else:
-                    entitle_to.append(item)
-            return {"user_id": user_id, "entitle_to": entitle_to, "revoke_from": revoke_from}
-    finally:
-        driver.close()
+    async with driver.session(database=database) as session:
+        rows = await _run_all(
+            session,
+            """
+            MATCH (pg:PolicyGroup)
+            OPTIONAL MATCH (u:User {userId: $user_id})-[r:memberOf]->(pg)
+            RETURN
+              pg.policyGroupId AS groupId,
+              pg.policyGroupName AS groupName,
+              count(r) > 0 AS isMember
+            ORDER BY groupName, groupId
+            """,
+            user_id=user_id,
+        )
+        entitle_to = []
+        revoke_from = []
+        for r in rows:
+            item = {"group_id": r["groupId"], "group_name": r["groupName"]}
+            if r["isMember"]:
+                revoke_from.append(item)
+            else:
+                entitle_to.append(item)
+        return {"user_id": user_id, "entitle_to": entitle_to, "revoke_from": revoke_from}
 
 
 @app.get("/api/groups")
-def get_groups():
+async def get_groups():
     driver, database = _neo4j_driver()
-    try:
-        with driver.session(database=database) as session:
-            rows = session.run(
-                """
-                MATCH (pg:PolicyGroup)
-                RETURN pg.policyGroupId AS groupId, pg.policyGroupName AS groupName
-                ORDER BY groupName, groupId
-                """
-            )
-            return [
-                {
-                    "group_id": r["groupId"],
-                    "group_name": r["groupName"],
-                }
-                for r in rows
-                if r["groupId"]
-            ]
-    finally:
-        driver.close()
+    async with driver.session(database=database) as session:
+        rows = await _run_all(
+            session,
+            """
+            MATCH (pg:PolicyGroup)
+            RETURN pg.policyGroupId AS groupId, pg.policyGroupName AS groupName
+            ORDER BY groupName, groupId
+            """
+        )
+        return [
+            {
+                "group_id": r["groupId"],
+                "group_name": r["groupName"],
+            }
+            for r in rows
+            if r["groupId"]
+        ]
 
 
 @app.get("/api/groups/{group_id}/user-options")
-def get_group_user_options(group_id: str):
+async def get_group_user_options(group_id: str):
     driver, database = _neo4j_driver()
-    try:
-        with driver.session(database=database) as session:
-            exists = session.run(
-                "MATCH (pg:PolicyGroup {policyGroupId: $group_id}) RETURN pg.policyGroupId AS id",
-                group_id=group_id,
-            ).single()
-            if not exists:
-                raise HTTPException(status_code=404, detail=f"PolicyGroup not found: {group_id}")
-
-            rows = session.run(
-                """
-                MATCH (p:Policy)
-                OPTIONAL MATCH (:PolicyGroup {policyGroupId: $group_id})-[r:includesPolicy]->(p)
-                RETURN
-                  p.policyId AS policyId,
-                  p.policyName AS policyName,
-                  p.definition AS definition,
-                  count(r) > 0 AS isIncluded
-                ORDER BY policyName, policyId
-                """,
-                group_id=group_id,
-            )
-            including_policies = []
-            excluding_policies = []
-            for r in rows:
-                policy_id = r["policyId"]
-                if not policy_id:
-                    continue
-                item = {
-                    "policy_id": policy_id,
-                    "policy_name": r["policyName"],
-                    "definition": r["definition"],
-                }
-                if r["isIncluded"]:
-                    excluding_policies.append(item)
-                else:
-                    including_policies.append(item)
-            return {
-                "group_id": group_id,
-                "including_policies": including_policies,
-                "excluding_policies": excluding_policies,
+    async with driver.session(database=database) as session:
+        exists = await _run_single(
+            session,
+            "MATCH (pg:PolicyGroup {policyGroupId: $group_id}) RETURN pg.policyGroupId AS id",
+            group_id=group_id,
+        )
+        if not exists:
+            raise HTTPException(status_code=404, detail=f"PolicyGroup not found: {group_id}")
+
+        rows = await _run_all(
+            session,
+            """
+            MATCH (p:Policy)
+            OPTIONAL MATCH (:PolicyGroup {policyGroupId: $group_id})-[r:includesPolicy]->(p)
+            RETURN
+              p.policyId AS policyId,
+              p.policyName AS policyName,
+              p.definition AS definition,
+              count(r) > 0 AS isIncluded
+            ORDER BY policyName, policyId
+            """,
+            group_id=group_id,
+        )
+        including_policies = []
+        excluding_policies = []
+        for r in rows:
+            policy_id = r["policyId"]
+            if not policy_id:
+                continue
+            item = {
+                "policy_id": policy_id,
+                "policy_name": r["policyName"],
+                "definition": r["definition"],
             }
-    finally:
-        driver.close()
+            if r["isIncluded"]:
+                excluding_policies.append(item)
+            else:
+                including_policies.append(item)
+        return {
+            "group_id": group_id,
+            "including_policies": including_policies,
+            "excluding_policies": excluding_policies,
+        }
 
 
 @app.post("/api/groups/includes-policy")
-def include_policy_for_group(req: GroupPolicyRequest):
+async def include_policy_for_group(req: GroupPolicyRequest):
     driver, database = _neo4j_driver()
-    try:
-        with driver.session(database=database) as session:
-            found = session.run(
-                """
-                MATCH (pg:PolicyGroup {policyGroupId: $group_id}), (p:Policy {policyId: $policy_id})
-                RETURN pg.policyGroupId AS groupId, p.policyId AS policyId
-                """,
-                group_id=req.group_id,
-                policy_id=req.policy_id,
-            ).single()
-            if not found:
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"PolicyGroup or Policy not found: {req.group_id}, {req.policy_id}",
-                )
+    async with driver.session(database=database) as session:
+        found = await _run_single(
+            session,
+            """
+            MATCH (pg:PolicyGroup {policyGroupId: $group_id}), (p:Policy {policyId: $policy_id})
+            RETURN pg.policyGroupId AS groupId, p.policyId AS policyId
+            """,
+            group_id=req.group_id,
+            policy_id=req.policy_id,
+        )
+        if not found:
+            raise HTTPException(
+                status_code=404,
+                detail=f"PolicyGroup or Policy not found: {req.group_id}, {req.policy_id}",
+            )
 
-            session.run(
+        async def _write(tx):
+            await _run_consume(
+                tx,
                 """
                 MATCH (pg:PolicyGroup {policyGroupId: $group_id})
                 MATCH (p:Policy {policyId: $policy_id})
@@ -832,32 +1097,44 @@ def include_policy_for_group(req: GroupPolicyRequest):
                 """,
                 group_id=req.group_id,
                 policy_id=req.policy_id,
-            ).consume()
-            return {"ok": True, "action": "include", "group_id": req.group_id, "policy_id": req.policy_id}
-    finally:
-        driver.close()
+            )
+            return await _record_changes(
+                tx, [entitlement_change("link", "PolicyGroup", req.group_id, "includesPolicy", "Policy", req.policy_id)]
+            )
+
+        version = await session.execute_write(_write)
+        _invalidate_entitlement_cache(group_ids=[req.group_id])
+        return {
+            "ok": True,
+            "action": "include",
+            "group_id": req.group_id,
+            "policy_id": req.policy_id,
+            "version": version,
+        }
 
 
 @app.post("/api/groups/excludes-policy")
-def exclude_policy_for_group(req: GroupPolicyRequest):
+async def exclude_policy_for_group(req: GroupPolicyRequest):
     driver, database = _neo4j_driver()
-    try:
-        with driver.session(database=database) as session:
-            found = session.run(
-                """
-                MATCH (pg:PolicyGroup {policyGroupId: $group_id}), (p:Policy {policyId: $policy_id})
-                RETURN pg.policyGroupId AS groupId, p.policyId AS policyId
-                """,
-                group_id=req.group_id,
-                policy_id=req.policy_id,
-            ).single()
-            if not found:
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"PolicyGroup or Policy not found: {req.group_id}, {req.policy_id}",
-                )
+    async with driver.session(database=database) as session:
+        found = await _run_single(
+            session,
+            """
+            MATCH (pg:PolicyGroup {policyGroupId: $group_id}), (p:Policy {policyId: $policy_id})
+            RETURN pg.policyGroupId AS groupId, p.policyId AS policyId
+            """,
+            group_id=req.group_id,
+            policy_id=req.policy_id,
+        )
+        if not found:
+            raise HTTPException(
+                status_code=404,
+                detail=f"PolicyGroup or Policy not found: {req.group_id}, {req.policy_id}",
+            )
 
-            summary = session.run(
+        async def _write(tx):
+            summary = await _run_single(
+                tx,
                 """
                 MATCH (pg:PolicyGroup {policyGroupId: $group_id})-[r:includesPolicy]->(p:Policy {policyId: $policy_id})
                 DELETE r
@@ -865,32 +1142,42 @@ def exclude_policy_for_group(req: GroupPolicyRequest):
                 """,
                 group_id=req.group_id,
                 policy_id=req.policy_id,
-            ).single()
+            )
             deleted = int(summary["deleted"]) if summary and summary["deleted"] is not None else 0
-            return {
-                "ok": True,
-                "action": "exclude",
-                "group_id": req.group_id,
-                "policy_id": req.policy_id,
-                "deleted": deleted,
-            }
-    finally:
-        driver.close()
+            changes = (
+                [entitlement_change("unlink", "PolicyGroup", req.group_id, "includesPolicy", "Policy", req.policy_id)]
+                if deleted
+                else []
+            )
+            return deleted, await _record_changes(tx, changes)
+
+        deleted, version = await session.execute_write(_write)
+        _invalidate_entitlement_cache(group_ids=[req.group_id])
+        return {
+            "ok": True,
+            "action": "exclude",
+            "group_id": req.group_id,
+            "policy_id": req.policy_id,
+            "deleted": deleted,
+            "version": version,
+        }
 
 
 @app.post("/api/entitlements/assign")
-def assign_user_to_group(req: MembershipRequest):
+async def assign_user_to_group(req: MembershipRequest):
     driver, database = _neo4j_driver()
-    try:
-        with driver.session(database=database) as session:
-            found = session.run(
-                "MATCH (pg:PolicyGroup {policyGroupId: $group_id}) RETURN pg.policyGroupId AS id",
-                group_id=req.group_id,
-            ).single()
-            if not found:
-                raise HTTPException(status_code=404, detail=f"PolicyGroup not found: {req.group_id}")
-
-            session.run(
+    async with driver.session(database=database) as session:
+        found = await _run_single(
+            session,
+            "MATCH (pg:PolicyGroup {policyGroupId: $group_id}) RETURN pg.policyGroupId AS id",
+            group_id=req.group_id,
+        )
+        if not found:
+            raise HTTPException(status_code=404, detail=f"PolicyGroup not found: {req.group_id}")
+
+        async def _write(tx):
+            await _run_consume(
+                tx,
                 """
                 MERGE (u:User {userId: $user_id})
                 WITH u
@@ -899,18 +1186,23 @@ def assign_user_to_group(req: MembershipRequest):
                 """,
                 user_id=req.user_id,
                 group_id=req.group_id,
-            ).consume()
-            return {"ok": True, "action": "assign", "user_id": req.user_id, "group_id": req.group_id}
-    finally:
-        driver.close()
+            )
+            return await _record_changes(
+                tx, [entitlement_change("link", "User", req.user_id, "memberOf", "PolicyGroup", req.group_id)]
+            )
+
+        version = await session.execute_write(_write)
+        _invalidate_entitlement_cache(user_ids=[req.user_id])
+        return {"ok": True, "action": "assign", "user_id": req.user_id, "group_id": req.group_id, "version": version}
 
 
 @app.post("/api/entitlements/revoke")
-def revoke_user_from_group(req: MembershipRequest):
+async def revoke_user_from_group(req: MembershipRequest):
     driver, database = _neo4j_driver()
-    try:
-        with driver.session(database=database) as session:
-            summary = session.run(
+    async with driver.session(database=database) as session:
+        async def _write(tx):
+            summary = await _run_single(
+                tx,
                 """
                 MATCH (u:User {userId: $user_id})-[r:memberOf]->(pg:PolicyGroup {policyGroupId: $group_id})
                 DELETE r
@@ -918,14 +1210,22 @@ def revoke_user_from_group(req: MembershipRequest):
                 """,
                 user_id=req.user_id,
                 group_id=req.group_id,
-            ).single()
+            )
             deleted = int(summary["deleted"]) if summary and summary["deleted"] is not None else 0
-            return {
-                "ok": True,
-                "action": "revoke",
-                "user_id": req.user_id,
-                "group_id": req.group_id,
-                "deleted": deleted,
-            }
-    finally:
-        driver.close()
+            changes = (
+                [entitlement_change("unlink", "User", req.user_id, "memberOf", "PolicyGroup", req.group_id)]
+                if deleted
+                else []
+            )
+            return deleted, await _record_changes(tx, changes)
+
+        deleted, version = await session.execute_write(_write)
+        _invalidate_entitlement_cache(user_ids=[req.user_id])
+        return {
+            "ok": True,
+            "action": "revoke",
+            "user_id": req.user_id,
+            "group_id": req.group_id,
+            "deleted": deleted,
+            "version": version,
+        }
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Dict
+
+from fastapi import APIRouter, HTTPException, Request
+from pydantic import BaseModel
+from sqlglot.errors import ParseError, TokenError
+from starlette.background import BackgroundTask
+from starlette.responses import StreamingResponse
+
+from relational_database.executor import StatementCanceller
+from relational_database.mysql.entitlement_pipeline import prepare_async, run_query_async
+from relational_database.mysql.mysql_entitlement_util import AppState, run_query_stream
+from relational_database.arrow_result import arrow_available
+from relational_database.result_stream import FORMATS, MEDIA_TYPES, encode
+from secret.secret_util import get_config
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api", tags=["query"])
+
+_config = get_config()
+# [query_api] defaults: a deadline per request, and the threads that run entitled SQL (at
+# most the JDBC pool size is useful; more only queue on the pool instead of here)
+DEFAULT_TIMEOUT_SECONDS = _config.getfloat("query_api", "TIMEOUT_SECONDS", fallback=30.0)
+EXECUTE_WORKERS = _config.getint("query_api", "EXECUTE_WORKERS", fallback=8)
+DISCONNECT_POLL_SECONDS = 0.25
+
+_execute_pool = ThreadPoolExecutor(max_workers=EXECUTE_WORKERS, thread_name_prefix="query-execute")
+
+
+class QueryStreamRequest(BaseModel):
+    user_id: str
+    sql: str
+    format: str = "ndjson"
+    fetch_size: int | None = None
+
+
+@router.post("/query/stream")
+async def stream_entitled_query(req: QueryStreamRequest):
+    """
+    Rewrite the SQL for the user's entitlements and stream the result as NDJSON, CSV or an
+    Arrow IPC stream, one chunk per fetch batch; the first bytes go out before the result
+    is complete.
+    """
+    if req.format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(FORMATS)}")
+    if req.format == "arrow" and not arrow_available():
+        raise HTTPException(status_code=501, detail="format=arrow needs pyarrow installed on the server")
+    if req.fetch_size is not None and req.fetch_size < 1:
+        raise HTTPException(status_code=400, detail="fetch_size must be >= 1")
+    if not req.sql.strip():
+        raise HTTPException(status_code=400, detail="sql is required")
+
+    # parse/entitlements/rewrite/execute block on Neo4j and JDBC; keep them off the event loop
+    try:
+        _, result = await asyncio.to_thread(run_query_stream, req.user_id, req.sql, req.fetch_size)
+    except (ParseError, TokenError, ValueError) as exc:
+        raise _bad_request(exc)
+    # the body generator is iterated in the threadpool and returns the pooled connection when
+    # exhausted or closed; close() covers a body that was never started
+    return StreamingResponse(
+        encode(result, req.format),
+        media_type=MEDIA_TYPES[req.format],
+        background=BackgroundTask(result.close),
+    )
+
+
+class QueryRequest(BaseModel):
+    user_id: str
+    sql: str
+    timeout_seconds: float | None = None  # default [query_api] TIMEOUT_SECONDS
+
+
+async def _cancel_on_disconnect(request: Request, task: asyncio.Task) -> bool:
+    while not task.done():
+        if await request.is_disconnected():
+            task.cancel()
+            return True
+        await asyncio.sleep(DISCONNECT_POLL_SECONDS)
+    return False
+
+
+def _bad_request(exc: Exception) -> HTTPException:
+    # sqlglot parse/tokenize errors, and ValueError for SQL the pipeline cannot run (not a SELECT)
+    if isinstance(exc, (ParseError, TokenError)):
+        return HTTPException(status_code=400, detail=f"invalid SQL: {exc}")
+    return HTTPException(status_code=400, detail=str(exc))
+
+
+def _cancel_statement(canceller: StatementCanceller) -> None:
+    try:
+        canceller.cancel()
+    except Exception as exc:  # the statement finished or its connection broke meanwhile
+        logger.warning("query api: cancelling the statement failed (%s: %s)", type(exc).__name__, exc)
+
+
+async def _run_entitled(
+    request: Request, req: QueryRequest, pipeline: Awaitable[AppState], canceller: StatementCanceller | None = None
+) -> AppState:
+    """
+    Await the pipeline under the request deadline; cancel it when the deadline passes (504)
+    or the client disconnects (499). Cancelling the task does not stop a worker thread that is
+    already running the statement, so the canceller also cancels the statement in the database
+    and its pooled connection comes back.
+    """
+    task = asyncio.ensure_future(pipeline)
+    watcher = asyncio.ensure_future(_cancel_on_disconnect(request, task))
+    timeout = req.timeout_seconds or DEFAULT_TIMEOUT_SECONDS
+    try:
+        async with asyncio.timeout(timeout):
+            return await task
+    except TimeoutError:
+        raise HTTPException(status_code=504, detail=f"query did not finish within {timeout:g}s")
+    except (ParseError, TokenError, ValueError) as exc:
+        raise _bad_request(exc)
+    except asyncio.CancelledError:
+        if asyncio.current_task().cancelling():
+            raise  # the server is cancelling this request, not the watcher
+        raise HTTPException(status_code=499, detail="client closed the request")
+    finally:
+        watcher.cancel()
+        if canceller is not None and task.cancelled():
+            # Statement.cancel() is a network round trip: off the loop, not awaited
+            asyncio.get_running_loop().run_in_executor(None, _cancel_statement, canceller)
+
+
+def _validate(req: QueryRequest) -> None:
+    if not req.sql.strip():
+        raise HTTPException(status_code=400, detail="sql is required")
+    if req.timeout_seconds is not None and req.timeout_seconds <= 0:
+        raise HTTPException(status_code=400, detail="timeout_seconds must be > 0")
+
+
+def _decision_payload(state: AppState) -> Dict[str, Any]:
+    decision = state["decision"]
+    return {
+        "user_id": state["user_id"],
+        "decision": decision.action,
+        "rewritten_sql": decision.sql,
+        "columns": decision.columns,
+        "denied_tables": decision.denied_tables,
+        "user_groups": state.get("user_groups", []),
+    }
+
+
+@router.post("/query")
+async def run_entitled_query(req: QueryRequest, request: Request):
+    """
+    Rewrite the SQL for the user's entitlements and return the rows. Parsing overlaps the
+    user's group lookup; execution runs on a bounded pool ([query_api] EXECUTE_WORKERS).
+    columns is null when the projection has a star.
+    """
+    _validate(req)
+    started = time.perf_counter()
+    canceller = StatementCanceller()
+    state = await _run_entitled(
+        request, req, run_query_async(req.user_id, req.sql, _execute_pool, canceller), canceller
+    )
+    rows = state.get("rows", [])
+    return {
+        **_decision_payload(state),
+        "rows": [list(row) for row in rows],
+        "row_count": len(rows),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
+
+
+@router.post("/rewrite")
+async def rewrite_entitled_query(req: QueryRequest, request: Request):
+    """
+    The rewrite decision only (allow / rewrite / deny and the rewritten SQL); nothing is executed.
+    """
+    _validate(req)
+    started = time.perf_counter()
+    state = await _run_entitled(request, req, prepare_async(req.user_id, req.sql))
+    return {
+        **_decision_payload(state),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+    }